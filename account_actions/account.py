@@ -0,0 +1,61 @@
+"""Trading account that the account actions of the current decision act on.
+
+By default every account action (portfolio, positions, orders, the
+mark-to-market and risk engines) uses the process-wide Binance client and
+engines. Strategies trading their own sub-account run their decisions
+inside use_account(account); the account is kept in a context variable, so
+it follows the decision into its worker threads and tool calls while
+concurrent decisions of other strategies keep their own.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from client.binance_client import get_binance_client
+
+
+class TradingAccount:
+    """Binance client and local account state of one (sub-)account."""
+
+    def __init__(self, name: str, client, mark_to_market=None, risk=None):
+        """
+        Args:
+            name: Account name, used in logs
+            client: Binance client authenticated for the account
+            mark_to_market: MarkToMarketEngine of the account (None when disabled)
+            risk: RiskEngine of the account (None when disabled)
+        """
+        self.name = name
+        self.client = client
+        self.mark_to_market = mark_to_market
+        self.risk = risk
+
+
+_current_account: ContextVar[Optional[TradingAccount]] = ContextVar("current_account", default=None)
+
+
+def get_current_account() -> Optional[TradingAccount]:
+    """Get the account of the current decision, or None for the default account."""
+    return _current_account.get()
+
+
+@contextmanager
+def use_account(account: Optional[TradingAccount]) -> Iterator[Optional[TradingAccount]]:
+    """
+    Run the account actions inside the block against an account.
+
+    Args:
+        account: Account to use (None: the default account)
+    """
+    token = _current_account.set(account)
+    try:
+        yield account
+    finally:
+        _current_account.reset(token)
+
+
+def get_account_client():
+    """Get the Binance client of the current account (default: get_binance_client())."""
+    account = _current_account.get()
+    return account.client if account is not None else get_binance_client()
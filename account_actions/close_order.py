@@ -1,28 +1,37 @@
 """Close all open futures positions on Binance."""
 
-from client.binance_client import get_binance_client
-from typing import List, Dict
+from account_actions.account import get_account_client
+from account_actions.orders import new_client_order_id, submit_market_order
+from typing import List, Dict, Optional
 
 
-def close_order() -> List[Dict]:
+def close_order(symbols: Optional[List[str]] = None) -> List[Dict]:
     """
-    Close all open positions on Binance Futures.
+    Close open positions on Binance Futures.
     
     This function:
-    1. Retrieves all open positions
+    1. Retrieves all open positions (of the given symbols only, if any)
     2. For each open position, places an opposite market order to close it
        - LONG positions are closed with a SELL order
        - SHORT positions are closed with a BUY order
     
+    Each close order carries its own newClientOrderId, so a retried request
+    cannot close (or flip) a position twice.
+    
+    Args:
+        symbols: Binance symbols (e.g. "ETHUSDT") whose positions to close
+            (default: every open position)
+    
     Returns:
         List of dictionaries containing close order responses, each with:
             - symbol: Trading pair symbol that was closed
+            - client_order_id: Idempotency key of the close order
             - response: Order response from Binance API
     
     Raises:
         Exception: If positions cannot be retrieved or orders cannot be created
     """
-    client = get_binance_client()
+    client = get_account_client()
     
     try:
         # Get futures account information to retrieve open positions
@@ -39,6 +48,8 @@ def close_order() -> List[Dict]:
             # Only process positions with non-zero amount (open positions)
             if position_amt != 0:
                 symbol = position.get('symbol', '')
+                if symbols is not None and symbol not in symbols:
+                    continue
                 
                 # Determine opposite side to close position:
                 # LONG (positive) -> SELL to close
@@ -46,17 +57,17 @@ def close_order() -> List[Dict]:
                 close_side = "SELL" if position_amt > 0 else "BUY"
                 quantity = abs(position_amt)  # Use absolute value for quantity
                 
-                # Create market order to close the position
-                response = client.futures_create_order(
-                    symbol=symbol,
-                    side=close_side,
-                    type="MARKET",
-                    quantity=quantity,
-                    reduceOnly=True  # Ensures this order only reduces the position
+                # Create market order to close the position (reduce-only
+                # ensures it can never open or flip a position)
+                client_order_id = new_client_order_id()
+                response = submit_market_order(
+                    symbol, close_side, quantity,
+                    client_order_id=client_order_id, reduce_only=True, client=client
                 )
                 
                 close_responses.append({
                     "symbol": symbol,
+                    "client_order_id": client_order_id,
                     "response": response
                 })
         
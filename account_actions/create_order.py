@@ -1,11 +1,13 @@
 """Create a futures order on Binance."""
 
 import time
-from typing import Literal
-from client.binance_client import get_binance_client
+from typing import Literal, Optional
+from account_actions.account import get_account_client
+from account_actions.orders import submit_market_order
 
 
-def create_position(symbol: str, side: Literal["LONG", "SHORT"], quantity: float) -> dict:
+def create_position(symbol: str, side: Literal["LONG", "SHORT"], quantity: float,
+                    client_order_id: Optional[str] = None) -> dict:
     """
     Create a futures position order on Binance.
     
@@ -13,6 +15,8 @@ def create_position(symbol: str, side: Literal["LONG", "SHORT"], quantity: float
         symbol: Trading pair symbol (e.g., "ETHUSDT")
         side: "LONG" for buy, "SHORT" for sell
         quantity: Order quantity (amount of base asset)
+        client_order_id: Idempotency key sent as newClientOrderId, so a
+            retried request cannot open the position twice (default: generated)
     
     Returns:
         Dictionary containing the order response from Binance
@@ -20,7 +24,7 @@ def create_position(symbol: str, side: Literal["LONG", "SHORT"], quantity: float
     Raises:
         Exception: If no latest price found or order creation fails
     """
-    client = get_binance_client()
+    client = get_account_client()
     
     try:
         # Get latest price from 1-minute candlesticks (last 5 minutes)
@@ -53,12 +57,7 @@ def create_position(symbol: str, side: Literal["LONG", "SHORT"], quantity: float
         # Note: Market orders execute immediately at current market price
         # The JS code uses a price adjustment (1.01x for LONG, 0.99x for SHORT),
         # but for simplicity we use MARKET order type which doesn't require price
-        response = client.futures_create_order(
-            symbol=symbol,
-            side=order_side,
-            type="MARKET",
-            quantity=quantity
-        )
+        response = submit_market_order(symbol, order_side, quantity, client_order_id=client_order_id, client=client)
         
         return response
         
@@ -1,6 +1,6 @@
 """Get open positions from Binance Futures account."""
 
-from client.binance_client import get_binance_client
+from account_actions.account import get_account_client
 from typing import List, Dict
 
 
@@ -17,7 +17,7 @@ def get_open_position() -> List[Dict[str, str | float]]:
             - realizedPnl: Realized profit and loss (from cumulative realized PnL)
             - liquidationPrice: Liquidation price
     """
-    client = get_binance_client()
+    client = get_account_client()
     
     try:
         # Get futures account information which includes positions
@@ -1,6 +1,6 @@
 """Get portfolio information from Binance account."""
 
-from client.binance_client import get_binance_client
+from account_actions.account import get_account_client
 
 
 def get_portfolio() -> dict[str, str]:
@@ -16,7 +16,7 @@ def get_portfolio() -> dict[str, str]:
         Exception: If API authentication fails or account data cannot be retrieved.
         Provides detailed guidance for common API key permission issues.
     """
-    client = get_binance_client()
+    client = get_account_client()
     
     # First, verify the client connection works (test public endpoint)
     try:
@@ -0,0 +1,527 @@
+"""Local mark-to-market of open positions and account equity.
+
+Positions (signed size, entry price, leverage, margin mode) are kept in
+memory and updated from the fills of our own orders; unrealized PnL,
+margin ratio and liquidation distance are computed locally from a cached
+mark-price feed. The exchange's account and position endpoints are only
+read to reconcile: at start, every MTM_RECONCILE_SECONDS, and after an
+order whose outcome is unknown. Between reconciliations an account view
+costs at most one mark-price request (one for all held symbols, reused for
+MARK_PRICE_TTL_SECONDS), so it can be taken as often as risk monitoring
+needs.
+
+Formulas follow Binance USDⓈ-M futures in one-way mode with a single
+maintenance-margin rate (MTM_MAINTENANCE_MARGIN_RATE) instead of the
+per-notional brackets, so liquidation prices are an estimate; taker fees
+of local fills are estimated with MTM_TAKER_FEE_RATE. Funding payments and
+fee differences show up at the next reconciliation.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from account_actions.account import get_current_account
+from utils.logger import get_logger
+from utils.metrics import increment, set_gauge
+
+
+logger = get_logger("mark_to_market")
+
+MTM_RECONCILE_SECONDS = float(os.getenv("MTM_RECONCILE_SECONDS", "900"))
+MARK_PRICE_TTL_SECONDS = float(os.getenv("MARK_PRICE_TTL_SECONDS", "2"))
+MTM_MAINTENANCE_MARGIN_RATE = float(os.getenv("MTM_MAINTENANCE_MARGIN_RATE", "0.005"))
+MTM_TAKER_FEE_RATE = float(os.getenv("MTM_TAKER_FEE_RATE", "0.0005"))
+# Leverage assumed for symbols the exchange has not reported yet
+DEFAULT_LEVERAGE = 10
+# Order ids remembered to ignore a fill reported twice (e.g. a recovered order)
+MAX_SEEN_ORDERS = 1000
+
+
+class MarkPriceCache:
+    """Latest mark price and premium index per symbol, refreshed from the premium index when stale."""
+
+    def __init__(self, client=None, ttl_seconds: float = MARK_PRICE_TTL_SECONDS):
+        """
+        Args:
+            client: Binance client (default: client.binance_client.get_binance_client())
+            ttl_seconds: How long a mark price is used before it is refetched
+        """
+        self._client = client
+        self.ttl_seconds = ttl_seconds
+        # symbol -> (mark price, monotonic time of the update)
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        # symbol -> (premium index, monotonic time of the fetch)
+        self._premium: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    def update(self, symbol: str, price: float, now: Optional[float] = None):
+        """Store a mark price pushed by any feed (e.g. a position reconciliation)."""
+        if price > 0:
+            with self._lock:
+                self._prices[symbol] = (float(price), time.monotonic() if now is None else now)
+
+    def peek(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Get the last known mark prices, however old, without any request."""
+        with self._lock:
+            return {s: self._prices[s][0] for s in symbols if s in self._prices}
+
+    def peek_premium(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Get the last fetched premium index of a symbol, however old, without any request."""
+        with self._lock:
+            cached = self._premium.get(symbol)
+            return cached[0] if cached is not None else None
+
+    def _fetch(self, symbol: Optional[str], now: float):
+        """Request the premium index of one symbol (or of all of them) and store every row."""
+        if symbol is not None:
+            rows = [self.client.futures_mark_price(symbol=symbol)]
+        else:
+            rows = self.client.futures_mark_price()
+        with self._lock:
+            for row in rows:
+                mark_price = float(row["markPrice"])
+                if mark_price > 0:
+                    self._prices[row["symbol"]] = (mark_price, now)
+                # Delivery contracts are listed too, with empty funding fields
+                self._premium[row["symbol"]] = ({
+                    "mark_price": mark_price,
+                    "index_price": float(row.get("indexPrice") or 0),
+                    "predicted_rate": float(row.get("lastFundingRate") or 0),
+                    "next_funding_time": int(row.get("nextFundingTime") or 0),
+                    "time": int(row.get("time") or 0),
+                }, now)
+
+    def get_prices(self, symbols: Iterable[str], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Get the mark prices of several symbols, refetching the stale ones.
+
+        A single stale symbol is fetched alone; several are fetched with one
+        request for the whole premium index.
+
+        Args:
+            symbols: Futures symbols
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Symbol -> mark price for every symbol with a known price
+        """
+        now = time.monotonic() if now is None else now
+        symbols = list(symbols)
+        with self._lock:
+            stale = [s for s in symbols if s not in self._prices or now - self._prices[s][1] >= self.ttl_seconds]
+        if stale:
+            try:
+                self._fetch(stale[0] if len(stale) == 1 else None, now)
+                increment("mark_price_requests_total", status="ok")
+            except Exception as e:
+                # Keep valuing positions at the last known marks
+                increment("mark_price_requests_total", status="error")
+                logger.warning("Failed to refresh mark prices", extra={"symbols": stale, "error": str(e)})
+        with self._lock:
+            return {s: self._prices[s][0] for s in symbols if s in self._prices}
+
+    def get_premium_index(self, symbol: str, max_age_seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get the premium index of a symbol, refetching it when older than max_age_seconds.
+
+        A refetch requests the whole premium index, so every other symbol
+        (e.g. the next one of a multi-symbol cycle) is served by the same
+        request, and the mark prices are refreshed along the way.
+
+        Args:
+            symbol: Futures symbol
+            max_age_seconds: How long a fetched premium index is reused (0 = always refetch)
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Dictionary with mark_price, index_price, predicted_rate,
+            next_funding_time (ms) and time (ms)
+
+        Raises:
+            Exception: If the premium index cannot be fetched, or does not list the symbol
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            cached = self._premium.get(symbol)
+        if cached is not None and now - cached[1] < max_age_seconds:
+            increment("premium_index_requests_total", status="cached")
+            return cached[0]
+        try:
+            self._fetch(None, now)
+        except Exception as e:
+            increment("premium_index_requests_total", status="error")
+            raise Exception(f"Failed to fetch premium index: {str(e)}")
+        increment("premium_index_requests_total", status="fetched")
+        premium = self.peek_premium(symbol)
+        if premium is None:
+            raise Exception(f"Premium index has no {symbol}")
+        return premium
+
+
+def _signed_side(side: str) -> int:
+    return 1 if side.upper() in ("BUY", "LONG") else -1
+
+
+class MarkToMarketEngine:
+    """Account and positions valued locally between exchange reconciliations."""
+
+    def __init__(self, client=None, prices: Optional[MarkPriceCache] = None,
+                 reconcile_seconds: float = MTM_RECONCILE_SECONDS,
+                 maintenance_margin_rate: float = MTM_MAINTENANCE_MARGIN_RATE,
+                 taker_fee_rate: float = MTM_TAKER_FEE_RATE):
+        """
+        Args:
+            client: Binance client (default: client.binance_client.get_binance_client())
+            prices: Mark price feed (default: a MarkPriceCache on the same client)
+            reconcile_seconds: Longest time between two reconciliations
+            maintenance_margin_rate: Maintenance margin as a fraction of the notional
+            taker_fee_rate: Fee charged on local fills, as a fraction of the notional
+        """
+        self._client = client
+        self.prices = prices or MarkPriceCache(client)
+        self.reconcile_seconds = reconcile_seconds
+        self.maintenance_margin_rate = maintenance_margin_rate
+        self.taker_fee_rate = taker_fee_rate
+        self.wallet_balance = 0.0
+        # symbol -> amount (signed), entry_price, leverage, margin_type, isolated_margin
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        # symbol -> (leverage, margin type), from the last reconciliation
+        self._settings: Dict[str, Tuple[int, str]] = {}
+        self._seen_orders: List[Any] = []
+        self._reconciled_at: Optional[float] = None
+        self._stale_reason: Optional[str] = "start"
+        self._lock = threading.RLock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    # ---------------- Exchange reconciliation ----------------
+
+    def invalidate(self, reason: str):
+        """Force a reconciliation on the next account view (e.g. after an unknown order outcome)."""
+        with self._lock:
+            self._stale_reason = reason
+
+    def ensure_fresh(self, now: Optional[float] = None) -> bool:
+        """
+        Reconcile when the local state is stale.
+
+        Args:
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            True if a reconciliation ran
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            reason = self._stale_reason
+            if reason is None and now - self._reconciled_at >= self.reconcile_seconds:
+                reason = "interval"
+        if reason is None:
+            return False
+        self.reconcile(reason, now)
+        return True
+
+    def reconcile(self, reason: str = "manual", now: Optional[float] = None):
+        """
+        Replace the local state with the exchange's account and positions.
+
+        Args:
+            reason: Why the reconciliation runs (metric label)
+            now: Monotonic time (default: time.monotonic())
+
+        Raises:
+            Exception: If the account or positions cannot be read
+        """
+        now = time.monotonic() if now is None else now
+        try:
+            account = self.client.futures_account()
+            rows = self.client.futures_position_information()
+        except Exception as e:
+            increment("mtm_reconciles_total", reason=reason, status="error")
+            raise Exception(f"Failed to reconcile account: {str(e)}")
+
+        # positionRisk V3 rows carry neither leverage nor margin type; the V2
+        # account lists both for every symbol
+        settings = {
+            row["symbol"]: (int(float(row.get("leverage") or DEFAULT_LEVERAGE)),
+                            "isolated" if row.get("isolated") else "cross")
+            for row in account.get("positions", [])
+        }
+        with self._lock:
+            known = dict(self._settings)
+        positions = {}
+        for row in rows:
+            symbol = row["symbol"]
+            amount = float(row.get("positionAmt", 0))
+            if amount == 0:
+                continue
+            leverage, margin_type = settings.get(symbol) or known.get(symbol, (DEFAULT_LEVERAGE, "cross"))
+            positions[symbol] = {
+                "amount": amount,
+                "entry_price": float(row.get("entryPrice") or 0),
+                "leverage": leverage,
+                "margin_type": margin_type,
+                "isolated_margin": float(row.get("isolatedWallet") or 0),
+            }
+            self.prices.update(symbol, float(row.get("markPrice") or 0), now)
+
+        wallet_balance = float(account.get("totalWalletBalance", 0))
+        with self._lock:
+            drift = wallet_balance - self.wallet_balance if self._reconciled_at is not None else 0.0
+            drifted = sorted(s for s in set(positions) | set(self._positions)
+                             if positions.get(s, {}).get("amount") != self._positions.get(s, {}).get("amount"))
+            self.wallet_balance = wallet_balance
+            self._positions = positions
+            self._settings.update(settings)
+            self._reconciled_at = now
+            self._stale_reason = None
+
+        increment("mtm_reconciles_total", reason=reason, status="ok")
+        set_gauge("mtm_reconcile_wallet_drift", drift)
+        log = logger.warning if drifted and reason == "interval" else logger.info
+        log("Account reconciled", extra={
+            "reason": reason, "wallet_balance": wallet_balance, "wallet_drift": round(drift, 6),
+            "positions": len(positions), "position_drift": drifted,
+        })
+
+    def leverage(self, symbol: str) -> int:
+        """Leverage of a symbol, as last reported by the exchange."""
+        with self._lock:
+            return self._settings.get(symbol, (DEFAULT_LEVERAGE, "cross"))[0]
+
+    # ---------------- Fills ----------------
+
+    def apply_order(self, order: Dict[str, Any]):
+        """
+        Apply the fill of an order response (newOrderRespType=RESULT).
+
+        Args:
+            order: Order with symbol, side, executedQty and avgPrice; an
+                order already applied (same orderId) is ignored
+        """
+        quantity = float(order.get("executedQty") or 0)
+        price = float(order.get("avgPrice") or 0)
+        if quantity <= 0 or price <= 0:
+            return
+        order_id = order.get("orderId")
+        with self._lock:
+            if order_id is not None:
+                if order_id in self._seen_orders:
+                    return
+                self._seen_orders = (self._seen_orders + [order_id])[-MAX_SEEN_ORDERS:]
+            self.apply_fill(order["symbol"], order["side"], quantity, price)
+
+    def apply_fill(self, symbol: str, side: str, quantity: float, price: float):
+        """
+        Update a position and the wallet balance with a fill.
+
+        Adding to a position moves its entry price to the size-weighted
+        average; reducing it realizes PnL against the entry price; a fill
+        larger than the position flips it, with the rest entered at the
+        fill price.
+
+        Args:
+            symbol: Futures symbol
+            side: "BUY" or "SELL"
+            quantity: Filled quantity
+            price: Average fill price
+        """
+        delta = _signed_side(side) * quantity
+        with self._lock:
+            position = self._positions.get(symbol)
+            amount = position["amount"] if position else 0.0
+            entry = position["entry_price"] if position else 0.0
+            realized = 0.0
+            new_amount = amount + delta
+            if amount == 0 or amount * delta > 0:
+                entry = (abs(amount) * entry + quantity * price) / abs(new_amount)
+            else:
+                closed = min(abs(delta), abs(amount))
+                realized = closed * (price - entry) * (1 if amount > 0 else -1)
+                if amount * new_amount < 0:
+                    entry = price
+            self.wallet_balance += realized - quantity * price * self.taker_fee_rate
+
+            if abs(new_amount) < 1e-12:
+                self._positions.pop(symbol, None)
+            else:
+                leverage, margin_type = self._settings.get(symbol, (DEFAULT_LEVERAGE, "cross"))
+                self._positions[symbol] = {
+                    "amount": new_amount,
+                    "entry_price": entry,
+                    "leverage": leverage,
+                    "margin_type": margin_type,
+                    "isolated_margin": abs(new_amount) * entry / leverage if margin_type == "isolated" else 0.0,
+                }
+            self.prices.update(symbol, price)
+        increment("mtm_fills_total", symbol=symbol)
+
+    # ---------------- Views ----------------
+
+    def _position_view(self, symbol: str, position: Dict[str, Any], mark: float,
+                       cross_balance: float) -> Dict[str, Any]:
+        amount, entry = position["amount"], position["entry_price"]
+        notional = abs(amount) * mark
+        maintenance = notional * self.maintenance_margin_rate
+        # Binance: LP = (WB - sign * amount * entry) / (|amount| * MMR - sign * amount),
+        # with WB the isolated margin, or for cross margin the wallet balance
+        # net of the other positions' maintenance margin and unrealized PnL
+        balance = position["isolated_margin"] if position["margin_type"] == "isolated" else cross_balance
+        denominator = abs(amount) * self.maintenance_margin_rate - amount
+        liquidation = (balance - amount * entry) / denominator if denominator else 0.0
+        liquidation = max(liquidation, 0.0)
+        return {
+            "symbol": symbol,
+            "positionAmt": amount,
+            "positionSide": "BOTH",
+            "entryPrice": entry,
+            "markPrice": mark,
+            "unRealizedProfit": amount * (mark - entry),
+            "notional": amount * mark,
+            "leverage": position["leverage"],
+            "marginType": position["margin_type"],
+            "initialMargin": notional / position["leverage"],
+            "maintMargin": maintenance,
+            "liquidationPrice": liquidation,
+            # Fraction the mark can move against the position before liquidation
+            "liquidationDistance": abs(mark - liquidation) / mark if liquidation > 0 else None,
+        }
+
+    def account_view(self, now: Optional[float] = None, refresh: bool = True) -> Dict[str, Any]:
+        """
+        Value the account and every open position at the current mark prices.
+
+        Reconciles first if the local state is stale.
+
+        Args:
+            now: Monotonic time (default: time.monotonic())
+            refresh: When False, make no request at all: skip the
+                reconciliation and value positions at the last known marks
+
+        Returns:
+            Dictionary with wallet_balance, equity, unrealized_pnl,
+            available, initial_margin, maintenance_margin, margin_ratio
+            (maintenance margin over equity; liquidation at 1), positions
+            (shaped like futures_position_information rows, plus notional,
+            initialMargin, maintMargin and liquidationDistance),
+            reconciled_seconds_ago
+        """
+        now = time.monotonic() if now is None else now
+        if refresh:
+            self.ensure_fresh(now)
+        with self._lock:
+            positions = {symbol: dict(position) for symbol, position in self._positions.items()}
+            wallet_balance = self.wallet_balance
+            reconciled_at = self._reconciled_at
+        marks = self.prices.get_prices(positions, now) if refresh else self.prices.peek(positions)
+
+        # Positions without any mark are valued at their entry price
+        marks = {symbol: marks.get(symbol, position["entry_price"]) for symbol, position in positions.items()}
+        pnl = {symbol: p["amount"] * (marks[symbol] - p["entry_price"]) for symbol, p in positions.items()}
+        maintenance = {symbol: abs(p["amount"]) * marks[symbol] * self.maintenance_margin_rate
+                       for symbol, p in positions.items()}
+        cross = [s for s, p in positions.items() if p["margin_type"] != "isolated"]
+        views = []
+        for symbol, position in positions.items():
+            others = [s for s in cross if s != symbol]
+            cross_balance = wallet_balance - sum(maintenance[s] for s in others) + sum(pnl[s] for s in others)
+            views.append(self._position_view(symbol, position, marks[symbol], cross_balance))
+
+        unrealized_pnl = sum(pnl.values())
+        equity = wallet_balance + unrealized_pnl
+        initial_margin = sum(view["initialMargin"] for view in views)
+        maintenance_margin = sum(maintenance.values())
+        margin_ratio = maintenance_margin / equity if equity > 0 else (1.0 if maintenance_margin else 0.0)
+
+        set_gauge("account_equity", equity)
+        set_gauge("account_margin_ratio", margin_ratio)
+        for view in views:
+            if view["liquidationDistance"] is not None:
+                set_gauge("position_liquidation_distance", view["liquidationDistance"], symbol=view["symbol"])
+        return {
+            "wallet_balance": wallet_balance,
+            "equity": equity,
+            "unrealized_pnl": unrealized_pnl,
+            "available": max(equity - initial_margin, 0.0),
+            "initial_margin": initial_margin,
+            "maintenance_margin": maintenance_margin,
+            "margin_ratio": margin_ratio,
+            "positions": views,
+            "reconciled_seconds_ago": now - reconciled_at if reconciled_at is not None else None,
+        }
+
+
+_prices: MarkPriceCache | None = None
+_engine: MarkToMarketEngine | None = None
+
+
+def get_mark_price_cache() -> MarkPriceCache:
+    """
+    Get the process-wide mark price cache, shared by the engines of every account.
+
+    Mark prices are public market data: one request refreshes them for all
+    accounts.
+    """
+    global _prices
+    if _prices is None:
+        _prices = MarkPriceCache()
+    return _prices
+
+
+def get_mark_to_market() -> Optional[MarkToMarketEngine]:
+    """
+    Get the mark-to-market engine of the current account.
+
+    That is the engine of the account set with account_actions.account.use_account,
+    or else the process-wide engine (singleton).
+
+    Returns:
+        MarkToMarketEngine, or None when MTM_ENABLED is "false" (account
+        views then come straight from the exchange)
+    """
+    global _engine
+    account = get_current_account()
+    if account is not None:
+        return account.mark_to_market
+    if _engine is None and os.getenv("MTM_ENABLED", "true").lower() != "false":
+        _engine = MarkToMarketEngine(prices=get_mark_price_cache())
+    return _engine
+
+
+def create_mark_to_market(client) -> Optional[MarkToMarketEngine]:
+    """
+    Create a mark-to-market engine for another account's client.
+
+    Args:
+        client: Binance client authenticated for the account
+
+    Returns:
+        MarkToMarketEngine sharing the process-wide mark prices, or None
+        when MTM_ENABLED is "false"
+    """
+    if os.getenv("MTM_ENABLED", "true").lower() == "false":
+        return None
+    return MarkToMarketEngine(client, prices=get_mark_price_cache())
+
+
+def reset_mark_to_market():
+    """Drop the local account state (the next view reconciles with the exchange) and the mark prices."""
+    global _engine, _prices
+    _engine = None
+    _prices = None
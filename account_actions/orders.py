@@ -0,0 +1,254 @@
+"""Idempotent order submission on Binance Futures.
+
+Every order carries a ``newClientOrderId`` generated before it is sent.
+When the outcome of a submission is unknown (read timeout, dropped
+connection, 5xx, or the exchange reporting the id as a duplicate), the order
+is looked up by that id, with growing delays, and never sent again: Binance
+only rejects a duplicate client order id while the first order is still
+open, and a lookup can lag the matching engine, so resending a market order
+that already filled would fill it twice. Fills are applied to the local
+mark-to-market engine (account_actions/mark_to_market.py).
+
+Orders whose outcome is not known yet are tracked in flight; the runtime
+checkpoint (utils/checkpoint.py) keeps them across a restart, and
+recover_orders looks them up on startup.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import requests
+
+from account_actions.account import get_account_client, get_current_account
+from account_actions.mark_to_market import get_mark_to_market
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("orders")
+
+ORDER_LOOKUP_ATTEMPTS = int(os.getenv("ORDER_LOOKUP_ATTEMPTS", "4"))
+ORDER_LOOKUP_DELAY_SECONDS = float(os.getenv("ORDER_LOOKUP_DELAY_SECONDS", "0.5"))
+CLIENT_ORDER_ID_PREFIX = "trader"
+# Binance Futures error codes
+DUPLICATE_CLIENT_ORDER_ID = -4116
+ORDER_DOES_NOT_EXIST = -2013
+
+# Client order id -> symbol, side, quantity, account and submission time of
+# the orders whose outcome is not known yet
+_in_flight: Dict[str, Dict[str, Any]] = {}
+_in_flight_lock = threading.Lock()
+
+
+def new_client_order_id(prefix: str = CLIENT_ORDER_ID_PREFIX, key: Optional[str] = None) -> str:
+    """
+    Generate a client order id (at most 36 characters of [A-Za-z0-9_-]).
+
+    Args:
+        prefix: Leading label identifying orders placed by this service
+        key: Optional stable key (e.g. an agent tool call id); the same key
+            always yields the same id, so repeated executions of one
+            decision cannot place the order twice
+
+    Returns:
+        Client order id (random unless key is given)
+    """
+    digest = hashlib.sha1(key.encode()).hexdigest() if key is not None else uuid.uuid4().hex
+    return f"{prefix}-{digest[:24]}"
+
+
+def _is_ambiguous(error: Exception) -> bool:
+    """Whether a failed submission may still have reached the matching engine."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and status_code >= 500
+
+
+def find_order(symbol: str, client_order_id: str, client=None) -> Optional[Dict]:
+    """
+    Look up an order by its client order id.
+
+    Args:
+        symbol: Futures symbol (e.g. "ETHUSDT")
+        client_order_id: Id passed as newClientOrderId
+        client: Binance client (default: the current account's, see account_actions.account)
+
+    Returns:
+        Order as returned by the exchange, or None if it does not exist
+
+    Raises:
+        Exception: If the lookup itself fails
+    """
+    client = client or get_account_client()
+    try:
+        return client.futures_get_order(symbol=symbol, origClientOrderId=client_order_id)
+    except Exception as e:
+        if getattr(e, "code", None) == ORDER_DOES_NOT_EXIST:
+            return None
+        raise
+
+
+def _record_fill(order: Dict):
+    """Apply a fill to the local mark-to-market engine, if enabled."""
+    engine = get_mark_to_market()
+    if engine is not None:
+        engine.apply_order(order)
+
+
+def _invalidate_positions(reason: str):
+    """Make the mark-to-market engine reconcile before its next account view."""
+    engine = get_mark_to_market()
+    if engine is not None:
+        engine.invalidate(reason)
+
+
+def _settle(client_order_id: str):
+    """Stop tracking an order whose outcome is known."""
+    with _in_flight_lock:
+        _in_flight.pop(client_order_id, None)
+
+
+def get_in_flight_orders() -> Dict[str, Dict[str, Any]]:
+    """Orders submitted but not confirmed or rejected yet (including ones that ran out of attempts)."""
+    with _in_flight_lock:
+        return {client_order_id: dict(order) for client_order_id, order in _in_flight.items()}
+
+
+def recover_orders(orders: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Dict]]:
+    """
+    Look up orders that were in flight when a previous process stopped.
+
+    Runs against the current account (account_actions.account.use_account);
+    pass the orders of that account only. Found orders are logged with their
+    status and make the mark-to-market engine reconcile. Orders that never
+    reached the exchange are dropped.
+
+    Args:
+        orders: Entries of get_in_flight_orders from the previous process
+
+    Returns:
+        Client order id -> order as reported by the exchange (None if it was
+        never placed); orders whose lookup failed are left out
+    """
+    client = get_account_client()
+    results = {}
+    for client_order_id, order in orders.items():
+        try:
+            existing = find_order(order["symbol"], client_order_id, client)
+        except Exception as e:
+            logger.warning("Failed to look up an order in flight before the restart", extra={
+                "client_order_id": client_order_id, "error": str(e),
+            })
+            continue
+        results[client_order_id] = existing
+        if existing is None:
+            logger.info("Order in flight before the restart was never placed", extra={
+                "client_order_id": client_order_id, **order,
+            })
+            continue
+        increment("order_submissions_total", status="recovered")
+        logger.warning("Order in flight before the restart was placed", extra={
+            "client_order_id": client_order_id, "status": existing.get("status"),
+            "executed_qty": existing.get("executedQty"), **order,
+        })
+        _invalidate_positions("order_recovered")
+    return results
+
+
+def _lookup_order(symbol: str, client_order_id: str, client) -> Optional[Dict]:
+    """
+    Look up an order whose submission outcome is unknown.
+
+    The first lookup is immediate; each further one waits twice as long as the
+    previous (ORDER_LOOKUP_DELAY_SECONDS first), since an order can take a
+    moment to become visible after the matching engine accepted it.
+
+    Returns:
+        The order, or None if ORDER_LOOKUP_ATTEMPTS lookups did not find it
+    """
+    for attempt in range(ORDER_LOOKUP_ATTEMPTS):
+        if attempt:
+            time.sleep(ORDER_LOOKUP_DELAY_SECONDS * 2 ** (attempt - 1))
+        try:
+            existing = find_order(symbol, client_order_id, client)
+        except Exception as e:
+            logger.warning("Order lookup failed", extra={"client_order_id": client_order_id, "error": str(e)})
+            continue
+        if existing is not None:
+            return existing
+    return None
+
+
+def submit_market_order(symbol: str, side: str, quantity: float, client_order_id: Optional[str] = None,
+                        reduce_only: bool = False, client=None) -> Dict:
+    """
+    Place a market order, looking it up when its outcome is unknown.
+
+    Args:
+        symbol: Futures symbol (e.g. "ETHUSDT")
+        side: "BUY" or "SELL"
+        quantity: Order quantity (amount of base asset)
+        client_order_id: Idempotency key (default: a new one from new_client_order_id)
+        reduce_only: Only reduce an existing position
+        client: Binance client (default: the current account's, see account_actions.account)
+
+    Returns:
+        Order response including orderId, clientOrderId, status, executedQty and avgPrice
+
+    Raises:
+        Exception: If the order was rejected, or its outcome is unknown and
+            ORDER_LOOKUP_ATTEMPTS lookups did not find it (the order stays
+            in flight and the account is reconciled before its next view)
+    """
+    client = client or get_account_client()
+    client_order_id = client_order_id or new_client_order_id()
+    params = {
+        "symbol": symbol,
+        "side": side,
+        "type": "MARKET",
+        "quantity": quantity,
+        "newClientOrderId": client_order_id,
+        # Return the fill (executedQty, avgPrice) instead of a bare acknowledgement
+        "newOrderRespType": "RESULT",
+    }
+    if reduce_only:
+        params["reduceOnly"] = True
+    account = get_current_account()
+    with _in_flight_lock:
+        _in_flight[client_order_id] = {
+            "symbol": symbol, "side": side, "quantity": quantity, "reduce_only": reduce_only,
+            "account": account.name if account is not None else None, "submitted_at": time.time(),
+        }
+
+    try:
+        order = client.futures_create_order(**params)
+    except Exception as e:
+        duplicate = getattr(e, "code", None) == DUPLICATE_CLIENT_ORDER_ID
+        if not duplicate and not _is_ambiguous(e):
+            increment("order_submissions_total", status="rejected")
+            _settle(client_order_id)
+            raise
+        logger.warning("Order outcome unknown, looking it up", extra={
+            "symbol": symbol, "client_order_id": client_order_id, "error": str(e),
+        })
+    else:
+        increment("order_submissions_total", status="ok")
+        _settle(client_order_id)
+        _record_fill(order)
+        return order
+
+    existing = _lookup_order(symbol, client_order_id, client)
+    if existing is None:
+        increment("order_submissions_total", status="failed")
+        _invalidate_positions("unknown_order")
+        raise Exception(f"Outcome of order {client_order_id} unknown: not found after "
+                        f"{ORDER_LOOKUP_ATTEMPTS} lookups, check open positions before placing it again")
+    increment("order_submissions_total", status="recovered")
+    _settle(client_order_id)
+    _record_fill(existing)
+    return existing
@@ -0,0 +1,279 @@
+"""Local pre-trade risk checks for orders placed by the agent.
+
+Every order is checked against the account state cached by the
+mark-to-market engine (no request is made) and configurable limits before
+it is sent; a rejected order goes back to the agent at once with the
+reason and the largest quantity the limits allow:
+
+- RISK_MAX_ORDER_NOTIONAL: notional of a single order
+- RISK_MAX_SYMBOL_NOTIONAL: position notional of one symbol after the order
+- RISK_MAX_LEVERAGE: gross notional of all positions over equity after the order
+- initial margin of the order within the available margin
+- RISK_MAX_DAILY_LOSS: equity drawdown since the start of the UTC day, as a
+  fraction of the day's starting equity, beyond which only orders that
+  reduce a position are accepted
+- RISK_MAX_ORDERS_PER_MINUTE: orders accepted per rolling minute
+
+Orders that only reduce a position skip the exposure, margin and loss
+limits. position_size() gives a volatility-scaled quantity from the ATR.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from account_actions.account import get_current_account
+from utils.checkpoint import monotonic_to_wall, wall_to_monotonic
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("risk")
+
+
+class RiskEngine:
+    """Pre-trade limits checked against the locally cached account."""
+
+    def __init__(self, engine=None, max_order_notional: float = 10000.0, max_symbol_notional: float = 20000.0,
+                 max_leverage: float = 10.0, max_daily_loss: float = 0.05, max_orders_per_minute: int = 6,
+                 risk_per_trade: float = 0.01, atr_stop: float = 2.0):
+        """
+        Args:
+            engine: MarkToMarketEngine holding the account state (default:
+                account_actions.mark_to_market.get_mark_to_market(); without
+                one only the order notional and rate limits apply)
+            max_order_notional: Largest notional of a single order (quote asset)
+            max_symbol_notional: Largest position notional per symbol
+            max_leverage: Largest gross notional over equity
+            max_daily_loss: Drawdown since the UTC day start, as a fraction of
+                the day's starting equity, that stops new exposure
+            max_orders_per_minute: Orders accepted per rolling minute
+            risk_per_trade: Fraction of equity position_size risks per trade
+            atr_stop: Stop distance in ATRs assumed by position_size
+        """
+        self._engine = engine
+        self.max_order_notional = max_order_notional
+        self.max_symbol_notional = max_symbol_notional
+        self.max_leverage = max_leverage
+        self.max_daily_loss = max_daily_loss
+        self.max_orders_per_minute = max_orders_per_minute
+        self.risk_per_trade = risk_per_trade
+        self.atr_stop = atr_stop
+        # Symbol -> (price, ATR) from the last collected market data
+        self._market: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._orders: Deque[float] = deque()
+        # (UTC date, equity at the first check of the day)
+        self._day: Optional[Tuple[str, float]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from account_actions.mark_to_market import get_mark_to_market
+
+            self._engine = get_mark_to_market()
+        return self._engine
+
+    def update_market(self, symbol: str, price: float, atr: Optional[float]):
+        """Record the latest price and ATR of a symbol (reference when no mark price is cached)."""
+        with self._lock:
+            self._market[symbol] = (price, atr)
+
+    def _price(self, symbol: str) -> Optional[float]:
+        engine = self.engine
+        mark = engine.prices.peek([symbol]).get(symbol) if engine is not None else None
+        if mark:
+            return mark
+        market = self._market.get(symbol)
+        return market[0] if market else None
+
+    def position_size(self, symbol: str, equity: Optional[float] = None) -> Optional[float]:
+        """
+        Volatility-scaled position size.
+
+        Sized so that a stop atr_stop ATRs away loses risk_per_trade of the
+        equity, then capped by the order and symbol notional limits.
+
+        Args:
+            symbol: Futures symbol
+            equity: Account equity (default: from the cached account)
+
+        Returns:
+            Quantity in the base asset, or None without a price, ATR or equity
+        """
+        with self._lock:
+            atr = self._market.get(symbol, (None, None))[1]
+        price = self._price(symbol)
+        if equity is None and self.engine is not None:
+            equity = self.engine.account_view(refresh=False)["equity"]
+        if not price or not atr or not equity or equity <= 0:
+            return None
+        quantity = equity * self.risk_per_trade / (atr * self.atr_stop)
+        return min(quantity, self.max_order_notional / price, self.max_symbol_notional / price)
+
+    def check_order(self, symbol: str, side: str, quantity: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Check an order against every limit; an accepted order counts toward the rate limit.
+
+        Args:
+            symbol: Futures symbol (e.g. "ETHUSDT")
+            side: "LONG"/"BUY" or "SHORT"/"SELL"
+            quantity: Order quantity in the base asset
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Dictionary with allowed, reasons (empty when allowed), price,
+            notional, max_quantity (largest quantity the exposure limits
+            allow, None if unknown) and suggested_quantity (position_size)
+        """
+        now = time.monotonic() if now is None else now
+        signed = quantity if side.upper() in ("LONG", "BUY") else -quantity
+        reasons = []
+        price = self._price(symbol)
+        view = self.engine.account_view(refresh=False) if self.engine is not None else None
+        if quantity <= 0:
+            reasons.append("quantity must be positive")
+        if not price:
+            reasons.append(f"no reference price for {symbol}")
+        if view is not None and view["reconciled_seconds_ago"] is None:
+            reasons.append("account state unknown (never reconciled)")
+            view = None
+
+        current = 0.0
+        if view is not None:
+            current = next((p["positionAmt"] for p in view["positions"] if p["symbol"] == symbol), 0.0)
+        reducing = current * signed < 0 and abs(signed) <= abs(current)
+        notional = abs(signed) * price if price else 0.0
+        limits = []
+
+        if price:
+            limits.append(self.max_order_notional / price)
+            if notional > self.max_order_notional:
+                reasons.append(f"order notional {notional:.2f} exceeds {self.max_order_notional:g}")
+
+        if price and view is not None and not reducing:
+            equity = view["equity"]
+            symbol_notional = abs(current + signed) * price
+            gross = sum(abs(p["notional"]) for p in view["positions"] if p["symbol"] != symbol) + symbol_notional
+            leverage = gross / equity if equity > 0 else float("inf")
+            margin = notional / self.engine.leverage(symbol)
+            limits.append(max(self.max_symbol_notional / price - abs(current), 0.0))
+            limits.append(max((self.max_leverage * equity - (gross - symbol_notional)) / price - abs(current), 0.0))
+            if symbol_notional > self.max_symbol_notional:
+                reasons.append(f"{symbol} exposure {symbol_notional:.2f} would exceed {self.max_symbol_notional:g}")
+            if leverage > self.max_leverage:
+                reasons.append(f"leverage {leverage:.2f}x would exceed {self.max_leverage:g}x")
+            if margin > view["available"]:
+                reasons.append(f"initial margin {margin:.2f} exceeds available {view['available']:.2f}")
+
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            with self._lock:
+                if self._day is None or self._day[0] != today:
+                    self._day = (today, equity)
+                day_start = self._day[1]
+            loss = (day_start - equity) / day_start if day_start > 0 else 0.0
+            if loss >= self.max_daily_loss:
+                reasons.append(f"daily loss {loss:.2%} reached the {self.max_daily_loss:.2%} limit; "
+                               f"only reducing orders are accepted")
+
+        with self._lock:
+            while self._orders and now - self._orders[0] >= 60:
+                self._orders.popleft()
+            if len(self._orders) >= self.max_orders_per_minute:
+                reasons.append(f"order rate limit of {self.max_orders_per_minute} per minute reached")
+            if not reasons:
+                self._orders.append(now)
+
+        result = {
+            "allowed": not reasons,
+            "reasons": reasons,
+            "price": price,
+            "notional": notional,
+            "max_quantity": min(limits) if limits else None,
+            "suggested_quantity": self.position_size(symbol, view["equity"] if view else None),
+        }
+        increment("risk_checks_total", symbol=symbol, result="accepted" if not reasons else "rejected")
+        if reasons:
+            logger.warning("Order rejected by risk limits", extra={
+                "symbol": symbol, "side": side, "quantity": quantity, "reasons": reasons,
+            })
+        return result
+
+    def get_state(self) -> Dict[str, Any]:
+        """Start-of-day equity and recent order times (Unix times), for a checkpoint."""
+        with self._lock:
+            return {"day": list(self._day) if self._day else None,
+                    "orders": [monotonic_to_wall(order) for order in self._orders]}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore a checkpoint, so that a restart does not reset the daily loss and rate limits."""
+        with self._lock:
+            if state["day"] is not None:
+                self._day = (state["day"][0], float(state["day"][1]))
+            self._orders.extend(wall_to_monotonic(order) for order in state["orders"])
+
+
+_risk_engine: RiskEngine | None = None
+
+
+def get_risk_engine() -> Optional[RiskEngine]:
+    """
+    Get the risk engine of the current account.
+
+    That is the engine of the account set with account_actions.account.use_account,
+    or else the process-wide engine (configured from the environment).
+
+    Environment variables:
+        RISK_ENABLED: "false" disables pre-trade checks (default: "true")
+        RISK_MAX_ORDER_NOTIONAL: Default 10000
+        RISK_MAX_SYMBOL_NOTIONAL: Default 20000
+        RISK_MAX_LEVERAGE: Default 10
+        RISK_MAX_DAILY_LOSS: Default 0.05
+        RISK_MAX_ORDERS_PER_MINUTE: Default 6
+        RISK_PER_TRADE: Default 0.01
+        RISK_ATR_STOP: Default 2.0
+
+    Returns:
+        RiskEngine, or None when disabled
+    """
+    global _risk_engine
+    account = get_current_account()
+    if account is not None:
+        return account.risk
+    if _risk_engine is None:
+        _risk_engine = create_risk_engine()
+    return _risk_engine
+
+
+def create_risk_engine(engine=None) -> Optional[RiskEngine]:
+    """
+    Create a risk engine with the limits from the environment (see get_risk_engine).
+
+    Args:
+        engine: MarkToMarketEngine of the account the limits apply to
+            (default: the current account's)
+
+    Returns:
+        RiskEngine, or None when RISK_ENABLED is "false"
+    """
+    if os.getenv("RISK_ENABLED", "true").lower() == "false":
+        return None
+    return RiskEngine(
+        engine=engine,
+        max_order_notional=float(os.getenv("RISK_MAX_ORDER_NOTIONAL", "10000")),
+        max_symbol_notional=float(os.getenv("RISK_MAX_SYMBOL_NOTIONAL", "20000")),
+        max_leverage=float(os.getenv("RISK_MAX_LEVERAGE", "10")),
+        max_daily_loss=float(os.getenv("RISK_MAX_DAILY_LOSS", "0.05")),
+        max_orders_per_minute=int(os.getenv("RISK_MAX_ORDERS_PER_MINUTE", "6")),
+        risk_per_trade=float(os.getenv("RISK_PER_TRADE", "0.01")),
+        atr_stop=float(os.getenv("RISK_ATR_STOP", "2.0")),
+    )
+
+
+def reset_risk_engine():
+    """Forget the order history, daily start equity and market data."""
+    global _risk_engine
+    _risk_engine = None
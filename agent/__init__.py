@@ -1,6 +1,13 @@
 """Agent package for LangChain agents."""
 
-from .builder import build_agent
-
 __all__ = ["build_agent"]
 
+
+def __getattr__(name):
+    # Imported on first use so that importing agent.callbacks or agent.tools
+    # does not pull in the full langchain agent stack
+    if name == "build_agent":
+        from .builder import build_agent
+
+        return build_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
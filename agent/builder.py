@@ -5,18 +5,28 @@ from agent.tools import get_tools
 from llm.model import get_model
 
 
-def build_agent(temperature: float = 0, system_prompt: str | None = None):
+def build_agent(temperature: float = 0, system_prompt: str | None = None, model=None, callbacks=None):
     """Build and compile the agent using LangChain's create_agent.
     
     Args:
         temperature: Model temperature for randomness (default: 0)
         system_prompt: Optional system prompt for the agent
+        model: Optional chat model to use instead of the default from get_model
+        callbacks: Optional callback handlers attached to this agent's copy of the model
         
     Returns:
         Compiled LangChain agent
     """
     # Initialize model
-    model = get_model(temperature=temperature)
+    if model is None:
+        model = get_model(temperature=temperature)
+    
+    # Attach callbacks to a copy of the model: on Python < 3.11 run config is
+    # not propagated into the agent's async model call, only into tool calls.
+    # The model itself is shared by concurrent decisions and must not change
+    # (with_config would not survive create_agent's bind_tools).
+    if callbacks:
+        model = model.model_copy(update={"callbacks": callbacks})
     
     # Get tools
     tools = get_tools()
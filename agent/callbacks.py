@@ -0,0 +1,83 @@
+"""LangChain callback handlers for the agent."""
+
+import time
+from typing import Any, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.metrics import get_metrics_registry
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Record LLM call and tool call latency, counts and token usage.
+
+    Metrics recorded:
+        - llm_call_seconds{model}: LLM call latency histogram
+        - llm_calls_total{model,status}: LLM calls
+        - llm_tokens_total{model,type}: Input/output tokens reported by the provider
+        - tool_call_seconds{tool}: Tool execution latency histogram
+        - tool_calls_total{tool,status}: Tool calls
+    """
+
+    # Run synchronously in the event loop instead of a thread executor,
+    # so spans land in the trace of the cycle that triggered them.
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+        self._registry = get_metrics_registry()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any):
+        model = (kwargs.get("metadata") or {}).get("ls_model_name") or (serialized or {}).get("name", "unknown")
+        self._runs[run_id] = (time.perf_counter(), model)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID, **kwargs: Any):
+        model = (kwargs.get("metadata") or {}).get("ls_model_name") or (serialized or {}).get("name", "unknown")
+        self._runs[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        start, model = self._runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            self._registry.record_span("llm_call", start, time.perf_counter() - start, model=model)
+        self._registry.increment("llm_calls_total", model=model, status="ok")
+
+        input_tokens, output_tokens = _get_token_usage(response)
+        if input_tokens:
+            self._registry.increment("llm_tokens_total", input_tokens, model=model, type="input")
+        if output_tokens:
+            self._registry.increment("llm_tokens_total", output_tokens, model=model, type="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        start, model = self._runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            self._registry.record_span("llm_call", start, time.perf_counter() - start, model=model)
+        self._registry.increment("llm_calls_total", model=model, status="error")
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._runs[run_id] = (time.perf_counter(), (serialized or {}).get("name", "unknown"))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "error")
+
+    def _finish_tool(self, run_id: UUID, status: str):
+        start, tool_name = self._runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            self._registry.record_span("tool_call", start, time.perf_counter() - start, tool=tool_name)
+        self._registry.increment("tool_calls_total", tool=tool_name, status=status)
+
+
+def _get_token_usage(response: LLMResult) -> tuple[int, int]:
+    """Extract (input, output) token counts from an LLM result."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
@@ -0,0 +1,160 @@
+"""Trading decision under a latency budget.
+
+A decision runs the agent with the primary model, bounded by
+LLM_PRIMARY_TIMEOUT_SECONDS. If the model misses it (or fails), the agent
+runs again with the next model of the cascade (a faster one) within what
+is left of DECISION_DEADLINE_SECONDS, and finally the deterministic rules
+of agent/rules.py decide.
+
+Tool calls are dispatched from the model stream as soon as their arguments
+are complete (agent/dispatch.py). If an attempt is cut off after it started
+an order, the cascade stops there: the order keeps running, its result is
+collected and becomes the decision, so a fallback can never trade twice.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from agent.builder import build_agent
+from agent.callbacks import MetricsCallbackHandler
+from agent.dispatch import ToolCallDispatcher
+from agent.tools import collect_tool_calls, start_tool_call
+from utils.logger import get_logger
+from utils.metrics import increment, observe, span
+
+
+logger = get_logger("decision")
+
+RULES_SOURCE = "rules"
+
+
+def get_decision_deadline() -> float:
+    """Total latency budget of one decision in seconds (DECISION_DEADLINE_SECONDS)."""
+    return float(os.getenv("DECISION_DEADLINE_SECONDS", "150"))
+
+
+def get_primary_timeout() -> float:
+    """Budget of the first model in seconds (LLM_PRIMARY_TIMEOUT_SECONDS)."""
+    return float(os.getenv("LLM_PRIMARY_TIMEOUT_SECONDS", "100"))
+
+
+def _message_record(node_name: str, msg) -> Dict[str, Any]:
+    return {
+        "node": node_name,
+        "type": getattr(msg, "type", type(msg).__name__),
+        "content": getattr(msg, "content", str(msg)),
+        "tool_calls": getattr(msg, "tool_calls", None) or [],
+    }
+
+
+async def _stream_agent(agent, user_message: str, messages: List[Dict[str, Any]], callbacks: List[Any]):
+    """Run the agent, appending every message it produces to messages."""
+    async for chunk in agent.astream({"messages": [("user", user_message)]}, config={"callbacks": callbacks}):
+        for node_name, node_output in chunk.items():
+            if isinstance(node_output, dict) and "messages" in node_output:
+                messages.extend(_message_record(node_name, msg) for msg in node_output["messages"])
+
+
+async def _gather_results(tasks: List[asyncio.Future]) -> List[Dict[str, Any]]:
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return [{"status": "error", "message": str(r)} if isinstance(r, BaseException) else r for r in results]
+
+
+async def _collect_started_calls(dispatcher: ToolCallDispatcher, messages: List[Dict[str, Any]]) -> List[Any]:
+    """Wait for the tool calls an interrupted attempt had started."""
+    call_ids = list(dispatcher.tool_call_ids)
+    for record in messages:
+        call_ids.extend(call["id"] for call in record["tool_calls"] if call.get("id") not in call_ids)
+    tasks = collect_tool_calls(call_ids)
+    # Each task is bounded by its tool timeout (see agent.tools.run_with_timeout)
+    return await _gather_results(tasks)
+
+
+def _decision(source: str, status: str, messages: List[Dict[str, Any]], start: float,
+              tool_results: Optional[List[Any]] = None) -> Dict[str, Any]:
+    elapsed = time.perf_counter() - start
+    increment("decisions_total", source=source, status=status)
+    observe("decision_seconds", elapsed, source=source)
+    return {
+        "source": source,
+        "status": status,
+        "messages": messages,
+        "response": "".join(str(record["content"]) for record in messages if record["content"]),
+        "tool_calls": [call["name"] for record in messages for call in record["tool_calls"]],
+        "tool_results": tool_results or [],
+        "elapsed": elapsed,
+    }
+
+
+async def run_decision(system_prompt: str, user_message: str, models: Sequence[Tuple[str, Any]],
+                       rules: Optional[Callable[[], Tuple[List[Tuple[str, Dict[str, Any]]], str]]] = None,
+                       deadline: Optional[float] = None, primary_timeout: Optional[float] = None,
+                       decision_id: str = "decision") -> Dict[str, Any]:
+    """Make one trading decision with the model cascade.
+
+    Args:
+        system_prompt: Enriched market prompt
+        user_message: Decision request sent as the user message
+        models: (label, chat model) pairs, primary first
+        rules: Callable returning (tool calls, reason) used when every model
+            missed its budget (default: hold)
+        deadline: Total budget in seconds (default: get_decision_deadline())
+        primary_timeout: Budget of the first model (default: get_primary_timeout())
+        decision_id: Key for the tool calls placed by the rules
+
+    Returns:
+        Decision with source (model label or "rules"), status ("ok", "timeout"
+        or "error" for the attempt that decided), archived messages, response
+        text, tool call names, tool results of interrupted attempts and
+        elapsed seconds
+    """
+    start = time.perf_counter()
+    deadline = get_decision_deadline() if deadline is None else deadline
+    primary_timeout = get_primary_timeout() if primary_timeout is None else primary_timeout
+
+    for index, (label, model) in enumerate(models):
+        remaining = deadline - (time.perf_counter() - start)
+        if remaining <= 0:
+            break
+        budget = min(remaining, primary_timeout) if index == 0 and len(models) > 1 else remaining
+
+        metrics_callback = MetricsCallbackHandler()
+        dispatcher = ToolCallDispatcher()
+        agent = build_agent(temperature=0, system_prompt=system_prompt, model=model,
+                            callbacks=[metrics_callback, dispatcher])
+        messages: List[Dict[str, Any]] = []
+        try:
+            with span("decision_attempt", model=label):
+                await asyncio.wait_for(_stream_agent(agent, user_message, messages, [metrics_callback]), budget)
+            # Calls dispatched from the stream were awaited by the tool node
+            collect_tool_calls(dispatcher.tool_call_ids)
+            return _decision(label, "ok", messages, start)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            increment("llm_deadline_misses_total", model=label)
+            logger.warning("Model missed its deadline", extra={"model": label, "budget": round(budget, 1)})
+        except Exception as e:
+            status = "error"
+            logger.warning("Model call failed", extra={"model": label, "error": str(e)})
+
+        tool_results = await _collect_started_calls(dispatcher, messages)
+        if tool_results:
+            # The model already acted; a fallback must not decide again
+            return _decision(label, status, messages, start, tool_results)
+        increment("llm_fallbacks_total", model=label, reason=status)
+
+    tool_calls, reason = rules() if rules else ([], "Rules: no rules configured, holding")
+    tasks = [start_tool_call(name, args, f"{decision_id}-rules-{i}") for i, (name, args) in enumerate(tool_calls)]
+    tool_results = await _gather_results(tasks)
+    collect_tool_calls([f"{decision_id}-rules-{i}" for i in range(len(tasks))])
+    messages = [{
+        "node": RULES_SOURCE,
+        "type": "ai",
+        "content": reason,
+        "tool_calls": [{"name": name, "args": args, "id": f"{decision_id}-rules-{i}"}
+                       for i, (name, args) in enumerate(tool_calls)],
+    }]
+    logger.info("Rules decided", extra={"reason": reason, "tool_results": tool_results})
+    return _decision(RULES_SOURCE, "ok", messages, start, tool_results)
@@ -0,0 +1,88 @@
+"""Early dispatch of tool calls from the model stream.
+
+A streaming model emits a tool call as chunks of JSON arguments. As soon as
+the arguments of a call parse (the closing brace has arrived) and validate
+against the tool schema, the call is started through
+agent.tools.start_tool_call, while the model may still be streaming and
+before the graph reaches its tool node. The tool node then awaits the task
+that is already running. Non-streaming models are handled when the model
+call ends.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from agent.tools import get_tools_by_name, start_tool_call
+from utils.logger import get_logger
+from utils.metrics import increment, observe
+
+
+logger = get_logger("dispatch")
+
+
+class ToolCallDispatcher(BaseCallbackHandler):
+    """Start tool calls as soon as their arguments are complete.
+
+    Attach it to the model (like MetricsCallbackHandler) so that it sees the
+    stream on every Python version.
+    """
+
+    # Run in the event loop so that tool calls can be scheduled on it
+    run_inline = True
+
+    def __init__(self):
+        self._tool_names = set(get_tools_by_name())
+        # (model run, tool call index) -> partial tool call
+        self._partial: Dict[Tuple[UUID, Any], Dict[str, str]] = {}
+        # Tool call id -> dispatch time (perf_counter)
+        self._dispatched: Dict[str, float] = {}
+
+    @property
+    def tool_call_ids(self) -> List[str]:
+        """Ids of the tool calls started so far, in dispatch order."""
+        return list(self._dispatched)
+
+    def on_llm_new_token(self, token: str, *, chunk=None, run_id: UUID, **kwargs: Any):
+        message = getattr(chunk, "message", None)
+        for call_chunk in getattr(message, "tool_call_chunks", None) or []:
+            partial = self._partial.setdefault((run_id, call_chunk.get("index")), {"id": "", "name": "", "args": ""})
+            partial["id"] = call_chunk.get("id") or partial["id"]
+            partial["name"] = call_chunk.get("name") or partial["name"]
+            partial["args"] += call_chunk.get("args") or ""
+            if partial["id"] and partial["id"] not in self._dispatched:
+                try:
+                    args = json.loads(partial["args"])
+                except ValueError:
+                    continue
+                if isinstance(args, dict):
+                    self._dispatch(partial["name"], args, partial["id"], "stream")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        now = time.perf_counter()
+        for key in [key for key in self._partial if key[0] == run_id]:
+            call_id = self._partial.pop(key)["id"]
+            if call_id in self._dispatched:
+                # Time the order had been running before the model finished
+                observe("tool_dispatch_lead_seconds", now - self._dispatched[call_id])
+        for generations in response.generations:
+            for generation in generations:
+                for tool_call in getattr(getattr(generation, "message", None), "tool_calls", None) or []:
+                    if tool_call.get("id") and tool_call["id"] not in self._dispatched:
+                        self._dispatch(tool_call["name"], tool_call["args"], tool_call["id"], "llm_end")
+
+    def _dispatch(self, name: str, args: Dict[str, Any], tool_call_id: str, stage: str):
+        if name not in self._tool_names:
+            return
+        try:
+            start_tool_call(name, args, tool_call_id)
+        except Exception as e:
+            # Left to the tool node, which reports the error to the model
+            logger.warning("Could not dispatch tool call", extra={"tool": name, "error": str(e)})
+            return
+        self._dispatched[tool_call_id] = time.perf_counter()
+        increment("tool_dispatches_total", tool=name, stage=stage)
@@ -0,0 +1,185 @@
+"""Signal-change gate in front of the model decision.
+
+Most 5-minute cycles in a quiet market carry nothing new for the model. The
+gate compares a compact snapshot of the market state (see market_state)
+with the snapshot of the last cycle that ran the model, and runs it again
+only when something material changed:
+
+- a crossing flipped (price vs EMA20, EMA20 vs EMA50, MACD sign)
+- an RSI left or entered its overbought/oversold zone
+- the price moved more than SIGNAL_GATE_ATR_MOVE ATRs
+- positions changed, or unrealized PnL moved more than SIGNAL_GATE_PNL_CHANGE
+  of the account value
+- SIGNAL_GATE_MAX_STALENESS_SECONDS passed since the last model decision
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.checkpoint import monotonic_to_wall, wall_to_monotonic
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("gate")
+
+
+def _sign(value: float) -> int:
+    return (value > 0) - (value < 0)
+
+
+def market_state(price: float, atr: Optional[float], crossings: Dict[str, Tuple[float, float]],
+                 oscillators: Dict[str, float], positions: List[Dict[str, Any]],
+                 account_value: float, rsi_lower: float = 30.0, rsi_upper: float = 70.0) -> Dict[str, Any]:
+    """Build the snapshot the gate compares between cycles.
+
+    Args:
+        price: Current price
+        atr: Current ATR on the decision timeframe (None if unknown)
+        crossings: Name -> (fast, slow) pairs whose order is tracked (e.g.
+            EMA20 vs EMA50, or MACD vs 0)
+        oscillators: Name -> RSI value; tracked as a zone (-1 oversold,
+            0 neutral, 1 overbought)
+        positions: Open positions as returned by get_open_position (non-zero only)
+        account_value: Total account value
+        rsi_lower: Oversold threshold
+        rsi_upper: Overbought threshold
+
+    Returns:
+        Market state dictionary
+    """
+    signals = {name: _sign(fast - slow) for name, (fast, slow) in crossings.items()}
+    signals.update({name: 1 if value >= rsi_upper else -1 if value <= rsi_lower else 0
+                    for name, value in oscillators.items()})
+    return {
+        "price": price,
+        "atr": atr,
+        "signals": signals,
+        "positions": {pos["symbol"]: float(pos.get("positionAmt", 0)) for pos in positions},
+        "unrealized_pnl": sum(float(pos.get("unRealizedProfit", 0) or 0) for pos in positions),
+        "account_value": account_value,
+    }
+
+
+class SignalGate:
+    """Decide per symbol whether a cycle needs a model decision."""
+
+    def __init__(self, enabled: bool = True, max_staleness_seconds: float = 1800.0,
+                 atr_move: float = 1.0, pnl_change: float = 0.005):
+        """
+        Args:
+            enabled: When False every cycle runs the model
+            max_staleness_seconds: Longest time between two model decisions
+            atr_move: Price move since the last decision, in ATRs, that triggers one
+            pnl_change: Unrealized PnL change, as a fraction of the account
+                value, that triggers a decision
+        """
+        self.enabled = enabled
+        self.max_staleness_seconds = max_staleness_seconds
+        self.atr_move = atr_move
+        self.pnl_change = pnl_change
+        # Symbol -> (state at the last model decision, monotonic time)
+        self._last: Dict[str, Tuple[Dict[str, Any], float]] = {}
+
+    def evaluate(self, symbol: str, state: Dict[str, Any], now: Optional[float] = None) -> List[str]:
+        """Compare a state with the one of the last model decision.
+
+        Args:
+            symbol: Symbol of the state
+            state: Output of market_state
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Reasons to run the model; empty when the cycle can be skipped
+        """
+        if not self.enabled:
+            return ["gate disabled"]
+        last = self._last.get(symbol)
+        if last is None:
+            return ["first decision"]
+        previous, decided_at = last
+        now = time.monotonic() if now is None else now
+
+        reasons = [f"{name} changed {previous['signals'][name]:+d} -> {value:+d}"
+                   for name, value in state["signals"].items()
+                   if name in previous["signals"] and previous["signals"][name] != value]
+        if state["atr"] and previous["price"]:
+            move = abs(state["price"] - previous["price"]) / state["atr"]
+            if move >= self.atr_move:
+                reasons.append(f"price moved {move:.2f} ATR")
+        if state["positions"] != previous["positions"]:
+            reasons.append("positions changed")
+        elif state["account_value"] > 0:
+            pnl_change = abs(state["unrealized_pnl"] - previous["unrealized_pnl"]) / state["account_value"]
+            if pnl_change >= self.pnl_change:
+                reasons.append(f"unrealized PnL moved {pnl_change:.2%} of account value")
+        if now - decided_at >= self.max_staleness_seconds:
+            reasons.append(f"last decision {now - decided_at:.0f}s ago")
+        return reasons
+
+    def check(self, symbol: str, state: Dict[str, Any], now: Optional[float] = None,
+              force_reasons: Optional[List[str]] = None) -> List[str]:
+        """Evaluate a state, record it if the model runs, and log the outcome.
+
+        Args:
+            symbol: Symbol of the state
+            state: Output of market_state
+            now: Monotonic time (default: time.monotonic())
+            force_reasons: Reasons decided elsewhere (e.g. an event trigger)
+                that run the model whatever the state
+
+        Returns:
+            Reasons to run the model; empty when the cycle is skipped
+        """
+        now = time.monotonic() if now is None else now
+        reasons = list(force_reasons or []) + self.evaluate(symbol, state, now)
+        if reasons:
+            self._last[symbol] = (state, now)
+            increment("signal_gate_cycles_total", symbol=symbol, decision="run")
+            logger.info("Signal gate: running model", extra={"symbol": symbol, "reasons": reasons})
+        else:
+            increment("signal_gate_cycles_total", symbol=symbol, decision="skip")
+            logger.info("Signal gate: no material change, skipping model", extra={
+                "symbol": symbol, "since_last_decision": round(now - self._last[symbol][1], 1),
+            })
+        return reasons
+
+    def get_state(self) -> Dict[str, Any]:
+        """States of the last model decisions (Unix times), for a checkpoint."""
+        return {symbol: {"state": state, "decided_at": monotonic_to_wall(decided_at)}
+                for symbol, (state, decided_at) in list(self._last.items())}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore the states of a checkpoint, so that a restart does not re-run every model."""
+        for symbol, last in state.items():
+            self._last[symbol] = (last["state"], wall_to_monotonic(last["decided_at"]))
+
+
+_gate: SignalGate | None = None
+
+
+def get_signal_gate() -> SignalGate:
+    """Get the process-wide signal gate, configured from the environment.
+
+    Environment variables:
+        SIGNAL_GATE_ENABLED: "false" runs the model every cycle (default: "true")
+        SIGNAL_GATE_MAX_STALENESS_SECONDS: Default 1800
+        SIGNAL_GATE_ATR_MOVE: Default 1.0
+        SIGNAL_GATE_PNL_CHANGE: Default 0.005
+    """
+    global _gate
+    if _gate is None:
+        _gate = SignalGate(
+            enabled=os.getenv("SIGNAL_GATE_ENABLED", "true").lower() != "false",
+            max_staleness_seconds=float(os.getenv("SIGNAL_GATE_MAX_STALENESS_SECONDS", "1800")),
+            atr_move=float(os.getenv("SIGNAL_GATE_ATR_MOVE", "1.0")),
+            pnl_change=float(os.getenv("SIGNAL_GATE_PNL_CHANGE", "0.005")),
+        )
+    return _gate
+
+
+def reset_signal_gate():
+    """Forget all recorded states (the next cycle of every symbol runs the model)."""
+    global _gate
+    _gate = None
@@ -1,8 +1,7 @@
 """Node functions for the agent workflow."""
 
-from langchain.messages import SystemMessage, ToolMessage
+from langchain.messages import SystemMessage
 from agent.state import MessagesState
-from agent.tools import get_tools_by_name
 
 
 def create_llm_call_node(model_with_tools):
@@ -39,30 +38,3 @@ def create_llm_call_node(model_with_tools):
     
     return llm_call
 
-
-def create_tool_node():
-    """Create the tool execution node function.
-    
-    Returns:
-        Node function that can be used in the graph
-    """
-    tools_by_name = get_tools_by_name()
-    
-    def tool_node(state: MessagesState):
-        """Performs the tool call.
-        
-        Args:
-            state: Current workflow state
-            
-        Returns:
-            Updated state with tool execution results
-        """
-        result = []
-        for tool_call in state["messages"][-1].tool_calls:
-            tool = tools_by_name[tool_call["name"]]
-            observation = tool.invoke(tool_call["args"])
-            result.append(ToolMessage(content=observation, tool_call_id=tool_call["id"]))
-        return {"messages": result}
-    
-    return tool_node
-
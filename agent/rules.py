@@ -0,0 +1,37 @@
+"""Deterministic trading rules used when no model answers in time.
+
+The rules never open positions: without a model decision the agent only
+protects what it already holds, closing the positions that the long-term
+trend (EMA20 vs EMA50) and momentum (MACD) both turned against. Positions
+in other symbols are left alone.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def rule_decision(positions: List[Dict[str, Any]], ema_fast: Optional[float], ema_slow: Optional[float],
+                  macd: Optional[float]) -> Tuple[List[Tuple[str, Dict[str, Any]]], str]:
+    """Decide on tool calls from the long-term indicators.
+
+    Args:
+        positions: Open positions as returned by get_open_position (non-zero only)
+        ema_fast: Latest long-term EMA20
+        ema_slow: Latest long-term EMA50
+        macd: Latest long-term MACD value
+
+    Returns:
+        Tuple of (tool calls as (name, args) pairs, human-readable reason)
+    """
+    if not positions:
+        return [], "Rules: no open positions, holding"
+    if ema_fast is None or ema_slow is None or macd is None:
+        return [], "Rules: long-term indicators unavailable, holding"
+
+    trend = 1 if ema_fast > ema_slow and macd > 0 else -1 if ema_fast < ema_slow and macd < 0 else 0
+    against = [pos["symbol"] for pos in positions
+               if trend and (float(pos.get("positionAmt", 0)) > 0) != (trend > 0)]
+    if against:
+        direction = "up" if trend > 0 else "down"
+        return ([("closePosition", {"symbol": symbol}) for symbol in against],
+                f"Rules: trend turned {direction} against {', '.join(against)}, closing positions")
+    return [], "Rules: open positions agree with the trend, holding"
@@ -0,0 +1,226 @@
+"""Strategy instances hosted side by side in one trading process.
+
+STRATEGIES_FILE points to a JSON list of strategies. Each one has its own
+symbols, prompt template, model and (optionally) Binance sub-account, and
+they all run in the same cycle on one shared market data fan-out
+(market_data.fanout): a symbol traded by several strategies is fetched
+once. Without STRATEGIES_FILE the agent runs a single default strategy from
+the environment as before.
+
+Example:
+
+    [
+      {"id": "trend", "symbols": ["ETHUSDT", "BTCUSDT"], "top_k": 1,
+       "prompt_file": "prompts/trend.txt", "model": "deepseek-reasoner",
+       "api_key_env": "TREND_BINANCE_API_KEY", "secret_key_env": "TREND_BINANCE_SECRET_KEY"},
+      {"id": "fast", "symbols": ["ETHUSDT"], "model": "deepseek-chat", "initial_value": 1000}
+    ]
+
+Fields:
+    id: Strategy id (required, unique); tags its portfolio snapshots,
+        archived decisions and logs
+    symbols: Symbols to trade (required); more than one are scanned and
+        the best top_k decided on, like SCAN_SYMBOLS
+    top_k: Decisions per cycle when several symbols (default: SCAN_TOP_K)
+    prompt_file: System prompt template with the placeholders of
+        prompts.trading_prompt.stock_market_prompt, relative to the
+        strategies file (default: that prompt)
+    model / base_url: Primary model and endpoint (default: LLM_MODEL / LLM_BASE_URL)
+    fallback_model / fallback_base_url: Fallback model (default: LLM_FALLBACK_MODEL)
+    api_key_env / secret_key_env: Names of the environment variables holding
+        the sub-account's API key and secret (default: the main account)
+    testnet: Use the Binance testnet for the sub-account (default: BINANCE_TESTNET)
+    initial_value: Starting account value for the total return (default: 5000)
+"""
+
+import json
+import os
+from string import Template
+from typing import Any, Dict, List, Optional, Set
+
+from utils.logger import get_logger
+
+
+logger = get_logger("strategies")
+
+DEFAULT_INITIAL_VALUE = 5000.0
+
+
+def _placeholders(template: Template) -> Set[str]:
+    """Names of the placeholders used in a template."""
+    names = set()
+    for match in template.pattern.finditer(template.template):
+        name = match.group("named") or match.group("braced")
+        if name:
+            names.add(name)
+    return names
+
+
+class Strategy:
+    """Configuration and per-strategy state of one hosted strategy."""
+
+    def __init__(self, strategy_id: str, symbols: List[str], top_k: Optional[int] = None,
+                 prompt: Optional[Template] = None, model_name: Optional[str] = None,
+                 base_url: Optional[str] = None, fallback_model_name: Optional[str] = None,
+                 fallback_base_url: Optional[str] = None, account=None,
+                 initial_value: float = DEFAULT_INITIAL_VALUE):
+        """
+        Args:
+            strategy_id: Unique strategy id
+            symbols: Symbols to trade
+            top_k: Decisions per cycle when several symbols (default: SCAN_TOP_K)
+            prompt: System prompt template (default: stock_market_prompt)
+            model_name: Primary model (default: LLM_MODEL)
+            base_url: Primary model endpoint (default: LLM_BASE_URL)
+            fallback_model_name: Fallback model (default: LLM_FALLBACK_MODEL)
+            fallback_base_url: Fallback model endpoint (default: base_url)
+            account: account_actions.account.TradingAccount of a sub-account
+                (default: None, the main account)
+            initial_value: Starting account value for the total return
+        """
+        self.id = strategy_id
+        self.symbols = symbols
+        self.top_k = top_k if top_k is not None else int(os.getenv("SCAN_TOP_K", "3"))
+        self.prompt = prompt
+        self.model_name = model_name
+        self.base_url = base_url
+        self.fallback_model_name = fallback_model_name
+        self.fallback_base_url = fallback_base_url
+        self.account = account
+        self.initial_value = initial_value
+        self._models: Dict[str, Any] = {}
+
+    def get_model(self):
+        """Primary chat model, or None to use the default from llm.get_model."""
+        if self.model_name is None and self.base_url is None:
+            return None
+        if "primary" not in self._models:
+            from llm.model import get_model
+
+            self._models["primary"] = get_model(temperature=0, model_name=self.model_name, base_url=self.base_url)
+        return self._models["primary"]
+
+    def get_fallback_model(self):
+        """Fallback chat model (default: llm.get_fallback_model), or None without one."""
+        if "fallback" not in self._models:
+            from llm.model import get_model, get_fallback_model
+
+            if self.fallback_model_name:
+                self._models["fallback"] = get_model(
+                    temperature=0, model_name=self.fallback_model_name,
+                    base_url=self.fallback_base_url or self.base_url,
+                )
+            else:
+                self._models["fallback"] = get_fallback_model()
+        return self._models["fallback"]
+
+    def decision_key(self, symbol: str) -> str:
+        """Key of the strategy's decisions on a symbol (signal gate, decision lock)."""
+        return f"{self.id}:{symbol}"
+
+
+def _create_account(strategy_id: str, config: Dict[str, Any]):
+    """Build the sub-account of a strategy, or None to trade on the main account."""
+    key_env, secret_env = config.get("api_key_env"), config.get("secret_key_env")
+    if not key_env and not secret_env:
+        return None
+    api_key, api_secret = os.getenv(key_env or ""), os.getenv(secret_env or "")
+    if not api_key or not api_secret:
+        # Never fall back to the main account with a sub-account configured
+        raise ValueError(f"Strategy {strategy_id}: {key_env} and {secret_env} must both be set")
+
+    from account_actions.account import TradingAccount
+    from account_actions.mark_to_market import create_mark_to_market
+    from account_actions.risk import create_risk_engine
+    from client.binance_client import create_binance_client
+
+    client = create_binance_client(api_key, api_secret, config.get("testnet"))
+    mark_to_market = create_mark_to_market(client)
+    return TradingAccount(strategy_id, client, mark_to_market, create_risk_engine(mark_to_market))
+
+
+def load_strategies(path: str) -> List[Strategy]:
+    """
+    Load the strategies of a strategies file (format in the module docstring).
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        Strategies, in file order
+
+    Raises:
+        ValueError: If the file is invalid, an id is duplicated, a prompt uses
+            unknown placeholders or sub-account credentials are missing
+    """
+    from prompts.trading_prompt import stock_market_prompt
+
+    with open(path) as f:
+        configs = json.load(f)
+    if not isinstance(configs, list) or not configs:
+        raise ValueError(f"{path} must contain a non-empty list of strategies")
+
+    known_placeholders = _placeholders(stock_market_prompt)
+    strategies, seen = [], set()
+    for config in configs:
+        strategy_id = str(config.get("id") or "")
+        if not strategy_id:
+            raise ValueError(f"{path}: every strategy needs an id")
+        if strategy_id in seen:
+            raise ValueError(f"{path}: duplicate strategy id {strategy_id}")
+        seen.add(strategy_id)
+        symbols = list(dict.fromkeys(s.strip().upper() for s in config.get("symbols", []) if s.strip()))
+        if not symbols:
+            raise ValueError(f"Strategy {strategy_id}: symbols must not be empty")
+
+        prompt = None
+        if config.get("prompt_file"):
+            prompt_path = os.path.join(os.path.dirname(os.path.abspath(path)), config["prompt_file"])
+            with open(prompt_path) as f:
+                prompt = Template(f.read())
+            unknown = _placeholders(prompt) - known_placeholders
+            if unknown:
+                raise ValueError(f"Strategy {strategy_id}: unknown prompt placeholders {', '.join(sorted(unknown))}")
+
+        strategies.append(Strategy(
+            strategy_id,
+            symbols,
+            top_k=config.get("top_k"),
+            prompt=prompt,
+            model_name=config.get("model"),
+            base_url=config.get("base_url"),
+            fallback_model_name=config.get("fallback_model"),
+            fallback_base_url=config.get("fallback_base_url"),
+            account=_create_account(strategy_id, config),
+            initial_value=float(config.get("initial_value", DEFAULT_INITIAL_VALUE)),
+        ))
+    logger.info("Strategies loaded", extra={
+        "path": path,
+        "strategies": {s.id: s.symbols for s in strategies},
+        "sub_accounts": [s.id for s in strategies if s.account is not None],
+    })
+    return strategies
+
+
+_strategies: List[Strategy] | None = None
+
+
+def get_strategies() -> List[Strategy]:
+    """
+    Get the strategies hosted by this process, loaded once from STRATEGIES_FILE.
+
+    Returns:
+        Strategies, or an empty list when STRATEGIES_FILE is not set (single
+        default strategy)
+    """
+    global _strategies
+    if _strategies is None:
+        path = os.getenv("STRATEGIES_FILE")
+        _strategies = load_strategies(path) if path else []
+    return _strategies
+
+
+def reset_strategies():
+    """Reload the strategies (and rebuild their accounts) on the next get_strategies."""
+    global _strategies
+    _strategies = None
@@ -1,63 +1,292 @@
-"""Tool definitions for the agent."""
+"""Tool definitions for the agent.
 
+Tools are async: the blocking Binance calls run in a worker thread, so
+independent tool calls of one agent step run concurrently and never stall
+the event loop. Each tool is bounded by its own timeout and returns a
+structured result (status, order ids, fill price, latency) that the model
+sees as JSON.
+
+Tool calls are executed as tasks keyed by their tool call id. A call can be
+started before the graph reaches its tool node (see agent/dispatch.py); the
+tool node then awaits the task that is already running instead of placing
+the order again.
+"""
+
+import asyncio
+import os
+import time
 from langchain.tools import tool
-from typing import Dict, Callable, Literal
+from langchain_core.tools import InjectedToolCallId
+from typing import Annotated, Any, Awaitable, Dict, Callable, List, Literal, Optional
 from account_actions.create_order import create_position
 from account_actions.close_order import close_order
+from account_actions.orders import new_client_order_id
+from account_actions.risk import get_risk_engine
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("tools")
+
+# Per-tool timeouts in seconds
+TOOL_TIMEOUTS = {
+    "createPosition": float(os.getenv("CREATE_POSITION_TIMEOUT_SECONDS", "20")),
+    "closeAllPosition": float(os.getenv("CLOSE_ALL_POSITION_TIMEOUT_SECONDS", "30")),
+    "closePosition": float(os.getenv("CLOSE_POSITION_TIMEOUT_SECONDS", "20")),
+}
+
+# Running or finished tool calls that have not been collected yet, by tool call id
+_tool_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def run_with_timeout(tool_name: str, fn: Callable, *args, **kwargs):
+    """Run a blocking function in a worker thread, bounded by the tool's timeout.
+
+    On timeout the thread cannot be cancelled and keeps running; its outcome
+    is logged when it finishes.
+
+    Args:
+        tool_name: Key in TOOL_TIMEOUTS
+        fn: Blocking function to run
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+
+    Returns:
+        Return value of fn
+
+    Raises:
+        asyncio.TimeoutError: If fn did not finish within the timeout
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), TOOL_TIMEOUTS[tool_name])
+    except asyncio.TimeoutError:
+        increment("tool_timeouts_total", tool=tool_name)
+
+        def log_late_outcome(finished: asyncio.Future):
+            error = finished.exception()
+            logger.warning("Tool finished after its timeout", extra={
+                "tool": tool_name, "error": str(error) if error else None,
+            })
+
+        task.add_done_callback(log_late_outcome)
+        raise
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _order_summary(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields the model needs from an order response."""
+    fill_price = float(order.get("avgPrice") or 0)
+    return {
+        "order_id": order.get("orderId"),
+        "client_order_id": order.get("clientOrderId"),
+        "order_status": order.get("status"),
+        "executed_qty": float(order.get("executedQty") or 0),
+        "fill_price": fill_price or None,
+    }
+
+
+async def open_position(symbol: str, side: str, quantity: float, tool_call_id: str) -> Dict[str, Any]:
+    """Open a position (implementation of createPosition).
+
+    Args:
+        symbol: Market symbol, with or without a slash (e.g. "ETH/USDT")
+        side: "LONG" or "SHORT"
+        quantity: Quantity of the base asset
+        tool_call_id: Id of the tool call; the client order id is derived
+            from it, so the same call can never fill twice
+
+    Returns:
+        Structured result (see createPosition)
+    """
+    # Convert symbol format from "ETH/USDT" to "ETHUSDT" for Binance
+    binance_symbol = symbol.replace("/", "")
+    client_order_id = new_client_order_id(key=tool_call_id)
+    result = {"symbol": binance_symbol, "side": side, "quantity": quantity, "client_order_id": client_order_id}
+    start = time.perf_counter()
+
+    # Pre-trade limits, checked locally: a rejection costs no request
+    risk = get_risk_engine()
+    if risk is not None:
+        verdict = risk.check_order(binance_symbol, side, quantity)
+        if not verdict["allowed"]:
+            limits = {key: round(verdict[key], 4) if verdict[key] is not None else None
+                      for key in ("max_quantity", "suggested_quantity")}
+            return {**result, **limits, "status": "rejected", "latency_ms": _elapsed_ms(start),
+                    "message": f"Order rejected by risk limits: {'; '.join(verdict['reasons'])}"}
+
+    try:
+        order = await run_with_timeout("createPosition", create_position, binance_symbol, side, quantity,
+                                       client_order_id=client_order_id)
+    except asyncio.TimeoutError:
+        return {**result, "status": "timeout", "latency_ms": _elapsed_ms(start),
+                "message": f"Order not confirmed within {TOOL_TIMEOUTS['createPosition']:g}s and may still "
+                           f"fill; check open positions before placing it again"}
+    except Exception as e:
+        return {**result, "status": "error", "latency_ms": _elapsed_ms(start),
+                "message": f"Failed to open position: {str(e)}"}
+    return {**result, **_order_summary(order), "status": "ok", "latency_ms": _elapsed_ms(start),
+            "message": f"Position opened successfully for {quantity} {symbol}"}
+
+
+async def _close_positions(tool_name: str, symbols: Optional[List[str]], message: str) -> Dict[str, Any]:
+    """Close the open positions of the given symbols (all if None) with reduce-only orders."""
+    start = time.perf_counter()
+    try:
+        results = await run_with_timeout(tool_name, close_order, symbols)
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "latency_ms": _elapsed_ms(start),
+                "message": f"Close orders not confirmed within {TOOL_TIMEOUTS[tool_name]:g}s; "
+                           f"check open positions before closing again"}
+    except Exception as e:
+        return {"status": "error", "latency_ms": _elapsed_ms(start),
+                "message": f"Failed to close positions: {str(e)}"}
+
+    if len(results) == 1 and "message" in results[0]:
+        return {"status": "ok", "orders": [], "latency_ms": _elapsed_ms(start), "message": results[0]["message"]}
+    orders = [{"symbol": result["symbol"], **_order_summary(result["response"])} for result in results]
+    return {"status": "ok", "orders": orders, "latency_ms": _elapsed_ms(start),
+            "message": f"{message} Closed {len(results)} position(s)."}
+
+
+async def close_all_positions(tool_call_id: str) -> Dict[str, Any]:
+    """Close every open position (implementation of closeAllPosition).
+
+    Args:
+        tool_call_id: Id of the tool call (close orders are reduce-only, so
+            repeating them cannot flip a position)
+
+    Returns:
+        Structured result (see closeAllPosition)
+    """
+    return await _close_positions("closeAllPosition", None, "All positions closed successfully.")
+
+
+async def close_position(symbol: str, tool_call_id: str) -> Dict[str, Any]:
+    """Close the open position of one market (implementation of closePosition).
+
+    Args:
+        symbol: Market symbol, with or without a slash (e.g. "ETH/USDT")
+        tool_call_id: Id of the tool call (close orders are reduce-only, so
+            repeating them cannot flip a position)
+
+    Returns:
+        Structured result (see closePosition)
+    """
+    return await _close_positions("closePosition", [symbol.replace("/", "")],
+                                  f"Position closed successfully for {symbol}.")
+
+
+_IMPLEMENTATIONS: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+    "createPosition": open_position,
+    "closeAllPosition": close_all_positions,
+    "closePosition": close_position,
+}
+
+
+def start_tool_call(name: str, args: Dict[str, Any], tool_call_id: str) -> asyncio.Task:
+    """Start executing a tool call, or return the task already running for its id.
+
+    Must be called from the event loop.
+
+    Args:
+        name: Tool name (e.g. "createPosition")
+        args: Tool arguments as produced by the model
+        tool_call_id: Id of the tool call
+
+    Returns:
+        Task resolving to the tool's structured result
+
+    Raises:
+        KeyError: If the tool does not exist
+        pydantic.ValidationError: If the arguments do not match the tool schema
+    """
+    task = _tool_tasks.get(tool_call_id)
+    if task is None:
+        schema = get_tools_by_name()[name].tool_call_schema
+        validated = schema.model_validate(args).model_dump()
+        task = asyncio.ensure_future(_IMPLEMENTATIONS[name](tool_call_id=tool_call_id, **validated))
+        _tool_tasks[tool_call_id] = task
+    return task
+
+
+def collect_tool_calls(tool_call_ids: List[str]) -> List[asyncio.Task]:
+    """Remove and return the tasks of the given tool calls that were started."""
+    return [_tool_tasks.pop(call_id) for call_id in tool_call_ids if call_id in _tool_tasks]
+
+
+async def _execute(name: str, args: Dict[str, Any], tool_call_id: str) -> Dict[str, Any]:
+    task = start_tool_call(name, args, tool_call_id)
+    # Shielded: if the agent is cancelled (decision deadline) the order
+    # keeps going and is collected by the decision runner
+    result = await asyncio.shield(task)
+    _tool_tasks.pop(tool_call_id, None)
+    return result
 
 
 @tool
-def createPosition(symbol: str, side: Literal["LONG", "SHORT"], quantity: float) -> str:
+async def createPosition(symbol: str, side: Literal["LONG", "SHORT"], quantity: float,
+                         tool_call_id: Annotated[str, InjectedToolCallId]) -> Dict[str, Any]:
     """Open a position in the given market.
 
     Args:
         symbol: The symbol to open the position at (e.g., "ETH/USDT")
         side: "LONG" or "SHORT"
         quantity: The quantity of the position to open
-    
+
     Returns:
-        Success message
+        Result with status ("ok", "rejected", "timeout" or "error"),
+        order_id, client_order_id, fill_price, executed_qty, latency_ms and
+        message; a rejected order also carries max_quantity and
+        suggested_quantity
     """
-    try:
-        # Convert symbol format from "ETH/USDT" to "ETHUSDT" for Binance
-        binance_symbol = symbol.replace("/", "")
-        create_position(binance_symbol, side, quantity)
-        return f"Position opened successfully for {quantity} {symbol}"
-    except Exception as e:
-        return f"Failed to open position: {str(e)}"
+    return await _execute("createPosition", {"symbol": symbol, "side": side, "quantity": quantity}, tool_call_id)
 
 
 @tool
-def closeAllPosition() -> str:
+async def closeAllPosition(tool_call_id: Annotated[str, InjectedToolCallId]) -> Dict[str, Any]:
     """Close all the currently open positions.
 
     Returns:
-        Success message
+        Result with status ("ok", "timeout" or "error"), the closed orders
+        (symbol, order_id, client_order_id, fill_price, executed_qty),
+        latency_ms and message
     """
-    try:
-        results = close_order()
-        if len(results) == 1 and "message" in results[0]:
-            return results[0]["message"]
-        return f"All positions closed successfully. Closed {len(results)} position(s)."
-    except Exception as e:
-        return f"Failed to close positions: {str(e)}"
+    return await _execute("closeAllPosition", {}, tool_call_id)
+
+
+@tool
+async def closePosition(symbol: str, tool_call_id: Annotated[str, InjectedToolCallId]) -> Dict[str, Any]:
+    """Close the open position in the given market, leaving other positions open.
+
+    Args:
+        symbol: The symbol whose position to close (e.g., "ETH/USDT")
+
+    Returns:
+        Result with status ("ok", "timeout" or "error"), the closed orders
+        (symbol, order_id, client_order_id, fill_price, executed_qty),
+        latency_ms and message
+    """
+    return await _execute("closePosition", {"symbol": symbol}, tool_call_id)
 
 
 def get_tools():
     """Get all available tools.
-    
+
     Returns:
         List of tool instances
     """
-    return [createPosition, closeAllPosition]
+    return [createPosition, closeAllPosition, closePosition]
 
 
 def get_tools_by_name() -> Dict[str, Callable]:
     """Get tools organized by name for quick lookup.
-    
+
     Returns:
         Dictionary mapping tool names to tool instances
     """
     tools = get_tools()
     return {tool.name: tool for tool in tools}
-
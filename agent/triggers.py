@@ -0,0 +1,300 @@
+"""Event-driven agent decisions between scheduled cycles.
+
+The scheduled cycle looks at the market once per candle. In between, the
+event monitor polls the mark prices of the watched symbols (the symbols
+decided on recently plus every open position) every EVENT_POLL_SECONDS,
+one request for all of them, and evaluates cheap conditions against the
+baseline of the last model decision:
+
+- atr_move: the price moved EVENT_ATR_MOVE 5m ATRs since the decision
+- rsi_extreme: RSI14 over the closed 5m closes plus the live price is at
+  or beyond EVENT_RSI_LOWER/EVENT_RSI_UPPER
+- liquidation_distance: an open position is within EVENT_LIQUIDATION_DISTANCE
+  of its liquidation price (needs the mark-to-market engine)
+
+Conditions are edge-triggered: a condition fires when it becomes true and
+re-arms once it clears. A fired condition triggers an out-of-band agent
+decision for its symbol unless the symbol was decided on less than
+EVENT_DEBOUNCE_SECONDS ago, or EVENT_MAX_TRIGGERS_PER_HOUR triggers already
+fired; it is then retried on the next poll. Prices can also be pushed
+from a stream with on_price.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from utils.calculations import get_rsi
+from utils.checkpoint import monotonic_to_wall, wall_to_monotonic
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("triggers")
+
+RSI_PERIOD = 14
+
+
+class EventMonitor:
+    """Evaluate trigger conditions on price updates between scheduled cycles."""
+
+    def __init__(self, enabled: bool = True, poll_seconds: float = 5.0, atr_move: float = 1.5,
+                 rsi_lower: float = 20.0, rsi_upper: float = 80.0, liquidation_distance: float = 0.03,
+                 debounce_seconds: float = 60.0, max_triggers_per_hour: int = 6):
+        """
+        Args:
+            enabled: When False, run() returns immediately
+            poll_seconds: Interval between two mark-price polls
+            atr_move: Price move since the last decision, in 5m ATRs, that fires
+            rsi_lower: Live RSI at or below which rsi_extreme fires
+            rsi_upper: Live RSI at or above which rsi_extreme fires
+            liquidation_distance: Distance to the liquidation price, as a
+                fraction of the mark price, at or below which a position fires
+            debounce_seconds: Shortest time between a decision on a symbol
+                (scheduled or triggered) and a triggered one
+            max_triggers_per_hour: Triggered decisions allowed per rolling hour
+        """
+        self.enabled = enabled
+        self.poll_seconds = poll_seconds
+        self.atr_move = atr_move
+        self.rsi_lower = rsi_lower
+        self.rsi_upper = rsi_upper
+        self.liquidation_distance = liquidation_distance
+        self.debounce_seconds = debounce_seconds
+        self.max_triggers_per_hour = max_triggers_per_hour
+        # Symbol -> price, atr, closes, decided_at of the last model decision
+        self._baselines: Dict[str, Dict[str, Any]] = {}
+        # Symbol -> conditions that fired and have not cleared since
+        self._active: Dict[str, Set[str]] = {}
+        self._fired: Deque[float] = deque()
+        # Symbol -> (last checked price, monotonic time)
+        self._last_prices: Dict[str, Tuple[float, float]] = {}
+        self._prices = None
+        self._tasks: Set[asyncio.Task] = set()
+        # observe runs on the event loop, check in the polling thread
+        self._lock = threading.Lock()
+
+    def observe(self, symbol: str, atr: Optional[float], closes: Sequence[float],
+                reference_price: Optional[float] = None, now: Optional[float] = None):
+        """Record the market data of a cycle.
+
+        Args:
+            symbol: Symbol of the data
+            atr: Current 5m ATR
+            closes: Closed 5m closes, oldest first
+            reference_price: Price the model decided on; resets the move
+                baseline and the debounce timer (None when the model was
+                skipped). A price checked within the last two polls is
+                used instead, as closed candles lag a move in progress
+            now: Monotonic time (default: time.monotonic())
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            baseline = self._baselines.setdefault(symbol, {"price": None, "decided_at": None})
+            baseline["atr"] = atr
+            baseline["closes"] = list(closes[-(RSI_PERIOD * 4):])
+            if reference_price is not None:
+                last = self._last_prices.get(symbol)
+                baseline["price"] = last[0] if last and now - last[1] <= 2 * self.poll_seconds else reference_price
+                baseline["decided_at"] = now
+
+    def evaluate(self, symbol: str, price: float, liquidation_distance: Optional[float] = None) -> Dict[str, str]:
+        """Evaluate every condition of a symbol at a price.
+
+        Args:
+            symbol: Symbol to evaluate
+            price: Live (mark) price
+            liquidation_distance: Distance of the symbol's position to its
+                liquidation price (None without a position)
+
+        Returns:
+            Condition name -> description, for the conditions that hold
+        """
+        conditions = {}
+        baseline = self._baselines.get(symbol)
+        if baseline is not None:
+            if baseline["atr"] and baseline["price"]:
+                move = (price - baseline["price"]) / baseline["atr"]
+                if abs(move) >= self.atr_move:
+                    conditions["atr_move"] = f"price moved {move:+.2f} ATR to {price:g} since the last decision"
+            if len(baseline["closes"]) > RSI_PERIOD:
+                rsi = get_rsi(baseline["closes"] + [price], RSI_PERIOD)[-1]
+                if rsi >= self.rsi_upper or rsi <= self.rsi_lower:
+                    conditions["rsi_extreme"] = f"live RSI{RSI_PERIOD} at {rsi:.1f}"
+        if liquidation_distance is not None and liquidation_distance <= self.liquidation_distance:
+            conditions["liquidation_distance"] = f"position {liquidation_distance:.2%} from liquidation"
+        return conditions
+
+    def check(self, symbol: str, price: float, liquidation_distance: Optional[float] = None,
+              now: Optional[float] = None) -> List[str]:
+        """Evaluate a price update and decide whether it triggers a decision.
+
+        Args:
+            symbol: Symbol of the update
+            price: Live (mark) price
+            liquidation_distance: See evaluate
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Descriptions of the newly fired conditions; empty when nothing
+            fired, or when debouncing or the rate cap held it back
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_prices[symbol] = (price, now)
+            conditions = self.evaluate(symbol, price, liquidation_distance)
+            # Cleared conditions re-arm
+            active = self._active[symbol] = self._active.get(symbol, set()) & set(conditions)
+            fired = {name: description for name, description in conditions.items() if name not in active}
+            if not fired:
+                return []
+
+            decided_at = self._baselines.get(symbol, {}).get("decided_at")
+            if decided_at is not None and now - decided_at < self.debounce_seconds:
+                increment("event_triggers_total", symbol=symbol, decision="debounced")
+                return []
+            while self._fired and now - self._fired[0] >= 3600:
+                self._fired.popleft()
+            if len(self._fired) >= self.max_triggers_per_hour:
+                increment("event_triggers_total", symbol=symbol, decision="rate_limited")
+                logger.info("Event trigger rate limited", extra={"symbol": symbol, "conditions": list(fired)})
+                return []
+
+            self._fired.append(now)
+            active.update(fired)
+        for name in fired:
+            increment("event_triggers_total", symbol=symbol, decision="fired", condition=name)
+        logger.info("Event trigger fired", extra={"symbol": symbol, "reasons": list(fired.values())})
+        return list(fired.values())
+
+    def on_price(self, symbol: str, price: float, now: Optional[float] = None) -> List[str]:
+        """Check a price pushed by a stream (closed candle, mark price update).
+
+        Args:
+            symbol: Symbol of the update
+            price: Latest price
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            See check
+        """
+        return self.check(symbol, price, now=now)
+
+    def poll(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Fetch the mark prices of the watched symbols and check them. Blocking.
+
+        Args:
+            now: Monotonic time (default: time.monotonic())
+
+        Returns:
+            Symbol -> reasons, for the symbols whose conditions fired
+        """
+        from account_actions.mark_to_market import MarkPriceCache, get_mark_to_market
+
+        now = time.monotonic() if now is None else now
+        engine = get_mark_to_market()
+        distances: Dict[str, Optional[float]] = {}
+        if engine is not None:
+            # Also refreshes the marks of every open position
+            for position in engine.account_view()["positions"]:
+                distances[position["symbol"]] = position["liquidationDistance"]
+            prices = engine.prices
+        else:
+            if self._prices is None:
+                self._prices = MarkPriceCache()
+            prices = self._prices
+
+        with self._lock:
+            symbols = list(dict.fromkeys([*self._baselines, *distances]))
+        marks = prices.get_prices(symbols) if symbols else {}
+        fired = {}
+        for symbol, price in marks.items():
+            reasons = self.check(symbol, price, distances.get(symbol), now)
+            if reasons:
+                fired[symbol] = reasons
+        return fired
+
+    def get_state(self) -> Dict[str, Any]:
+        """Decision baselines, fired conditions and the trigger history (Unix times), for a checkpoint."""
+        with self._lock:
+            baselines = {
+                symbol: {**baseline, "decided_at": monotonic_to_wall(baseline["decided_at"])
+                         if baseline["decided_at"] is not None else None}
+                for symbol, baseline in self._baselines.items()
+            }
+            return {
+                "baselines": baselines,
+                "active": {symbol: sorted(names) for symbol, names in self._active.items()},
+                "fired": [monotonic_to_wall(fired) for fired in self._fired],
+            }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Restore a checkpoint, so that moves since the last decision still count after a restart."""
+        with self._lock:
+            for symbol, baseline in state["baselines"].items():
+                if baseline["decided_at"] is not None:
+                    baseline["decided_at"] = wall_to_monotonic(baseline["decided_at"])
+                self._baselines[symbol] = baseline
+            self._active.update({symbol: set(names) for symbol, names in state["active"].items()})
+            self._fired.extend(wall_to_monotonic(fired) for fired in state["fired"])
+
+    async def run(self, on_trigger: Callable[[str, List[str]], Awaitable[Any]]):
+        """Poll until cancelled, starting on_trigger for every fired symbol.
+
+        Args:
+            on_trigger: Async function called with the symbol and the reasons;
+                runs as its own task, so a slow decision does not delay polling
+        """
+        if not self.enabled:
+            return
+        logger.info("Event monitor started", extra={"poll_seconds": self.poll_seconds})
+        while True:
+            try:
+                fired = await asyncio.to_thread(self.poll)
+            except Exception as e:
+                fired = {}
+                logger.warning("Event monitor poll failed", extra={"error": str(e)})
+            for symbol, reasons in fired.items():
+                task = asyncio.create_task(on_trigger(symbol, reasons))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            await asyncio.sleep(self.poll_seconds)
+
+
+_monitor: EventMonitor | None = None
+
+
+def get_event_monitor() -> EventMonitor:
+    """Get the process-wide event monitor, configured from the environment.
+
+    Environment variables:
+        EVENT_TRIGGERS_ENABLED: "false" disables triggered decisions (default: "true")
+        EVENT_POLL_SECONDS: Default 5
+        EVENT_ATR_MOVE: Default 1.5
+        EVENT_RSI_LOWER / EVENT_RSI_UPPER: Default 20 / 80
+        EVENT_LIQUIDATION_DISTANCE: Default 0.03
+        EVENT_DEBOUNCE_SECONDS: Default 60
+        EVENT_MAX_TRIGGERS_PER_HOUR: Default 6
+    """
+    global _monitor
+    if _monitor is None:
+        _monitor = EventMonitor(
+            enabled=os.getenv("EVENT_TRIGGERS_ENABLED", "true").lower() != "false",
+            poll_seconds=float(os.getenv("EVENT_POLL_SECONDS", "5")),
+            atr_move=float(os.getenv("EVENT_ATR_MOVE", "1.5")),
+            rsi_lower=float(os.getenv("EVENT_RSI_LOWER", "20")),
+            rsi_upper=float(os.getenv("EVENT_RSI_UPPER", "80")),
+            liquidation_distance=float(os.getenv("EVENT_LIQUIDATION_DISTANCE", "0.03")),
+            debounce_seconds=float(os.getenv("EVENT_DEBOUNCE_SECONDS", "60")),
+            max_triggers_per_hour=int(os.getenv("EVENT_MAX_TRIGGERS_PER_HOUR", "6")),
+        )
+    return _monitor
+
+
+def reset_event_monitor():
+    """Forget all baselines and fired triggers."""
+    global _monitor
+    _monitor = None
@@ -1,10 +1,14 @@
 """FastAPI server to serve portfolio data to the frontend."""
 
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from database.models import get_portfolio_history
-from typing import List, Dict, Any
+from fastapi.responses import PlainTextResponse
+from database.models import get_portfolio_history, get_cycle_traces, get_metrics_snapshot
+from utils.metrics import MetricsRegistry
+from utils.archive import get_archive
+from utils.logger import setup_logging
+from typing import List, Dict, Any, Optional
 
 app = FastAPI(title="Trader AI API", version="1.0.0")
 
@@ -28,35 +32,96 @@ def root():
 
 
 @app.get("/api/portfolio/history", response_model=None)
-def get_history(limit: int = None) -> List[Dict[str, Any]]:
+def get_history(limit: int = None, strategy_id: str = None) -> List[Dict[str, Any]]:
     """
     Get portfolio history.
     
     Args:
         limit: Optional limit on number of records to return
+        strategy_id: Optional strategy whose snapshots to return (default: all)
     
     Returns:
-        List of portfolio data points with timestamp, total, and available
+        List of portfolio data points with timestamp, total, available and strategy_id
     """
-    return get_portfolio_history(limit=limit)
+    return get_portfolio_history(limit=limit, strategy_id=strategy_id)
 
 
 @app.get("/api/portfolio/latest", response_model=None)
-def get_latest() -> Dict[str, Any]:
+def get_latest(strategy_id: str = None) -> Dict[str, Any]:
     """
     Get the latest portfolio data point.
     
+    Args:
+        strategy_id: Optional strategy whose latest snapshot to return
+    
     Returns:
         Latest portfolio data point
     """
-    history = get_portfolio_history(limit=1)
+    history = get_portfolio_history(limit=1, strategy_id=strategy_id)
     if history:
         # Return the last item (most recent)
         return history[-1]
     return {"timestamp": None, "total": 0, "available": 0}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> str:
+    """
+    Get trading cycle metrics in the Prometheus text exposition format.
+    
+    The trading agent runs in its own process, so this renders the latest
+    metrics snapshot it persisted at the end of its last cycle.
+    
+    Returns:
+        Prometheus metrics text
+    """
+    registry = MetricsRegistry.from_snapshot(get_metrics_snapshot())
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/cycles/traces", response_model=None)
+def get_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Get per-stage timing traces of recent trading cycles.
+    
+    Args:
+        limit: Maximum number of traces to return (default: 20)
+    
+    Returns:
+        List of traces (cycle_id, started_at, duration, spans), most recent first
+    """
+    return get_cycle_traces(limit=limit)
+
+
+@app.get("/api/cycles/{cycle_id}/decision", response_model=None)
+def get_decision(cycle_id: str, symbol: Optional[str] = None,
+                 strategy_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get the archived prompts, agent messages and responses of a past cycle.
+    
+    A cycle holds one decision per symbol and strategy in multi-symbol or
+    multi-strategy mode, and a single one otherwise.
+    
+    Args:
+        cycle_id: Cycle identifier (as listed by /api/cycles/traces), or the
+            archive key of one decision
+        symbol: Optional symbol filter
+        strategy_id: Optional strategy filter
+    
+    Returns:
+        Archived decision records of the cycle, in the order they were made
+    """
+    archive = get_archive()
+    records = archive.find(cycle_id, symbol=symbol, strategy_id=strategy_id)
+    if not records and symbol is None and strategy_id is None:
+        record = archive.get(cycle_id)
+        records = [record] if record is not None else []
+    if not records:
+        raise HTTPException(status_code=404, detail=f"No archived decision for cycle {cycle_id}")
+    return records
+
 if __name__ == "__main__":
     import uvicorn
+    setup_logging()
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
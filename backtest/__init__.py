@@ -0,0 +1 @@
+"""Backtesting and parameter sweeps for the indicator signal set."""
@@ -0,0 +1,90 @@
+"""Named float64 arrays in one memory-mapped file.
+
+The sweep parent writes candle columns and indicator arrays once; worker
+processes map the file read-only and read the arrays as memoryviews, so
+nothing is pickled per task and all workers share the same page cache.
+
+File layout: magic, uint32 header length, JSON header ({"length": n,
+"keys": [...]}), zero padding to a multiple of 8, then one float64 array of
+``length`` values per key in header order.
+"""
+
+import json
+import mmap
+import struct
+from array import array
+from typing import Dict, List, Mapping, Sequence
+
+
+MAGIC = b"TRIDX001"
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+class SharedArrayStore:
+    """Read-only view of arrays written by SharedArrayStore.create."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: File written by SharedArrayStore.create
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a shared array store")
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(self._mmap[start:start + header_length])
+        data_offset = -(-(start + header_length) // 8) * 8
+
+        self.length: int = header["length"]
+        self.keys: List[str] = header["keys"]
+        self._offsets = {key: data_offset + i * self.length * 8 for i, key in enumerate(self.keys)}
+        self._views: Dict[str, memoryview] = {}
+
+    @classmethod
+    def create(cls, path: str, arrays: Mapping[str, Sequence[float]]) -> "SharedArrayStore":
+        """
+        Write arrays to a new store file and open it.
+
+        Args:
+            path: Output path (overwritten)
+            arrays: Float sequences (ideally array('d')) keyed by name, all of the same length
+
+        Returns:
+            The opened store
+        """
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("All arrays in a store must have the same length")
+        header = json.dumps({"length": lengths.pop() if lengths else 0, "keys": list(arrays)}).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(b"\0" * (-f.tell() % 8))
+            for values in arrays.values():
+                if not isinstance(values, array) or values.typecode != "d":
+                    values = array("d", values)
+                values.tofile(f)
+        return cls(path)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._offsets
+
+    def __getitem__(self, key: str) -> memoryview:
+        """Get an array as a read-only float64 memoryview (no copy)."""
+        view = self._views.get(key)
+        if view is None:
+            offset = self._offsets[key]
+            view = self._views[key] = memoryview(self._mmap)[offset:offset + self.length * 8].cast("d")
+        return view
+
+    def close(self):
+        """Release the views handed out and unmap the file."""
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._mmap.close()
@@ -0,0 +1,243 @@
+"""Rule-based backtest of the indicator signal set shown to the trading agent.
+
+The agent is given EMA, MACD, RSI and ATR values computed over a fixed
+window of recent candles. This module turns the same indicators into a
+deterministic long/short strategy so their periods and thresholds can be
+tuned on history:
+
+- Long when the fast EMA is above the slow EMA, MACD is positive and RSI is
+  below ``rsi_upper``; short on the mirrored conditions with ``rsi_lower``.
+- A position is held while the EMAs keep their order and is closed when
+  they cross, or at a stop ``atr_stop`` ATRs away from the entry.
+- Trades fill at the candle close, pay ``fee_rate`` per side and pay or
+  receive funding at every settlement while the position is open.
+
+Indicators are computed exactly like the live cycle: over the trailing
+``lookback`` candles, ending at each candle, with the functions in
+utils/calculations.py.
+"""
+
+import math
+from array import array
+from typing import Dict, Mapping, Sequence
+
+from market_data.funding import DEFAULT_FUNDING_INTERVAL_MS, funding_payment
+from utils.calculations import get_atr, get_ema, get_rsi
+from utils.candles import CandleSeries
+
+
+# Periods used by utils/stock_data.py and main.py, plus the strategy thresholds
+DEFAULT_PARAMS: Dict[str, float] = {
+    "lookback": 50,
+    "ema_fast": 20,
+    "ema_slow": 50,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "rsi_period": 14,
+    "rsi_upper": 70,
+    "rsi_lower": 30,
+    "atr_period": 14,
+    "atr_stop": 2.0,
+}
+# Binance USD-M futures taker fee
+DEFAULT_FEE_RATE = 0.0004
+# Funding rate charged at every settlement (0.01% per 8h is the Binance baseline)
+DEFAULT_FUNDING_RATE = 0.0001
+DEFAULT_INITIAL_EQUITY = 5000.0
+
+_MS_PER_YEAR = 365 * 24 * 3600 * 1000
+
+
+def indicator_keys(params: Mapping[str, float]) -> Dict[str, str]:
+    """
+    Name the indicator arrays a parameter set reads.
+
+    Keys have the form ``kind:period[:period]:lookback`` so that parameter
+    sets sharing a period and lookback share one precomputed array.
+
+    Args:
+        params: Strategy parameters (see DEFAULT_PARAMS)
+
+    Returns:
+        Mapping of role (ema_fast, ema_slow, macd, rsi, atr) to array key
+    """
+    lookback = int(params["lookback"])
+    return {
+        "ema_fast": f"ema:{int(params['ema_fast'])}:{lookback}",
+        "ema_slow": f"ema:{int(params['ema_slow'])}:{lookback}",
+        "macd": f"macd:{int(params['macd_fast'])}:{int(params['macd_slow'])}:{lookback}",
+        "rsi": f"rsi:{int(params['rsi_period'])}:{lookback}",
+        "atr": f"atr:{int(params['atr_period'])}:{lookback}",
+    }
+
+
+def validate_params(params: Mapping[str, float]):
+    """
+    Check that a parameter set can be evaluated.
+
+    Args:
+        params: Strategy parameters (see DEFAULT_PARAMS)
+
+    Raises:
+        ValueError: If a period does not fit in the lookback window or the
+            fast/slow and lower/upper pairs are not ordered
+    """
+    lookback = int(params["lookback"])
+    if not 0 < params["ema_fast"] < params["ema_slow"] <= lookback:
+        raise ValueError("Need 0 < ema_fast < ema_slow <= lookback")
+    if not 0 < params["macd_fast"] < params["macd_slow"] <= lookback:
+        raise ValueError("Need 0 < macd_fast < macd_slow <= lookback")
+    if not 0 < params["rsi_period"] <= lookback - 2:
+        raise ValueError("Need 0 < rsi_period <= lookback - 2")
+    if not 0 < params["atr_period"] <= lookback - 1:
+        raise ValueError("Need 0 < atr_period <= lookback - 1")
+    if not params["rsi_lower"] < params["rsi_upper"]:
+        raise ValueError("Need rsi_lower < rsi_upper")
+    if params["atr_stop"] <= 0:
+        raise ValueError("Need atr_stop > 0")
+
+
+def compute_indicator(series: CandleSeries, mid_prices: Sequence[float], key: str) -> array:
+    """
+    Compute one indicator for every candle over its trailing window.
+
+    Args:
+        series: Candles, oldest first
+        mid_prices: Mid prices of the candles (utils.calculations.get_mid_prices)
+        key: Array key from indicator_keys
+
+    Returns:
+        array('d') aligned with the candles; NaN until a full window exists
+    """
+    kind, *numbers = key.split(":")
+    *periods, lookback = [int(n) for n in numbers]
+    values = array("d", [math.nan]) * len(series)
+    for end in range(lookback, len(series) + 1):
+        window = mid_prices[end - lookback:end]
+        if kind == "ema":
+            value = get_ema(window, periods[0])[-1]
+        elif kind == "macd":
+            value = get_ema(window, periods[0])[-1] - get_ema(window, periods[1])[-1]
+        elif kind == "rsi":
+            value = get_rsi(window, period=periods[0])[-1]
+        elif kind == "atr":
+            value = get_atr(series[end - lookback:end], period=periods[0])[-1]
+        else:
+            raise ValueError(f"Unknown indicator: {kind}")
+        values[end - 1] = value
+    return values
+
+
+def _annualized_sharpe(equity: Sequence[float], candle_ms: float) -> float:
+    returns = [b / a - 1 for a, b in zip(equity, equity[1:]) if a > 0]
+    if len(returns) < 2:
+        return 0.0
+    mean = sum(returns) / len(returns)
+    std = (sum((r - mean) ** 2 for r in returns) / len(returns)) ** 0.5
+    if std == 0:
+        return 0.0
+    return mean / std * math.sqrt(_MS_PER_YEAR / candle_ms)
+
+
+def run_backtest(candles: Mapping[str, Sequence[float]], indicators: Mapping[str, Sequence[float]],
+                 params: Mapping[str, float], fee_rate: float = DEFAULT_FEE_RATE,
+                 funding_rate: float = DEFAULT_FUNDING_RATE,
+                 initial_equity: float = DEFAULT_INITIAL_EQUITY) -> Dict[str, float]:
+    """
+    Simulate the strategy for one parameter set.
+
+    Args:
+        candles: Columns "open_time", "high", "low" and "close" (sequences or memoryviews)
+        indicators: Arrays keyed by indicator_keys, aligned with the candles
+        params: Strategy parameters (see DEFAULT_PARAMS)
+        fee_rate: Fee per side as a fraction of the traded notional
+        funding_rate: Funding rate charged at every 8h settlement
+        initial_equity: Starting equity in the quote asset
+
+    Returns:
+        Dictionary with sharpe (annualized), max_drawdown (fraction of the
+        peak), turnover (traded notional / initial equity), total_return,
+        trades and funding_paid
+    """
+    keys = indicator_keys(params)
+    ema_fast, ema_slow, macd, rsi, atr = (
+        indicators[keys[role]] for role in ("ema_fast", "ema_slow", "macd", "rsi", "atr")
+    )
+    times, highs, lows, closes = candles["open_time"], candles["high"], candles["low"], candles["close"]
+    rsi_upper, rsi_lower, atr_stop = params["rsi_upper"], params["rsi_lower"], params["atr_stop"]
+
+    equity = initial_equity
+    quantity = 0.0
+    stop = 0.0
+    traded = 0.0
+    funding_paid = 0.0
+    trades = 0
+    peak = initial_equity
+    max_drawdown = 0.0
+    curve = []
+    next_funding = (int(times[0]) // DEFAULT_FUNDING_INTERVAL_MS + 1) * DEFAULT_FUNDING_INTERVAL_MS
+    previous_close = closes[0]
+
+    for i in range(len(closes)):
+        close = closes[i]
+        if quantity:
+            equity += quantity * (close - previous_close)
+        previous_close = close
+
+        # Settlements that happened before this candle opened
+        while times[i] >= next_funding:
+            if quantity:
+                payment = funding_payment(quantity, close, funding_rate)
+                equity -= payment
+                funding_paid += payment
+            next_funding += DEFAULT_FUNDING_INTERVAL_MS
+
+        stopped = False
+        if quantity and ((quantity > 0 and lows[i] <= stop) or (quantity < 0 and highs[i] >= stop)):
+            # Exit at the stop rather than the close
+            equity -= quantity * (close - stop)
+            equity -= abs(quantity) * stop * fee_rate
+            traded += abs(quantity) * stop
+            quantity = 0.0
+            stopped = True
+
+        fast, slow, momentum, strength = ema_fast[i], ema_slow[i], macd[i], rsi[i]
+        if not stopped and not math.isnan(fast + slow + momentum + strength):
+            direction = (quantity > 0) - (quantity < 0)
+            if fast > slow and momentum > 0 and strength < rsi_upper:
+                target = 1
+            elif fast < slow and momentum < 0 and strength > rsi_lower:
+                target = -1
+            elif (direction > 0 and fast > slow) or (direction < 0 and fast < slow):
+                target = direction
+            else:
+                target = 0
+
+            if target != direction:
+                if quantity:
+                    equity -= abs(quantity) * close * fee_rate
+                    traded += abs(quantity) * close
+                    quantity = 0.0
+                if target and equity > 0:
+                    quantity = target * equity / (close * (1 + fee_rate))
+                    equity -= abs(quantity) * close * fee_rate
+                    traded += abs(quantity) * close
+                    stop = close - target * atr_stop * atr[i]
+                    trades += 1
+
+        curve.append(equity)
+        peak = max(peak, equity)
+        if peak > 0:
+            max_drawdown = max(max_drawdown, (peak - equity) / peak)
+        if equity <= 0:
+            break
+
+    candle_ms = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else DEFAULT_FUNDING_INTERVAL_MS
+    return {
+        "sharpe": _annualized_sharpe(curve, candle_ms),
+        "max_drawdown": max_drawdown,
+        "turnover": traded / initial_equity,
+        "total_return": equity / initial_equity - 1,
+        "trades": trades,
+        "funding_paid": funding_paid,
+    }
@@ -0,0 +1,321 @@
+"""Parallel parameter sweep over the indicator strategy backtest.
+
+Evaluates a grid (or a random sample of a grid) of indicator periods and
+strategy thresholds over stored candle history on a process pool. Candle
+columns and every indicator array the parameter sets need are computed
+once and written to memory-mapped files (backtest/shared_store.py); workers
+map them read-only, so a task only carries its parameter dict. Results
+(Sharpe, drawdown, turnover, ...) are stored in the sweep_results table.
+
+Usage:
+    python -m backtest.sweep --symbol ETHUSDT --interval 5m --candles 20000 --save-klines eth-5m.json
+    python -m backtest.sweep --klines eth-5m.json --grid ema_fast=10,20,30 ema_slow=40:60:10 rsi_upper=65,70,75
+    python -m backtest.sweep --klines eth-5m.json --grid lookback=50,100 atr_stop=1:3:0.5 --random 200 --workers 16
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from backtest.shared_store import SharedArrayStore
+from backtest.strategy import (
+    DEFAULT_FEE_RATE,
+    DEFAULT_FUNDING_RATE,
+    DEFAULT_PARAMS,
+    compute_indicator,
+    indicator_keys,
+    run_backtest,
+    validate_params,
+)
+from utils.calculations import get_mid_prices
+from utils.candles import FIELDS, CandleSeries
+
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", "0")) or os.cpu_count() or 1
+# Binance caps a single klines request at 1000 rows
+MAX_KLINES_PER_REQUEST = 1000
+
+# Stores opened by each worker process (see _init_worker)
+_candles: Optional[SharedArrayStore] = None
+_indicators: Optional[SharedArrayStore] = None
+
+
+# ---------------- Parameter sets ----------------
+
+def _number(text: str) -> float:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def parse_grid(specs: Sequence[str]) -> Dict[str, List[float]]:
+    """
+    Parse grid specifications.
+
+    Args:
+        specs: Entries of the form ``name=v1,v2,...`` or ``name=start:stop:step``
+            (stop inclusive), with names from strategy.DEFAULT_PARAMS
+
+    Returns:
+        Mapping of parameter name to candidate values
+    """
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULT_PARAMS or not values:
+            raise ValueError(f"Invalid grid entry {spec!r}; expected one of {', '.join(DEFAULT_PARAMS)}")
+        if ":" in values:
+            start, stop, step = (float(v) for v in values.split(":"))
+            count = int(round((stop - start) / step)) + 1
+            grid[name] = [_number(f"{start + i * step:.10g}") for i in range(count)]
+        else:
+            grid[name] = [_number(v) for v in values.split(",")]
+    return grid
+
+
+def grid_param_sets(grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """
+    Expand a grid into every combination, other parameters at their defaults.
+
+    Args:
+        grid: Output of parse_grid
+
+    Returns:
+        List of full parameter dictionaries
+    """
+    names = list(grid)
+    return [{**DEFAULT_PARAMS, **dict(zip(names, values))}
+            for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_param_sets(grid: Dict[str, List[float]], count: int, seed: int = 42) -> List[Dict[str, float]]:
+    """
+    Sample distinct combinations from a grid without expanding it.
+
+    Args:
+        grid: Output of parse_grid
+        count: Number of parameter sets to draw (capped at the grid size)
+        seed: Random seed
+
+    Returns:
+        List of full parameter dictionaries
+    """
+    names = list(grid)
+    size = 1
+    for name in names:
+        size *= len(grid[name])
+    rng = random.Random(seed)
+    chosen = rng.sample(range(size), min(count, size))
+    param_sets = []
+    for index in chosen:
+        params = dict(DEFAULT_PARAMS)
+        for name in reversed(names):
+            index, position = divmod(index, len(grid[name]))
+            params[name] = grid[name][position]
+        param_sets.append(params)
+    return param_sets
+
+
+# ---------------- History ----------------
+
+def load_history(path: str, symbol: Optional[str] = None, interval: Optional[str] = None) -> CandleSeries:
+    """
+    Load klines from a JSON file.
+
+    Args:
+        path: A JSON list of kline rows, or a response document written by
+            benchmarks.fake_exchange.record_responses
+        symbol: Symbol to read from a response document
+        interval: Interval to read from a response document
+
+    Returns:
+        CandleSeries of the stored klines
+    """
+    with open(path) as f:
+        document = json.load(f)
+    if isinstance(document, dict):
+        klines = document["klines"]
+        symbol = symbol or next(iter(klines))
+        interval = interval or next(iter(klines[symbol]))
+        document = klines[symbol][interval]
+    return CandleSeries.from_klines(document)
+
+
+def fetch_history(symbol: str, interval: str, candles: int, client=None) -> CandleSeries:
+    """
+    Fetch closed klines from Binance, paging backwards from now.
+
+    Args:
+        symbol: Symbol (e.g. "ETHUSDT")
+        interval: Kline interval (e.g. "5m")
+        candles: Number of closed klines to fetch
+        client: Binance client (default: client.binance_client.get_binance_client())
+
+    Returns:
+        CandleSeries of the fetched klines, oldest first
+    """
+    if client is None:
+        from client.binance_client import get_binance_client
+
+        client = get_binance_client()
+
+    now_ms = int(time.time() * 1000)
+    rows: List[list] = []
+    end_time = None
+    while len(rows) < candles:
+        params: Dict[str, Any] = {"symbol": symbol, "interval": interval, "limit": MAX_KLINES_PER_REQUEST}
+        if end_time is not None:
+            params["endTime"] = end_time
+        page = [row for row in client.get_klines(**params) if int(row[6]) < now_ms]
+        if not page:
+            break
+        rows = page + rows
+        end_time = int(page[0][0]) - 1
+    return CandleSeries.from_klines(rows[-candles:])
+
+
+# ---------------- Workers ----------------
+
+def _init_worker(candles_path: str, indicators_path: Optional[str]):
+    global _candles, _indicators
+    for store in (_candles, _indicators):
+        if store is not None:
+            store.close()
+    _candles = SharedArrayStore(candles_path)
+    _indicators = SharedArrayStore(indicators_path) if indicators_path else None
+
+
+def _compute_task(key: str):
+    series = CandleSeries({field: _candles[field] for field in FIELDS})
+    return compute_indicator(series, _candles["mid_price"], key)
+
+
+def _evaluate_task(job) -> Dict[str, Any]:
+    params, fee_rate, funding_rate = job
+    result = run_backtest(_candles, _indicators, params, fee_rate=fee_rate, funding_rate=funding_rate)
+    return {"params": params, **result}
+
+
+def _map(workers: int, initargs: tuple, fn, items: list) -> list:
+    if workers <= 1:
+        _init_worker(*initargs)
+        return [fn(item) for item in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(fn, items, chunksize=chunksize))
+
+
+def run_sweep(series: CandleSeries, param_sets: Sequence[Dict[str, float]], workers: int = SWEEP_WORKERS,
+              fee_rate: float = DEFAULT_FEE_RATE, funding_rate: float = DEFAULT_FUNDING_RATE,
+              store_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Backtest every valid parameter set on a process pool.
+
+    Args:
+        series: Candle history, oldest first
+        param_sets: Full parameter dictionaries (invalid sets are skipped)
+        workers: Worker processes (1 runs everything in this process)
+        fee_rate: Fee per side passed to run_backtest
+        funding_rate: Funding rate per settlement passed to run_backtest
+        store_dir: Directory for the memory-mapped stores (default: system temp)
+
+    Returns:
+        One dictionary per evaluated set with params and the run_backtest metrics
+    """
+    valid = []
+    for params in param_sets:
+        try:
+            validate_params(params)
+        except ValueError:
+            continue
+        valid.append(params)
+    if not valid:
+        return []
+
+    directory = tempfile.mkdtemp(prefix="sweep-", dir=store_dir)
+    global _candles, _indicators
+    try:
+        columns = {field: series.column(field) for field in FIELDS}
+        columns["mid_price"] = get_mid_prices(series)
+        candles_path = os.path.join(directory, "candles.bin")
+        SharedArrayStore.create(candles_path, columns).close()
+
+        keys = sorted({key for params in valid for key in indicator_keys(params).values()})
+        arrays = _map(workers, (candles_path, None), _compute_task, keys)
+        indicators_path = os.path.join(directory, "indicators.bin")
+        SharedArrayStore.create(indicators_path, dict(zip(keys, arrays))).close()
+
+        jobs = [(params, fee_rate, funding_rate) for params in valid]
+        return _map(workers, (candles_path, indicators_path), _evaluate_task, jobs)
+    finally:
+        for store in (_candles, _indicators):
+            if store is not None:
+                store.close()
+        _candles = _indicators = None
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv: List[str] | None = None) -> int:
+    from database.models import get_sweep_results, save_sweep_results
+
+    parser = argparse.ArgumentParser(description="Sweep indicator and threshold parameters over candle history")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--klines", help="JSON file with kline rows or a recorded response document")
+    source.add_argument("--symbol", help="Fetch history for this symbol from Binance")
+    parser.add_argument("--interval", default="5m", help="Kline interval (default: 5m)")
+    parser.add_argument("--candles", type=int, default=10000, help="Closed klines to fetch (default: 10000)")
+    parser.add_argument("--save-klines", help="Write the fetched klines to this JSON file")
+    parser.add_argument("--grid", nargs="*", default=[], help="Parameter grid, e.g. ema_fast=10,20 atr_stop=1:3:0.5")
+    parser.add_argument("--random", type=int, default=0, help="Evaluate this many random grid points instead of all")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --random")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS, help=f"Worker processes (default: {SWEEP_WORKERS})")
+    parser.add_argument("--fee-rate", type=float, default=DEFAULT_FEE_RATE, help="Fee per side")
+    parser.add_argument("--funding-rate", type=float, default=DEFAULT_FUNDING_RATE, help="Funding rate per 8h settlement")
+    parser.add_argument("--order-by", default="sharpe", help="Metric to rank results by (default: sharpe)")
+    parser.add_argument("--top", type=int, default=10, help="Results to print (default: 10)")
+    args = parser.parse_args(argv)
+
+    if args.klines:
+        series = load_history(args.klines, interval=args.interval)
+    else:
+        from utils.env import load_env
+
+        load_env()
+        series = fetch_history(args.symbol, args.interval, args.candles)
+        if args.save_klines:
+            with open(args.save_klines, "w") as f:
+                json.dump(series.to_klines(), f)
+
+    grid = parse_grid(args.grid)
+    param_sets = random_param_sets(grid, args.random, args.seed) if args.random else grid_param_sets(grid)
+    print(f"{len(series)} candles, {len(param_sets)} parameter sets, {args.workers} worker(s)")
+
+    start = time.perf_counter()
+    results = run_sweep(series, param_sets, workers=args.workers,
+                        fee_rate=args.fee_rate, funding_rate=args.funding_rate)
+    elapsed = time.perf_counter() - start
+    print(f"Evaluated {len(results)} sets ({len(param_sets) - len(results)} invalid) in {elapsed:.1f}s")
+    if not results:
+        return 1
+
+    run_id = f"sweep-{uuid.uuid4().hex[:12]}"
+    save_sweep_results(run_id, results)
+    print(f"Saved to sweep_results as {run_id}\n")
+    print(f"{'sharpe':>8} {'drawdown':>9} {'turnover':>9} {'return':>8} {'trades':>7}  changed parameters")
+    for row in get_sweep_results(run_id, order_by=args.order_by, limit=args.top):
+        changed = " ".join(f"{k}={v}" for k, v in row["params"].items() if v != DEFAULT_PARAMS[k]) or "(defaults)"
+        print(f"{row['sharpe']:>8.2f} {row['max_drawdown']:>8.1%} {row['turnover']:>9.1f} "
+              f"{row['total_return']:>+8.1%} {row['trades']:>7}  {changed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Reproducible benchmarks for the trading code paths."""
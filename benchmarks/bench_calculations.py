@@ -0,0 +1,225 @@
+"""Benchmark the indicator functions in utils/calculations.py.
+
+Times each indicator at several series lengths and the per-cycle indicator
+workload across many symbols, reports throughput and peak memory, and
+compares the results against a stored baseline.
+
+Usage:
+    python -m benchmarks.bench_calculations                  # run and compare against baseline
+    python -m benchmarks.bench_calculations --save-baseline  # run and store a new baseline
+    python -m benchmarks.bench_calculations --sizes 50,10000 --symbols 10,100
+
+Exit status is 1 when any case is slower (or uses more memory) than the
+baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import generate_candles, generate_portfolio_values
+from utils.candles import CandleSeries
+from utils.calculations import (
+    calculate_sharpe_ratio,
+    get_atr,
+    get_ema,
+    get_macd,
+    get_mid_prices,
+    get_rsi,
+    get_volume_statistics,
+)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "calculations.json")
+DEFAULT_SIZES = [50, 10_000, 1_000_000]
+DEFAULT_SYMBOLS = [1, 10, 100, 1000]
+DEFAULT_THRESHOLD = 0.25
+# Candles per symbol in the multi-symbol case (matches the live 50-candle lookback)
+CANDLES_PER_SYMBOL = 50
+
+# Indicator cases: name -> function of the prepared dataset
+CASES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "get_mid_prices": lambda data: get_mid_prices(data["candles"]),
+    "get_ema": lambda data: get_ema(data["prices"], 20),
+    "get_rsi": lambda data: get_rsi(data["prices"], 14),
+    "get_atr": lambda data: get_atr(data["candles"], 14),
+    "get_macd": lambda data: get_macd(data["prices"]),
+    "get_volume_statistics": lambda data: get_volume_statistics(data["candles"], 20),
+    "get_mid_prices[series]": lambda data: get_mid_prices(data["series"]),
+    "get_atr[series]": lambda data: get_atr(data["series"], 14),
+    "get_volume_statistics[series]": lambda data: get_volume_statistics(data["series"], 20),
+    "calculate_sharpe_ratio": lambda data: calculate_sharpe_ratio(data["portfolio"]),
+}
+
+
+def prepare_dataset(size: int, seed: int = 42) -> Dict[str, Any]:
+    """Build the inputs for every indicator case at a given series length."""
+    candles = generate_candles(size, seed=seed)
+    return {
+        "candles": candles,
+        "series": CandleSeries.from_candlesticks(candles),
+        "prices": get_mid_prices(candles),
+        "portfolio": generate_portfolio_values(size, seed=seed),
+    }
+
+
+def compute_symbol_indicators(candles: List[Dict[str, float]]):
+    """Compute the per-symbol indicator set used by one trading cycle."""
+    prices = get_mid_prices(candles)
+    get_ema(prices, 20)
+    get_macd(prices)
+    get_rsi(prices, 7)
+    get_rsi(prices, 14)
+    get_atr(candles, 3)
+    get_atr(candles, 14)
+    get_volume_statistics(candles, 20)
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> Dict[str, float]:
+    """
+    Measure the best per-call time and the peak memory allocated by fn.
+
+    Timing runs enough calls per repeat to last at least 0.2s (timeit's
+    autorange) and keeps the fastest repeat. Peak memory is measured in a
+    separate call under tracemalloc so that tracing does not skew timings.
+
+    :param fn: Zero-argument function to measure
+    :param repeat: Number of timing repeats
+    :return: Dictionary with 'seconds' (per call) and 'peak_kib'
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": seconds, "peak_kib": round(peak / 1024, 1)}
+
+
+def run_benchmarks(sizes: List[int], symbol_counts: List[int]) -> Dict[str, Dict[str, float]]:
+    """
+    Run all benchmark cases.
+
+    :param sizes: Series lengths for the single-series indicator cases
+    :param symbol_counts: Symbol counts for the multi-symbol cycle case
+    :return: Mapping of "case/size" to seconds, throughput and peak_kib
+    """
+    results = {}
+
+    for size in sizes:
+        data = prepare_dataset(size)
+        for name, case in CASES.items():
+            result = measure(lambda: case(data))
+            result["throughput"] = size / result["seconds"]
+            results[f"{name}/{size}"] = result
+            print_result(f"{name}/{size}", result, "points/s")
+        del data
+
+    for count in symbol_counts:
+        universe = [generate_candles(CANDLES_PER_SYMBOL, seed=seed) for seed in range(count)]
+
+        def run_cycle():
+            for candles in universe:
+                compute_symbol_indicators(candles)
+
+        result = measure(run_cycle)
+        result["throughput"] = count / result["seconds"]
+        results[f"cycle_symbols/{count}"] = result
+        print_result(f"cycle_symbols/{count}", result, "symbols/s")
+
+    return results
+
+
+def print_result(key: str, result: Dict[str, float], unit: str):
+    print(
+        f"{key:<34} {result['seconds'] * 1e3:>12.4f} ms "
+        f"{result['throughput']:>16,.0f} {unit:<10} {result['peak_kib']:>12,.1f} KiB peak"
+    )
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+                        threshold: float) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    :param results: Output of run_benchmarks
+    :param baseline: Stored baseline document
+    :param threshold: Allowed relative slowdown / memory growth (0.25 = 25%)
+    :return: List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        for metric in ("seconds", "peak_kib"):
+            if reference[metric] <= 0:
+                continue
+            change = result[metric] / reference[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{key} {metric}: {reference[metric]:.6g} -> {result[metric]:.6g} (+{change:.0%})"
+                )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark utils/calculations indicators")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated series lengths")
+    parser.add_argument("--symbols", default=",".join(str(s) for s in DEFAULT_SYMBOLS),
+                        help="Comma-separated symbol counts for the multi-symbol case")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative regression before failing (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    symbol_counts = [int(s) for s in args.symbols.split(",") if s]
+
+    print(f"Python {platform.python_version()} on {platform.platform()}")
+    results = run_benchmarks(sizes, symbol_counts)
+
+    if args.save_baseline:
+        document = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
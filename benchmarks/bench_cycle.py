@@ -0,0 +1,210 @@
+"""End-to-end benchmark of the trading cycle against a fake exchange and a fake LLM.
+
+Runs the full `main.invoke_agent` path (data fetch, indicators, prompt,
+agent graph, tools, DB write) in-process against FakeBinanceClient and
+ScriptedChatModel, and reports per-stage and total latency percentiles.
+With --simulator the real python-binance client talks HTTP to a local
+exchange simulator (benchmarks.exchange_server) instead.
+
+Usage:
+    python -m benchmarks.bench_cycle --cycles 50 --symbols 3
+    python -m benchmarks.bench_cycle --exchange-latency-ms 40 --llm-latency-ms 1500
+    python -m benchmarks.bench_cycle --responses recorded.json --json results.json
+    python -m benchmarks.bench_cycle --simulator --symbols 200 --scan-top-k 5
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from benchmarks.fake_exchange import FakeBinanceClient, load_responses, synthesize_responses
+from benchmarks.fake_llm import ScriptedChatModel
+
+
+DEFAULT_SYMBOLS = ["ETHUSDT", "BTCUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "DOGEUSDT", "ADAUSDT", "AVAXUSDT"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_traces(traces: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Aggregate span durations per cycle and compute latency percentiles.
+
+    Spans with the same name and labels within one cycle (e.g. the klines
+    stage running for both timeframes) are summed before computing percentiles.
+
+    :param traces: Traces returned by utils.metrics.end_trace
+    :return: Mapping of span key to count, mean, p50, p90, p99 and max in seconds
+    """
+    per_cycle: Dict[str, List[float]] = defaultdict(list)
+    for trace in traces:
+        totals: Dict[str, float] = defaultdict(float)
+        for span_record in trace["spans"]:
+            labels = ",".join(f"{k}={v}" for k, v in sorted(span_record["labels"].items()))
+            key = f"{span_record['name']}[{labels}]" if labels else span_record["name"]
+            totals[key] += span_record["duration"]
+        for key, total in totals.items():
+            per_cycle[key].append(total)
+
+    summary = {}
+    for key, values in sorted(per_cycle.items()):
+        summary[key] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+    return summary
+
+
+async def run_benchmark(cycles: int, symbols: List[str], client,
+                        llm_latency_seconds: float, warmup: int = 1, gate: bool = False,
+                        scan_top_k: int = 0, scan_concurrency: int = 3) -> List[Dict[str, Any]]:
+    """
+    Run trading cycles against the fake exchange and return their traces.
+
+    :param cycles: Number of measured cycles
+    :param symbols: Symbols processed in every cycle
+    :param client: Fake Binance client (or a client of the simulator) to install as the client singleton
+    :param llm_latency_seconds: Latency of each scripted model call
+    :param warmup: Unmeasured cycles run first (imports, first-call caches)
+    :param gate: Let the signal gate skip the model when nothing changed
+        (by default every cycle runs the model)
+    :param scan_top_k: Run main.run_universe and decide on the top K symbols
+        (0 decides on every symbol, one after another)
+    :param scan_concurrency: Concurrent decisions in run_universe
+    :return: List of cycle traces
+    """
+    import agent.gate as signal_gate
+    import client.binance_client as binance_client
+    import database.models as models
+    import database.writer as writer
+    import main
+    import utils.archive as archive
+    from utils.metrics import end_trace, span, start_trace
+
+    binance_client._client = client
+    db_dir = tempfile.mkdtemp(prefix="bench_cycle_")
+    models.DB_PATH = os.path.join(db_dir, "portfolio.db")
+    models.init_database()
+    archive._archive = archive.DecisionArchive(os.path.join(db_dir, "archive"))
+    signal_gate._gate = signal_gate.SignalGate(enabled=gate)
+
+    chat_models = {
+        symbol: ScriptedChatModel(symbol=f"{symbol[:-4]}/{symbol[-4:]}", latency_seconds=llm_latency_seconds)
+        for symbol in symbols
+    }
+
+    traces = []
+    for cycle in range(warmup + cycles):
+        start_trace(f"bench-{cycle}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            with span("cycle"):
+                if scan_top_k:
+                    await main.run_universe(symbols, scan_top_k, scan_concurrency, models=chat_models)
+                else:
+                    for symbol in symbols:
+                        await main.invoke_agent(symbol, model=chat_models[symbol])
+        trace = end_trace()
+        if cycle >= warmup:
+            traces.append(trace)
+    archive.get_archive().close()
+    writer.close_persistence_writer()
+    return traces
+
+
+def print_summary(summary: Dict[str, Dict[str, float]]):
+    print(f"{'span':<44} {'count':>6} {'mean':>10} {'p50':>10} {'p90':>10} {'p99':>10} {'max':>10}  (ms)")
+    for key, stats in summary.items():
+        print(
+            f"{key:<44} {stats['count']:>6} "
+            + " ".join(f"{stats[m] * 1e3:>10.2f}" for m in ("mean", "p50", "p90", "p99", "max"))
+        )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark one trading cycle end to end")
+    parser.add_argument("--cycles", type=int, default=20, help="Measured cycles (default: 20)")
+    parser.add_argument("--symbols", type=int, default=1, help="Symbols per cycle (default: 1)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured warmup cycles (default: 1)")
+    parser.add_argument("--exchange-latency-ms", type=float, default=25.0,
+                        help="Latency of every fake exchange call (default: 25)")
+    parser.add_argument("--jitter-ms", type=float, default=10.0,
+                        help="Uniform jitter added to exchange calls (default: 10)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0,
+                        help="Latency of every fake model call (default: 200)")
+    parser.add_argument("--gate", action="store_true",
+                        help="Let the signal gate skip unchanged cycles (default: the model runs every cycle)")
+    parser.add_argument("--scan-top-k", type=int, default=0,
+                        help="Scan the symbols and decide on the top K concurrently (default: 0, decide on all)")
+    parser.add_argument("--scan-concurrency", type=int, default=3,
+                        help="Concurrent decisions with --scan-top-k (default: 3)")
+    parser.add_argument("--responses", help="Recorded response JSON (default: synthesized data)")
+    parser.add_argument("--simulator", action="store_true",
+                        help="Use the real Binance client against a local exchange simulator over HTTP")
+    parser.add_argument("--json", help="Write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.symbols > len(DEFAULT_SYMBOLS):
+        symbols = DEFAULT_SYMBOLS + [f"SYM{i}USDT" for i in range(args.symbols - len(DEFAULT_SYMBOLS))]
+    else:
+        symbols = DEFAULT_SYMBOLS[:args.symbols]
+
+    server = None
+    if args.simulator:
+        from benchmarks.exchange_server import DEFAULT_API_KEYS, ExchangeServer, SimulatedExchange
+        from client.tuned_client import TunedClient
+
+        responses = load_responses(args.responses) if args.responses else None
+        exchange = SimulatedExchange(symbols, responses=responses, weight_limit=0, spot_weight_limit=0,
+                                     order_limit=0)
+        server = ExchangeServer(exchange, latency_ms=args.exchange_latency_ms).start()
+        api_key, api_secret = next(iter(DEFAULT_API_KEYS.items()))
+        client = TunedClient(api_key, api_secret, base_url=server.base_url)
+    else:
+        responses = load_responses(args.responses) if args.responses else synthesize_responses(symbols)
+        client = FakeBinanceClient(responses, latency_ms=args.exchange_latency_ms, jitter_ms=args.jitter_ms)
+
+    try:
+        traces = asyncio.run(run_benchmark(args.cycles, symbols, client, args.llm_latency_ms / 1000, args.warmup,
+                                         args.gate, args.scan_top_k, args.scan_concurrency))
+    finally:
+        if server is not None:
+            server.stop()
+    summary = summarize_traces(traces)
+
+    if server is not None:
+        calls, orders = server.requests, server.exchange.orders_filled
+        latency = f"simulator latency {args.exchange_latency_ms}ms"
+    else:
+        calls, orders = client.request_count, len(client.orders)
+        latency = f"exchange latency {args.exchange_latency_ms}ms (+{args.jitter_ms}ms jitter)"
+    print(f"{args.cycles} cycles x {len(symbols)} symbol(s), {latency}, LLM latency {args.llm_latency_ms}ms, "
+          f"{calls} exchange calls, {orders} orders\n")
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "summary": summary}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Benchmark process startup: import time and memory of each entry point.
+
+Imports every entry module in a fresh interpreter with ``-X importtime``,
+reports wall time, cumulative import time, peak RSS and the heaviest
+imports, and checks that modules which must stay light (the API server,
+database, logging and archive helpers) do not pull in python-binance or
+the LangChain stack. Results are compared against a stored baseline.
+
+Usage:
+    python -m benchmarks.bench_startup                  # run and compare against baseline
+    python -m benchmarks.bench_startup --save-baseline  # run and store a new baseline
+    python -m benchmarks.bench_startup --modules main,api_server --runs 10
+
+Exit status is 1 when an entry point imports a forbidden module or is
+slower (or uses more memory) than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "startup.json")
+DEFAULT_RUNS = 5
+# Interpreter startup is noisier than in-process timings
+DEFAULT_THRESHOLD = 0.5
+
+HEAVY_MODULES = ["binance", "langchain", "langchain_core", "langchain_deepseek", "langgraph"]
+
+# Entry module -> modules it must not import
+ENTRY_POINTS: Dict[str, List[str]] = {
+    "main": HEAVY_MODULES,
+    "api_server": HEAVY_MODULES,
+    "database.models": HEAVY_MODULES + ["requests"],
+    "utils.archive": HEAVY_MODULES + ["requests"],
+    "utils.stock_data": HEAVY_MODULES,
+    "client.binance_client": HEAVY_MODULES + ["requests"],
+    "agent.builder": [],
+}
+
+_CHILD_SCRIPT = """
+import json, resource, sys
+import {module}
+print(json.dumps({{
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded": sorted(m for m in {forbidden!r} if m in sys.modules),
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse ``-X importtime`` output.
+
+    :param stderr: Standard error of the child interpreter
+    :return: List of (module, self_us, cumulative_us, depth)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_module(module: str, forbidden: List[str], runs: int) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters and collect startup statistics.
+
+    :param module: Dotted module name to import
+    :param forbidden: Modules that must not end up in sys.modules
+    :param runs: Number of interpreter launches (medians are reported)
+    :return: Dictionary with wall_ms, import_ms, max_rss_kib, top imports and forbidden modules loaded
+    """
+    script = _CHILD_SCRIPT.format(module=module, forbidden=forbidden)
+    wall, imports, rss = [], [], []
+    rows: List[Tuple[str, int, int, int]] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                              cwd=REPO_ROOT, capture_output=True, text=True)
+        wall.append((time.perf_counter() - start) * 1e3)
+        if proc.returncode != 0:
+            raise Exception(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+        rows = parse_importtime(proc.stderr)
+        imports.append(sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1e3)
+        child = json.loads(proc.stdout.strip().splitlines()[-1])
+        rss.append(child["max_rss_kib"])
+        loaded = child["loaded"]
+
+    top_level = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)
+    return {
+        "wall_ms": statistics.median(wall),
+        "import_ms": statistics.median(imports),
+        "max_rss_kib": statistics.median(rss),
+        "top_imports": [{"module": name, "cumulative_ms": cumulative / 1e3}
+                        for name, _, cumulative, _ in top_level[:5]],
+        "forbidden_loaded": loaded,
+    }
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+                        threshold: float) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    :param results: Mapping of module to measure_module output
+    :param baseline: Stored baseline document
+    :param threshold: Allowed relative slowdown / memory growth (0.5 = 50%)
+    :return: List of regression descriptions (empty if none)
+    """
+    regressions = []
+    for module, result in results.items():
+        reference = baseline.get("results", {}).get(module)
+        if reference is None:
+            continue
+        for metric in ("import_ms", "max_rss_kib"):
+            if reference[metric] <= 0:
+                continue
+            change = result[metric] / reference[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{module} {metric}: {reference[metric]:.6g} -> {result[metric]:.6g} (+{change:.0%})"
+                )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark import time and memory of entry points")
+    parser.add_argument("--modules", default=",".join(ENTRY_POINTS),
+                        help="Comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"Interpreter launches per module (default: {DEFAULT_RUNS})")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative regression before failing (default: 0.5)")
+    args = parser.parse_args(argv)
+
+    print(f"Python {platform.python_version()} on {platform.platform()}")
+    print(f"{'module':<24} {'wall':>10} {'imports':>10} {'max rss':>12}  heaviest imports")
+    results = {}
+    violations = []
+    for module in [m for m in args.modules.split(",") if m]:
+        result = measure_module(module, ENTRY_POINTS.get(module, HEAVY_MODULES), args.runs)
+        results[module] = result
+        heaviest = ", ".join(f"{t['module']} {t['cumulative_ms']:.0f}" for t in result["top_imports"][:3])
+        print(f"{module:<24} {result['wall_ms']:>7.0f} ms {result['import_ms']:>7.0f} ms "
+              f"{result['max_rss_kib']:>8,.0f} KiB  {heaviest}")
+        if result["forbidden_loaded"]:
+            violations.append(f"{module} imports {', '.join(result['forbidden_loaded'])}")
+
+    if violations:
+        print(f"\n{len(violations)} entry point(s) import modules they must not:")
+        for violation in violations:
+            print(f"  {violation}")
+        return 1
+
+    if args.save_baseline:
+        document = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1012 @@
+"""Local Binance futures simulator for integration and load testing.
+
+Serves the subset of the Binance spot and USDⓈ-M futures REST API this
+project uses, over HTTP, so the real python-binance client (and with it
+TunedSession, retries, signatures and error handling) can run against it
+offline and deterministically:
+
+    GET  /api/v3/ping, /api/v3/time, /api/v3/klines
+    GET  /fapi/v1/ping, /fapi/v1/time, /fapi/v1/klines, /fapi/v1/openInterest,
+         /fapi/v1/fundingRate, /fapi/v1/premiumIndex, /futures/data/openInterestHist
+    GET  /fapi/v2|v3/account, /fapi/v2|v3/positionRisk,
+         /fapi/v1/symbolConfig                                (signed)
+    POST /fapi/v1/order, /fapi/v1/batchOrders, /fapi/v1/leverage (signed)
+    GET  /fapi/v1/order, DELETE /fapi/v1/order                (signed)
+    WS   /ws/<symbol>@kline_<interval>, /stream?streams=...   (kline events)
+
+Candles are replayed against the clock: every symbol and interval has a
+series whose first `history` candles end at the simulator's start time
+(recorded candles from benchmarks.fake_exchange.record_responses, or
+synthesized ones), and which then reveals one candle per interval as time
+passes, continuing with a seeded random walk when the recording runs out.
+The last candle of a series is the one in progress.
+
+The matching engine fills MARKET orders at the close of the symbol's
+in-progress 1m candle, and LIMIT orders when a replayed candle trades
+through their price. Positions, entry prices, realized PnL, taker fees and
+margin follow the same rules as account_actions.mark_to_market, so a
+reconciliation against the simulator shows no drift. There are no
+liquidations or funding payments.
+
+Signed endpoints check the X-MBX-APIKEY header, the HMAC-SHA256 signature
+and the timestamp against recvWindow. Every response carries the
+X-MBX-USED-WEIGHT-1M header (X-MBX-ORDER-COUNT-1M for orders), with
+approximately Binance's request weights, and requests over the per-minute
+limits are answered with 429 and Retry-After.
+
+Usage:
+    python -m benchmarks.exchange_server --port 8801 --symbols 200
+    BINANCE_BASE_URL=http://127.0.0.1:8801 BINANCE_API_KEY=simulator BINANCE_SECRET_KEY=simulator python main.py
+"""
+
+import argparse
+import ast
+import base64
+import hashlib
+import hmac
+import json
+import math
+import select
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.fake_exchange import FUNDING_INTERVAL_MS, FakeBinanceError
+from benchmarks.synthetic import generate_klines
+
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 3 * 60_000, "5m": 5 * 60_000, "15m": 15 * 60_000, "30m": 30 * 60_000,
+    "1h": 60 * 60_000, "2h": 2 * 60 * 60_000, "4h": 4 * 60 * 60_000, "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000, "12h": 12 * 60 * 60_000, "1d": 24 * 60 * 60_000,
+}
+OPEN_INTEREST_PERIODS = ("5m", "15m", "30m", "1h", "2h", "4h", "6h", "12h", "1d")
+MATCH_INTERVAL = "1m"
+# Candles generated at once when a series runs past its replayed candles
+CONTINUATION_CHUNK = 256
+DEFAULT_API_KEYS = {"simulator": "simulator"}
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _fmt(value: float) -> str:
+    """Format a decimal like Binance (fixed point string)."""
+    return f"{value:.8f}"
+
+
+class _CandleSeries:
+    """Candles of one symbol and interval, revealed one interval at a time."""
+
+    def __init__(self, rows: List[list], interval_ms: int, start_ms: int, history: int, seed: int):
+        """
+        :param rows: Candles to replay (Binance kline rows); their times are rewritten
+        :param interval_ms: Interval in milliseconds
+        :param start_ms: Simulator start time; candle history-1 is in progress then
+        :param history: Candles visible at start_ms
+        :param seed: Seed of the random walk continuing the replayed candles
+        """
+        self.interval_ms = interval_ms
+        history = max(1, min(history, len(rows)))
+        self.origin_ms = start_ms // interval_ms * interval_ms - (history - 1) * interval_ms
+        self.seed = seed
+        self.rows = []
+        for i, row in enumerate(rows):
+            open_time = self.origin_ms + i * interval_ms
+            self.rows.append([open_time, *row[1:6], open_time + interval_ms - 1, *row[7:]])
+
+    def index(self, time_ms: int) -> int:
+        """Index of the candle open at a time (negative before the series)."""
+        return (time_ms - self.origin_ms) // self.interval_ms
+
+    def visible(self, now_ms: int) -> List[list]:
+        """Candles opened up to now, the last one in progress."""
+        count = self.index(now_ms) + 1
+        while len(self.rows) < count:
+            last = self.rows[-1]
+            self.rows.extend(generate_klines(
+                CONTINUATION_CHUNK, seed=self.seed + len(self.rows), start_price=float(last[4]),
+                interval_ms=self.interval_ms, start_time_ms=last[0] + self.interval_ms,
+            ))
+        return self.rows[:max(count, 0)]
+
+
+class _Account:
+    """Wallet, positions and orders of one API key."""
+
+    def __init__(self, balance: float):
+        self.wallet_balance = balance
+        # symbol -> {"amount": signed size, "entry_price": float, "updated": ms}
+        self.positions: Dict[str, Dict[str, float]] = {}
+        self.orders: Dict[int, Dict[str, Any]] = {}
+        self.client_order_ids: Dict[str, int] = {}
+        # orderId -> index of the next 1m candle to match a resting order against
+        self.resting: Dict[int, int] = {}
+        # symbol -> leverage changed from the exchange default (POST /fapi/v1/leverage)
+        self.leverage: Dict[str, int] = {}
+
+
+class SimulatedExchange:
+    """
+    Market data replay, matching engine and accounts behind the simulator's endpoints.
+
+    Thread-safe; every public method takes the request parameters as strings,
+    like the HTTP layer receives them, and raises FakeBinanceError on
+    rejected requests.
+
+    :param symbols: Symbols the exchange lists
+    :param responses: Optional recorded response document (see
+                      benchmarks.fake_exchange.record_responses) whose klines are replayed
+    :param history: Candles of each series visible at start
+    :param seed: Base random seed of the synthesized candles
+    :param api_keys: Mapping of API key to secret, one account each
+    :param balance: Starting USDT wallet balance of every account
+    :param leverage: Leverage of every position
+    :param taker_fee_rate: Fee on MARKET fills, as a fraction of the notional
+    :param maker_fee_rate: Fee on LIMIT fills
+    :param weight_limit: Futures request weight per minute (0: unlimited)
+    :param spot_weight_limit: Spot request weight per minute (0: unlimited)
+    :param order_limit: Orders per minute (0: unlimited)
+    :param clock: Returns the current time in milliseconds (default: wall clock)
+    """
+
+    def __init__(self, symbols: List[str], responses: Optional[Dict[str, Any]] = None, history: int = 500,
+                 seed: int = 42, api_keys: Optional[Dict[str, str]] = None, balance: float = 5000.0,
+                 leverage: int = 10, taker_fee_rate: float = 0.0005, maker_fee_rate: float = 0.0002,
+                 weight_limit: int = 2400, spot_weight_limit: int = 6000, order_limit: int = 1200,
+                 clock: Optional[Callable[[], int]] = None):
+        self.symbols = list(symbols)
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.responses = responses or {}
+        self.history = history
+        self.seed = seed
+        self.api_keys = dict(api_keys or DEFAULT_API_KEYS)
+        self.leverage = leverage
+        self.taker_fee_rate = taker_fee_rate
+        self.maker_fee_rate = maker_fee_rate
+        self.weight_limit = weight_limit
+        self.spot_weight_limit = spot_weight_limit
+        self.order_limit = order_limit
+        self.clock = clock or (lambda: int(time.time() * 1000))
+        self.start_ms = self.clock()
+        self.accounts = {key: _Account(balance) for key in self.api_keys}
+        self._series: Dict[Tuple[str, str], _CandleSeries] = {}
+        self._next_order_id = 1
+        # limit kind -> (minute, used)
+        self._usage: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+        self.orders_filled = 0
+
+    # ---------------- Market data ----------------
+
+    def ping(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {}
+
+    def server_time(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {"serverTime": self.clock()}
+
+    def _symbol(self, params: Dict[str, str]) -> str:
+        symbol = params.get("symbol", "").upper()
+        if not symbol:
+            raise FakeBinanceError(-1102, "Mandatory parameter 'symbol' was not sent, was empty/null, or malformed.")
+        if symbol not in self._symbol_index:
+            raise FakeBinanceError(-1121, "Invalid symbol.")
+        return symbol
+
+    def _candles(self, symbol: str, interval: str) -> _CandleSeries:
+        series = self._series.get((symbol, interval))
+        if series is None:
+            interval_ms = INTERVAL_MS[interval]
+            i = self._symbol_index[symbol]
+            rows = self.responses.get("klines", {}).get(symbol, {}).get(interval)
+            if not rows:
+                rows = generate_klines(self.history, seed=self.seed + i, start_price=100.0 * (i + 1) + 2900.0,
+                                       interval_ms=interval_ms)
+            series = self._series[(symbol, interval)] = _CandleSeries(
+                rows, interval_ms, self.start_ms, self.history, seed=(self.seed + i) * 1000 + interval_ms // 60_000,
+            )
+        return series
+
+    def candles(self, symbol: str, interval: str) -> List[list]:
+        """Candles of a symbol and interval opened so far, the last one in progress."""
+        with self._lock:
+            return self._candles(symbol, interval).visible(self.clock())
+
+    def price(self, symbol: str) -> float:
+        """Last price of a symbol: close of its in-progress 1m candle."""
+        with self._lock:
+            return float(self._candles(symbol, MATCH_INTERVAL).visible(self.clock())[-1][4])
+
+    def klines(self, params: Dict[str, str], max_limit: int = 1500) -> List[list]:
+        symbol = self._symbol(params)
+        interval = params.get("interval")
+        if interval not in INTERVAL_MS:
+            raise FakeBinanceError(-1120, "Invalid interval.")
+        limit = min(int(params.get("limit", 500)), max_limit)
+        start, end = params.get("startTime"), params.get("endTime")
+        with self._lock:
+            series = self._candles(symbol, interval)
+            rows = series.visible(self.clock())
+            stop = len(rows) if end is None else max(0, min(len(rows), series.index(int(end)) + 1))
+            if start is not None:
+                first = max(0, -(-(int(start) - series.origin_ms) // series.interval_ms))
+                return rows[first:min(stop, first + limit)]
+            return rows[max(0, stop - limit):stop]
+
+    def spot_klines(self, params: Dict[str, str]) -> List[list]:
+        return self.klines(params, max_limit=1000)
+
+    def _open_interest(self, symbol: str, time_ms: int) -> float:
+        recorded = self.responses.get("open_interest", {}).get(symbol)
+        base = float(recorded["openInterest"]) if recorded else 100000.0 + 1000 * self._symbol_index[symbol]
+        return base * (1 + 0.02 * math.sin(time_ms / (INTERVAL_MS["5m"] * 48)))
+
+    def open_interest(self, params: Dict[str, str]) -> Dict[str, Any]:
+        symbol = self._symbol(params)
+        now_ms = self.clock()
+        return {"symbol": symbol, "openInterest": f"{self._open_interest(symbol, now_ms):.3f}", "time": now_ms}
+
+    def open_interest_hist(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        symbol = self._symbol(params)
+        period = params.get("period")
+        if period not in OPEN_INTEREST_PERIODS:
+            raise FakeBinanceError(-1130, "Invalid data sent for a parameter.")
+        period_ms = INTERVAL_MS[period]
+        limit = min(int(params.get("limit", 30)), 500)
+        # One point per closed period
+        end = (self.clock() // period_ms - 1) * period_ms
+        if params.get("endTime") is not None:
+            end = min(end, int(params["endTime"]) // period_ms * period_ms)
+        if params.get("startTime") is not None:
+            first = -(-int(params["startTime"]) // period_ms) * period_ms
+            end = min(end, first + (limit - 1) * period_ms)
+        else:
+            first = end - (limit - 1) * period_ms
+        price = self.price(symbol)
+        points = []
+        for timestamp in range(first, end + 1, period_ms):
+            value = self._open_interest(symbol, timestamp)
+            points.append({"symbol": symbol, "sumOpenInterest": f"{value:.3f}",
+                           "sumOpenInterestValue": f"{value * price:.2f}", "timestamp": timestamp})
+        return points
+
+    def _funding_rate(self, symbol: str, funding_time: int) -> float:
+        i = self._symbol_index[symbol]
+        return 0.0001 + 0.00005 * math.sin(funding_time / (FUNDING_INTERVAL_MS * 9) + i)
+
+    def funding_rate(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        symbol = self._symbol(params)
+        limit = min(int(params.get("limit", 100)), 1000)
+        last = self.clock() // FUNDING_INTERVAL_MS * FUNDING_INTERVAL_MS
+        if params.get("endTime") is not None:
+            last = min(last, int(params["endTime"]) // FUNDING_INTERVAL_MS * FUNDING_INTERVAL_MS)
+        if params.get("startTime") is not None:
+            first = -(-int(params["startTime"]) // FUNDING_INTERVAL_MS) * FUNDING_INTERVAL_MS
+            last = min(last, first + (limit - 1) * FUNDING_INTERVAL_MS)
+        else:
+            first = last - (limit - 1) * FUNDING_INTERVAL_MS
+        return [{"symbol": symbol, "fundingTime": t, "fundingRate": f"{self._funding_rate(symbol, t):.8f}",
+                 "markPrice": _fmt(self.price(symbol))}
+                for t in range(first, last + 1, FUNDING_INTERVAL_MS)]
+
+    def _premium_index(self, symbol: str) -> Dict[str, Any]:
+        now_ms = self.clock()
+        next_funding = (now_ms // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS
+        price = self.price(symbol)
+        return {
+            "symbol": symbol,
+            "markPrice": _fmt(price),
+            "indexPrice": _fmt(price),
+            "estimatedSettlePrice": _fmt(price),
+            "lastFundingRate": f"{self._funding_rate(symbol, next_funding):.8f}",
+            "interestRate": "0.00010000",
+            "nextFundingTime": next_funding,
+            "time": now_ms,
+        }
+
+    def premium_index(self, params: Dict[str, str]) -> Dict[str, Any] | List[Dict[str, Any]]:
+        if params.get("symbol"):
+            return self._premium_index(self._symbol(params))
+        return [self._premium_index(symbol) for symbol in self.symbols]
+
+    # ---------------- Accounts ----------------
+
+    def authenticate(self, api_key: Optional[str], params: Dict[str, str], payload: str) -> _Account:
+        """
+        Check a signed request.
+
+        :param api_key: X-MBX-APIKEY header
+        :param params: Request parameters
+        :param payload: Query string followed by the request body, as sent
+        :return: Account of the API key
+        """
+        if not api_key:
+            raise FakeBinanceError(-2014, "API-key format invalid.", 401)
+        secret = self.api_keys.get(api_key)
+        if secret is None:
+            raise FakeBinanceError(-2015, "Invalid API-key, IP, or permissions for action.", 401)
+        for name in ("timestamp", "signature"):
+            if not params.get(name):
+                raise FakeBinanceError(-1102, f"Mandatory parameter '{name}' was not sent, was empty/null, "
+                                              f"or malformed.")
+        now_ms = self.clock()
+        timestamp = int(params["timestamp"])
+        if timestamp > now_ms + 1000 or now_ms - timestamp > int(params.get("recvWindow", 5000)):
+            raise FakeBinanceError(-1021, "Timestamp for this request is outside of the recvWindow.")
+        signed = "&".join(part for part in payload.split("&") if part and not part.startswith("signature="))
+        expected = hmac.new(secret.encode(), signed.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, params["signature"]):
+            raise FakeBinanceError(-1022, "Signature for this request is not valid.")
+        return self.accounts[api_key]
+
+    def _unrealized(self, account: _Account) -> Dict[str, Tuple[float, float]]:
+        """symbol -> (mark price, unrealized PnL) of the open positions."""
+        return {symbol: (mark, p["amount"] * (mark - p["entry_price"]))
+                for symbol, p in account.positions.items() for mark in (self.price(symbol),)}
+
+    def _leverage(self, account: _Account, symbol: str) -> int:
+        return account.leverage.get(symbol, self.leverage)
+
+    def _margins(self, account: _Account) -> Tuple[float, float]:
+        """Unrealized PnL and initial margin of an account."""
+        unrealized = initial = 0.0
+        for symbol, (mark, pnl) in self._unrealized(account).items():
+            unrealized += pnl
+            initial += abs(account.positions[symbol]["amount"]) * mark / self._leverage(account, symbol)
+        return unrealized, initial
+
+    def account(self, account: _Account, params: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            self._match_resting(account)
+            marks = self._unrealized(account)
+            unrealized, initial = self._margins(account)
+            margin_balance = account.wallet_balance + unrealized
+            available = margin_balance - initial
+            positions = []
+            for symbol in self.symbols:
+                position = account.positions.get(symbol)
+                amount = position["amount"] if position else 0.0
+                mark, pnl = marks.get(symbol, (0.0, 0.0))
+                leverage = self._leverage(account, symbol)
+                positions.append({
+                    "symbol": symbol,
+                    "positionAmt": _fmt(amount),
+                    "entryPrice": _fmt(position["entry_price"] if position else 0.0),
+                    "unrealizedProfit": _fmt(pnl),
+                    "initialMargin": _fmt(abs(amount) * mark / leverage),
+                    "positionInitialMargin": _fmt(abs(amount) * mark / leverage),
+                    "openOrderInitialMargin": "0",
+                    "leverage": str(leverage),
+                    "isolated": False,
+                    "positionSide": "BOTH",
+                    "updateTime": int(position["updated"]) if position else 0,
+                })
+            return {
+                "feeTier": 0,
+                "canTrade": True,
+                "canDeposit": True,
+                "canWithdraw": True,
+                "totalInitialMargin": _fmt(initial),
+                "totalPositionInitialMargin": _fmt(initial),
+                "totalOpenOrderInitialMargin": "0",
+                "totalWalletBalance": _fmt(account.wallet_balance),
+                "totalUnrealizedProfit": _fmt(unrealized),
+                "totalMarginBalance": _fmt(margin_balance),
+                "totalCrossWalletBalance": _fmt(account.wallet_balance),
+                "availableBalance": _fmt(available),
+                "maxWithdrawAmount": _fmt(max(available, 0.0)),
+                "assets": [{"asset": "USDT", "walletBalance": _fmt(account.wallet_balance),
+                            "unrealizedProfit": _fmt(unrealized), "marginBalance": _fmt(margin_balance),
+                            "availableBalance": _fmt(available)}],
+                "positions": positions,
+            }
+
+    def position_risk(self, account: _Account, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Open positions in the V3 schema, which carries neither leverage nor
+        margin type (those come from the account and symbolConfig endpoints).
+        """
+        with self._lock:
+            self._match_resting(account)
+            symbol = self._symbol(params) if params.get("symbol") else None
+            rows = []
+            for name, (mark, pnl) in self._unrealized(account).items():
+                if symbol is not None and name != symbol:
+                    continue
+                position = account.positions[name]
+                amount = position["amount"]
+                margin = abs(amount) * mark / self._leverage(account, name)
+                rows.append({
+                    "symbol": name,
+                    "positionSide": "BOTH",
+                    "positionAmt": _fmt(amount),
+                    "entryPrice": _fmt(position["entry_price"]),
+                    "breakEvenPrice": _fmt(position["entry_price"]),
+                    "markPrice": _fmt(mark),
+                    "unRealizedProfit": _fmt(pnl),
+                    "liquidationPrice": "0",
+                    "isolatedMargin": "0",
+                    "notional": _fmt(amount * mark),
+                    "marginAsset": "USDT",
+                    "isolatedWallet": "0",
+                    "initialMargin": _fmt(margin),
+                    "maintMargin": _fmt(abs(amount) * mark * 0.004),
+                    "positionInitialMargin": _fmt(margin),
+                    "openOrderInitialMargin": "0",
+                    "adl": 0,
+                    "bidNotional": "0",
+                    "askNotional": "0",
+                    "updateTime": int(position["updated"]),
+                })
+            return rows
+
+    def position_risk_v2(self, account: _Account, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Open positions in the V2 schema, which still reports leverage and margin type."""
+        rows = self.position_risk(account, params)
+        with self._lock:
+            return [{
+                "symbol": row["symbol"],
+                "positionAmt": row["positionAmt"],
+                "entryPrice": row["entryPrice"],
+                "breakEvenPrice": row["breakEvenPrice"],
+                "markPrice": row["markPrice"],
+                "unRealizedProfit": row["unRealizedProfit"],
+                "liquidationPrice": row["liquidationPrice"],
+                "leverage": str(self._leverage(account, row["symbol"])),
+                "maxNotionalValue": "1000000",
+                "marginType": "cross",
+                "isolatedMargin": row["isolatedMargin"],
+                "isAutoAddMargin": "false",
+                "positionSide": row["positionSide"],
+                "notional": row["notional"],
+                "isolatedWallet": row["isolatedWallet"],
+                "updateTime": row["updateTime"],
+            } for row in rows]
+
+    def symbol_config(self, account: _Account, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        symbols = [self._symbol(params)] if params.get("symbol") else self.symbols
+        with self._lock:
+            return [{
+                "symbol": symbol,
+                "marginType": "CROSSED",
+                "isAutoAddMargin": "false",
+                "leverage": self._leverage(account, symbol),
+                "maxNotionalValue": "1000000",
+            } for symbol in symbols]
+
+    def change_leverage(self, account: _Account, params: Dict[str, str]) -> Dict[str, Any]:
+        symbol = self._symbol(params)
+        try:
+            leverage = int(params.get("leverage", ""))
+        except ValueError:
+            raise FakeBinanceError(-1102, "Mandatory parameter 'leverage' was not sent, was empty/null, or malformed.")
+        if not 1 <= leverage <= 125:
+            raise FakeBinanceError(-4028, f"Leverage {leverage} is not valid")
+        with self._lock:
+            account.leverage[symbol] = leverage
+        return {"symbol": symbol, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    # ---------------- Matching engine ----------------
+
+    def _fill(self, account: _Account, order: Dict[str, Any], quantity: float, price: float, fee_rate: float):
+        """Apply a fill to the account, like MarkToMarketEngine.apply_fill."""
+        symbol = order["symbol"]
+        delta = quantity if order["side"] == "BUY" else -quantity
+        position = account.positions.get(symbol)
+        amount = position["amount"] if position else 0.0
+        entry = position["entry_price"] if position else 0.0
+        new_amount = amount + delta
+        realized = 0.0
+        if amount == 0 or amount * delta > 0:
+            entry = (abs(amount) * entry + quantity * price) / abs(new_amount)
+        else:
+            closed = min(abs(delta), abs(amount))
+            realized = closed * (price - entry) * (1 if amount > 0 else -1)
+            if amount * new_amount < 0:
+                entry = price
+        account.wallet_balance += realized - quantity * price * fee_rate
+        now_ms = self.clock()
+        if abs(new_amount) < 1e-12:
+            account.positions.pop(symbol, None)
+        else:
+            account.positions[symbol] = {"amount": new_amount, "entry_price": entry, "updated": now_ms}
+        order.update({
+            "status": "FILLED",
+            "executedQty": _fmt(quantity),
+            "cumQuote": _fmt(quantity * price),
+            "avgPrice": _fmt(price),
+            "updateTime": now_ms,
+        })
+        account.resting.pop(order["orderId"], None)
+        self.orders_filled += 1
+
+    def _reduce_only_quantity(self, account: _Account, symbol: str, side: str, quantity: float) -> float:
+        """Quantity of a reduce-only order that only reduces the position."""
+        amount = account.positions.get(symbol, {}).get("amount", 0.0)
+        if amount == 0 or (amount > 0) == (side == "BUY"):
+            raise FakeBinanceError(-2022, "ReduceOnly Order is rejected.")
+        return min(quantity, abs(amount))
+
+    def _check_margin(self, account: _Account, symbol: str, side: str, quantity: float, price: float):
+        amount = account.positions.get(symbol, {}).get("amount", 0.0)
+        delta = quantity if side == "BUY" else -quantity
+        added = max(abs(amount + delta) - abs(amount), 0.0)
+        if added == 0:
+            return
+        unrealized, initial = self._margins(account)
+        available = account.wallet_balance + unrealized - initial
+        if added * price / self._leverage(account, symbol) + quantity * price * self.taker_fee_rate > available:
+            raise FakeBinanceError(-2019, "Margin is insufficient.")
+
+    def _match_resting(self, account: _Account):
+        """Fill resting LIMIT orders whose price the replayed candles traded through."""
+        if not account.resting:
+            return
+        now_ms = self.clock()
+        for order_id, next_index in list(account.resting.items()):
+            order = account.orders[order_id]
+            series = self._candles(order["symbol"], MATCH_INTERVAL)
+            rows = series.visible(now_ms)
+            limit_price = float(order["price"])
+            for index in range(next_index, len(rows)):
+                low, high = float(rows[index][3]), float(rows[index][2])
+                if (order["side"] == "BUY" and low <= limit_price) or (order["side"] == "SELL" and high >= limit_price):
+                    quantity = float(order["origQty"])
+                    try:
+                        if order["reduceOnly"]:
+                            quantity = self._reduce_only_quantity(account, order["symbol"], order["side"], quantity)
+                    except FakeBinanceError:
+                        order.update({"status": "EXPIRED", "updateTime": now_ms})
+                        account.resting.pop(order_id, None)
+                        break
+                    self._fill(account, order, quantity, limit_price, self.maker_fee_rate)
+                    break
+            else:
+                account.resting[order_id] = len(rows)
+
+    def create_order(self, account: _Account, params: Dict[str, str]) -> Dict[str, Any]:
+        symbol = self._symbol(params)
+        side = params.get("side", "").upper()
+        order_type = params.get("type", "").upper()
+        if side not in ("BUY", "SELL"):
+            raise FakeBinanceError(-1102, "Mandatory parameter 'side' was not sent, was empty/null, or malformed.")
+        if order_type not in ("MARKET", "LIMIT"):
+            raise FakeBinanceError(-1116, "Invalid orderType.")
+        quantity = float(params.get("quantity") or 0)
+        if quantity <= 0:
+            raise FakeBinanceError(-4003, "Quantity less than or equal to zero.")
+        reduce_only = str(params.get("reduceOnly", "false")).lower() == "true"
+        limit_price = float(params.get("price") or 0)
+        if order_type == "LIMIT" and limit_price <= 0:
+            raise FakeBinanceError(-4002, "Price less than or equal to zero.")
+
+        with self._lock:
+            client_order_id = params.get("newClientOrderId") or f"sim-{self._next_order_id}"
+            if client_order_id in account.client_order_ids:
+                raise FakeBinanceError(-4116, "ClientOrderId is duplicated.")
+            self._match_resting(account)
+            price = self.price(symbol)
+            if reduce_only:
+                quantity = self._reduce_only_quantity(account, symbol, side, quantity)
+            else:
+                self._check_margin(account, symbol, side, quantity, limit_price or price)
+
+            now_ms = self.clock()
+            order = {
+                "orderId": self._next_order_id,
+                "symbol": symbol,
+                "status": "NEW",
+                "clientOrderId": client_order_id,
+                "price": _fmt(limit_price),
+                "avgPrice": _fmt(0.0),
+                "origQty": _fmt(quantity),
+                "executedQty": _fmt(0.0),
+                "cumQuote": _fmt(0.0),
+                "timeInForce": params.get("timeInForce", "GTC"),
+                "type": order_type,
+                "origType": order_type,
+                "reduceOnly": reduce_only,
+                "closePosition": False,
+                "side": side,
+                "positionSide": "BOTH",
+                "stopPrice": "0",
+                "workingType": "CONTRACT_PRICE",
+                "priceProtect": False,
+                "updateTime": now_ms,
+            }
+            self._next_order_id += 1
+            account.orders[order["orderId"]] = order
+            account.client_order_ids[client_order_id] = order["orderId"]
+
+            if order_type == "MARKET":
+                self._fill(account, order, quantity, price, self.taker_fee_rate)
+            elif (side == "BUY" and limit_price >= price) or (side == "SELL" and limit_price <= price):
+                # Marketable limit order: takes liquidity at the last price
+                self._fill(account, order, quantity, price, self.taker_fee_rate)
+            else:
+                account.resting[order["orderId"]] = self._candles(symbol, MATCH_INTERVAL).index(now_ms) + 1
+
+            if params.get("newOrderRespType", "ACK").upper() == "ACK":
+                return {**order, "status": "NEW", "executedQty": _fmt(0.0), "cumQuote": _fmt(0.0),
+                        "avgPrice": _fmt(0.0)}
+            return dict(order)
+
+    def batch_orders(self, account: _Account, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        raw = params.get("batchOrders")
+        if not raw:
+            raise FakeBinanceError(-1102, "Mandatory parameter 'batchOrders' was not sent, was empty/null, "
+                                          "or malformed.")
+        try:
+            orders = json.loads(raw)
+        except ValueError:
+            # python-binance sends the repr of the list, which may hold True/False
+            orders = ast.literal_eval(raw)
+        if not isinstance(orders, list) or not 1 <= len(orders) <= 5:
+            raise FakeBinanceError(-1130, "Invalid data sent for a parameter.")
+        results = []
+        for order in orders:
+            try:
+                results.append(self.create_order(account, {k: str(v) for k, v in order.items()}))
+            except FakeBinanceError as e:
+                results.append({"code": e.code, "msg": e.message})
+        return results
+
+    def _find_order(self, account: _Account, params: Dict[str, str], missing: FakeBinanceError) -> Dict[str, Any]:
+        symbol = self._symbol(params)
+        order_id = params.get("orderId")
+        if order_id is None and params.get("origClientOrderId"):
+            order_id = account.client_order_ids.get(params["origClientOrderId"])
+        order = account.orders.get(int(order_id)) if order_id is not None else None
+        if order is None or order["symbol"] != symbol:
+            raise missing
+        return order
+
+    def get_order(self, account: _Account, params: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            self._match_resting(account)
+            return dict(self._find_order(account, params, FakeBinanceError(-2013, "Order does not exist.")))
+
+    def cancel_order(self, account: _Account, params: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            self._match_resting(account)
+            order = self._find_order(account, params, FakeBinanceError(-2011, "Unknown order sent."))
+            if order["status"] != "NEW":
+                raise FakeBinanceError(-2011, "Unknown order sent.")
+            order.update({"status": "CANCELED", "updateTime": self.clock()})
+            account.resting.pop(order["orderId"], None)
+            return dict(order)
+
+    # ---------------- Rate limits ----------------
+
+    def use(self, kind: str, amount: int, limit: int) -> Tuple[int, Optional[int]]:
+        """
+        Count request weight or orders against a per-minute limit.
+
+        :param kind: Limit name (e.g. "fapi_weight", "orders")
+        :param amount: Weight or order count of the request
+        :param limit: Limit per minute (0: unlimited)
+        :return: Used amount in the current minute, and seconds until the
+                 next minute when the request is over the limit (else None)
+        """
+        now_ms = self.clock()
+        minute = now_ms // 60_000
+        with self._lock:
+            window, used = self._usage.get(kind, (minute, 0))
+            if window != minute:
+                used = 0
+            if limit and used + amount > limit:
+                self._usage[kind] = (minute, used)
+                return used, (minute + 1) * 60 - now_ms // 1000
+            self._usage[kind] = (minute, used + amount)
+            return used + amount, None
+
+
+def _klines_weight(params: Dict[str, str]) -> int:
+    limit = int(params.get("limit", 500))
+    return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+
+
+# (method, path) -> (handler name, signed, weight, order count); weight may depend on the parameters
+_ROUTES: Dict[Tuple[str, str], Tuple[str, bool, Callable[[Dict[str, str]], int] | int, int]] = {
+    ("GET", "/api/v3/ping"): ("ping", False, 1, 0),
+    ("GET", "/api/v3/time"): ("server_time", False, 1, 0),
+    ("GET", "/api/v3/klines"): ("spot_klines", False, 2, 0),
+    ("GET", "/fapi/v1/ping"): ("ping", False, 1, 0),
+    ("GET", "/fapi/v1/time"): ("server_time", False, 1, 0),
+    ("GET", "/fapi/v1/klines"): ("klines", False, _klines_weight, 0),
+    ("GET", "/fapi/v1/openInterest"): ("open_interest", False, 1, 0),
+    ("GET", "/fapi/v1/fundingRate"): ("funding_rate", False, 1, 0),
+    ("GET", "/fapi/v1/premiumIndex"): ("premium_index", False, lambda p: 1 if p.get("symbol") else 10, 0),
+    ("GET", "/futures/data/openInterestHist"): ("open_interest_hist", False, 1, 0),
+    ("GET", "/fapi/v2/account"): ("account", True, 5, 0),
+    ("GET", "/fapi/v3/account"): ("account", True, 5, 0),
+    ("GET", "/fapi/v2/positionRisk"): ("position_risk_v2", True, 5, 0),
+    ("GET", "/fapi/v3/positionRisk"): ("position_risk", True, 5, 0),
+    ("GET", "/fapi/v1/symbolConfig"): ("symbol_config", True, 5, 0),
+    ("POST", "/fapi/v1/leverage"): ("change_leverage", True, 1, 0),
+    ("POST", "/fapi/v1/order"): ("create_order", True, 0, 1),
+    ("GET", "/fapi/v1/order"): ("get_order", True, 1, 0),
+    ("DELETE", "/fapi/v1/order"): ("cancel_order", True, 1, 0),
+    ("POST", "/fapi/v1/batchOrders"): ("batch_orders", True, 5, 5),
+}
+
+
+class ExchangeServer:
+    """
+    HTTP and WebSocket front end of a SimulatedExchange, running in a background thread.
+
+    :param exchange: Simulated exchange to serve
+    :param latency_ms: Delay added to every HTTP response
+    :param ws_push_ms: Interval between kline events on WebSocket streams
+    :param host: Interface to bind
+    :param port: Port to bind (0 picks a free one)
+    """
+
+    def __init__(self, exchange: SimulatedExchange, latency_ms: float = 0.0, ws_push_ms: float = 1000.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.exchange = exchange
+        self.latency_ms = latency_ms
+        self.ws_push_ms = ws_push_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ExchangeServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopping.set()
+            self._server.server_close()
+
+    def stop(self):
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "ExchangeServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, method: str, path: str, query: str, body: str,
+               api_key: Optional[str]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Answer one REST request.
+
+        :param method: HTTP method
+        :param path: Request path
+        :param query: Raw query string
+        :param body: Raw form-encoded body
+        :param api_key: X-MBX-APIKEY header
+        :return: Status code, JSON payload and extra headers
+        """
+        exchange = self.exchange
+        with self._lock:
+            self.requests += 1
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        params.update(parse_qsl(body, keep_blank_values=True))
+        route = _ROUTES.get((method, path))
+        if route is None:
+            return 404, {"code": -5000, "msg": "Path not found"}, {}
+        name, signed, weight, order_count = route
+        headers = {}
+        spot = path.startswith("/api/")
+        try:
+            weight = weight(params) if callable(weight) else weight
+            if spot:
+                used, retry_after = exchange.use("api_weight", weight, exchange.spot_weight_limit)
+            else:
+                used, retry_after = exchange.use("fapi_weight", weight, exchange.weight_limit)
+            headers["X-MBX-USED-WEIGHT-1M"] = str(used)
+            if retry_after is None and order_count:
+                orders, retry_after = exchange.use("orders", order_count, exchange.order_limit)
+                headers["X-MBX-ORDER-COUNT-1M"] = str(orders)
+            if retry_after is not None:
+                headers["Retry-After"] = str(retry_after)
+                return 429, {"code": -1003, "msg": "Too many requests; current limit is exceeded."}, headers
+
+            if signed:
+                account = exchange.authenticate(api_key, params, f"{query}{body}")
+                return 200, getattr(exchange, name)(account, params), headers
+            return 200, getattr(exchange, name)(params), headers
+        except FakeBinanceError as e:
+            return e.status_code, {"code": e.code, "msg": e.message}, headers
+        except (TypeError, ValueError, SyntaxError):
+            return 400, {"code": -1100, "msg": "Illegal characters found in a parameter."}, headers
+
+    def _kline_event(self, stream: str, row: list, closed: bool) -> Dict[str, Any]:
+        symbol, interval = stream.split("@kline_")
+        return {"e": "kline", "E": self.exchange.clock(), "s": symbol.upper(), "k": {
+            "t": row[0], "T": row[6], "s": symbol.upper(), "i": interval, "o": row[1], "c": row[4],
+            "h": row[2], "l": row[3], "v": row[5], "n": row[8], "x": closed, "q": row[7],
+            "V": row[9], "Q": row[10], "B": "0",
+        }}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; do not wait for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _rest(self, method: str):
+                url = urlsplit(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                status, payload, headers = server.handle(method, url.path, url.query, body,
+                                                         self.headers.get("X-MBX-APIKEY"))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.headers.get("Upgrade", "").lower() == "websocket":
+                    self._websocket()
+                else:
+                    self._rest("GET")
+
+            def do_POST(self):
+                self._rest("POST")
+
+            def do_DELETE(self):
+                self._rest("DELETE")
+
+            # ---------------- WebSocket ----------------
+
+            def _websocket(self):
+                url = urlsplit(self.path)
+                if url.path.startswith("/ws/"):
+                    streams, combined = url.path[len("/ws/"):].split("/"), False
+                elif url.path == "/stream":
+                    streams, combined = dict(parse_qsl(url.query)).get("streams", "").split("/"), True
+                else:
+                    self.send_error(404)
+                    return
+                subscriptions = []
+                for stream in streams:
+                    symbol, _, interval = stream.partition("@kline_")
+                    if symbol.upper() not in server.exchange.symbols or interval not in INTERVAL_MS:
+                        self.send_error(400, f"Unsupported stream {stream}")
+                        return
+                    subscriptions.append((stream, symbol.upper(), interval))
+
+                accept = base64.b64encode(hashlib.sha1(
+                    (self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.close_connection = True
+
+                # Open time of the candle last pushed per stream
+                pushed: Dict[str, int] = {}
+                try:
+                    while not server._stopping.is_set():
+                        for stream, symbol, interval in subscriptions:
+                            rows = server.exchange.candles(symbol, interval)
+                            if stream in pushed and rows[-1][0] != pushed[stream] and len(rows) > 1:
+                                # The previous candle closed since the last push
+                                self._send(self._event(stream, rows[-2], True, combined))
+                            pushed[stream] = rows[-1][0]
+                            self._send(self._event(stream, rows[-1], False, combined))
+                        if not self._receive(server.ws_push_ms / 1000):
+                            return
+                except (BrokenPipeError, ConnectionResetError, OSError):
+                    pass
+
+            def _event(self, stream: str, row: list, closed: bool, combined: bool) -> Dict[str, Any]:
+                event = server._kline_event(stream, row, closed)
+                return {"stream": stream, "data": event} if combined else event
+
+            def _send(self, payload: Any, opcode: int = 0x1):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                if len(data) < 126:
+                    header = struct.pack("!BB", 0x80 | opcode, len(data))
+                elif len(data) < 1 << 16:
+                    header = struct.pack("!BBH", 0x80 | opcode, 126, len(data))
+                else:
+                    header = struct.pack("!BBQ", 0x80 | opcode, 127, len(data))
+                self.wfile.write(header + data)
+                self.wfile.flush()
+
+            def _receive(self, timeout: float) -> bool:
+                """Handle client frames for up to timeout seconds; False once the client closed."""
+                deadline = time.monotonic() + timeout
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return True
+                    readable, _, _ = select.select([self.connection], [], [], remaining)
+                    if not readable:
+                        return True
+                    header = self.rfile.read(2)
+                    if len(header) < 2:
+                        return False
+                    opcode, length = header[0] & 0x0F, header[1] & 0x7F
+                    if length == 126:
+                        length = struct.unpack("!H", self.rfile.read(2))[0]
+                    elif length == 127:
+                        length = struct.unpack("!Q", self.rfile.read(8))[0]
+                    mask = self.rfile.read(4) if header[1] & 0x80 else b"\x00" * 4
+                    data = bytes(b ^ mask[i % 4] for i, b in enumerate(self.rfile.read(length)))
+                    if opcode == 0x8:
+                        self._send(data[:2], opcode=0x8)
+                        return False
+                    if opcode == 0x9:
+                        self._send(data, opcode=0xA)
+
+        return Handler
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a local Binance futures simulator")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8801, help="Port (default: 8801)")
+    parser.add_argument("--symbols", default="ETHUSDT,BTCUSDT",
+                        help="Comma-separated symbols, or a number of generated ones (SYM0001USDT...)")
+    parser.add_argument("--responses", help="Recorded responses (record_responses) to replay")
+    parser.add_argument("--history", type=int, default=500, help="Candles per series visible at start")
+    parser.add_argument("--seed", type=int, default=42, help="Base random seed")
+    parser.add_argument("--api-key", action="append", default=[], metavar="KEY:SECRET",
+                        help="API key and secret of an account (repeatable; default: simulator:simulator)")
+    parser.add_argument("--balance", type=float, default=5000.0, help="Starting wallet balance per account")
+    parser.add_argument("--weight-limit", type=int, default=2400, help="Futures request weight per minute (0: off)")
+    parser.add_argument("--spot-weight-limit", type=int, default=6000, help="Spot request weight per minute (0: off)")
+    parser.add_argument("--order-limit", type=int, default=1200, help="Orders per minute (0: off)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response")
+    args = parser.parse_args(argv)
+
+    if args.symbols.isdigit():
+        symbols = [f"SYM{i:04d}USDT" for i in range(int(args.symbols))]
+    else:
+        symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    responses = None
+    if args.responses:
+        from benchmarks.fake_exchange import load_responses
+
+        responses = load_responses(args.responses)
+    api_keys = dict(pair.split(":", 1) for pair in args.api_key) or None
+
+    exchange = SimulatedExchange(symbols, responses=responses, history=args.history, seed=args.seed,
+                                 api_keys=api_keys, balance=args.balance, weight_limit=args.weight_limit,
+                                 spot_weight_limit=args.spot_weight_limit, order_limit=args.order_limit)
+    server = ExchangeServer(exchange, latency_ms=args.latency_ms, host=args.host, port=args.port)
+    print(f"Simulating Binance futures for {len(symbols)} symbols on {server.base_url} "
+          f"(API keys: {', '.join(exchange.api_keys)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""In-process fake Binance client serving recorded responses with configurable latency."""
+
+import json
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import generate_klines
+
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+FUNDING_INTERVAL_MS = 8 * 60 * 60_000
+
+
+def synthesize_responses(symbols: List[str], intervals: List[str] = ("1m", "5m", "4h"),
+                         candles: int = 500, seed: int = 42) -> Dict[str, Any]:
+    """
+    Build a deterministic response set for the given symbols.
+
+    :param symbols: Symbols to generate market data for
+    :param intervals: Kline intervals to generate
+    :param candles: Number of klines per symbol and interval
+    :param seed: Base random seed
+    :return: Response document in the same layout record_responses writes
+    """
+    now_ms = int(time.time() * 1000)
+    klines = {}
+    open_interest = {}
+    funding_rate = {}
+    for i, symbol in enumerate(symbols):
+        klines[symbol] = {}
+        for interval in intervals:
+            interval_ms = INTERVAL_MS[interval]
+            # Last kline is the in-progress candle, and open times fall on
+            # interval boundaries, as on the real exchange
+            start = now_ms // interval_ms * interval_ms - (candles - 1) * interval_ms
+            klines[symbol][interval] = generate_klines(
+                candles, seed=seed + i, start_price=100.0 * (i + 1) + 2900.0,
+                interval_ms=interval_ms, start_time_ms=start,
+            )
+        open_interest[symbol] = {"symbol": symbol, "openInterest": f"{100000 + 1000 * i:.3f}", "time": now_ms}
+        # 30 days of 8h settlements oscillating around 0.01%
+        last_settlement = now_ms // FUNDING_INTERVAL_MS * FUNDING_INTERVAL_MS
+        funding_rate[symbol] = [
+            {"symbol": symbol, "fundingTime": funding_time,
+             "fundingRate": f"{0.0001 + 0.00005 * math.sin(funding_time / (FUNDING_INTERVAL_MS * 9) + i):.8f}"}
+            for funding_time in range(last_settlement - 89 * FUNDING_INTERVAL_MS, last_settlement + 1,
+                                      FUNDING_INTERVAL_MS)
+        ]
+
+    return {
+        "klines": klines,
+        "open_interest": open_interest,
+        "funding_rate": funding_rate,
+        "account": {
+            "totalWalletBalance": "5000.00000000",
+            "availableBalance": "5000.00000000",
+            "positions": [],
+        },
+        "position_information": [],
+    }
+
+
+def record_responses(symbols: List[str], path: str, intervals: List[str] = ("1m", "5m", "4h"),
+                     candles: int = 500):
+    """
+    Record live responses from the configured Binance client to a JSON file.
+
+    :param symbols: Symbols to record market data for
+    :param path: Output JSON path
+    :param intervals: Kline intervals to record
+    :param candles: Number of klines per symbol and interval
+    """
+    from client.binance_client import get_binance_client
+
+    client = get_binance_client()
+    document = {"klines": {}, "open_interest": {}, "funding_rate": {}, "premium_index": {}}
+    for symbol in symbols:
+        document["klines"][symbol] = {
+            interval: client.get_klines(symbol=symbol, interval=interval, limit=candles)
+            for interval in intervals
+        }
+        document["open_interest"][symbol] = client.futures_open_interest(symbol=symbol)
+        document["funding_rate"][symbol] = client.futures_funding_rate(symbol=symbol, limit=100)
+        document["premium_index"][symbol] = client.futures_mark_price(symbol=symbol)
+    document["account"] = client.futures_account()
+    document["position_information"] = client.futures_position_information()
+
+    with open(path, "w") as f:
+        json.dump(document, f)
+
+
+def load_responses(path: str) -> Dict[str, Any]:
+    """Load a response document written by record_responses."""
+    with open(path) as f:
+        return json.load(f)
+
+
+class FakeBinanceError(Exception):
+    """Error carrying a Binance error code, like BinanceAPIException."""
+
+    def __init__(self, code: int, message: str, status_code: int = 400):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+class _FakeSession:
+    """Stand-in for TunedSession exposing the same stats interface."""
+
+    def __init__(self, client: "FakeBinanceClient"):
+        self._client = client
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"requests": self._client.request_count, "retries": 0, "failures": 0,
+                "new_connections": 0, "reused_connections": self._client.request_count, "pools": 0}
+
+
+class FakeBinanceClient:
+    """
+    Fake python-binance Client implementing the calls this project makes.
+
+    Every call sleeps for a configurable latency (blocking, like the real
+    client) and answers from a recorded or synthesized response document.
+    Orders are filled immediately at the last close and tracked as positions.
+    """
+
+    def __init__(self, responses: Dict[str, Any], latency_ms: float | Dict[str, float] = 0.0,
+                 jitter_ms: float = 0.0, seed: int = 0):
+        """
+        :param responses: Response document (see synthesize_responses)
+        :param latency_ms: Latency applied to every call, or a mapping of method name
+                           to latency with an optional "default" entry
+        :param jitter_ms: Uniform random jitter added to each call's latency
+        :param seed: Random seed for the jitter
+        """
+        self.responses = responses
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self.request_count = 0
+        self.orders: List[Dict[str, Any]] = []
+        self.positions: Dict[str, float] = {}
+        self.session = _FakeSession(self)
+
+    def _delay(self, method: str):
+        self.request_count += 1
+        if isinstance(self.latency_ms, dict):
+            latency = self.latency_ms.get(method, self.latency_ms.get("default", 0.0))
+        else:
+            latency = self.latency_ms
+        if self.jitter_ms:
+            latency += self._rng.uniform(0, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def _klines(self, symbol: str, interval: str, limit: Optional[int]) -> List[list]:
+        rows = self.responses["klines"].get(symbol, {}).get(interval)
+        if rows is None:
+            raise Exception(f"No recorded klines for {symbol} {interval}")
+        return rows[-limit:] if limit else rows
+
+    def _last_price(self, symbol: str) -> float:
+        intervals = self.responses["klines"][symbol]
+        rows = intervals.get("1m") or next(iter(intervals.values()))
+        return float(rows[-1][4])
+
+    def ping(self) -> Dict:
+        self._delay("ping")
+        return {}
+
+    def futures_ping(self) -> Dict:
+        self._delay("futures_ping")
+        return {}
+
+    def get_klines(self, symbol: str, interval: str, limit: Optional[int] = 500, **kwargs) -> List[list]:
+        self._delay("get_klines")
+        return self._klines(symbol, interval, limit)
+
+    def futures_klines(self, symbol: str, interval: str, limit: Optional[int] = 500, **kwargs) -> List[list]:
+        self._delay("futures_klines")
+        return self._klines(symbol, interval, limit)
+
+    def futures_open_interest(self, symbol: str, **kwargs) -> Dict:
+        self._delay("futures_open_interest")
+        return self.responses["open_interest"][symbol]
+
+    def futures_open_interest_hist(self, symbol: str, period: str = "5m", limit: int = 30,
+                                   startTime: Optional[int] = None, **kwargs) -> List[Dict]:
+        self._delay("futures_open_interest_hist")
+        # Deterministic wave around the recorded open interest, one point per closed period
+        base = float(self.responses["open_interest"][symbol]["openInterest"])
+        period_ms = INTERVAL_MS[period]
+        end = (int(time.time() * 1000) // period_ms - 1) * period_ms
+        start = max(startTime or 0, end - (limit - 1) * period_ms)
+        start = -(-start // period_ms) * period_ms
+        points = []
+        for timestamp in range(start, end + 1, period_ms):
+            value = base * (1 + 0.02 * math.sin(timestamp / (period_ms * 48)))
+            points.append({"symbol": symbol, "sumOpenInterest": f"{value:.3f}",
+                           "sumOpenInterestValue": f"{value * self._last_price(symbol):.2f}",
+                           "timestamp": timestamp})
+        return points[-limit:]
+
+    def futures_funding_rate(self, symbol: str, limit: int = 100, startTime: Optional[int] = None,
+                             **kwargs) -> List[Dict]:
+        self._delay("futures_funding_rate")
+        settlements = self.responses["funding_rate"][symbol]
+        if startTime is not None:
+            return [s for s in settlements if int(s["fundingTime"]) >= startTime][:limit]
+        return settlements[-limit:]
+
+    def futures_mark_price(self, symbol: Optional[str] = None, **kwargs) -> Dict | List[Dict]:
+        self._delay("futures_mark_price")
+        if symbol is None:
+            # Premium index of every symbol, in one request
+            return [self._premium_index(symbol) for symbol in self.responses["klines"]]
+        return self._premium_index(symbol)
+
+    def _premium_index(self, symbol: str) -> Dict:
+        recorded = self.responses.get("premium_index", {}).get(symbol)
+        if recorded is not None:
+            return recorded
+        now_ms = int(time.time() * 1000)
+        last_rate = self.responses["funding_rate"][symbol][-1]["fundingRate"]
+        price = self._last_price(symbol)
+        return {
+            "symbol": symbol,
+            "markPrice": f"{price:.2f}",
+            "indexPrice": f"{price:.2f}",
+            "lastFundingRate": last_rate,
+            "nextFundingTime": (now_ms // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS,
+            "interestRate": "0.00010000",
+            "time": now_ms,
+        }
+
+    def futures_account(self, **kwargs) -> Dict:
+        self._delay("futures_account")
+        account = dict(self.responses["account"])
+        account["positions"] = [
+            {"symbol": symbol, "positionAmt": str(amount), "leverage": "10", "isolated": False}
+            for symbol, amount in self.positions.items() if amount != 0
+        ]
+        return account
+
+    def futures_position_information(self, **kwargs) -> List[Dict]:
+        self._delay("futures_position_information")
+        positions = list(self.responses.get("position_information", []))
+        for symbol, amount in self.positions.items():
+            if amount != 0:
+                positions.append({
+                    "symbol": symbol,
+                    "positionAmt": str(amount),
+                    "positionSide": "BOTH",
+                    "entryPrice": str(self._last_price(symbol)),
+                    "markPrice": str(self._last_price(symbol)),
+                    "unRealizedProfit": "0.0",
+                    "isolatedWallet": "0",
+                })
+        return positions
+
+    def futures_create_order(self, symbol: str, side: str, type: str, quantity: float, **kwargs) -> Dict:
+        self._delay("futures_create_order")
+        client_order_id = kwargs.get("newClientOrderId")
+        if client_order_id and any(o["clientOrderId"] == client_order_id for o in self.orders):
+            raise FakeBinanceError(-4116, "ClientOrderId is duplicated.")
+        current = self.positions.get(symbol, 0.0)
+        position = current + (float(quantity) if side == "BUY" else -float(quantity))
+        # Reduce-only orders can never flip or open a position
+        if kwargs.get("reduceOnly") and position * current <= 0:
+            position = 0.0
+        self.positions[symbol] = position
+        order = {
+            "orderId": len(self.orders) + 1,
+            "clientOrderId": kwargs.get("newClientOrderId", f"fake-{len(self.orders) + 1}"),
+            "symbol": symbol,
+            "side": side,
+            "type": type,
+            "origQty": str(quantity),
+            "executedQty": str(quantity),
+            "avgPrice": str(self._last_price(symbol)),
+            "status": "FILLED",
+        }
+        self.orders.append(order)
+        return order
+
+    def futures_get_order(self, symbol: str, orderId: Optional[int] = None,
+                          origClientOrderId: Optional[str] = None, **kwargs) -> Dict:
+        self._delay("futures_get_order")
+        for order in self.orders:
+            if order["symbol"] == symbol and (order["orderId"] == orderId
+                                              or order["clientOrderId"] == origClientOrderId):
+                return order
+        raise FakeBinanceError(-2013, "Order does not exist.")
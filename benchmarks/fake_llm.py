@@ -0,0 +1,77 @@
+"""Scripted stand-in chat model for running the agent without a real LLM."""
+
+import asyncio
+import itertools
+import time
+import uuid
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that replays a fixed script of trading decisions.
+
+    Each agent run consumes the next action from ``script``:
+    - "long" / "short": call createPosition with ``quantity`` of the symbol
+    - "close": call closeAllPosition
+    - "hold": answer without a tool call
+
+    After a tool result comes back the model answers with a short final
+    message, so every run makes one or two model calls like the real agent.
+    Each call waits ``latency_seconds`` to stand in for model latency.
+    """
+
+    script: List[str] = ["hold", "long", "hold", "close"]
+    symbol: str = "ETH/USDT"
+    quantity: float = 0.01
+    latency_seconds: float = 0.0
+    reasoning: str = "Signals reviewed. "
+    # Position in the script, shared with the per-decision copies build_agent makes
+    _cursor: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        usage = {"input_tokens": sum(len(str(m.content)) // 4 for m in messages), "output_tokens": 20,
+                 "total_tokens": 0}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        if messages and isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=f"Done: {messages[-1].content}", usage_metadata=usage)
+
+        action = self.script[next(self._cursor) % len(self.script)]
+
+        if action in ("long", "short"):
+            tool_calls = [{
+                "name": "createPosition",
+                "args": {"symbol": self.symbol, "side": action.upper(), "quantity": self.quantity},
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+            }]
+        elif action == "close":
+            tool_calls = [{"name": "closeAllPosition", "args": {}, "id": f"call_{uuid.uuid4().hex[:8]}"}]
+        else:
+            return AIMessage(content=f"{self.reasoning}Holding, no clear edge.", usage_metadata=usage)
+
+        return AIMessage(content=self.reasoning, tool_calls=tool_calls, usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
@@ -0,0 +1,213 @@
+"""Local stand-in for an OpenAI-compatible chat model server.
+
+Serves ``POST /chat/completions`` and replays a script of trading decisions
+like benchmarks.fake_llm.ScriptedChatModel, but over HTTP with streaming
+(server-sent events): a delay before the first token, reasoning tokens,
+then the tool call arguments in small chunks, each separated by a token
+delay. Point the agent at it to exercise the real ChatDeepSeek client,
+the decision deadline, the fallback cascade and early tool dispatch.
+
+Usage:
+    python -m benchmarks.fake_llm_server --port 8701 --first-token-ms 30000 --script long,hold
+    LLM_BASE_URL=http://127.0.0.1:8701 LLM_FALLBACK_BASE_URL=http://127.0.0.1:8702 python main.py
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeLLMServer:
+    """
+    Scripted chat completions server running in a background thread.
+
+    :param script: Actions consumed one per decision: "long", "short", "close" or "hold"
+    :param symbol: Symbol passed to createPosition
+    :param quantity: Quantity passed to createPosition
+    :param first_token_ms: Delay before the first streamed token
+    :param token_ms: Delay between streamed chunks
+    :param reasoning_tokens: Reasoning chunks streamed before the answer
+    :param tail_ms: Delay after the tool call before the stream ends
+    :param host: Interface to bind
+    :param port: Port to bind (0 picks a free one)
+    """
+
+    def __init__(self, script: Optional[List[str]] = None, symbol: str = "ETH/USDT", quantity: float = 0.01,
+                 first_token_ms: float = 0.0, token_ms: float = 0.0, reasoning_tokens: int = 5,
+                 tail_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.script = script or ["hold", "long", "hold", "close"]
+        self.symbol = symbol
+        self.quantity = quantity
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.reasoning_tokens = reasoning_tokens
+        self.tail_ms = tail_ms
+        self.position = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def next_reply(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Decide the next reply to a chat request.
+
+        :param messages: Request messages
+        :return: Dict with reasoning, content and an optional tool call (name, arguments)
+        """
+        with self._lock:
+            self.requests += 1
+            if messages and messages[-1].get("role") == "tool":
+                return {"reasoning": "", "content": f"Done: {messages[-1].get('content')}", "tool_call": None}
+            action = self.script[self.position % len(self.script)]
+            self.position += 1
+
+        if action in ("long", "short"):
+            arguments = {"symbol": self.symbol, "side": action.upper(), "quantity": self.quantity}
+            tool_call = {"name": "createPosition", "arguments": json.dumps(arguments)}
+        elif action == "close":
+            tool_call = {"name": "closeAllPosition", "arguments": "{}"}
+        else:
+            tool_call = None
+        content = "" if tool_call else "Holding: no clear edge."
+        return {"reasoning": "Signals reviewed. " * self.reasoning_tokens, "content": content, "tool_call": tool_call}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                reply = server.next_reply(body.get("messages", []))
+                model = body.get("model", "fake")
+                try:
+                    if body.get("stream"):
+                        self._stream(model, reply)
+                    else:
+                        self._complete(model, reply)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (decision deadline)
+                    pass
+
+            def _complete(self, model: str, reply: Dict[str, Any]):
+                time.sleep(server.first_token_ms / 1000)
+                message: Dict[str, Any] = {"role": "assistant", "content": reply["content"],
+                                           "reasoning_content": reply["reasoning"]}
+                if reply["tool_call"]:
+                    message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                                              "function": reply["tool_call"]}]
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:8]}", "object": "chat.completion",
+                    "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": message,
+                                 "finish_reason": "tool_calls" if reply["tool_call"] else "stop"}],
+                    "usage": {"prompt_tokens": 1000, "completion_tokens": 50, "total_tokens": 1050},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, model: str, reply: Dict[str, Any]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:8]}"
+
+                def send(delta: Dict[str, Any], finish_reason: Optional[str] = None, delay_ms: float = server.token_ms):
+                    time.sleep(delay_ms / 1000)
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                send({"role": "assistant", "content": ""}, delay_ms=server.first_token_ms)
+                for _ in range(server.reasoning_tokens if reply["reasoning"] else 0):
+                    send({"reasoning_content": "Signals reviewed. "})
+                if reply["content"]:
+                    send({"content": reply["content"]})
+                if reply["tool_call"]:
+                    call = reply["tool_call"]
+                    send({"tool_calls": [{"index": 0, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                                          "function": {"name": call["name"], "arguments": ""}}]})
+                    arguments = call["arguments"]
+                    for start in range(0, len(arguments), 16):
+                        send({"tool_calls": [{"index": 0, "function": {"arguments": arguments[start:start + 16]}}]})
+                send({}, finish_reason="tool_calls" if reply["tool_call"] else "stop", delay_ms=server.tail_ms)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a scripted OpenAI-compatible chat model")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8701, help="Port (default: 8701)")
+    parser.add_argument("--script", default="hold,long,hold,close", help="Comma-separated actions")
+    parser.add_argument("--symbol", default="ETH/USDT", help="Symbol for createPosition")
+    parser.add_argument("--quantity", type=float, default=0.01, help="Quantity for createPosition")
+    parser.add_argument("--first-token-ms", type=float, default=0.0, help="Delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Delay between streamed chunks")
+    parser.add_argument("--reasoning-tokens", type=int, default=5, help="Reasoning chunks per reply")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="Delay after the tool call before the stream ends")
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer(script=args.script.split(","), symbol=args.symbol, quantity=args.quantity,
+                           first_token_ms=args.first_token_ms, token_ms=args.token_ms,
+                           reasoning_tokens=args.reasoning_tokens, tail_ms=args.tail_ms,
+                           host=args.host, port=args.port)
+    print(f"Serving scripted chat completions on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
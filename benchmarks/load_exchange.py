@@ -0,0 +1,232 @@
+"""Load test of the exchange client path against the local Binance simulator.
+
+Drives the real python-binance client (TunedSession, signatures, retries)
+and account_actions.orders.submit_market_order against a
+benchmarks.exchange_server simulator at fixed request rates: kline polls
+over every symbol, and market orders of a fixed notional with seeded random
+sides. Reports throughput, latency percentiles and errors per kind, the
+request weight used, and whether the local mark-to-market engine still
+agrees with the simulator's wallet and positions afterwards.
+
+Each order worker owns a shard of the symbols, so the fills of a symbol
+reach the exchange and the local engine in the same order.
+
+Usage:
+    python -m benchmarks.load_exchange --symbols 300 --orders-per-minute 3000 --duration 60
+    python -m benchmarks.load_exchange --url http://127.0.0.1:8801 --api-key simulator --api-secret simulator
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_cycle import percentile
+
+
+class LoadResults:
+    """Thread-safe latency and error counters per request kind."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float, error: Exception | None = None):
+        with self._lock:
+            self.latencies[kind].append(seconds)
+            if error is not None:
+                self.errors[kind][str(getattr(error, "code", type(error).__name__))] += 1
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        """
+        :param duration: Wall time of the run in seconds
+        :return: Mapping of kind to count, rate per second, p50/p90/p99/max in seconds and error counts
+        """
+        return {kind: {
+            "count": len(values),
+            "per_second": len(values) / duration,
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values),
+            "errors": dict(self.errors[kind]),
+        } for kind, values in sorted(self.latencies.items())}
+
+
+def run_paced(count: int, interval: float, start: float, stop: float, task: Callable[[int], None]):
+    """
+    Run task(i) for i = 0, 1, ... at start + i * interval until stop.
+
+    Several threads can share the same counter to spread the schedule.
+
+    :param count: Shared itertools.count of the next task index
+    :param interval: Seconds between consecutive tasks
+    :param start: time.monotonic() of the first task
+    :param stop: time.monotonic() after which no task starts
+    :param task: Function of the task index
+    """
+    for i in count:
+        due = start + i * interval
+        if due >= stop:
+            return
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        task(i)
+
+
+def run_load(client, symbols: List[str], duration: float, klines_per_minute: float, orders_per_minute: float,
+             workers: int, order_workers: int, order_notional: float, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run the load and check the local account state against the exchange.
+
+    :param client: Binance client of the simulator
+    :param symbols: Symbols to poll and trade
+    :param duration: Seconds of load
+    :param klines_per_minute: Kline requests per minute, over all symbols
+    :param orders_per_minute: Market orders per minute
+    :param workers: Threads polling klines
+    :param order_workers: Threads submitting orders, each owning a shard of the symbols
+    :param order_notional: Notional of every order in USDT
+    :param seed: Random seed of the order sides
+    :return: Results with the per-kind summary, weight used and account drift
+    """
+    from account_actions.account import TradingAccount, use_account
+    from account_actions.mark_to_market import create_mark_to_market
+    from account_actions.orders import submit_market_order
+
+    engine = create_mark_to_market(client)
+    engine.reconcile("load_test")
+    account = TradingAccount("load_test", client, engine)
+    prices = {row["symbol"]: float(row["markPrice"]) for row in client.futures_mark_price()}
+    results = LoadResults()
+
+    def timed(kind: str, call: Callable[[], Any]):
+        started = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            results.record(kind, time.perf_counter() - started, e)
+        else:
+            results.record(kind, time.perf_counter() - started)
+
+    def poll_klines(i: int):
+        timed("klines", lambda: client.get_klines(symbol=symbols[i % len(symbols)], interval="1m", limit=100))
+
+    def submit_orders(worker: int, start: float, stop: float):
+        shard = symbols[worker::order_workers]
+        rng = random.Random(seed + worker)
+
+        def submit(i: int):
+            symbol = shard[rng.randrange(len(shard))]
+            side = rng.choice(("BUY", "SELL"))
+            quantity = round(order_notional / prices[symbol], 3) or 0.001
+            timed("orders", lambda: submit_market_order(symbol, side, quantity))
+
+        with use_account(account):
+            run_paced(itertools.count(), order_workers * 60 / orders_per_minute, start, stop, submit)
+
+    start = time.monotonic() + 0.1
+    stop = start + duration
+    threads = []
+    if klines_per_minute > 0:
+        counter = itertools.count()
+        threads += [threading.Thread(target=run_paced, args=(counter, 60 / klines_per_minute, start, stop,
+                                                             poll_klines)) for _ in range(workers)]
+    if orders_per_minute > 0:
+        order_workers = min(order_workers, len(symbols))
+        threads += [threading.Thread(target=submit_orders, args=(w, start, stop)) for w in range(order_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    # Local state (fills applied to the engine) against the exchange's
+    exchange_account = client.futures_account()
+    used_weight = client.response.headers.get("X-MBX-USED-WEIGHT-1M")
+    exchange_positions = {row["symbol"]: float(row["positionAmt"]) for row in client.futures_position_information()}
+    local_positions = {p["symbol"]: p["positionAmt"] for p in engine.account_view(refresh=False)["positions"]}
+    mismatched = sorted(s for s in set(exchange_positions) | set(local_positions)
+                        if abs(exchange_positions.get(s, 0.0) - local_positions.get(s, 0.0)) > 1e-9)
+    return {
+        "duration": elapsed,
+        "summary": results.summary(elapsed),
+        "used_weight_1m": int(used_weight) if used_weight is not None else None,
+        "wallet_drift": float(exchange_account["totalWalletBalance"]) - engine.wallet_balance,
+        "open_positions": len(exchange_positions),
+        "position_mismatches": mismatched,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the exchange client path against the simulator")
+    parser.add_argument("--symbols", type=int, default=300, help="Symbols to poll and trade (default: 300)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load (default: 30)")
+    parser.add_argument("--klines-per-minute", type=float, default=6000.0,
+                        help="Kline requests per minute (default: 6000)")
+    parser.add_argument("--orders-per-minute", type=float, default=3000.0,
+                        help="Market orders per minute (default: 3000)")
+    parser.add_argument("--workers", type=int, default=8, help="Kline polling threads (default: 8)")
+    parser.add_argument("--order-workers", type=int, default=8, help="Order threads (default: 8)")
+    parser.add_argument("--order-notional", type=float, default=20.0, help="USDT notional per order (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the order sides")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulator response delay (in-process only)")
+    parser.add_argument("--binance-limits", action="store_true",
+                        help="Enforce Binance's request weight and order limits (in-process only)")
+    parser.add_argument("--url", help="Simulator already running at this URL (default: start one in-process)")
+    parser.add_argument("--api-key", default="simulator", help="API key with --url")
+    parser.add_argument("--api-secret", default="simulator", help="API secret with --url")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    from client.tuned_client import TunedClient
+    import client.binance_client as binance_client
+
+    symbols = [f"SYM{i:04d}USDT" for i in range(args.symbols)]
+    server = None
+    url = args.url
+    if url is None:
+        from benchmarks.exchange_server import ExchangeServer, SimulatedExchange
+
+        limits = {} if args.binance_limits else {"weight_limit": 0, "spot_weight_limit": 0, "order_limit": 0}
+        exchange = SimulatedExchange(symbols, api_keys={args.api_key: args.api_secret}, balance=1_000_000.0,
+                                     **limits)
+        server = ExchangeServer(exchange, latency_ms=args.latency_ms).start()
+        url = server.base_url
+    client = TunedClient(args.api_key, args.api_secret, base_url=url)
+    # Mark price refreshes of the engine go to the simulator too
+    binance_client._client = client
+
+    try:
+        results = run_load(client, symbols, args.duration, args.klines_per_minute, args.orders_per_minute,
+                           args.workers, args.order_workers, args.order_notional, args.seed)
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(f"{len(symbols)} symbols, {results['duration']:.1f}s against {url}\n")
+    print(f"{'kind':<8} {'count':>8} {'per s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)  errors")
+    for kind, stats in results["summary"].items():
+        print(f"{kind:<8} {stats['count']:>8} {stats['per_second']:>8.1f} "
+              + " ".join(f"{stats[m] * 1e3:>8.2f}" for m in ("p50", "p90", "p99", "max"))
+              + f"  {stats['errors'] or ''}")
+    print(f"\nused weight (last minute): {results['used_weight_1m']}, open positions: {results['open_positions']}")
+    print(f"local vs exchange: wallet drift {results['wallet_drift']:.8f}, "
+          f"position mismatches {results['position_mismatches'] or 'none'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), **results}, f, indent=2)
+    consistent = abs(results["wallet_drift"]) < 1e-6 and not results["position_mismatches"]
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
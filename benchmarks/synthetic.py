@@ -0,0 +1,85 @@
+"""Synthetic market data generators for benchmarks."""
+
+import math
+import random
+from typing import Dict, List
+
+
+def generate_candles(count: int, seed: int = 42, start_price: float = 3000.0) -> List[Dict[str, float]]:
+    """
+    Generate a reproducible OHLCV series following a geometric random walk.
+    
+    :param count: Number of candles to generate
+    :param seed: Random seed (same seed always produces the same series)
+    :param start_price: Opening price of the first candle
+    :return: List of candlesticks with 'open', 'high', 'low', 'close', 'volume'
+    """
+    rng = random.Random(seed)
+    candles = []
+    price = start_price
+    for _ in range(count):
+        open_price = price
+        close_price = open_price * math.exp(rng.gauss(0, 0.002))
+        high = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.001)))
+        low = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.001)))
+        volume = rng.lognormvariate(6, 0.5)
+        candles.append({
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": close_price,
+            "volume": volume,
+        })
+        price = close_price
+    return candles
+
+
+def generate_klines(count: int, seed: int = 42, start_price: float = 3000.0,
+                    interval_ms: int = 5 * 60 * 1000, start_time_ms: int = 1_700_000_000_000) -> List[list]:
+    """
+    Generate a reproducible series of raw Binance kline rows.
+    
+    :param count: Number of klines to generate
+    :param seed: Random seed
+    :param start_price: Opening price of the first kline
+    :param interval_ms: Kline interval in milliseconds (default: 5m)
+    :param start_time_ms: Open time of the first kline in milliseconds
+    :return: List of kline rows in Binance format
+             [Open time, Open, High, Low, Close, Volume, Close time, Quote volume,
+              Trades, Taker buy base volume, Taker buy quote volume, Ignore]
+    """
+    start_time_ms -= start_time_ms % interval_ms
+    klines = []
+    for i, candle in enumerate(generate_candles(count, seed, start_price)):
+        open_time = start_time_ms + i * interval_ms
+        klines.append([
+            open_time,
+            f"{candle['open']:.2f}",
+            f"{candle['high']:.2f}",
+            f"{candle['low']:.2f}",
+            f"{candle['close']:.2f}",
+            f"{candle['volume']:.3f}",
+            open_time + interval_ms - 1,
+            f"{candle['volume'] * candle['close']:.2f}",
+            100,
+            f"{candle['volume'] / 2:.3f}",
+            f"{candle['volume'] * candle['close'] / 2:.2f}",
+            "0",
+        ])
+    return klines
+
+
+def generate_portfolio_values(count: int, seed: int = 42, start_value: float = 5000.0) -> List[float]:
+    """
+    Generate a reproducible portfolio value series.
+    
+    :param count: Number of values to generate
+    :param seed: Random seed
+    :param start_value: Initial portfolio value
+    :return: List of portfolio values
+    """
+    rng = random.Random(seed)
+    values = [start_value]
+    for _ in range(count - 1):
+        values.append(values[-1] * (1 + rng.gauss(0.0001, 0.003)))
+    return values
@@ -1,14 +1,12 @@
 """Binance API client initialization and management."""
 import os
-from binance import Client
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Optional
 
-load_dotenv()  # Load environment variables from .env file
+from utils.env import load_env
+
+if TYPE_CHECKING:
+    from binance import Client
 
-# Initialize Binance client (API keys optional for public endpoints like klines)
-# API keys can help with rate limits
-_api_key = os.getenv("BINANCE_API_KEY")
-_api_secret = os.getenv("BINANCE_SECRET_KEY")
 # Check if testnet should be used (default to True/testnet - change to False for mainnet)
 _use_testnet = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
 _client = None
@@ -20,7 +18,7 @@ def reset_client():
     _client = None
 
 
-def get_binance_client() -> Client:
+def get_binance_client() -> "Client":
     """
     Get or create Binance client instance (singleton pattern).
     
@@ -31,19 +29,78 @@ def get_binance_client() -> Client:
     Testnet mode can be controlled via BINANCE_TESTNET environment variable:
     - Set BINANCE_TESTNET=true or omit to use Binance testnet (default)
     - Set BINANCE_TESTNET=false to use Binance mainnet
+    BINANCE_BASE_URL (e.g. http://127.0.0.1:8801, the local simulator
+    benchmarks.exchange_server) sends every request to another host instead.
     
     Returns:
         Client: Binance API client instance
     """
     global _client, _use_testnet
+    if _client is not None:
+        return _client
+    
+    load_env()
     # Re-read testnet setting in case it changed (default to True/testnet)
     _use_testnet = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
-    
-    if _client is None:
-        if _api_key and _api_secret:
-            _client = Client(_api_key, _api_secret, testnet=_use_testnet)
-        else:
-            # Can still use client without keys for public endpoints
-            _client = Client(testnet=_use_testnet)
+    # API keys are optional for public endpoints like klines, but help with rate limits
+    _client = create_binance_client(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_SECRET_KEY"), _use_testnet)
     return _client
 
+
+def create_binance_client(api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                          testnet: Optional[bool] = None) -> "Client":
+    """
+    Create a new Binance client, e.g. for a sub-account's credentials.
+    
+    Args:
+        api_key: API key (without keys only public endpoints can be used)
+        api_secret: API secret
+        testnet: Use the testnet (default: BINANCE_TESTNET); ignored when
+            BINANCE_BASE_URL is set
+    
+    Returns:
+        Client: New Binance API client instance with its own connection pool
+    """
+    # python-binance is only imported once a client is actually needed
+    from client.tuned_client import TunedClient
+    
+    if testnet is None:
+        testnet = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
+    base_url = os.getenv("BINANCE_BASE_URL") or None
+    if api_key and api_secret:
+        return TunedClient(api_key, api_secret, testnet=testnet, base_url=base_url)
+    # Can still use client without keys for public endpoints
+    return TunedClient(testnet=testnet, base_url=base_url)
+
+
+def warm_up_connections():
+    """
+    Refresh keep-alive connections to the spot and futures hosts.
+    
+    Sends a cheap ping to each host so that a cold or server-closed socket is
+    re-established (DNS + TCP + TLS) before the trading cycle starts, instead
+    of on the first latency-sensitive request of the cycle.
+    
+    Raises:
+        Exception: If neither host can be reached
+    """
+    client = get_binance_client()
+    errors = []
+    for ping in (client.ping, client.futures_ping):
+        try:
+            ping()
+        except Exception as e:
+            errors.append(str(e))
+    if len(errors) == 2:
+        raise Exception(f"Failed to warm up Binance connections: {'; '.join(errors)}")
+
+
+def get_connection_stats() -> dict[str, int]:
+    """
+    Get connection reuse statistics for the Binance client session.
+    
+    Returns:
+        Dictionary of request, retry and connection counters
+        (see TunedSession.get_stats)
+    """
+    return get_binance_client().session.get_stats()
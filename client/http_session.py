@@ -0,0 +1,265 @@
+"""Tuned HTTP session used by the Binance client.
+
+Adds an explicitly sized connection pool, per-endpoint timeouts and an
+idempotency-aware retry policy with jittered exponential backoff on top of
+the plain ``requests.Session`` that python-binance creates by default.
+
+Rate limit responses (429, and 418 once Binance bans the IP for ignoring
+them) are never retried: Binance escalates requests sent before the
+Retry-After delay expires to an IP ban. Until it expires, requests to that
+host fail locally without reaching the exchange.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.logger import get_logger
+from utils.metrics import increment, set_gauge, span
+
+
+# Pool sizing: one pool per host (api, fapi, futures/data), each holding
+# enough keep-alive sockets for the concurrent requests a cycle makes.
+POOL_CONNECTIONS = int(os.getenv("BINANCE_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("BINANCE_POOL_MAXSIZE", "10"))
+
+# Retry policy
+MAX_RETRIES = int(os.getenv("BINANCE_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("BINANCE_BACKOFF_BASE", "0.25"))
+BACKOFF_MAX = float(os.getenv("BINANCE_BACKOFF_MAX", "4.0"))
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# Rate limited (429) and IP banned (418): never retried, and the host is
+# avoided for Retry-After seconds (RATE_LIMIT_BACKOFF without the header)
+RATE_LIMIT_STATUS_CODES = {418, 429}
+RATE_LIMIT_BACKOFF = float(os.getenv("BINANCE_RATE_LIMIT_BACKOFF", "60"))
+
+# HTTP methods that are safe to repeat after the request may have reached
+# the server. POST /order is deliberately not in this set.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# (connect timeout, read timeout) in seconds, matched on URL path suffix.
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 10.0)
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "/ping": (3.05, 3.0),
+    "/time": (3.05, 3.0),
+    "/klines": (3.05, 5.0),
+    "/openInterest": (3.05, 5.0),
+    "/openInterestHist": (3.05, 8.0),
+    "/fundingRate": (3.05, 5.0),
+    "/premiumIndex": (3.05, 5.0),
+    "/account": (3.05, 8.0),
+    "/positionRisk": (3.05, 8.0),
+    "/order": (3.05, 15.0),
+    "/batchOrders": (3.05, 15.0),
+}
+
+logger = get_logger("http_session")
+
+# host -> (time.monotonic() until which requests are not sent, status code)
+_rate_limited: Dict[str, Tuple[float, int]] = {}
+_rate_limited_lock = threading.Lock()
+
+
+class RateLimitedError(requests.exceptions.RequestException):
+    """A request was not sent because its host answered 429 or 418 and Retry-After has not expired."""
+
+    def __init__(self, host: str, status_code: int, retry_after: float):
+        super().__init__(f"{host} is rate limited (HTTP {status_code}) for another {retry_after:.1f}s, "
+                         f"request not sent")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def get_endpoint_timeout(url: str) -> Tuple[float, float]:
+    """
+    Resolve the (connect, read) timeout for a request URL.
+
+    Args:
+        url: Full request URL
+
+    Returns:
+        Tuple of (connect timeout, read timeout) in seconds
+    """
+    path = urlparse(url).path
+    for suffix, timeout in ENDPOINT_TIMEOUTS.items():
+        if path.endswith(suffix):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+def get_endpoint_label(url: str) -> str:
+    """
+    Get a low-cardinality metrics label for a request URL.
+
+    Args:
+        url: Full request URL (e.g. "https://fapi.binance.com/fapi/v1/klines")
+
+    Returns:
+        Path without version segments (e.g. "fapi/klines")
+    """
+    parts = urlparse(url).path.strip("/").split("/")
+    return "/".join(part for part in parts if not re.fullmatch(r"v\d+", part))
+
+
+def get_backoff_delay(attempt: int) -> float:
+    """
+    Compute the delay before a retry using exponential backoff with full jitter.
+
+    Args:
+        attempt: Retry attempt number (1 for the first retry)
+
+    Returns:
+        Delay in seconds
+    """
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+class TunedSession(requests.Session):
+    """
+    ``requests.Session`` with pool sizing, per-endpoint timeouts and safe retries.
+
+    Retry rules:
+    - Idempotent methods (GET/HEAD/OPTIONS) are retried on connection errors,
+      timeouts and retryable status codes (5xx).
+    - 429 and 418 responses are returned without retrying, and further
+      requests to the host raise RateLimitedError until Retry-After expires.
+    - Non-idempotent methods (order placement/cancellation) are only retried
+      when the connection could not be established at all, i.e. the request
+      never left this process. They are never retried on read timeouts or on
+      error responses, because the exchange may already have accepted them.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        super().__init__()
+        self.max_retries = max_retries
+        self.adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=0,
+            pool_block=False,
+        )
+        self.mount("https://", self.adapter)
+        self.mount("http://", self.adapter)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+        }
+
+    def request(self, method, url, *args, **kwargs):
+        """Send a request applying the endpoint timeout and retry policy."""
+        # python-binance always passes its global REQUEST_TIMEOUT; replace it
+        # with the endpoint-specific (connect, read) pair.
+        kwargs["timeout"] = get_endpoint_timeout(url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        endpoint = get_endpoint_label(url)
+        host = urlparse(url).netloc
+
+        attempt = 0
+        while True:
+            self._check_rate_limit(host, endpoint)
+            self._record("requests")
+            try:
+                with span("binance_request", endpoint=endpoint):
+                    response = super().request(method, url, *args, **kwargs)
+                self._record_response(endpoint, response)
+            except requests.exceptions.ConnectTimeout:
+                increment("binance_requests_total", endpoint=endpoint, status="connect_timeout")
+                # Connection never established: safe to retry for every method
+                if attempt >= self.max_retries:
+                    self._record("failures")
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                increment("binance_requests_total", endpoint=endpoint, status="connection_error")
+                if not idempotent or attempt >= self.max_retries:
+                    self._record("failures")
+                    raise
+            else:
+                if response.status_code in RATE_LIMIT_STATUS_CODES:
+                    self._record_rate_limit(host, endpoint, response)
+                    return response
+                if (
+                    not idempotent
+                    or response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    return response
+
+            attempt += 1
+            self._record("retries")
+            time.sleep(get_backoff_delay(attempt))
+
+    def _check_rate_limit(self, host: str, endpoint: str):
+        """Raise RateLimitedError while the host's Retry-After has not expired."""
+        with _rate_limited_lock:
+            until, status_code = _rate_limited.get(host, (0.0, 0))
+        remaining = until - time.monotonic()
+        if remaining > 0:
+            increment("binance_requests_total", endpoint=endpoint, status="rate_limited_local")
+            raise RateLimitedError(host, status_code, remaining)
+
+    def _record_rate_limit(self, host: str, endpoint: str, response: requests.Response):
+        try:
+            retry_after = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            retry_after = RATE_LIMIT_BACKOFF
+        with _rate_limited_lock:
+            until = max(_rate_limited.get(host, (0.0, 0))[0], time.monotonic() + retry_after)
+            _rate_limited[host] = (until, response.status_code)
+        log = logger.error if response.status_code == 418 else logger.warning
+        log("IP banned by Binance" if response.status_code == 418 else "Rate limited by Binance", extra={
+            "host": host, "endpoint": endpoint, "status": response.status_code, "retry_after": retry_after,
+        })
+
+    def _record_response(self, endpoint: str, response: requests.Response):
+        increment("binance_requests_total", endpoint=endpoint, status=str(response.status_code))
+        # Binance reports the request weight used in the current minute per IP
+        used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is not None:
+            set_gauge("binance_used_weight_1m", float(used_weight))
+
+    def _record(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+        if key != "requests":
+            increment(f"binance_http_{key}_total", amount)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get request and connection reuse statistics.
+
+        Returns:
+            Dictionary with:
+                - requests: HTTP requests sent (including retries)
+                - retries: Retry attempts made
+                - failures: Requests that failed after exhausting retries
+                - new_connections: TCP/TLS connections opened
+                - reused_connections: Requests served over an existing connection
+                - pools: Number of per-host connection pools
+        """
+        new_connections = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            pool_requests += pool.num_requests
+
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["new_connections"] = new_connections
+        stats["reused_connections"] = max(pool_requests - new_connections, 0)
+        stats["pools"] = len(pools)
+        return stats
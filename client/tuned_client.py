@@ -0,0 +1,44 @@
+"""Binance client subclass using the tuned HTTP session.
+
+Kept separate from client.binance_client so that importing the client
+accessors does not import python-binance until a client is actually built.
+"""
+
+from typing import Optional
+
+from binance import Client
+
+from client.http_session import TunedSession
+
+
+class TunedClient(Client):
+    """Binance client that sends requests through a pooled, retrying session."""
+
+    def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 base_url: Optional[str] = None, ping: bool = True, **kwargs):
+        """
+        Args:
+            api_key: API key
+            api_secret: API secret
+            base_url: Serve every spot and futures request from this host
+                instead of Binance (e.g. the local simulator,
+                benchmarks.exchange_server); overrides testnet
+            ping: Ping the spot host on construction
+            **kwargs: Other python-binance Client arguments
+        """
+        if base_url:
+            kwargs["testnet"] = False
+        # Ping only once the URLs point where they should
+        super().__init__(api_key, api_secret, ping=False, **kwargs)
+        if base_url:
+            base_url = base_url.rstrip("/")
+            self.API_URL = f"{base_url}/api"
+            self.FUTURES_URL = f"{base_url}/fapi"
+            self.FUTURES_DATA_URL = f"{base_url}/futures/data"
+        if ping:
+            self.ping()
+
+    def _init_session(self) -> TunedSession:
+        session = TunedSession()
+        session.headers.update(self._get_headers())
+        return session
@@ -1,16 +1,27 @@
 """Database models and schema for portfolio tracking."""
 
+import json
 import sqlite3
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
 
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "portfolio.db")
+# Number of most recent cycle traces to keep
+TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "1000"))
+# Database path whose schema has been created in this process
+_initialized_path: Optional[str] = None
 
 
 def init_database():
-    """Initialize the database and create tables if they don't exist."""
+    """
+    Initialize the database and create tables if they don't exist.
+    
+    Entry points call this once at startup. Other functions in this module
+    also run it on first use, so importing the module has no side effects.
+    """
+    global _initialized_path
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
@@ -30,11 +41,73 @@ def init_database():
         ON portfolio_history(timestamp)
     """)
     
+    # Strategy the snapshot belongs to (multi-strategy runtime, agent/strategies.py);
+    # added to databases created before it existed
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(portfolio_history)")}
+    if "strategy_id" not in columns:
+        cursor.execute("""
+            ALTER TABLE portfolio_history
+            ADD COLUMN strategy_id TEXT NOT NULL DEFAULT 'default'
+        """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_strategy_timestamp 
+        ON portfolio_history(strategy_id, timestamp)
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cycle_traces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cycle_id TEXT NOT NULL UNIQUE,
+            started_at TEXT NOT NULL,
+            duration REAL NOT NULL,
+            spans TEXT NOT NULL
+        )
+    """)
+    
+    # Single-row table holding the latest metrics registry snapshot
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metrics_snapshot (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            updated_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+    """)
+    
+    # Results of backtest parameter sweeps (backtest/sweep.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sweep_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            params TEXT NOT NULL,
+            sharpe REAL NOT NULL,
+            max_drawdown REAL NOT NULL,
+            turnover REAL NOT NULL,
+            total_return REAL NOT NULL,
+            trades INTEGER NOT NULL,
+            funding_paid REAL NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sweep_run 
+        ON sweep_results(run_id, sharpe)
+    """)
+    
     conn.commit()
     conn.close()
+    _initialized_path = DB_PATH
+
+
+def connect() -> sqlite3.Connection:
+    """Open a connection, creating the schema first if this process has not yet."""
+    if _initialized_path != DB_PATH:
+        init_database()
+    return sqlite3.connect(DB_PATH)
 
 
-def save_portfolio_data(total: float, available: float, timestamp: Optional[str] = None):
+def save_portfolio_data(total: float, available: float, timestamp: Optional[str] = None,
+                        strategy_id: str = "default"):
     """
     Save portfolio data to the database.
     
@@ -42,56 +115,263 @@ def save_portfolio_data(total: float, available: float, timestamp: Optional[str]
         total: Total portfolio value
         available: Available balance
         timestamp: Optional timestamp string. If None, uses current time.
+        strategy_id: Strategy whose account the snapshot is of
     """
+    conn = connect()
+    _insert_portfolio_data(conn.cursor(), total, available, timestamp, strategy_id)
+    conn.commit()
+    conn.close()
+
+
+def _insert_portfolio_data(cursor: sqlite3.Cursor, total: float, available: float,
+                           timestamp: Optional[str] = None, strategy_id: str = "default"):
     if timestamp is None:
         timestamp = datetime.utcnow().isoformat()
+    cursor.execute("""
+        INSERT INTO portfolio_history (timestamp, total, available, strategy_id)
+        VALUES (?, ?, ?, ?)
+    """, (timestamp, float(total), float(available), strategy_id))
+
+
+def get_portfolio_history(limit: Optional[int] = None, strategy_id: Optional[str] = None) -> List[Dict[str, any]]:
+    """
+    Retrieve portfolio history from the database.
     
-    conn = sqlite3.connect(DB_PATH)
+    Args:
+        limit: Optional limit on number of records to return
+        strategy_id: Only return the snapshots of this strategy (default: all)
+    
+    Returns:
+        List of dictionaries with timestamp, total, available and strategy_id
+    """
+    conn = connect()
+    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    cursor.execute("""
-        INSERT INTO portfolio_history (timestamp, total, available)
-        VALUES (?, ?, ?)
-    """, (timestamp, float(total), float(available)))
+    query = "SELECT timestamp, total, available, strategy_id FROM portfolio_history"
+    params: list = []
+    if strategy_id is not None:
+        query += " WHERE strategy_id = ?"
+        params.append(strategy_id)
+    query += " ORDER BY timestamp ASC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    cursor.execute(query, params)
+    
+    rows = cursor.fetchall()
+    conn.close()
+    
+    return [dict(row) for row in rows]
+
+
+def save_cycle_trace(trace: Dict[str, any]):
+    """
+    Save a trading cycle trace and prune traces beyond TRACE_RETENTION.
     
+    Args:
+        trace: Trace dictionary with cycle_id, started_at (Unix seconds),
+            duration (seconds) and spans (list of span records)
+    """
+    conn = connect()
+    _insert_cycle_trace(conn.cursor(), trace)
     conn.commit()
     conn.close()
 
 
-def get_portfolio_history(limit: Optional[int] = None) -> List[Dict[str, any]]:
+def _insert_cycle_trace(cursor: sqlite3.Cursor, trace: Dict[str, any]):
+    cursor.execute("""
+        INSERT OR REPLACE INTO cycle_traces (cycle_id, started_at, duration, spans)
+        VALUES (?, ?, ?, ?)
+    """, (
+        trace["cycle_id"],
+        datetime.utcfromtimestamp(trace["started_at"]).isoformat(),
+        float(trace["duration"]),
+        json.dumps(trace["spans"]),
+    ))
+    cursor.execute("""
+        DELETE FROM cycle_traces
+        WHERE id <= (SELECT MAX(id) FROM cycle_traces) - ?
+    """, (TRACE_RETENTION,))
+
+
+def get_cycle_traces(limit: int = 20) -> List[Dict[str, any]]:
     """
-    Retrieve portfolio history from the database.
+    Retrieve the most recent cycle traces.
     
     Args:
-        limit: Optional limit on number of records to return
+        limit: Maximum number of traces to return
     
     Returns:
-        List of dictionaries with timestamp, total, and available
+        List of dictionaries with cycle_id, started_at, duration and spans,
+        most recent first
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    if limit:
-        cursor.execute("""
-            SELECT timestamp, total, available
-            FROM portfolio_history
-            ORDER BY timestamp ASC
-            LIMIT ?
-        """, (limit,))
-    else:
-        cursor.execute("""
-            SELECT timestamp, total, available
-            FROM portfolio_history
-            ORDER BY timestamp ASC
-        """)
+    cursor.execute("""
+        SELECT cycle_id, started_at, duration, spans
+        FROM cycle_traces
+        ORDER BY id DESC
+        LIMIT ?
+    """, (limit,))
     
     rows = cursor.fetchall()
     conn.close()
     
-    return [dict(row) for row in rows]
+    return [{**dict(row), "spans": json.loads(row["spans"])} for row in rows]
+
+
+def save_metrics_snapshot(snapshot: Dict[str, list]):
+    """
+    Store the latest metrics registry snapshot.
+    
+    Args:
+        snapshot: Output of MetricsRegistry.snapshot()
+    """
+    conn = connect()
+    _upsert_metrics_snapshot(conn.cursor(), snapshot)
+    conn.commit()
+    conn.close()
+
+
+def _upsert_metrics_snapshot(cursor: sqlite3.Cursor, snapshot: Dict[str, list],
+                             updated_at: Optional[str] = None):
+    cursor.execute("""
+        INSERT OR REPLACE INTO metrics_snapshot (id, updated_at, data)
+        VALUES (1, ?, ?)
+    """, (updated_at or datetime.utcnow().isoformat(), json.dumps(snapshot)))
+
+
+# Record kinds accepted by save_records, and how each is written
+_RECORD_WRITERS = {
+    "portfolio": lambda cursor, record: _insert_portfolio_data(cursor, **record),
+    "cycle_trace": _insert_cycle_trace,
+    "metrics_snapshot": lambda cursor, record: _upsert_metrics_snapshot(cursor, **record),
+}
+RECORD_KINDS = frozenset(_RECORD_WRITERS)
+
+
+def save_records(records: List[Tuple[str, Dict[str, any]]], conn: Optional[sqlite3.Connection] = None):
+    """
+    Write several records in a single transaction.
+    
+    Used by the write-behind writer (database/writer.py) so that a batch of
+    snapshots costs one commit instead of one per record.
+    
+    Args:
+        records: (kind, record) pairs. Kinds: "portfolio" (total, available,
+            timestamp, strategy_id), "cycle_trace" (a trace, see save_cycle_trace) and
+            "metrics_snapshot" (snapshot, updated_at)
+        conn: Open connection to reuse (default: a new one, closed afterwards)
+    
+    Raises:
+        ValueError: If a record kind is unknown; nothing is written
+    """
+    unknown = {kind for kind, _ in records} - _RECORD_WRITERS.keys()
+    if unknown:
+        raise ValueError(f"Unknown record kinds: {', '.join(sorted(unknown))}")
+    
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            for kind, record in records:
+                _RECORD_WRITERS[kind](cursor, record)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def get_metrics_snapshot() -> Optional[Dict[str, list]]:
+    """
+    Retrieve the latest metrics registry snapshot.
+    
+    Returns:
+        Snapshot dictionary, or None if no snapshot has been saved yet
+    """
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT data FROM metrics_snapshot WHERE id = 1")
+    row = cursor.fetchone()
+    conn.close()
+    
+    return json.loads(row[0]) if row else None
+
+
+# Columns sweep results can be ranked by
+SWEEP_ORDER_COLUMNS = {"sharpe", "max_drawdown", "turnover", "total_return", "trades", "funding_paid"}
+
 
+def save_sweep_results(run_id: str, results: List[Dict[str, any]]):
+    """
+    Store the results of a parameter sweep.
+    
+    Args:
+        run_id: Identifier shared by all results of one sweep
+        results: Dictionaries with params plus the metrics of
+            backtest.strategy.run_backtest
+    """
+    conn = connect()
+    cursor = conn.cursor()
+    
+    cursor.executemany("""
+        INSERT INTO sweep_results
+            (run_id, params, sharpe, max_drawdown, turnover, total_return, trades, funding_paid)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (run_id, json.dumps(result["params"], sort_keys=True), result["sharpe"], result["max_drawdown"],
+         result["turnover"], result["total_return"], result["trades"], result["funding_paid"])
+        for result in results
+    ])
+    
+    conn.commit()
+    conn.close()
 
-# Initialize database on module import
-init_database()
 
+def get_sweep_results(run_id: Optional[str] = None, order_by: str = "sharpe",
+                      limit: int = 20) -> List[Dict[str, any]]:
+    """
+    Retrieve the best results of a parameter sweep.
+    
+    Args:
+        run_id: Sweep to read (default: the most recent one)
+        order_by: Metric to rank by, descending (max_drawdown and turnover
+            rank ascending)
+        limit: Maximum number of results to return
+    
+    Returns:
+        List of dictionaries with run_id, params and the stored metrics
+    """
+    if order_by not in SWEEP_ORDER_COLUMNS:
+        raise ValueError(f"Cannot order sweep results by {order_by}")
+    direction = "ASC" if order_by in ("max_drawdown", "turnover") else "DESC"
+    
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    if run_id is None:
+        cursor.execute("SELECT run_id FROM sweep_results ORDER BY id DESC LIMIT 1")
+        row = cursor.fetchone()
+        if row is None:
+            conn.close()
+            return []
+        run_id = row["run_id"]
+    
+    cursor.execute(f"""
+        SELECT run_id, params, sharpe, max_drawdown, turnover, total_return, trades, funding_paid
+        FROM sweep_results
+        WHERE run_id = ?
+        ORDER BY {order_by} {direction}
+        LIMIT ?
+    """, (run_id, limit))
+    
+    rows = cursor.fetchall()
+    conn.close()
+    
+    return [{**dict(row), "params": json.loads(row["params"])} for row in rows]
@@ -0,0 +1,261 @@
+"""Write-behind persistence of portfolio snapshots, cycle traces and metrics.
+
+The trading cycle only enqueues records; a background thread drains the
+bounded queue and writes them in batched transactions, committing when
+PERSIST_BATCH_SIZE records are pending or PERSIST_FLUSH_INTERVAL_SECONDS
+after the first pending one. A commit (and its fsync) is paid once per
+batch instead of once per record, off the decision path, so snapshots can
+be recorded far more often than once per cycle. Queued records are flushed
+on close, which runs at interpreter exit. A batch whose commit fails
+PERSIST_MAX_ATTEMPTS times is dropped, and the next flush or close reports
+the failure.
+
+Metrics: persistence_queue_depth (gauge), persistence_commit_seconds,
+persistence_records_total{kind}, persistence_commits_total{status} and
+persistence_dropped_total{kind}.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.metrics import increment, observe, set_gauge
+
+from . import models
+
+
+logger = get_logger("persistence")
+
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "100"))
+PERSIST_FLUSH_INTERVAL_SECONDS = float(os.getenv("PERSIST_FLUSH_INTERVAL_SECONDS", "1.0"))
+PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", "10000"))
+# Commit attempts of a batch before its records are dropped
+PERSIST_MAX_ATTEMPTS = 3
+
+_FLUSH = object()
+
+
+class _FlushWaiter:
+    """Completion of a flush request, and whether every record before it was committed."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = True
+
+
+class PersistenceWriter:
+    """Bounded queue of database records drained by one writer thread."""
+
+    def __init__(self, batch_size: int = PERSIST_BATCH_SIZE,
+                 flush_interval: float = PERSIST_FLUSH_INTERVAL_SECONDS,
+                 max_queue: int = PERSIST_QUEUE_SIZE):
+        """
+        Args:
+            batch_size: Pending records that trigger a commit
+            flush_interval: Longest time a record waits for its commit (seconds)
+            max_queue: Queued records beyond which new ones are dropped
+        """
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._closed_ok = True
+        self._stats = {"records": 0, "commits": 0, "errors": 0, "dropped": 0, "last_commit_seconds": 0.0}
+
+    # ---------------- Enqueueing ----------------
+
+    def put(self, kind: str, record: Dict[str, Any]) -> bool:
+        """
+        Queue a record without blocking.
+
+        Args:
+            kind: Record kind accepted by database.models.save_records
+            record: Record fields
+
+        Returns:
+            False if the queue was full and the record was dropped
+        """
+        if kind not in models.RECORD_KINDS:
+            raise ValueError(f"Unknown record kind: {kind}")
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((kind, record))
+        except queue.Full:
+            self._stats["dropped"] += 1
+            increment("persistence_dropped_total", kind=kind)
+            logger.warning("Persistence queue full, dropping record", extra={"kind": kind})
+            return False
+        set_gauge("persistence_queue_depth", self._queue.qsize())
+        return True
+
+    def save_portfolio_data(self, total: float, available: float, timestamp: Optional[str] = None,
+                            strategy_id: str = "default") -> bool:
+        """Queue a portfolio snapshot (see database.models.save_portfolio_data)."""
+        return self.put("portfolio", {
+            "total": float(total),
+            "available": float(available),
+            "timestamp": timestamp or datetime.utcnow().isoformat(),
+            "strategy_id": strategy_id,
+        })
+
+    def save_cycle_trace(self, trace: Dict[str, Any]) -> bool:
+        """Queue a cycle trace (see database.models.save_cycle_trace)."""
+        return self.put("cycle_trace", trace)
+
+    def save_metrics_snapshot(self, snapshot: Dict[str, list]) -> bool:
+        """Queue a metrics registry snapshot (see database.models.save_metrics_snapshot)."""
+        return self.put("metrics_snapshot", {"snapshot": snapshot, "updated_at": datetime.utcnow().isoformat()})
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Commit every record queued so far.
+
+        Args:
+            timeout: Longest wait in seconds (default: no limit)
+
+        Returns:
+            True once the records are committed; False on timeout, or if a
+            batch was dropped after failed commits since the previous flush
+        """
+        if self._worker is None:
+            return True
+        waiter = _FlushWaiter()
+        self._queue.put((_FLUSH, waiter))
+        return waiter.done.wait(timeout) and waiter.ok
+
+    def close(self) -> bool:
+        """
+        Commit queued records and stop the writer thread.
+
+        Returns:
+            False if a batch was dropped after failed commits since the
+            previous flush
+        """
+        if self._worker is None:
+            return True
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+        return self._closed_ok
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Records and commits so far, the last commit latency and the queue depth."""
+        return {**self._stats, "queue_depth": self._queue.qsize()}
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    # ---------------- Writer thread ----------------
+
+    def _run(self):
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        attempts = 0
+        deadline = 0.0
+        # Whether a batch was dropped since the last flush
+        dropped = False
+        try:
+            while True:
+                timeout = max(0.0, deadline - time.monotonic()) if pending else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = _FLUSH, None
+
+                if item is not None and item[0] is not _FLUSH:
+                    pending.append(item)
+                    if len(pending) == 1:
+                        deadline = time.monotonic() + self.flush_interval
+                    if len(pending) < self.batch_size:
+                        continue
+
+                while pending:
+                    if self._commit(pending):
+                        pending, attempts = [], 0
+                        break
+                    attempts += 1
+                    if attempts >= PERSIST_MAX_ATTEMPTS:
+                        self._drop(pending)
+                        pending, attempts, dropped = [], 0, True
+                    elif item is not None and (item[0] is not _FLUSH or item[1] is None):
+                        # Retry with the next commit; on flush and close, right away
+                        deadline = time.monotonic() + self.flush_interval
+                        break
+                if item is None:
+                    self._closed_ok = not dropped
+                    return
+                if item[0] is _FLUSH and item[1] is not None:
+                    item[1].ok = not dropped
+                    item[1].done.set()
+                    dropped = False
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _commit(self, records: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        start = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = models.connect()
+                # Readers (API server) do not block the writer and vice versa
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            models.save_records(records, self._conn)
+        except Exception as e:
+            self._stats["errors"] += 1
+            increment("persistence_commits_total", status="error")
+            logger.warning("Failed to commit persistence batch", extra={"records": len(records), "error": str(e)})
+            return False
+        elapsed = time.perf_counter() - start
+        self._stats["records"] += len(records)
+        self._stats["commits"] += 1
+        self._stats["last_commit_seconds"] = elapsed
+        observe("persistence_commit_seconds", elapsed)
+        increment("persistence_commits_total", status="ok")
+        for kind, _ in records:
+            increment("persistence_records_total", kind=kind)
+        set_gauge("persistence_queue_depth", self._queue.qsize())
+        return True
+
+    def _drop(self, records: List[Tuple[str, Dict[str, Any]]]):
+        self._stats["dropped"] += len(records)
+        for kind, _ in records:
+            increment("persistence_dropped_total", kind=kind)
+        logger.error("Dropping persistence batch after failed commits", extra={"records": len(records)})
+
+
+_writer: PersistenceWriter | None = None
+
+
+def get_persistence_writer() -> PersistenceWriter:
+    """Get or create the process-wide write-behind writer (singleton)."""
+    global _writer
+    if _writer is None:
+        _writer = PersistenceWriter()
+    return _writer
+
+
+def close_persistence_writer() -> bool:
+    """
+    Commit queued records and stop the process-wide writer if it was ever started.
+
+    Returns:
+        False if records were dropped after failed commits (see PersistenceWriter.close)
+    """
+    global _writer
+    if _writer is None:
+        return True
+    ok = _writer.close()
+    _writer = None
+    return ok
@@ -1,22 +1,58 @@
 """LLM model initialization and configuration."""
 import os
-from langchain_deepseek import ChatDeepSeek
-from dotenv import load_dotenv
 
-load_dotenv()  # optional, for local .env files
+from utils.env import load_env
+
+
+def get_model(temperature: float = 0, model_name: str | None = None, base_url: str | None = None):
+    """Initialize and return the primary chat model (DeepSeek-R1 by default).
+
+    The model streams its response, so tool calls can be dispatched as soon
+    as their arguments are complete, and each HTTP request is bounded by
+    LLM_REQUEST_TIMEOUT_SECONDS.
 
-def get_model(temperature: float = 0):
-    """Initialize and return the DeepSeek-R1 chat model.
-    
     Note: DeepSeek-R1 may not support temperature parameter,
     but we keep it for compatibility with the interface.
+
+    Args:
+        temperature: Sampling temperature
+        model_name: Model to use (default: LLM_MODEL or "deepseek-reasoner")
+        base_url: OpenAI-compatible endpoint (default: LLM_BASE_URL or the DeepSeek API)
     """
+    load_env()  # optional, for local .env files
     api_key = os.getenv("DEEPSEEK_API_KEY") or os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("Missing DEEPSEEK_API_KEY or OPENAI_API_KEY environment variable.")
-    
+
+    from langchain_deepseek import ChatDeepSeek
+
+    kwargs = {}
+    base_url = base_url or os.getenv("LLM_BASE_URL")
+    if base_url:
+        kwargs["api_base"] = base_url
     return ChatDeepSeek(
-        model="deepseek-reasoner",
-        temperature=temperature
-        # other params...
+        model=model_name or os.getenv("LLM_MODEL", "deepseek-reasoner"),
+        temperature=temperature,
+        api_key=api_key,
+        streaming=True,
+        timeout=float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120")),
+        # Retries are handled by the fallback cascade, within the decision deadline
+        max_retries=0,
+        **kwargs,
     )
+
+
+def get_fallback_model(temperature: float = 0):
+    """Initialize the faster model used when the primary misses its deadline.
+
+    Configured by LLM_FALLBACK_MODEL (default: "deepseek-chat"; set it to an
+    empty string to disable) and LLM_FALLBACK_BASE_URL (default: LLM_BASE_URL).
+
+    Returns:
+        Chat model, or None if no fallback model is configured
+    """
+    load_env()
+    model_name = os.getenv("LLM_FALLBACK_MODEL", "deepseek-chat")
+    if not model_name:
+        return None
+    return get_model(temperature=temperature, model_name=model_name, base_url=os.getenv("LLM_FALLBACK_BASE_URL"))
@@ -1,17 +1,43 @@
 """Main entry point for the trader-ai application."""
 
 import asyncio
+import os
 import time
-from utils.stock_data import get_indicators
+import uuid
+from utils.env import load_env
+
+# Load .env before importing modules that read settings at import time
+load_env()
+
+from utils.stock_data import get_indicators, get_closed_klines, get_klines_cache_state, restore_klines_cache_state
+from utils.scheduler import CandleScheduler
+from utils.metrics import span, start_trace, end_trace, get_metrics_registry, get_current_cycle_id
+from utils.logger import get_logger, setup_logging
+from utils.archive import get_archive, close_archive
+from utils.checkpoint import get_checkpointer
+from utils.profiling import profile_cycle
+from utils.candles import CandleSeries
 from utils.calculations import get_ema, get_atr, get_rsi, get_macd, get_mid_prices, calculate_sharpe_ratio
 from prompts.trading_prompt import stock_market_prompt, trading_decision_prompt
+from account_actions.account import use_account
 from account_actions.get_portfolio import get_portfolio
 from account_actions.get_open_position import get_open_position
-from agent.builder import build_agent
-from database.models import save_portfolio_data, get_portfolio_history
+from account_actions.mark_to_market import get_mark_to_market
+from account_actions.risk import get_risk_engine
+from database.models import init_database, get_portfolio_history
+from database.writer import get_persistence_writer, close_persistence_writer
 from datetime import datetime
-from client.binance_client import get_binance_client
-from binance import Client
+from client.binance_client import get_binance_client, warm_up_connections, get_connection_stats
+from market_data.open_interest import get_open_interest_history
+from market_data.funding import get_funding_history
+from market_data.resampler import get_resampler
+from market_data.scanner import get_universe, scan_universe, select_candidates
+from market_data.fanout import MarketDataFanout
+from agent.gate import get_signal_gate, market_state
+from agent.triggers import get_event_monitor
+from agent.strategies import get_strategies
+
+logger = get_logger("main")
 
 # Track invocation count across all calls
 invocation_count = 0
@@ -19,18 +45,152 @@ invocation_count = 0
 start_time = time.time()
 # Initial account value (from the old prompt, user was given $5000)
 INITIAL_ACCOUNT_VALUE = 5000.0
+# Cycle scheduling: run a few seconds after every 5m candle close
+CYCLE_INTERVAL_SECONDS = int(os.getenv("CYCLE_INTERVAL_SECONDS", "300"))
+CYCLE_OFFSET_SECONDS = float(os.getenv("CYCLE_OFFSET_SECONDS", "2"))
+CYCLE_OVERRUN_POLICY = os.getenv("CYCLE_OVERRUN_POLICY", "skip")
+# Multi-symbol mode (SCAN_SYMBOLS with more than one symbol): agent decisions
+# per cycle for the best-ranked symbols, and how many run at once
+SCAN_TOP_K = int(os.getenv("SCAN_TOP_K", "3"))
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "3"))
+# One decision at a time per symbol (per strategy and symbol with
+# STRATEGIES_FILE), scheduled or event-triggered
+_decision_locks: dict = {}
 
 
-async def invoke_agent():
-    """Main function to invoke the trading agent."""
-    global invocation_count
+def preload_agent_modules():
+    """
+    Import the LangChain agent stack and python-binance.
     
-    # Increment invocation count
-    invocation_count += 1
+    These imports take seconds and are deferred out of module import so that
+    startup stays fast; main() runs this in a worker thread while waiting
+    for the first candle close, so the first cycle does not pay for them.
+    """
+    import agent.decision  # noqa: F401
+    import client.tuned_client  # noqa: F401
+
+
+def get_runtime_state() -> dict:
+    """Cycle counters of this process, for the checkpoint."""
+    return {"invocation_count": invocation_count, "start_time": start_time}
+
+
+def restore_runtime_state(state: dict):
+    """Continue the counters of a checkpoint, so prompts carry on where the previous process stopped."""
+    global invocation_count, start_time
+    invocation_count = state["invocation_count"]
+    start_time = state["start_time"]
+
+
+def restore_in_flight_orders(orders: dict):
+    """Look up, on their own accounts, the orders in flight when the checkpoint was written. Blocking."""
+    from account_actions.orders import recover_orders
+    
+    accounts = {strategy.account.name: strategy.account for strategy in get_strategies() if strategy.account}
+    by_account: dict = {}
+    for client_order_id, order in orders.items():
+        by_account.setdefault(order.get("account"), {})[client_order_id] = order
+    for name, account_orders in by_account.items():
+        if name is not None and name not in accounts:
+            logger.warning("Orders in flight before the restart belong to an unknown account", extra={
+                "account": name, "client_order_ids": list(account_orders),
+            })
+            continue
+        with use_account(accounts.get(name)):
+            recover_orders(account_orders)
+
+
+def setup_checkpoint():
+    """
+    Register the stateful components with the checkpointer and restore the last checkpoint.
+    
+    Blocking: restoring looks up the orders that were in flight. Incremental
+    syncs of restored klines, open interest and funding then only fetch what
+    changed since the checkpoint.
     
-    # Market configuration
-    symbol = "ETHUSDT"
+    Returns:
+        Checkpointer, or None when checkpoints are disabled (CHECKPOINT_PATH="")
+    """
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return None
+    from account_actions.orders import get_in_flight_orders
     
+    checkpointer.register("runtime", get_runtime_state, restore_runtime_state)
+    checkpointer.register("klines_cache", get_klines_cache_state, restore_klines_cache_state)
+    resampler = get_resampler()
+    if resampler is not None:
+        checkpointer.register("resampler", resampler.get_state, resampler.restore_state)
+    open_interest_history, funding_history = get_open_interest_history(), get_funding_history()
+    checkpointer.register("open_interest", open_interest_history.get_state, open_interest_history.restore_state)
+    checkpointer.register("funding", funding_history.get_state, funding_history.restore_state)
+    checkpointer.register("signal_gate", get_signal_gate().get_state, get_signal_gate().restore_state)
+    checkpointer.register("event_monitor", get_event_monitor().get_state, get_event_monitor().restore_state)
+    for account in [None] + [strategy.account for strategy in get_strategies() if strategy.account]:
+        with use_account(account):
+            risk = get_risk_engine()
+        if risk is not None:
+            name = account.name if account is not None else "default"
+            checkpointer.register(f"risk:{name}", risk.get_state, risk.restore_state)
+    checkpointer.register("orders", get_in_flight_orders, restore_in_flight_orders)
+    checkpointer.restore()
+    return checkpointer
+
+
+def format_change(change: float | None) -> str:
+    """Format a fractional change as a signed percentage, or "n/a" when unknown."""
+    return f"{change * 100:+.2f}%" if change is not None else "n/a"
+
+
+def format_rate(rate: float | None) -> str:
+    """Format a funding rate with six decimals, or "n/a" when unknown."""
+    return f"{rate:.6f}" if rate is not None else "n/a"
+
+
+def format_funding_cost(positions: list, funding_history) -> str:
+    """Describe the funding each open position pays (or receives) at the next settlement and over 24h.
+
+    Args:
+        positions: Open positions from get_open_position with a non-zero positionAmt
+        funding_history: FundingHistory holding premium index and settlements for the symbols
+
+    Returns:
+        One entry per position with funding data, or "n/a"
+    """
+    def describe(amount):
+        if amount is None:
+            return "n/a"
+        return f"{'pays' if amount >= 0 else 'receives'} ${abs(amount):.2f}"
+
+    entries = []
+    for pos in positions:
+        symbol = pos.get('symbol', 'N/A')
+        mark_price = float(pos.get('markPrice') or 0) or None
+        cost = funding_history.estimate_cost(symbol, float(pos.get('positionAmt', 0)), mark_price)
+        if cost["next_settlement"] is None and cost["per_period"] is None:
+            continue
+        entries.append(f"{symbol} next settlement {describe(cost['next_settlement'])}, "
+                       f"24h {describe(cost['per_period'])}")
+    return "; ".join(entries) if entries else "n/a"
+
+
+def decision_lock(key: str) -> asyncio.Lock:
+    """Get the lock serializing the decisions of a symbol (or a strategy's decision_key)."""
+    return _decision_locks.setdefault(key, asyncio.Lock())
+
+
+def collect_market_data(symbol: str) -> dict:
+    """Fetch klines, indicators, open interest and funding for one symbol.
+    
+    Blocking; invoke_agent runs it in a worker thread, so the data of several
+    symbols can be collected concurrently.
+    
+    Args:
+        symbol: Market symbol (e.g. "ETHUSDT")
+        
+    Returns:
+        Dictionary of the values the prompt and the signal gate need
+    """
     # Get intraday indicators (5m)
     intraday_indicators = get_indicators("5m", symbol)
     
@@ -41,44 +201,27 @@ async def invoke_agent():
     client = get_binance_client()
     
     # Get raw klines data for additional calculations
-    intraday_klines = client.get_klines(symbol=symbol, interval=Client.KLINE_INTERVAL_5MINUTE, limit=50)
-    longterm_klines = client.get_klines(symbol=symbol, interval=Client.KLINE_INTERVAL_4HOUR, limit=50)
-    
-    # Convert to candlestick format
-    intraday_candlesticks = [
-        {
-            "open": float(candle[1]),
-            "high": float(candle[2]),
-            "low": float(candle[3]),
-            "close": float(candle[4]),
-            "volume": float(candle[5])
-        }
-        for candle in intraday_klines
-    ]
-    
-    longterm_candlesticks = [
-        {
-            "open": float(candle[1]),
-            "high": float(candle[2]),
-            "low": float(candle[3]),
-            "close": float(candle[4]),
-            "volume": float(candle[5])
-        }
-        for candle in longterm_klines
-    ]
-    
-    # Calculate additional intraday indicators
-    intraday_mid_prices = get_mid_prices(intraday_candlesticks)
-    intraday_rsi7 = get_rsi(intraday_mid_prices, period=7)
-    intraday_rsi14 = get_rsi(intraday_mid_prices, period=14)
-    
-    # Calculate additional long-term indicators
-    longterm_mid_prices = get_mid_prices(longterm_candlesticks)
-    longterm_ema50 = get_ema(longterm_mid_prices, 50)
-    longterm_atr3 = get_atr(longterm_candlesticks, period=3)
-    longterm_atr14 = get_atr(longterm_candlesticks, period=14)
-    longterm_rsi14 = get_rsi(longterm_mid_prices, period=14)
-    longterm_macd = get_macd(longterm_mid_prices)
+    with span("stage", stage="klines"):
+        intraday_klines = get_closed_klines(symbol, "5m", 50)
+        longterm_klines = get_closed_klines(symbol, "4h", 50)
+    
+    with span("stage", stage="indicators"):
+        # Convert to candlestick format
+        intraday_candlesticks = CandleSeries.from_klines(intraday_klines)
+        longterm_candlesticks = CandleSeries.from_klines(longterm_klines)
+    
+        # Calculate additional intraday indicators
+        intraday_mid_prices = get_mid_prices(intraday_candlesticks)
+        intraday_rsi7 = get_rsi(intraday_mid_prices, period=7)
+        intraday_rsi14 = get_rsi(intraday_mid_prices, period=14)
+    
+        # Calculate additional long-term indicators
+        longterm_mid_prices = get_mid_prices(longterm_candlesticks)
+        longterm_ema50 = get_ema(longterm_mid_prices, 50)
+        longterm_atr3 = get_atr(longterm_candlesticks, period=3)
+        longterm_atr14 = get_atr(longterm_candlesticks, period=14)
+        longterm_rsi14 = get_rsi(longterm_mid_prices, period=14)
+        longterm_macd = get_macd(longterm_mid_prices)
     
     # Get current values (latest values)
     current_price = intraday_mid_prices[-1] if intraday_mid_prices else 0
@@ -87,78 +230,249 @@ async def invoke_agent():
     current_rsi_seven_period = intraday_rsi7[-1] if intraday_rsi7 else 0
     
     # Get open interest and funding rate
-    try:
-        open_interest_data = client.futures_open_interest(symbol=symbol)
-        open_interest_latest = float(open_interest_data.get('openInterest', 0))
+    with span("stage", stage="open_interest"):
+        try:
+            open_interest_data = client.futures_open_interest(symbol=symbol)
+            open_interest_latest = float(open_interest_data.get('openInterest', 0))
+        except Exception as e:
+            logger.warning("Failed to get open interest", extra={"symbol": symbol, "error": str(e)})
+            open_interest_latest = 0
         
-        # Get historical open interest for average (last 24 hours)
-        # Note: Binance API may have limits, using latest as fallback
-        open_interest_rate_average = open_interest_latest  # Simplified - could be improved
-    except Exception as e:
-        print(f"Warning: Failed to get open interest: {e}")
-        open_interest_latest = 0
-        open_interest_rate_average = 0
+        # Rolling average and change rates from the locally cached history
+        # (only newly closed periods are fetched)
+        oi_history = get_open_interest_history()
+        try:
+            oi_history.sync(symbol)
+        except Exception as e:
+            logger.warning("Failed to sync open interest history", extra={"symbol": symbol, "error": str(e)})
+        oi_summary = oi_history.get_summary(symbol)
+        open_interest_rate_average = oi_summary["average"] if oi_summary["average"] is not None else open_interest_latest
     
-    try:
-        funding_rate_data = client.futures_funding_rate(symbol=symbol, limit=1)
-        funding_rate = float(funding_rate_data[0].get('fundingRate', 0)) if funding_rate_data else 0
-    except Exception as e:
-        print(f"Warning: Failed to get funding rate: {e}")
-        funding_rate = 0
+    with span("stage", stage="funding_rate"):
+        # Settlements and the premium index are cached; REST calls happen
+        # only after a settlement or when the premium index expires
+        funding_history = get_funding_history()
+        try:
+            funding_history.sync(symbol)
+        except Exception as e:
+            logger.warning("Failed to sync funding rate", extra={"symbol": symbol, "error": str(e)})
+        funding_summary = funding_history.get_summary(symbol)
+        funding_rate = funding_summary["last_rate"] if funding_summary["last_rate"] is not None else 0
+    
+    return {
+        "intraday_indicators": intraday_indicators,
+        "longterm_indicators": longterm_indicators,
+        "intraday_closes": intraday_candlesticks.close,
+        "intraday_rsi7": intraday_rsi7,
+        "intraday_rsi14": intraday_rsi14,
+        "longterm_ema50": longterm_ema50,
+        "longterm_atr3": longterm_atr3,
+        "longterm_atr14": longterm_atr14,
+        "longterm_rsi14": longterm_rsi14,
+        "longterm_macd": longterm_macd,
+        "current_price": current_price,
+        "current_ema20": current_ema20,
+        "current_macd": current_macd,
+        "current_rsi_seven_period": current_rsi_seven_period,
+        "open_interest_latest": open_interest_latest,
+        "open_interest_rate_average": open_interest_rate_average,
+        "oi_summary": oi_summary,
+        "funding_rate": funding_rate,
+        "funding_summary": funding_summary,
+        "funding_history": funding_history,
+    }
+
+
+def collect_account_data(strategy=None) -> dict:
+    """Fetch the account view shared by every decision of a cycle.
+    
+    Reads the portfolio (and queues a snapshot of it), the open positions of
+    all symbols and the performance statistics. Portfolio and positions
+    come from the local mark-to-market engine when it is enabled, which
+    only reads the exchange to reconcile. Blocking.
+    
+    Args:
+        strategy: agent.strategies.Strategy the view is for; tags the
+            snapshot and selects its history (default: the default strategy).
+            Its account must be the current one (account_actions.account.use_account)
+    
+    Returns:
+        Dictionary with portfolio, positions (non-zero only),
+        current_account_position, total_return_percentage and sharpe_ratio
+    """
+    strategy_id = strategy.id if strategy is not None else "default"
+    initial_value = strategy.initial_value if strategy is not None else INITIAL_ACCOUNT_VALUE
+    # Account and positions valued locally between exchange reconciliations
+    mark_to_market = get_mark_to_market()
+    account_view = None
     
     # Get portfolio information
-    portfolio = get_portfolio()
+    with span("stage", stage="portfolio"):
+        if mark_to_market is not None:
+            try:
+                account_view = mark_to_market.account_view()
+            except Exception as e:
+                logger.warning("Local account view failed, reading the exchange", extra={"error": str(e)})
+        if account_view is not None:
+            portfolio = {
+                'total': str(round(account_view['wallet_balance'], 8)),
+                'available': str(round(account_view['available'], 8)),
+            }
+        else:
+            portfolio = get_portfolio()
     
-    # Save portfolio data to database
-    try:
-        save_portfolio_data(
+    # Queue the portfolio snapshot; the write-behind writer commits it off the hot path
+    snapshot_timestamp = datetime.utcnow().isoformat()
+    with span("stage", stage="db_write"):
+        get_persistence_writer().save_portfolio_data(
             total=float(portfolio['total']),
             available=float(portfolio['available']),
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=snapshot_timestamp,
+            strategy_id=strategy_id
         )
-        print(f"Portfolio data saved to database: Total=${portfolio['total']}, Available=${portfolio['available']}")
-    except Exception as e:
-        print(f"Warning: Failed to save portfolio data to database: {e}")
     
     # Get open positions
-    try:
-        open_positions_list = get_open_position()
-        print(open_positions_list)
-        if not open_positions_list:
-            current_account_position = "No open positions"
-        else:
-            # Filter positions with non-zero amounts and format them
-            filtered_positions = [
-                pos for pos in open_positions_list 
-                if float(pos.get('positionAmt', 0)) != 0
-            ]
-            if filtered_positions:
-                current_account_position = ", ".join([
-                    f"{pos.get('symbol', 'N/A')} {pos.get('positionAmt', 'N/A')} {pos.get('positionSide', 'N/A')}" 
-                    for pos in filtered_positions
-                ])
-            else:
+    filtered_positions = []
+    with span("stage", stage="positions"):
+        try:
+            open_positions_list = account_view["positions"] if account_view is not None else get_open_position()
+            if not open_positions_list:
                 current_account_position = "No open positions"
-    except Exception as e:
-        print(f"Warning: Failed to get open positions: {e}")
-        current_account_position = "No open positions"
-        open_positions_list = []
+            else:
+                # Filter positions with non-zero amounts and format them
+                filtered_positions = [
+                    pos for pos in open_positions_list 
+                    if float(pos.get('positionAmt', 0)) != 0
+                ]
+                if filtered_positions:
+                    current_account_position = ", ".join([
+                        f"{pos.get('symbol', 'N/A')} {pos.get('positionAmt', 'N/A')} {pos.get('positionSide', 'N/A')}" 
+                        for pos in filtered_positions
+                    ])
+                else:
+                    current_account_position = "No open positions"
+        except Exception as e:
+            logger.warning("Failed to get open positions", extra={"error": str(e)})
+            current_account_position = "No open positions"
+            open_positions_list = []
     
     # Calculate total return percentage
     current_account_value = float(portfolio['total'])
-    total_return_percentage = ((current_account_value - INITIAL_ACCOUNT_VALUE) / INITIAL_ACCOUNT_VALUE) * 100
+    total_return_percentage = ((current_account_value - initial_value) / initial_value) * 100
     
     # Calculate Sharpe Ratio from portfolio history
-    try:
-        portfolio_history = get_portfolio_history()
-        if len(portfolio_history) >= 2:
+    with span("stage", stage="performance"):
+        try:
+            portfolio_history = get_portfolio_history(strategy_id=strategy_id)
             portfolio_values = [entry['total'] for entry in portfolio_history]
-            sharpe_ratio = calculate_sharpe_ratio(portfolio_values)
-        else:
+            # The snapshot above may not be committed yet
+            if not portfolio_history or portfolio_history[-1]['timestamp'] < snapshot_timestamp:
+                portfolio_values.append(float(portfolio['total']))
+            if len(portfolio_values) >= 2:
+                sharpe_ratio = calculate_sharpe_ratio(portfolio_values)
+            else:
+                sharpe_ratio = 0.0
+        except Exception as e:
+            logger.warning("Failed to calculate Sharpe ratio", extra={"error": str(e)})
             sharpe_ratio = 0.0
-    except Exception as e:
-        print(f"Warning: Failed to calculate Sharpe ratio: {e}")
-        sharpe_ratio = 0.0
+    
+    return {
+        "portfolio": portfolio,
+        "positions": filtered_positions,
+        "current_account_position": current_account_position,
+        "total_return_percentage": total_return_percentage,
+        "sharpe_ratio": sharpe_ratio,
+    }
+
+
+async def invoke_agent(symbol: str = "ETHUSDT", model=None, fallback_model=None, account: dict | None = None,
+                       cash_share: float = 1.0, decision_id: str | None = None,
+                       trigger_reasons: list | None = None, market: dict | None = None, strategy=None):
+    """Main function to invoke the trading agent.
+    
+    Args:
+        symbol: Market to trade (default: "ETHUSDT")
+        model: Optional chat model overriding the default from llm.get_model
+        fallback_model: Optional chat model used when the primary misses its
+            deadline (default: llm.get_fallback_model, unless model is given)
+        account: Account view from collect_account_data shared by the
+            decisions of a cycle (default: fetched for this decision)
+        cash_share: Fraction of the available cash this decision may commit
+            (concurrent decisions split the margin)
+        decision_id: Archive key of the decision (default: the cycle id)
+        trigger_reasons: Event trigger conditions that fired (agent.triggers);
+            the model then runs whatever the signal gate says
+        market: Market data from collect_market_data, e.g. shared with other
+            strategies through a MarketDataFanout (default: collected here)
+        strategy: agent.strategies.Strategy deciding, with its prompt, models
+            and account (default: the default strategy); its account must be
+            the current one (account_actions.account.use_account)
+    """
+    # Blocking exchange and database reads run in worker threads so that
+    # concurrent decisions (run_universe) do not stall each other
+    if market is None:
+        market = await asyncio.to_thread(collect_market_data, symbol)
+    if account is None:
+        account = await asyncio.to_thread(collect_account_data, strategy)
+    
+    intraday_indicators = market["intraday_indicators"]
+    longterm_indicators = market["longterm_indicators"]
+    intraday_rsi7, intraday_rsi14 = market["intraday_rsi7"], market["intraday_rsi14"]
+    longterm_ema50, longterm_macd, longterm_rsi14 = market["longterm_ema50"], market["longterm_macd"], market["longterm_rsi14"]
+    longterm_atr3, longterm_atr14 = market["longterm_atr3"], market["longterm_atr14"]
+    current_price, current_ema20 = market["current_price"], market["current_ema20"]
+    current_macd, current_rsi_seven_period = market["current_macd"], market["current_rsi_seven_period"]
+    open_interest_latest, open_interest_rate_average = market["open_interest_latest"], market["open_interest_rate_average"]
+    oi_summary, funding_rate, funding_summary = market["oi_summary"], market["funding_rate"], market["funding_summary"]
+    funding_history = market["funding_history"]
+    
+    portfolio = account["portfolio"]
+    filtered_positions = account["positions"]
+    symbol_positions = [pos for pos in filtered_positions if pos.get("symbol") == symbol]
+    current_account_value = float(portfolio['total'])
+    available_cash = f"${portfolio['available']}"
+    if cash_share < 1.0:
+        available_cash = f"${float(portfolio['available']) * cash_share:.2f} (this market's share of ${portfolio['available']})"
+    
+    risk = get_risk_engine()
+    if risk is not None:
+        risk.update_market(symbol, current_price, intraday_indicators["atr"][-1] if intraday_indicators["atr"] else None)
+    
+    # Skip the model when nothing material changed since its last decision
+    with span("stage", stage="signal_gate"):
+        state = market_state(
+            price=current_price,
+            atr=intraday_indicators["atr"][-1] if intraday_indicators["atr"] else None,
+            crossings={
+                "price_vs_ema20_5m": (current_price, current_ema20),
+                "macd_5m": (current_macd, 0.0),
+                "ema20_vs_ema50_4h": (longterm_indicators["ema20s"][-1] if longterm_indicators["ema20s"] else 0.0,
+                                      longterm_ema50[-1] if longterm_ema50 else 0.0),
+                "macd_4h": (longterm_macd[-1] if longterm_macd else 0.0, 0.0),
+            },
+            oscillators={
+                "rsi7_5m": current_rsi_seven_period,
+                "rsi14_5m": intraday_rsi14[-1] if intraday_rsi14 else 50.0,
+                "rsi14_4h": longterm_rsi14[-1] if longterm_rsi14 else 50.0,
+            },
+            positions=symbol_positions,
+            account_value=current_account_value,
+        )
+        gate_key = strategy.decision_key(symbol) if strategy is not None else symbol
+        gate_reasons = get_signal_gate().check(gate_key, state, force_reasons=trigger_reasons)
+    # Baseline of the event triggers: reset when the model decides
+    get_event_monitor().observe(
+        symbol,
+        atr=intraday_indicators["atr"][-1] if intraday_indicators["atr"] else None,
+        closes=market["intraday_closes"],
+        reference_price=current_price if gate_reasons else None,
+    )
+    if not gate_reasons:
+        return {"messages": [], "skipped": True}
+    
+    # Count only the decisions the model actually makes
+    global invocation_count
+    invocation_count += 1
     
     # Calculate elapsed time in minutes
     global start_time
@@ -170,97 +484,363 @@ async def invoke_agent():
     current_time = now.strftime('%H:%M:%S')
     
     # Prepare enriched prompt using stock_market_prompt
-    enriched_prompt = stock_market_prompt.substitute(
-        time_minutes=str(elapsed_minutes),
-        date=current_date,
-        time=current_time,
-        invocation_times=str(invocation_count),
-        current_price=f"{current_price:.3f}",
-        current_ema20=f"{current_ema20:.3f}",
-        current_macd=f"{current_macd:.3f}",
-        current_rsi_seven_period=f"{current_rsi_seven_period:.2f}",
-        open_interest_rate_latest=f"{open_interest_latest:.2f}",
-        open_interest_rate_average=f"{open_interest_rate_average:.2f}",
-        funding_rate=f"{funding_rate:.6f}",
-        intraday_midprices=",".join(str(x) for x in intraday_indicators["midPrices"][-10:]),
-        intraday_ema20s=",".join(str(x) for x in intraday_indicators["ema20s"][-10:]),
-        intraday_macd=",".join(str(x) for x in intraday_indicators["macd"][-10:]),
-        intraday_rsi7s=",".join(str(x) for x in intraday_rsi7[-10:]),
-        intraday_rsi14s=",".join(str(x) for x in intraday_rsi14[-10:]),
-        longterm_ema20=f"{longterm_indicators['ema20s'][-1]:.3f}" if longterm_indicators["ema20s"] else "0",
-        longterm_ema50=f"{longterm_ema50[-1]:.3f}" if longterm_ema50 else "0",
-        longterm_atr3=f"{longterm_atr3[-1]:.3f}" if longterm_atr3 else "0",
-        longterm_atr14=f"{longterm_atr14[-1]:.3f}" if longterm_atr14 else "0",
-        longterm_current_vol=f"{longterm_indicators['current_volume']:.3f}",
-        longterm_average_vol=f"{longterm_indicators['average_volume']:.3f}",
-        longterm_macd=",".join(str(x) for x in longterm_macd[-10:]),
-        longterm_rsi14s=",".join(str(x) for x in longterm_rsi14[-10:]),
-        total_return_percentage=f"{total_return_percentage:.2f}",
-        sharpe_ratio=f"{sharpe_ratio:.3f}",
-        available_cash=f"${portfolio['available']}",
-        current_account_value=f"${portfolio['total']}",
-        current_account_position=current_account_position
-    )
+    prompt = strategy.prompt if strategy is not None and strategy.prompt is not None else stock_market_prompt
+    with span("stage", stage="prompt_build"):
+        enriched_prompt = prompt.substitute(
+            time_minutes=str(elapsed_minutes),
+            date=current_date,
+            time=current_time,
+            coin=symbol[:-4] if symbol.endswith("USDT") else symbol,
+            invocation_times=str(invocation_count),
+            current_price=f"{current_price:.7g}",
+            current_ema20=f"{current_ema20:.7g}",
+            current_macd=f"{current_macd:.7g}",
+            current_rsi_seven_period=f"{current_rsi_seven_period:.2f}",
+            open_interest_rate_latest=f"{open_interest_latest:.2f}",
+            open_interest_rate_average=f"{open_interest_rate_average:.2f}",
+            open_interest_change_1h=format_change(oi_summary["change_1h"]),
+            open_interest_change_24h=format_change(oi_summary["change_24h"]),
+            funding_rate=f"{funding_rate:.6f}",
+            funding_rate_predicted=format_rate(funding_summary["predicted_rate"]),
+            funding_hours_to_next=f"{funding_summary['hours_to_next']:.1f}h" if funding_summary["hours_to_next"] is not None else "n/a",
+            funding_rate_average=format_rate(funding_summary["average_24h"]),
+            funding_rate_annualized=format_change(funding_summary["annualized_7d"]),
+            intraday_midprices=",".join(str(x) for x in intraday_indicators["midPrices"][-10:]),
+            intraday_ema20s=",".join(str(x) for x in intraday_indicators["ema20s"][-10:]),
+            intraday_macd=",".join(str(x) for x in intraday_indicators["macd"][-10:]),
+            intraday_rsi7s=",".join(str(x) for x in intraday_rsi7[-10:]),
+            intraday_rsi14s=",".join(str(x) for x in intraday_rsi14[-10:]),
+            longterm_ema20=f"{longterm_indicators['ema20s'][-1]:.7g}" if longterm_indicators["ema20s"] else "0",
+            longterm_ema50=f"{longterm_ema50[-1]:.7g}" if longterm_ema50 else "0",
+            longterm_atr3=f"{longterm_atr3[-1]:.7g}" if longterm_atr3 else "0",
+            longterm_atr14=f"{longterm_atr14[-1]:.7g}" if longterm_atr14 else "0",
+            longterm_current_vol=f"{longterm_indicators['current_volume']:.3f}",
+            longterm_average_vol=f"{longterm_indicators['average_volume']:.3f}",
+            longterm_macd=",".join(str(x) for x in longterm_macd[-10:]),
+            longterm_rsi14s=",".join(str(x) for x in longterm_rsi14[-10:]),
+            total_return_percentage=f"{account['total_return_percentage']:.2f}",
+            sharpe_ratio=f"{account['sharpe_ratio']:.3f}",
+            available_cash=available_cash,
+            current_account_value=f"${portfolio['total']}",
+            current_account_position=account["current_account_position"],
+            funding_position_cost=format_funding_cost(filtered_positions, funding_history)
+        )
+    
+    # Full prompt goes to the archive; only a summary is logged on the hot path
+    cycle_id = get_current_cycle_id() or uuid.uuid4().hex[:12]
+    decision_id = decision_id or cycle_id
+    strategy_id = strategy.id if strategy is not None else "default"
+    logger.info("Invoking agent", extra={
+        "cycle_id": cycle_id,
+        "strategy_id": strategy_id,
+        "symbol": symbol,
+        "price": current_price,
+        "open_positions": len(filtered_positions),
+        "prompt_chars": len(enriched_prompt),
+        "gate_reasons": gate_reasons,
+    })
+    
+    from agent.decision import run_decision
+    from agent.rules import rule_decision
+    from llm.model import get_model, get_fallback_model
+    
+    if model is None and strategy is not None:
+        model = strategy.get_model()
+        if model is not None and fallback_model is None:
+            fallback_model = strategy.get_fallback_model()
+    
+    # Primary model, then the faster fallback, then the deterministic rules
+    models = [("primary", model if model is not None else get_model(temperature=0))]
+    fallback_model = fallback_model if fallback_model is not None else (get_fallback_model() if model is None else None)
+    if fallback_model is not None:
+        models.append(("fallback", fallback_model))
+    
+    def rules():
+        return rule_decision(
+            symbol_positions,
+            longterm_indicators["ema20s"][-1] if longterm_indicators["ema20s"] else None,
+            longterm_ema50[-1] if longterm_ema50 else None,
+            longterm_macd[-1] if longterm_macd else None,
+        )
+    
+    with span("stage", stage="agent"):
+        # Invoke agent with a ReAct-style prompt to trigger trading decision
+        user_message = trading_decision_prompt.substitute()
+        if trigger_reasons:
+            user_message += ("\nEVENT: This decision was triggered between scheduled cycles: "
+                             + "; ".join(trigger_reasons) + ".")
+        suggested_quantity = risk.position_size(symbol) if risk is not None else None
+        if suggested_quantity:
+            user_message += (f"\nRISK: A volatility-scaled size for {symbol} is {suggested_quantity:.4f} "
+                             f"({risk.risk_per_trade:.1%} of equity at a {risk.atr_stop:g} ATR stop). "
+                             f"Orders beyond the risk limits are rejected.")
+        decision = await run_decision(enriched_prompt, user_message, models, rules=rules, decision_id=decision_id)
     
-    print("=" * 80)
-    print("ENRICHED PROMPT FOR AGENT:")
-    print("=" * 80)
-    print(enriched_prompt)
-    print("=" * 80)
-    print("\nInvoking agent with streaming...\n")
-    
-    # Build and invoke agent
-    agent = build_agent(temperature=0, system_prompt=enriched_prompt)
-    
-    # Invoke agent with a ReAct-style prompt to trigger trading decision
-    user_message = trading_decision_prompt.substitute()
-    
-    print("=" * 80)
-    print("AGENT RESPONSE (STREAMING):")
-    print("=" * 80)
-    
-    # Use astream for streaming responses
-    full_response_content = []
-    async for chunk in agent.astream({
-        "messages": [("user", user_message)]
-    }):
-        # Process each chunk - chunks can be node outputs or streaming tokens
-        for node_name, node_output in chunk.items():
-            if isinstance(node_output, dict) and "messages" in node_output:
-                for msg in node_output["messages"]:
-                    if hasattr(msg, 'content') and msg.content:
-                        print(msg.content, end="", flush=True)
-                        full_response_content.append(msg.content)
-            elif isinstance(node_output, str):
-                # Direct string content
-                print(node_output, end="", flush=True)
-                full_response_content.append(node_output)
-    
-    print("\n" + "=" * 80)
-    
-    return {"messages": [{"content": "".join(full_response_content)}]}
+    response = decision["response"]
+    get_archive().put(decision_id, {
+        "cycle_id": cycle_id,
+        "strategy_id": strategy_id,
+        "symbol": symbol,
+        "timestamp": datetime.utcnow().isoformat(),
+        "system_prompt": enriched_prompt,
+        "user_message": user_message,
+        "open_positions": filtered_positions,
+        "messages": decision["messages"],
+        "response": response,
+        "gate_reasons": gate_reasons,
+        "trigger_reasons": trigger_reasons,
+        "decision_source": decision["source"],
+        "decision_status": decision["status"],
+        "tool_results": decision["tool_results"],
+    }, cycle_id=cycle_id, symbol=symbol, strategy_id=strategy_id)
+    logger.info("Agent decision", extra={
+        "cycle_id": cycle_id,
+        "strategy_id": strategy_id,
+        "symbol": symbol,
+        "source": decision["source"],
+        "status": decision["status"],
+        "elapsed": round(decision["elapsed"], 2),
+        "tool_calls": decision["tool_calls"],
+        "response_chars": len(response),
+        "response_preview": response[-200:],
+    })
+    
+    return {"messages": [{"content": response}]}
 
 
-async def main():
-    """Run the trading agent in a loop every 5 minutes."""
-    print("Starting trader-ai agent...")
-    print("Will run every 5 minutes.")
-    print("Press Ctrl+C to stop.\n")
+async def run_universe(symbols: list, top_k: int = SCAN_TOP_K, concurrency: int = SCAN_CONCURRENCY,
+                       models: dict | None = None, strategy=None, fanout: MarketDataFanout | None = None,
+                       ranked: list | None = None) -> dict:
+    """Scan a universe and run agent decisions for its best candidates.
+    
+    Every symbol is ranked from its 5m candles (market_data.scanner); the top
+    K, plus every symbol with an open position, get a full agent decision.
+    Decisions run concurrently, at most `concurrency` at a time, and share
+    one account view; the available cash is split between them.
+    
+    Args:
+        symbols: Universe to scan
+        top_k: Number of best-ranked symbols to decide on
+        concurrency: Maximum concurrent decisions
+        models: Optional chat model per symbol (default: llm.get_model)
+        strategy: agent.strategies.Strategy deciding (default: the default strategy)
+        fanout: Market data shared with other strategies (default: collected per decision)
+        ranked: scan_universe output covering the symbols, e.g. from a scan
+            shared with other strategies (default: scanned here)
+        
+    Returns:
+        Dictionary mapping each decided symbol to its invoke_agent result
+        (None if the decision failed)
+    """
+    account = await asyncio.to_thread(collect_account_data, strategy)
+    if ranked is None:
+        with span("stage", stage="scan"):
+            ranked = await asyncio.to_thread(scan_universe, symbols)
+    else:
+        universe = set(symbols)
+        ranked = [r for r in ranked if r["symbol"] in universe]
+    candidates = select_candidates(ranked, top_k, held=[pos["symbol"] for pos in account["positions"]])
+    logger.info("Universe scanned", extra={
+        "strategy_id": strategy.id if strategy is not None else "default",
+        "symbols": len(symbols),
+        "ranked": len(ranked),
+        "candidates": candidates,
+        "top_scores": {r["symbol"]: round(r["score"], 2) for r in ranked[:top_k]},
+    })
+    
+    cycle_id = get_current_cycle_id() or uuid.uuid4().hex[:12]
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    cash_share = 1.0 / max(len(candidates), 1)
+    
+    prefix = f"{cycle_id}-{strategy.id}" if strategy is not None else cycle_id
+    
+    async def decide(symbol: str):
+        key = strategy.decision_key(symbol) if strategy is not None else symbol
+        async with semaphore, decision_lock(key):
+            try:
+                market = await fanout.get(symbol) if fanout is not None else None
+                return await invoke_agent(symbol, model=(models or {}).get(symbol), account=account,
+                                          cash_share=cash_share, decision_id=f"{prefix}-{symbol}",
+                                          market=market, strategy=strategy)
+            except Exception as e:
+                logger.error("Agent decision failed", extra={"symbol": symbol, "error": str(e)})
+                return None
     
-    while True:
+    results = await asyncio.gather(*(decide(symbol) for symbol in candidates))
+    return dict(zip(candidates, results))
+
+
+async def run_strategy(strategy, fanout: MarketDataFanout, ranked: list | None = None):
+    """Run one strategy's decisions of a cycle on its own account.
+    
+    Args:
+        strategy: agent.strategies.Strategy to run
+        fanout: Market data shared by the strategies of the cycle
+        ranked: Shared scan_universe output covering the strategy's symbols
+    """
+    with use_account(strategy.account):
+        if len(strategy.symbols) > 1:
+            await run_universe(strategy.symbols, top_k=strategy.top_k, strategy=strategy,
+                               fanout=fanout, ranked=ranked)
+            return
+        symbol = strategy.symbols[0]
+        async with decision_lock(strategy.decision_key(symbol)):
+            cycle_id = get_current_cycle_id() or uuid.uuid4().hex[:12]
+            await invoke_agent(symbol, market=await fanout.get(symbol), strategy=strategy,
+                               decision_id=f"{cycle_id}-{strategy.id}")
+
+
+async def run_strategies(strategies: list):
+    """Run every hosted strategy on one shared market data fan-out.
+    
+    The symbols of all multi-symbol strategies are scanned once, and each
+    symbol's market data is collected once however many strategies decide
+    on it. Strategies run concurrently; a failing one does not stop the others.
+    
+    Args:
+        strategies: agent.strategies.Strategy instances to run
+    """
+    fanout = MarketDataFanout(collect_market_data)
+    ranked = None
+    scanned = list(dict.fromkeys(s for strategy in strategies if len(strategy.symbols) > 1 for s in strategy.symbols))
+    if scanned:
+        with span("stage", stage="scan"):
+            ranked = await asyncio.to_thread(scan_universe, scanned)
+    
+    results = await asyncio.gather(*(run_strategy(strategy, fanout, ranked) for strategy in strategies),
+                                   return_exceptions=True)
+    for strategy, result in zip(strategies, results):
+        if isinstance(result, Exception):
+            logger.error("Strategy failed", extra={"strategy_id": strategy.id, "error": str(result)})
+    logger.info("Strategies finished", extra={
+        "strategies": len(strategies),
+        "symbols_collected": len(fanout.symbols),
+    })
+
+
+async def run_cycle(candle_close: float):
+    """Run one scheduled trading cycle for the candle that closed at candle_close."""
+    logger.info("Running agent invocation", extra={
+        "candle_close": datetime.fromtimestamp(candle_close).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    # Re-establish keep-alive connections that went cold during the sleep
+    try:
+        warm_up_connections()
+    except Exception as e:
+        logger.warning("Connection warmup failed", extra={"error": str(e)})
+    
+    trace = start_trace(f"{int(candle_close)}-{invocation_count + 1}")
+    try:
+        with span("cycle"), profile_cycle(trace["cycle_id"]):
+            strategies = get_strategies()
+            symbols = get_universe()
+            if strategies:
+                await run_strategies(strategies)
+            elif len(symbols) > 1:
+                await run_universe(symbols)
+            else:
+                async with decision_lock(symbols[0]):
+                    await invoke_agent(symbols[0])
+    finally:
+        trace = end_trace()
+        save_trace(trace)
+    logger.info("Cycle finished", extra={"cycle_id": trace["cycle_id"], "duration": trace["duration"],
+                                         "connections": get_connection_stats()})
+    checkpointer = get_checkpointer()
+    if checkpointer is not None:
+        await asyncio.to_thread(checkpointer.save)
+
+
+async def run_triggered_decision(symbol: str, reasons: list):
+    """Run an out-of-band decision for a symbol whose event trigger fired.
+    
+    With STRATEGIES_FILE, every strategy trading the symbol decides. A
+    decision is skipped if one on the symbol (for that strategy) is already
+    running: it sees the same market.
+    
+    Args:
+        symbol: Symbol whose conditions fired
+        reasons: Descriptions of the fired conditions
+    """
+    strategies = get_strategies()
+    if not strategies:
+        await _run_triggered_decision(symbol, reasons)
+        return
+    await asyncio.gather(*(_run_triggered_decision(symbol, reasons, strategy)
+                           for strategy in strategies if symbol in strategy.symbols))
+
+
+async def _run_triggered_decision(symbol: str, reasons: list, strategy=None):
+    strategy_id = strategy.id if strategy is not None else "default"
+    lock = decision_lock(strategy.decision_key(symbol) if strategy is not None else symbol)
+    if lock.locked():
+        logger.info("Decision already running, ignoring event trigger", extra={
+            "strategy_id": strategy_id, "symbol": symbol, "reasons": reasons,
+        })
+        return
+    async with lock:
+        suffix = f"{strategy.id}-{symbol}" if strategy is not None else symbol
+        account = strategy.account if strategy is not None else None
+        trace = start_trace(f"event-{int(time.time())}-{suffix}")
         try:
-            print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Running agent invocation...")
-            await invoke_agent()
-            print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Waiting 5 minutes until next invocation...\n")
-            await asyncio.sleep(60 * 5)  # Wait 5 minutes
-        except KeyboardInterrupt:
-            print("\n\nAgent stopped by user.")
-            break
+            with span("cycle", trigger="event"), profile_cycle(trace["cycle_id"]), use_account(account):
+                await invoke_agent(symbol, trigger_reasons=reasons, strategy=strategy)
         except Exception as e:
-            print(f"\nError during agent invocation: {e}")
-            print("Waiting 5 minutes before retry...\n")
-            await asyncio.sleep(60 * 5)
+            logger.error("Event-triggered decision failed", extra={
+                "strategy_id": strategy_id, "symbol": symbol, "error": str(e),
+            })
+        finally:
+            trace = end_trace()
+            save_trace(trace)
+    logger.info("Event-triggered decision finished", extra={
+        "cycle_id": trace["cycle_id"], "strategy_id": strategy_id, "symbol": symbol, "duration": trace["duration"],
+    })
+
+
+def save_trace(trace: dict):
+    """Queue a cycle trace and the current metrics for the API server."""
+    writer = get_persistence_writer()
+    writer.save_cycle_trace(trace)
+    writer.save_metrics_snapshot(get_metrics_registry().snapshot())
+
+
+async def main():
+    """Run the trading agent shortly after every 5-minute candle close."""
+    scheduler = CandleScheduler(
+        interval_seconds=CYCLE_INTERVAL_SECONDS,
+        offset_seconds=CYCLE_OFFSET_SECONDS,
+        overrun_policy=CYCLE_OVERRUN_POLICY,
+    )
+    
+    logger.info("Starting trader-ai agent", extra={
+        "interval_seconds": CYCLE_INTERVAL_SECONDS,
+        "offset_seconds": CYCLE_OFFSET_SECONDS,
+        "overrun_policy": CYCLE_OVERRUN_POLICY,
+    })
+    
+    init_database()
+    asyncio.get_running_loop().run_in_executor(None, preload_agent_modules)
+    # Warm restart: counters, caches and baselines of the last checkpoint
+    checkpointer = await asyncio.to_thread(setup_checkpoint)
+    # Out-of-band decisions on sharp moves between scheduled cycles
+    monitor = asyncio.create_task(get_event_monitor().run(run_triggered_decision))
+    
+    try:
+        await scheduler.run(run_cycle)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info("Agent stopped by user")
+    finally:
+        monitor.cancel()
+        if checkpointer is not None:
+            checkpointer.save()
+        logger.info("Scheduler stats", extra=scheduler.get_stats())
+        close_persistence_writer()
+        close_archive()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
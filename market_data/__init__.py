@@ -0,0 +1 @@
+"""Market-data collection shared between agent processes."""
@@ -0,0 +1,232 @@
+"""Market-data collector process.
+
+Owns the Binance connection for market data: after every candle close it
+fetches only the candles that closed since the last sync, computes the
+latest indicator values and publishes both into a SharedMarketFeed. Agent
+processes started with the same MARKET_DATA_SHM name read candles from the
+feed instead of fetching them, so adding agents does not add exchange load
+and data keeps flowing while an agent waits on a slow model call.
+
+Usage:
+    MARKET_DATA_SHM=trader-md python -m market_data.collector --symbols ETHUSDT,BTCUSDT
+    MARKET_DATA_SHM=trader-md python main.py
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+from market_data.shared_feed import (
+    INTERVAL_SECONDS,
+    SharedMarketFeed,
+    stream_name,
+)
+from utils.candles import CandleSeries
+from utils.calculations import get_atr, get_ema, get_macd, get_mid_prices, get_rsi, get_volume_statistics
+from utils.logger import get_logger
+from utils.metrics import increment, span
+
+
+logger = get_logger("collector")
+
+COLLECTOR_SYMBOLS = os.getenv("COLLECTOR_SYMBOLS", "ETHUSDT")
+COLLECTOR_INTERVALS = os.getenv("COLLECTOR_INTERVALS", "5m,4h")
+COLLECTOR_CAPACITY = int(os.getenv("COLLECTOR_CAPACITY", "500"))
+# Publish before agents wake up (CYCLE_OFFSET_SECONDS defaults to 2)
+COLLECTOR_OFFSET_SECONDS = float(os.getenv("COLLECTOR_OFFSET_SECONDS", "0.5"))
+# Binance caps a single klines request at 1000 rows
+MAX_KLINES_PER_REQUEST = 1000
+
+
+def compute_values(rows: Sequence[Sequence]) -> Dict[str, float]:
+    """
+    Compute the latest indicator values published with each stream.
+
+    Args:
+        rows: Closed kline rows, oldest first
+
+    Returns:
+        Dictionary keyed by shared_feed.VALUE_FIELDS; indicators without
+        enough history are left out (published as NaN)
+    """
+    candlesticks = CandleSeries.from_klines(rows)
+    if not candlesticks:
+        return {}
+
+    mid_prices = get_mid_prices(candlesticks)
+    values = {"mid_price": mid_prices[-1]}
+    for key, compute in (
+        ("ema20", lambda: get_ema(mid_prices, 20)),
+        ("ema50", lambda: get_ema(mid_prices, 50)),
+        ("macd", lambda: get_macd(mid_prices)),
+        ("rsi7", lambda: get_rsi(mid_prices, period=7)),
+        ("rsi14", lambda: get_rsi(mid_prices, period=14)),
+        ("atr3", lambda: get_atr(candlesticks, period=3)),
+        ("atr14", lambda: get_atr(candlesticks, period=14)),
+    ):
+        try:
+            series = compute()
+        except ValueError:
+            continue
+        if series:
+            values[key] = series[-1]
+    values.update(get_volume_statistics(candlesticks, period=20))
+    return values
+
+
+class MarketDataCollector:
+    """Incrementally syncs closed klines for a set of streams into a shared feed."""
+
+    def __init__(self, feed: SharedMarketFeed, symbols: Sequence[str], intervals: Sequence[str], client=None):
+        """
+        Args:
+            feed: Feed created by this process
+            symbols: Symbols to collect (e.g. ["ETHUSDT"])
+            intervals: Kline intervals to collect (e.g. ["5m", "4h"])
+            client: Binance client (default: client.binance_client.get_binance_client())
+        """
+        for interval in intervals:
+            if interval not in INTERVAL_SECONDS:
+                raise ValueError(f"Unsupported interval: {interval}")
+        self.feed = feed
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self._client = client
+        # Last published close time per stream (ms), to request only newer candles
+        self._last_close_ms: Dict[str, int] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    def sync_stream(self, symbol: str, interval: str, now_ms: Optional[int] = None) -> int:
+        """
+        Fetch the candles that closed since the last sync and publish them.
+
+        The first sync backfills the full ring; later syncs request only the
+        missing candles plus the in-progress one, which is dropped.
+
+        Args:
+            symbol: Symbol to sync
+            interval: Kline interval to sync
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Number of newly published candles
+        """
+        stream = stream_name(symbol, interval)
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        interval_ms = INTERVAL_SECONDS[interval] * 1000
+        last_close = self._last_close_ms.get(stream)
+
+        if last_close is None:
+            missing = self.feed.capacity
+        else:
+            missing = max(0, math.ceil((now_ms - last_close) / interval_ms) - 1)
+            if missing == 0:
+                increment("collector_syncs_total", status="up_to_date")
+                return 0
+        limit = min(missing + 1, MAX_KLINES_PER_REQUEST)
+
+        with span("collector_fetch", stream=stream):
+            rows = self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+        closed = [row for row in rows if int(row[6]) < now_ms]
+        if last_close is not None:
+            closed = [row for row in closed if int(row[6]) > last_close]
+
+        values = None
+        if closed:
+            history = self.feed.read_klines(stream) + [[float(v) for v in row[:7]] for row in closed]
+            values = compute_values(history[-self.feed.capacity:])
+            self._last_close_ms[stream] = int(closed[-1][6])
+        self.feed.publish(stream, closed, values)
+        increment("collector_syncs_total", status="ok")
+        increment("collector_candles_total", len(closed), stream=stream)
+        return len(closed)
+
+    def sync_all(self, now_ms: Optional[int] = None) -> Dict[str, int]:
+        """
+        Sync every stream, logging (not raising) per-stream failures.
+
+        Args:
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Mapping of stream name to newly published candles (-1 on failure)
+        """
+        published = {}
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                stream = stream_name(symbol, interval)
+                try:
+                    published[stream] = self.sync_stream(symbol, interval, now_ms)
+                except Exception as e:
+                    published[stream] = -1
+                    increment("collector_syncs_total", status="error")
+                    logger.warning("Failed to sync stream", extra={"stream": stream, "error": str(e)})
+        return published
+
+    async def run(self, max_cycles: Optional[int] = None):
+        """
+        Backfill every stream, then sync after each close of the shortest interval.
+
+        Args:
+            max_cycles: Optional number of candle closes to process before returning
+        """
+        from utils.scheduler import CandleScheduler
+
+        await asyncio.to_thread(self.sync_all)
+        logger.info("Backfill complete", extra={"streams": list(self.feed.streams), "name": self.feed.name})
+
+        scheduler = CandleScheduler(
+            interval_seconds=min(INTERVAL_SECONDS[i] for i in self.intervals),
+            offset_seconds=COLLECTOR_OFFSET_SECONDS,
+        )
+
+        async def collect(candle_close: float):
+            published = await asyncio.to_thread(self.sync_all)
+            logger.info("Published candles", extra={"published": published})
+
+        await scheduler.run(collect, max_cycles=max_cycles)
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+async def _main(args: argparse.Namespace):
+    symbols = _split(args.symbols)
+    intervals = _split(args.intervals)
+    streams = [stream_name(s, i) for s in symbols for i in intervals]
+    feed = SharedMarketFeed.create(args.name, streams, capacity=args.capacity)
+    try:
+        await MarketDataCollector(feed, symbols, intervals).run()
+    finally:
+        feed.close()
+        feed.unlink()
+
+
+if __name__ == "__main__":
+    from utils.env import load_env
+    from utils.logger import setup_logging
+
+    load_env()
+    setup_logging()
+
+    parser = argparse.ArgumentParser(description="Publish closed candles and indicators to shared memory")
+    parser.add_argument("--name", default=os.getenv("MARKET_DATA_SHM") or "trader-md",
+                        help="Shared memory name (default: MARKET_DATA_SHM or trader-md)")
+    parser.add_argument("--symbols", default=COLLECTOR_SYMBOLS, help="Comma-separated symbols")
+    parser.add_argument("--intervals", default=COLLECTOR_INTERVALS, help="Comma-separated kline intervals")
+    parser.add_argument("--capacity", type=int, default=COLLECTOR_CAPACITY, help="Candles kept per stream")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
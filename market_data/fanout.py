@@ -0,0 +1,57 @@
+"""Per-cycle fan-out of collected market data to every consumer.
+
+In the multi-strategy runtime several strategies may trade the same symbol.
+The fan-out collects the data of each symbol once per cycle, on the first
+request, and hands the same result to every strategy asking for it, so
+exchange request weight grows with the number of distinct symbols, not with
+the number of strategies.
+
+Metric: market_data_fanout_total{result} ("miss" collected, "hit" shared).
+"""
+
+import asyncio
+from typing import Any, Callable, Dict
+
+from utils.metrics import increment
+
+
+class MarketDataFanout:
+    """Collect each symbol's market data at most once and share the result."""
+
+    def __init__(self, collect: Callable[[str], Dict[str, Any]]):
+        """
+        Args:
+            collect: Blocking function returning the market data of a symbol
+                (e.g. main.collect_market_data); runs in a worker thread
+        """
+        self._collect = collect
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def get(self, symbol: str) -> Dict[str, Any]:
+        """
+        Get the market data of a symbol, collecting it on the first request.
+
+        Concurrent requests for the same symbol wait for the same collection.
+
+        Args:
+            symbol: Market symbol (e.g. "ETHUSDT")
+
+        Returns:
+            Market data returned by the collect function
+
+        Raises:
+            Exception: Whatever the collection raised, for every requester
+        """
+        task = self._tasks.get(symbol)
+        if task is None:
+            task = self._tasks[symbol] = asyncio.ensure_future(asyncio.to_thread(self._collect, symbol))
+            increment("market_data_fanout_total", result="miss")
+        else:
+            increment("market_data_fanout_total", result="hit")
+        # A cancelled requester must not cancel the collection others wait for
+        return await asyncio.shield(task)
+
+    @property
+    def symbols(self):
+        """Symbols requested so far."""
+        return list(self._tasks)
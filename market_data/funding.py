@@ -0,0 +1,333 @@
+"""Locally cached funding-rate history, predicted funding and funding cost.
+
+Funding settles every few hours (8h on most Binance perpetuals), so the
+settlement history (``futures_funding_rate``) is backfilled once per symbol
+and then only requested again after the next settlement time has passed,
+asking just for the settlements after the last stored one. The predicted
+rate of the upcoming settlement, the mark price and the next funding time
+come from the premium index (``futures_mark_price``), read through the
+shared mark price cache (account_actions.mark_to_market.MarkPriceCache):
+one request for all symbols serves the funding of every symbol and the
+marks of the open positions. Those move continuously, so the premium index
+is only reused for FUNDING_PREMIUM_TTL_SECONDS (a minute: in practice one
+request per cycle) and refreshed early once a settlement is due.
+"""
+
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.metrics import increment
+
+if TYPE_CHECKING:
+    from account_actions.mark_to_market import MarkPriceCache
+
+
+logger = get_logger("funding")
+
+# Settlements kept per symbol (90 = 30 days of 8h funding)
+FUNDING_HISTORY_LIMIT = int(os.getenv("FUNDING_HISTORY_LIMIT", "90"))
+# How long a premium index (predicted rate, mark price) is reused; it is
+# refetched anyway once the next funding time passes
+FUNDING_PREMIUM_TTL_SECONDS = float(os.getenv("FUNDING_PREMIUM_TTL_SECONDS", "60"))
+# Minimum spacing of settlement requests while the exchange is late publishing one
+FUNDING_RETRY_SECONDS = float(os.getenv("FUNDING_RETRY_SECONDS", "60"))
+# Funding interval assumed until two settlements are stored
+DEFAULT_FUNDING_INTERVAL_MS = 8 * 3600 * 1000
+# Binance returns at most 1000 settlements per request
+MAX_SETTLEMENTS_PER_REQUEST = 1000
+
+# (funding time ms, funding rate)
+FundingSettlement = Tuple[int, float]
+
+
+def funding_payment(position_amt: float, mark_price: float, rate: float) -> float:
+    """
+    Funding paid by a position at one settlement.
+
+    Longs pay shorts when the rate is positive and receive when it is
+    negative, so the sign of the position amount carries the side.
+
+    Args:
+        position_amt: Signed position size in contracts (negative = short)
+        mark_price: Mark price at settlement
+        rate: Funding rate of the settlement (0.0001 = 0.01%)
+
+    Returns:
+        Amount paid in the quote asset (negative = received)
+    """
+    return position_amt * mark_price * rate
+
+
+class FundingHistory:
+    """Per-symbol funding settlements kept in memory, plus the shared premium index."""
+
+    def __init__(self, client=None, prices: Optional["MarkPriceCache"] = None,
+                 max_settlements: int = FUNDING_HISTORY_LIMIT,
+                 premium_ttl_seconds: float = FUNDING_PREMIUM_TTL_SECONDS):
+        """
+        Args:
+            client: Binance client (default: client.binance_client.get_binance_client())
+            prices: Premium index and mark price cache (default: a MarkPriceCache on the same client)
+            max_settlements: Settlements kept per symbol
+            premium_ttl_seconds: How long a fetched premium index is reused
+        """
+        if max_settlements < 1:
+            raise ValueError("max_settlements must be at least 1")
+        if prices is None:
+            from account_actions.mark_to_market import MarkPriceCache
+
+            prices = MarkPriceCache(client)
+        self._client = client
+        self.prices = prices
+        self.max_settlements = max_settlements
+        self.premium_ttl_seconds = premium_ttl_seconds
+        self._settlements: Dict[str, Deque[FundingSettlement]] = {}
+        self._last_request_ms: Dict[str, int] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    def sync(self, symbol: str, now_ms: Optional[int] = None) -> int:
+        """
+        Refresh the premium index and fetch settlements that are not stored yet.
+
+        Both are served from memory until they can have changed: the premium
+        index until its TTL expires or the next funding time passes, the
+        settlement history until the next funding time passes.
+
+        Args:
+            symbol: Futures symbol (e.g. "ETHUSDT")
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Number of new settlements stored
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        self.premium_index(symbol, now_ms)
+        return self._sync_settlements(symbol, now_ms)
+
+    def _sync_settlements(self, symbol: str, now_ms: int) -> int:
+        settlements = self._settlements.get(symbol)
+        params: Dict[str, Any] = {"symbol": symbol}
+
+        if settlements:
+            # The premium index already points past a settlement that may not
+            # be published yet, so the due time comes from the stored history
+            due = settlements[-1][0] + self.funding_interval_ms(symbol)
+            last_request = self._last_request_ms.get(symbol, 0)
+            if now_ms < due or now_ms - last_request < FUNDING_RETRY_SECONDS * 1000:
+                increment("funding_syncs_total", kind="settlements", status="cached")
+                return 0
+            params["startTime"] = settlements[-1][0] + 1
+            params["limit"] = MAX_SETTLEMENTS_PER_REQUEST
+        else:
+            settlements = self._settlements[symbol] = deque(maxlen=self.max_settlements)
+            params["limit"] = min(self.max_settlements, MAX_SETTLEMENTS_PER_REQUEST)
+            logger.info("Backfilling funding history", extra={"symbol": symbol, "limit": params["limit"]})
+
+        self._last_request_ms[symbol] = now_ms
+        rows = self.client.futures_funding_rate(**params)
+        added = 0
+        for row in sorted(rows, key=lambda r: int(r["fundingTime"])):
+            funding_time = int(row["fundingTime"])
+            if settlements and funding_time <= settlements[-1][0]:
+                continue
+            settlements.append((funding_time, float(row["fundingRate"])))
+            added += 1
+        increment("funding_syncs_total", kind="settlements", status="fetched")
+        return added
+
+    def premium_index(self, symbol: str, now_ms: Optional[int] = None) -> Dict[str, float]:
+        """
+        Get the premium index from the shared cache, fetching it when stale.
+
+        Args:
+            symbol: Futures symbol
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Dictionary with mark_price, index_price, predicted_rate,
+            next_funding_time (ms) and time (ms)
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        cached = self.prices.peek_premium(symbol)
+        # Past the next funding time the predicted rate belongs to a settled period
+        due = cached is not None and now_ms >= cached["next_funding_time"]
+        return self.prices.get_premium_index(symbol, 0 if due else self.premium_ttl_seconds)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Stored settlements and request times per symbol, for a checkpoint."""
+        return {
+            "settlements": {symbol: [list(settlement) for settlement in settlements]
+                            for symbol, settlements in list(self._settlements.items())},
+            "last_request_ms": dict(self._last_request_ms),
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore the settlements of a checkpoint; they are only refetched once
+        due, as if the process had kept running. The premium index is not
+        restored: it is stale within a minute anyway.
+
+        Args:
+            state: Output of get_state
+        """
+        for symbol, settlements in state["settlements"].items():
+            self._settlements[symbol] = deque(((int(t), float(rate)) for t, rate in settlements),
+                                              maxlen=self.max_settlements)
+        self._last_request_ms.update({symbol: int(ms) for symbol, ms in state["last_request_ms"].items()})
+
+    def funding_interval_ms(self, symbol: str) -> int:
+        """Spacing of the two most recent settlements (default: 8 hours)."""
+        settlements = self._settlements.get(symbol)
+        if settlements and len(settlements) >= 2:
+            return settlements[-1][0] - settlements[-2][0]
+        return DEFAULT_FUNDING_INTERVAL_MS
+
+    def next_funding_time(self, symbol: str) -> int:
+        """
+        Time of the next settlement in milliseconds.
+
+        Taken from the cached premium index when it is ahead of the stored
+        history, otherwise extrapolated from the last settlement.
+        """
+        settlements = self._settlements.get(symbol)
+        expected = settlements[-1][0] + self.funding_interval_ms(symbol) if settlements else 0
+        premium = self.prices.peek_premium(symbol)
+        if premium is not None:
+            return max(expected, premium["next_funding_time"])
+        return expected
+
+    def latest(self, symbol: str) -> Optional[FundingSettlement]:
+        """Get the most recent stored settlement for a symbol, or None."""
+        settlements = self._settlements.get(symbol)
+        return settlements[-1] if settlements else None
+
+    def _window(self, symbol: str, window_hours: float):
+        settlements = self._settlements.get(symbol)
+        if not settlements:
+            return []
+        since = settlements[-1][0] - window_hours * 3600 * 1000
+        rates = []
+        for funding_time, rate in reversed(settlements):
+            if funding_time <= since:
+                break
+            rates.append(rate)
+        return rates
+
+    def average_rate(self, symbol: str, window_hours: float) -> Optional[float]:
+        """
+        Average funding rate of the settlements in the trailing window.
+
+        Args:
+            symbol: Futures symbol
+            window_hours: Window length ending at the latest settlement
+
+        Returns:
+            Average rate per settlement, or None without history
+        """
+        rates = self._window(symbol, window_hours)
+        return sum(rates) / len(rates) if rates else None
+
+    def annualized_rate(self, symbol: str, window_hours: float = 24 * 7) -> Optional[float]:
+        """
+        Average funding rate of the trailing window scaled to one year.
+
+        Args:
+            symbol: Futures symbol
+            window_hours: Window length ending at the latest settlement
+
+        Returns:
+            Annualized rate (0.1095 = 10.95% per year), or None without history
+        """
+        average = self.average_rate(symbol, window_hours)
+        if average is None:
+            return None
+        settlements_per_year = 365 * 24 * 3600 * 1000 / self.funding_interval_ms(symbol)
+        return average * settlements_per_year
+
+    def estimate_cost(self, symbol: str, position_amt: float, mark_price: Optional[float] = None,
+                      hours: float = 24) -> Dict[str, Optional[float]]:
+        """
+        Estimate the funding a position pays while it is held.
+
+        Args:
+            symbol: Futures symbol
+            position_amt: Signed position size in contracts (negative = short)
+            mark_price: Mark price (default: the cached premium index)
+            hours: Holding period for the average-based estimate
+
+        Returns:
+            Dictionary with next_settlement (payment at the predicted rate)
+            and per_period (payment over ``hours`` at the 24h average rate),
+            in the quote asset; negative values are received. None when the
+            data is not available.
+        """
+        premium = self.prices.peek_premium(symbol)
+        if mark_price is None and premium is not None:
+            mark_price = premium["mark_price"]
+        if mark_price is None:
+            return {"next_settlement": None, "per_period": None}
+
+        next_settlement = None
+        if premium is not None:
+            next_settlement = funding_payment(position_amt, mark_price, premium["predicted_rate"])
+        per_period = None
+        average = self.average_rate(symbol, 24)
+        if average is not None:
+            settlements = hours * 3600 * 1000 / self.funding_interval_ms(symbol)
+            per_period = funding_payment(position_amt, mark_price, average) * settlements
+        return {"next_settlement": next_settlement, "per_period": per_period}
+
+    def get_summary(self, symbol: str, now_ms: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """
+        Funding statistics used in the trading prompt.
+
+        Args:
+            symbol: Futures symbol
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Dictionary with last_rate, predicted_rate, mark_price,
+            hours_to_next (until the next settlement), average_24h and
+            annualized_7d (None when unavailable)
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        latest = self.latest(symbol)
+        premium = self.prices.peek_premium(symbol)
+        next_funding = self.next_funding_time(symbol)
+        return {
+            "last_rate": latest[1] if latest else None,
+            "predicted_rate": premium["predicted_rate"] if premium else None,
+            "mark_price": premium["mark_price"] if premium else None,
+            "hours_to_next": max(0.0, (next_funding - now_ms) / 3_600_000) if next_funding else None,
+            "average_24h": self.average_rate(symbol, 24),
+            "annualized_7d": self.annualized_rate(symbol, 24 * 7),
+        }
+
+
+_history: Optional[FundingHistory] = None
+
+
+def get_funding_history() -> FundingHistory:
+    """Get or create the process-wide funding history (singleton)."""
+    global _history
+    if _history is None:
+        from account_actions.mark_to_market import get_mark_price_cache
+
+        _history = FundingHistory(prices=get_mark_price_cache())
+    return _history
+
+
+def reset_funding_history():
+    """Drop the cached history (useful for testing or config changes)."""
+    global _history
+    _history = None
@@ -0,0 +1,226 @@
+"""Locally cached open-interest history with rolling statistics.
+
+Open interest statistics (``futures_open_interest_hist``) are backfilled
+once per symbol and then synced incrementally: a request is only made when
+a new period has closed since the last stored point, and it asks only for
+the points after that one. Rolling averages and change rates are served
+from memory.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from market_data.shared_feed import INTERVAL_SECONDS
+from utils.logger import get_logger
+from utils.metrics import increment
+
+
+logger = get_logger("open_interest")
+
+# Period of the open interest statistics (5m, 15m, 30m, 1h, 2h, 4h, 6h, 12h, 1d)
+OI_HISTORY_PERIOD = os.getenv("OI_HISTORY_PERIOD", "5m")
+# How much history is kept per symbol
+OI_HISTORY_RETENTION_HOURS = float(os.getenv("OI_HISTORY_RETENTION_HOURS", "24"))
+# Window of the average shown in the prompt
+OI_AVERAGE_WINDOW_HOURS = float(os.getenv("OI_AVERAGE_WINDOW_HOURS", "24"))
+# Binance returns at most 500 points per request
+MAX_POINTS_PER_REQUEST = 500
+
+# (timestamp ms, open interest in contracts, open interest value in quote asset)
+OpenInterestPoint = Tuple[int, float, float]
+
+
+class OpenInterestHistory:
+    """Per-symbol open interest history kept in memory and synced incrementally."""
+
+    def __init__(self, client=None, period: str = OI_HISTORY_PERIOD,
+                 retention_hours: float = OI_HISTORY_RETENTION_HOURS):
+        """
+        Args:
+            client: Binance client (default: client.binance_client.get_binance_client())
+            period: Statistics period (a Binance interval such as "5m" or "1h")
+            retention_hours: History kept per symbol
+        """
+        if period not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported open interest period: {period}")
+        self._client = client
+        self.period = period
+        self.period_ms = INTERVAL_SECONDS[period] * 1000
+        # +1 so that a full retention window (e.g. a 24h change) can be measured
+        self.max_points = max(2, int(retention_hours * 3600 * 1000 // self.period_ms) + 1)
+        self._points: Dict[str, Deque[OpenInterestPoint]] = {}
+        self._last_request_ms: Dict[str, int] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    def sync(self, symbol: str, now_ms: Optional[int] = None) -> int:
+        """
+        Fetch open interest points that are not stored yet.
+
+        The first call backfills the retention window. Later calls return
+        without a request until a new period has closed, and then request
+        only the points after the last stored one. While the exchange is late
+        publishing a point, requests are spaced at least half a period apart.
+
+        Args:
+            symbol: Futures symbol (e.g. "ETHUSDT")
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Number of new points stored
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        points = self._points.get(symbol)
+        params: Dict[str, Any] = {"symbol": symbol, "period": self.period}
+
+        if points:
+            # Start of the most recent period that has fully closed
+            latest_closed = (now_ms // self.period_ms - 1) * self.period_ms
+            last_request = self._last_request_ms.get(symbol, 0)
+            if points[-1][0] >= latest_closed or now_ms - last_request < self.period_ms // 2:
+                increment("oi_history_syncs_total", status="cached")
+                return 0
+            missing = (latest_closed - points[-1][0]) // self.period_ms
+            params["startTime"] = points[-1][0] + 1
+            params["limit"] = int(min(missing + 1, MAX_POINTS_PER_REQUEST))
+        else:
+            points = self._points[symbol] = deque(maxlen=self.max_points)
+            params["limit"] = min(self.max_points, MAX_POINTS_PER_REQUEST)
+            logger.info("Backfilling open interest history", extra={
+                "symbol": symbol, "period": self.period, "limit": params["limit"],
+            })
+
+        self._last_request_ms[symbol] = now_ms
+        rows = self.client.futures_open_interest_hist(**params)
+        added = 0
+        for row in sorted(rows, key=lambda r: int(r["timestamp"])):
+            timestamp = int(row["timestamp"])
+            if points and timestamp <= points[-1][0]:
+                continue
+            points.append((timestamp, float(row["sumOpenInterest"]), float(row.get("sumOpenInterestValue", 0.0))))
+            added += 1
+        increment("oi_history_syncs_total", status="fetched")
+        return added
+
+    def get_state(self) -> Dict[str, Any]:
+        """Stored points and request times per symbol, for a checkpoint."""
+        return {
+            "period": self.period,
+            "points": {symbol: [list(point) for point in points] for symbol, points in list(self._points.items())},
+            "last_request_ms": dict(self._last_request_ms),
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore the history of a checkpoint; the next sync of a symbol
+        requests only the points after the last restored one.
+
+        Args:
+            state: Output of get_state (ignored if of another period)
+        """
+        if state["period"] != self.period:
+            return
+        for symbol, points in state["points"].items():
+            self._points[symbol] = deque(((int(t), float(oi), float(value)) for t, oi, value in points),
+                                         maxlen=self.max_points)
+        self._last_request_ms.update({symbol: int(ms) for symbol, ms in state["last_request_ms"].items()})
+
+    def latest(self, symbol: str) -> Optional[OpenInterestPoint]:
+        """Get the most recent stored point for a symbol, or None."""
+        points = self._points.get(symbol)
+        return points[-1] if points else None
+
+    def rolling_average(self, symbol: str, window_hours: float = OI_AVERAGE_WINDOW_HOURS) -> Optional[float]:
+        """
+        Average open interest over the trailing window.
+
+        Args:
+            symbol: Futures symbol
+            window_hours: Window length ending at the latest stored point
+
+        Returns:
+            Average open interest in contracts, or None without history
+        """
+        points = self._points.get(symbol)
+        if not points:
+            return None
+        since = points[-1][0] - window_hours * 3600 * 1000
+        total = 0.0
+        count = 0
+        for timestamp, value, _ in reversed(points):
+            if timestamp < since:
+                break
+            total += value
+            count += 1
+        return total / count
+
+    def change_rate(self, symbol: str, window_hours: float) -> Optional[float]:
+        """
+        Relative change of open interest over the trailing window.
+
+        Args:
+            symbol: Futures symbol
+            window_hours: Window length ending at the latest stored point
+
+        Returns:
+            Fractional change (0.05 = +5%), or None when the history does not
+            reach back to the start of the window
+        """
+        points = self._points.get(symbol)
+        if not points:
+            return None
+        since = points[-1][0] - window_hours * 3600 * 1000
+        if points[0][0] > since:
+            return None
+        reference = None
+        for timestamp, value, _ in reversed(points):
+            if timestamp < since:
+                break
+            reference = value
+        if not reference:
+            return None
+        return points[-1][1] / reference - 1
+
+    def get_summary(self, symbol: str) -> Dict[str, Optional[float]]:
+        """
+        Open interest statistics used in the trading prompt.
+
+        Args:
+            symbol: Futures symbol
+
+        Returns:
+            Dictionary with latest, average (OI_AVERAGE_WINDOW_HOURS) and
+            change_1h / change_24h fractions (None when unavailable)
+        """
+        latest = self.latest(symbol)
+        return {
+            "latest": latest[1] if latest else None,
+            "average": self.rolling_average(symbol),
+            "change_1h": self.change_rate(symbol, 1),
+            "change_24h": self.change_rate(symbol, 24),
+        }
+
+
+_history: Optional[OpenInterestHistory] = None
+
+
+def get_open_interest_history() -> OpenInterestHistory:
+    """Get or create the process-wide open interest history (singleton)."""
+    global _history
+    if _history is None:
+        _history = OpenInterestHistory()
+    return _history
+
+
+def reset_open_interest_history():
+    """Drop the cached history (useful for testing or config changes)."""
+    global _history
+    _history = None
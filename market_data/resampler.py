@@ -0,0 +1,342 @@
+"""Higher-timeframe klines resampled locally from one base interval.
+
+Only base-interval klines (RESAMPLE_BASE_INTERVAL, 5m by default) are
+fetched from Binance: a backfill of RESAMPLE_BASE_CAPACITY candles on first
+use, then just the candles that closed since the last sync. Every larger
+interval whose length is a multiple of the base (15m, 1h, 4h, 1d, ...) is
+aggregated in memory, bucketed on the exchange's UTC-aligned boundaries, and
+kept up to date incrementally as base candles arrive: open of the first
+candle, high/low extremes, close of the last candle, summed volumes and
+trade counts.
+
+Usage (compare resampled bars with the exchange's own):
+    python -m market_data.resampler --symbol ETHUSDT --intervals 15m,1h,4h
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from market_data.shared_feed import INTERVAL_SECONDS
+from utils.logger import get_logger
+from utils.metrics import increment, span
+
+
+logger = get_logger("resampler")
+
+# Binance caps a single klines request at 1000 rows
+MAX_KLINES_PER_REQUEST = 1000
+# Bars kept per derived interval
+MAX_DERIVED_BARS = 1000
+
+# open time, open, high, low, close, volume, close time, quote volume,
+# trades, taker buy base volume, taker buy quote volume
+Bar = List[float]
+
+
+def _to_bar(row: Sequence) -> Bar:
+    """Normalize a Binance kline row (numbers or numeric strings)."""
+    values = [float(row[i]) if i < len(row) else 0.0 for i in range(11)]
+    values[0], values[6], values[8] = int(values[0]), int(values[6]), int(values[8])
+    return values
+
+
+class _DerivedBars:
+    """Closed bars of one derived interval plus the bucket being filled."""
+
+    def __init__(self, interval_ms: int):
+        self.interval_ms = interval_ms
+        self.bars: Deque[Bar] = deque(maxlen=MAX_DERIVED_BARS)
+        self.partial: Optional[Bar] = None
+        # Set when the bucket in progress started before the first base bar
+        self.partial_incomplete = False
+
+    def add(self, base: Bar):
+        bucket = base[0] // self.interval_ms * self.interval_ms
+        if self.partial is not None and self.partial[0] != bucket:
+            # The previous bucket missed its last base bars (exchange gap):
+            # the exchange still reports it, aggregated from what traded
+            self._close()
+        if self.partial is None:
+            self.partial = [bucket, base[1], base[2], base[3], base[4], base[5], bucket + self.interval_ms - 1,
+                            base[7], base[8], base[9], base[10]]
+            self.partial_incomplete = base[0] != bucket and not self.bars
+        else:
+            partial = self.partial
+            partial[2] = max(partial[2], base[2])
+            partial[3] = min(partial[3], base[3])
+            partial[4] = base[4]
+            for i in (5, 7, 8, 9, 10):
+                partial[i] += base[i]
+        if base[6] >= self.partial[6]:
+            self._close()
+
+    def _close(self):
+        if not self.partial_incomplete:
+            self.bars.append(self.partial)
+        self.partial = None
+        self.partial_incomplete = False
+
+
+class KlineResampler:
+    """Base-interval klines per symbol, with derived intervals served from memory."""
+
+    def __init__(self, base_interval: str = "5m", capacity: int = 3000, client=None):
+        """
+        Args:
+            base_interval: Interval fetched from the exchange
+            capacity: Base candles kept per symbol (bounds the history of
+                derived intervals: 3000 x 5m is about 62 4h bars)
+            client: Binance client (default: client.binance_client.get_binance_client())
+        """
+        if base_interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unsupported base interval: {base_interval}")
+        self.base_interval = base_interval
+        self.base_ms = INTERVAL_SECONDS[base_interval] * 1000
+        self.capacity = capacity
+        self._client = client
+        self._base: Dict[str, Deque[Bar]] = {}
+        self._derived: Dict[Tuple[str, str], _DerivedBars] = {}
+        self._lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from client.binance_client import get_binance_client
+
+            self._client = get_binance_client()
+        return self._client
+
+    def supports(self, interval: str) -> bool:
+        """Whether an interval can be served (the base or a multiple of it)."""
+        seconds = INTERVAL_SECONDS.get(interval)
+        return seconds is not None and seconds * 1000 % self.base_ms == 0
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _append(self, symbol: str, bars: List[Bar]):
+        base = self._base.setdefault(symbol, deque(maxlen=self.capacity))
+        derived = [state for (s, _), state in self._derived.items() if s == symbol]
+        for bar in bars:
+            base.append(bar)
+            for state in derived:
+                state.add(bar)
+
+    def _fetch(self, symbol: str, limit: int, end_time: Optional[int] = None) -> List[list]:
+        params = {"symbol": symbol, "interval": self.base_interval, "limit": limit}
+        if end_time is not None:
+            params["endTime"] = end_time
+        with span("resampler_fetch", symbol=symbol):
+            return self.client.get_klines(**params)
+
+    def sync(self, symbol: str, now_ms: Optional[int] = None) -> int:
+        """
+        Fetch the base candles that closed since the last sync.
+
+        The first sync backfills `capacity` candles, paging backwards; later
+        syncs request only the missing candles plus the in-progress one,
+        which is dropped.
+
+        Args:
+            symbol: Symbol to sync
+            now_ms: Current time in milliseconds (default: wall clock)
+
+        Returns:
+            Number of new base candles
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        with self._symbol_lock(symbol):
+            base = self._base.get(symbol)
+            if base:
+                last_close = base[-1][6]
+                missing = (now_ms - last_close - 1) // self.base_ms
+                if missing <= 0:
+                    return 0
+                if missing >= min(self.capacity, MAX_KLINES_PER_REQUEST):
+                    # Too far behind to catch up incrementally: start over
+                    self._reset_symbol(symbol)
+                    base = None
+
+            if base:
+                rows = self._fetch(symbol, min(missing + 1, MAX_KLINES_PER_REQUEST))
+                closed = [row for row in rows if last_close < int(row[6]) < now_ms]
+            else:
+                closed = []
+                end_time = None
+                while len(closed) < self.capacity:
+                    rows = [row for row in self._fetch(symbol, MAX_KLINES_PER_REQUEST, end_time)
+                            if int(row[6]) < now_ms]
+                    # Stop when a page adds nothing older (start of history)
+                    if closed:
+                        rows = [row for row in rows if int(row[0]) < int(closed[0][0])]
+                    if not rows:
+                        break
+                    closed = rows + closed
+                    end_time = int(rows[0][0]) - 1
+                closed = closed[-self.capacity:]
+
+            self._append(symbol, [_to_bar(row) for row in closed])
+            increment("resampler_syncs_total", kind="incremental" if base else "backfill")
+            increment("resampler_candles_total", len(closed), symbol=symbol)
+            return len(closed)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Base candles per symbol, for a checkpoint (derived intervals are replayed from them)."""
+        with self._lock:
+            symbols = list(self._base)
+        bars = {}
+        for symbol in symbols:
+            with self._symbol_lock(symbol):
+                bars[symbol] = [list(bar) for bar in self._base.get(symbol, ())]
+        return {"base_interval": self.base_interval, "bars": bars}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Restore the base candles of a checkpoint; the next sync of a symbol
+        fetches only the candles that closed since.
+
+        Args:
+            state: Output of get_state (ignored if of another base interval)
+        """
+        if state["base_interval"] != self.base_interval:
+            logger.info("Checkpoint has another base interval, backfilling", extra={
+                "checkpoint": state["base_interval"], "base_interval": self.base_interval,
+            })
+            return
+        for symbol, bars in state["bars"].items():
+            with self._symbol_lock(symbol):
+                self._reset_symbol(symbol)
+                self._append(symbol, [_to_bar(bar) for bar in bars[-self.capacity:]])
+
+    def _reset_symbol(self, symbol: str):
+        self._base.pop(symbol, None)
+        for key in [key for key in self._derived if key[0] == symbol]:
+            self._derived[key] = _DerivedBars(self._derived[key].interval_ms)
+
+    def get_klines(self, symbol: str, interval: str, limit: Optional[int]) -> Optional[List[Bar]]:
+        """
+        Closed klines of any supported interval, from memory.
+
+        Args:
+            symbol: Symbol (synced beforehand with sync)
+            interval: The base interval or a multiple of it
+            limit: Number of closed klines (None for all available)
+
+        Returns:
+            Kline rows in Binance order (open time ... taker buy quote
+            volume), oldest first, or None when fewer than `limit` closed
+            bars are available
+        """
+        if not self.supports(interval):
+            raise ValueError(f"Cannot resample {interval} from {self.base_interval}")
+        with self._symbol_lock(symbol):
+            base = self._base.get(symbol)
+            if not base:
+                return None
+            if interval == self.base_interval:
+                bars = base
+            else:
+                key = (symbol, interval)
+                state = self._derived.get(key)
+                if state is None:
+                    # First request: replay the stored base bars once
+                    state = self._derived[key] = _DerivedBars(INTERVAL_SECONDS[interval] * 1000)
+                    for bar in base:
+                        state.add(bar)
+                bars = state.bars
+            if limit is None:
+                limit = len(bars)
+            if len(bars) < limit:
+                return None
+            return [list(bar) for bar in list(bars)[-limit:]] if limit else []
+
+
+_resampler: KlineResampler | None = None
+
+
+def get_resampler() -> Optional[KlineResampler]:
+    """
+    Get the process-wide resampler (singleton).
+
+    Returns:
+        KlineResampler for RESAMPLE_BASE_INTERVAL (default: "5m") keeping
+        RESAMPLE_BASE_CAPACITY base candles (default: 3000), or None when
+        RESAMPLE_BASE_INTERVAL is set to an empty string
+    """
+    global _resampler
+    base_interval = os.getenv("RESAMPLE_BASE_INTERVAL", "5m")
+    if _resampler is None and base_interval:
+        _resampler = KlineResampler(base_interval, int(os.getenv("RESAMPLE_BASE_CAPACITY", "3000")))
+    return _resampler
+
+
+def reset_resampler():
+    """Drop all stored klines (useful for testing or config changes)."""
+    global _resampler
+    _resampler = None
+
+
+def compare_bars(resampled: List[Bar], exchange: List[Sequence], rel_tol: float = 1e-6) -> List[str]:
+    """
+    Compare resampled bars with exchange bars of the same interval.
+
+    Args:
+        resampled: Output of KlineResampler.get_klines
+        exchange: Closed exchange kline rows of the same interval
+        rel_tol: Relative tolerance for volumes (sums of rounded values)
+
+    Returns:
+        Human-readable differences for the bars present in both
+    """
+    by_open = {int(row[0]): _to_bar(row) for row in exchange}
+    differences = []
+    for bar in resampled:
+        expected = by_open.get(bar[0])
+        if expected is None:
+            continue
+        for index, name in ((1, "open"), (2, "high"), (3, "low"), (4, "close"), (6, "close_time"), (8, "trades")):
+            if bar[index] != expected[index]:
+                differences.append(f"{bar[0]} {name}: {bar[index]} != {expected[index]}")
+        for index, name in ((5, "volume"), (7, "quote_volume")):
+            if abs(bar[index] - expected[index]) > rel_tol * max(abs(expected[index]), 1.0):
+                differences.append(f"{bar[0]} {name}: {bar[index]} != {expected[index]}")
+    return differences
+
+
+def main(argv: List[str] | None = None) -> int:
+    import argparse
+
+    from utils.env import load_env
+
+    load_env()
+    parser = argparse.ArgumentParser(description="Verify resampled klines against the exchange's own bars")
+    parser.add_argument("--symbol", default="ETHUSDT", help="Symbol (default: ETHUSDT)")
+    parser.add_argument("--base", default="5m", help="Base interval (default: 5m)")
+    parser.add_argument("--capacity", type=int, default=3000, help="Base candles to backfill (default: 3000)")
+    parser.add_argument("--intervals", default="15m,1h,4h", help="Comma-separated intervals to verify")
+    args = parser.parse_args(argv)
+
+    resampler = KlineResampler(args.base, args.capacity)
+    resampler.sync(args.symbol)
+    failures = 0
+    for interval in (i.strip() for i in args.intervals.split(",") if i.strip()):
+        resampled = resampler.get_klines(args.symbol, interval, None) or []
+        exchange = resampler.client.get_klines(symbol=args.symbol, interval=interval,
+                                               limit=min(len(resampled) + 1, MAX_KLINES_PER_REQUEST))
+        differences = compare_bars(resampled, exchange)
+        matched = len({bar[0] for bar in resampled} & {int(row[0]) for row in exchange})
+        print(f"{interval}: {len(resampled)} resampled, {matched} compared, {len(differences)} differences")
+        for difference in differences[:10]:
+            print(f"    {difference}")
+        failures += bool(differences)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
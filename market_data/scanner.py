@@ -0,0 +1,134 @@
+"""Cheap ranking of a symbol universe before any agent decision.
+
+Every symbol of the universe (SCAN_SYMBOLS) is scored from its closed 5m
+candles with a handful of array indicators; only the top SCAN_TOP_K
+symbols, plus every symbol with an open position, go on to a full agent
+decision. Klines are fetched on a thread pool through
+utils.stock_data.get_closed_klines, so the agent reuses them for free.
+
+Score components (each roughly 0..3 in normal markets):
+    momentum  |close - close 12 candles ago| in ATRs (the last hour on 5m)
+    trend     |EMA20 - EMA50| in ATRs
+    rsi       distance of RSI14 from 50, scaled so that 30/70 count as 1
+    volume    volume of the last candle over its 20-candle average, above 1
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.calculations import get_atr, get_ema, get_rsi
+from utils.candles import CandleSeries
+from utils.logger import get_logger
+from utils.metrics import increment
+from utils.stock_data import get_closed_klines
+
+
+logger = get_logger("scanner")
+
+SCAN_INTERVAL = "5m"
+# Same count the agent requests, so the scan fills the klines cache for it
+SCAN_CANDLES = 50
+MOMENTUM_LOOKBACK = 12
+VOLUME_PERIOD = 20
+
+
+def get_universe() -> List[str]:
+    """Symbols to scan, from SCAN_SYMBOLS (comma separated, default: "ETHUSDT")."""
+    symbols = [s.strip().upper() for s in os.getenv("SCAN_SYMBOLS", "ETHUSDT").split(",") if s.strip()]
+    # Keep the configured order, drop duplicates
+    return list(dict.fromkeys(symbols))
+
+
+def score_candles(series: CandleSeries) -> Dict[str, float]:
+    """
+    Score how much a symbol's candles call for a decision.
+
+    Args:
+        series: Closed candles, oldest first (50 for every component)
+
+    Returns:
+        Dictionary with score, momentum, trend, rsi, volume and price
+    """
+    closes = series.close
+    price = closes[-1]
+    atr_values = get_atr(series, period=14)
+    atr = atr_values[-1] if atr_values and atr_values[-1] > 0 else None
+
+    momentum = trend = 0.0
+    if atr:
+        if len(closes) > MOMENTUM_LOOKBACK:
+            momentum = abs(price - closes[-1 - MOMENTUM_LOOKBACK]) / atr
+        if len(closes) >= 50:
+            trend = abs(get_ema(closes, 20)[-1] - get_ema(closes, 50)[-1]) / atr
+
+    rsi_values = get_rsi(closes, period=14) if len(closes) > 14 else []
+    rsi = abs(rsi_values[-1] - 50) / 20 if rsi_values else 0.0
+
+    volumes = series.volume[-VOLUME_PERIOD:]
+    average_volume = sum(volumes) / len(volumes) if len(volumes) else 0.0
+    volume = max(0.0, volumes[-1] / average_volume - 1) if average_volume > 0 else 0.0
+
+    return {
+        "score": momentum + trend + rsi + volume,
+        "momentum": momentum,
+        "trend": trend,
+        "rsi": rsi,
+        "volume": volume,
+        "price": price,
+    }
+
+
+def _scan_symbol(symbol: str) -> Optional[Dict[str, Any]]:
+    try:
+        series = CandleSeries.from_klines(get_closed_klines(symbol, SCAN_INTERVAL, SCAN_CANDLES))
+        if len(series) < 2:
+            raise ValueError(f"only {len(series)} closed candles")
+        result = score_candles(series)
+    except Exception as e:
+        increment("scan_symbols_total", status="error")
+        logger.warning("Failed to scan symbol", extra={"symbol": symbol, "error": str(e)})
+        return None
+    if math.isnan(result["score"]):
+        return None
+    increment("scan_symbols_total", status="ok")
+    return {"symbol": symbol, **result}
+
+
+def scan_universe(symbols: Iterable[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch and score every symbol of a universe.
+
+    Args:
+        symbols: Symbols to scan (e.g. get_universe())
+        workers: Concurrent kline fetches (default: SCAN_FETCH_WORKERS or 8)
+
+    Returns:
+        Scores of the symbols that could be scanned, best first
+    """
+    symbols = list(symbols)
+    workers = workers or int(os.getenv("SCAN_FETCH_WORKERS", "8"))
+    if len(symbols) <= 1 or workers <= 1:
+        results = [_scan_symbol(symbol) for symbol in symbols]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(symbols)), thread_name_prefix="scan") as pool:
+            results = list(pool.map(_scan_symbol, symbols))
+    return sorted((r for r in results if r is not None), key=lambda r: r["score"], reverse=True)
+
+
+def select_candidates(ranked: List[Dict[str, Any]], top_k: int, held: Iterable[str] = ()) -> List[str]:
+    """
+    Pick the symbols that get an agent decision.
+
+    Args:
+        ranked: Output of scan_universe
+        top_k: Number of best-scoring symbols
+        held: Symbols with open positions, always included so they keep being managed
+
+    Returns:
+        Symbols, best-scoring first, then held symbols outside the top K
+    """
+    candidates = [r["symbol"] for r in ranked[:max(top_k, 0)]]
+    candidates.extend(symbol for symbol in held if symbol not in candidates)
+    return candidates
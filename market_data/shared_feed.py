@@ -0,0 +1,382 @@
+"""Shared-memory ring buffers of closed candles and latest indicator values.
+
+The collector process (market_data.collector) owns the exchange connections
+and writes every stream ("ETHUSDT:5m") into a fixed-layout shared memory
+segment. Agent processes attach to the segment by name and read candles
+straight from it instead of fetching them from Binance themselves.
+
+Layout (little endian, all offsets 8-byte aligned):
+
+    header   magic[8] version:u32 n_streams:u32 capacity:u32 n_values:u32 (padded to 64 bytes)
+    names    n_streams x 32 bytes, ASCII stream names
+    streams  n_streams x block
+
+    block    seq:u64 count:u64 head:u64 updated_at:f64
+             candles: capacity x CANDLE_FIELDS f64 (ring, head = next slot to write)
+             values:  n_values f64 (latest indicator values, NaN when unavailable)
+
+Each block is guarded by a sequence lock: the writer makes ``seq`` odd
+before writing and even afterwards, and readers retry when ``seq`` was odd
+or changed while they were copying.
+"""
+
+import atexit
+import math
+import os
+import struct
+import time
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from utils.metrics import increment
+
+if TYPE_CHECKING:
+    from multiprocessing import shared_memory
+
+
+MAGIC = b"TRDRMD01"
+VERSION = 1
+HEADER_SIZE = 64
+NAME_SIZE = 32
+BLOCK_HEADER_SIZE = 32
+MAX_READ_RETRIES = 100
+
+# Columns stored per candle, matching the first 7 columns of a Binance kline row
+CANDLE_FIELDS = ("open_time", "open", "high", "low", "close", "volume", "close_time")
+# Latest indicator values published per stream
+VALUE_FIELDS = (
+    "mid_price", "ema20", "ema50", "macd", "rsi7", "rsi14",
+    "atr3", "atr14", "current_volume", "average_volume",
+)
+
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "3m": 3 * 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "30m": 30 * 60,
+    "1h": 60 * 60,
+    "2h": 2 * 60 * 60,
+    "4h": 4 * 60 * 60,
+    "6h": 6 * 60 * 60,
+    "8h": 8 * 60 * 60,
+    "12h": 12 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+_HEADER = struct.Struct("<8sIIII")
+_BLOCK_HEADER = struct.Struct("<QQQd")
+_U64 = struct.Struct("<Q")
+
+
+def stream_name(symbol: str, interval: str) -> str:
+    """Build the stream name for a symbol and kline interval (e.g. "ETHUSDT:5m")."""
+    return f"{symbol}:{interval}"
+
+
+def _block_size(capacity: int, n_values: int) -> int:
+    return BLOCK_HEADER_SIZE + (capacity * len(CANDLE_FIELDS) + n_values) * 8
+
+
+class SharedMarketFeed:
+    """Fixed-layout shared memory segment holding one candle ring per stream."""
+
+    def __init__(self, shm: "shared_memory.SharedMemory", owner: bool):
+        """
+        Use SharedMarketFeed.create() or SharedMarketFeed.attach() instead.
+
+        Args:
+            shm: Mapped shared memory segment
+            owner: Whether this process created (and may unlink) the segment
+        """
+        self._shm = shm
+        self.owner = owner
+        magic, version, n_streams, capacity, n_values = _HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"Shared memory segment {shm.name} is not a version {VERSION} market feed")
+
+        self.name = shm.name
+        self.capacity = capacity
+        self.n_values = n_values
+        self._block_size = _block_size(capacity, n_values)
+        self._blocks_offset = HEADER_SIZE + n_streams * NAME_SIZE
+
+        self.streams: Dict[str, int] = {}
+        for index in range(n_streams):
+            raw = bytes(shm.buf[HEADER_SIZE + index * NAME_SIZE:HEADER_SIZE + (index + 1) * NAME_SIZE])
+            self.streams[raw.rstrip(b"\0").decode("ascii")] = index
+
+        # One float64 view over the whole segment; candle and value reads are slices of it
+        self._doubles = shm.buf.cast("d")
+
+    @classmethod
+    def create(cls, name: str, streams: Sequence[str], capacity: int = 500) -> "SharedMarketFeed":
+        """
+        Create (or replace) a segment for the given streams.
+
+        Args:
+            name: Shared memory name agents attach to
+            streams: Stream names, e.g. ["ETHUSDT:5m", "ETHUSDT:4h"]
+            capacity: Candles kept per stream
+
+        Returns:
+            SharedMarketFeed owning the new segment
+        """
+        for stream in streams:
+            if len(stream.encode("ascii")) > NAME_SIZE:
+                raise ValueError(f"Stream name too long: {stream}")
+        # Imported on first use: multiprocessing costs ~15ms, and most
+        # processes importing this module never create or attach a segment
+        from multiprocessing import shared_memory
+
+        n_values = len(VALUE_FIELDS)
+        size = HEADER_SIZE + len(streams) * NAME_SIZE + len(streams) * _block_size(capacity, n_values)
+
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        _HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, len(streams), capacity, n_values)
+        for index, stream in enumerate(streams):
+            offset = HEADER_SIZE + index * NAME_SIZE
+            shm.buf[offset:offset + NAME_SIZE] = stream.encode("ascii").ljust(NAME_SIZE, b"\0")
+        feed = cls(shm, owner=True)
+        for stream in streams:
+            base = feed._values_index(feed.streams[stream])
+            feed._doubles[base:base + n_values] = array("d", [math.nan] * n_values)
+        _created[name] = feed
+        return feed
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedMarketFeed":
+        """
+        Attach to an existing segment created by a collector process.
+
+        Args:
+            name: Shared memory name
+
+        Returns:
+            Read-only SharedMarketFeed (by convention; the mapping itself is writable)
+        """
+        from multiprocessing import resource_tracker, shared_memory
+
+        shm = shared_memory.SharedMemory(name=name)
+        # Readers must not unlink the collector's segment when they exit
+        # (Python < 3.13 registers attached segments with the resource tracker)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    # ---------------- Layout helpers ----------------
+
+    def _block_offset(self, index: int) -> int:
+        return self._blocks_offset + index * self._block_size
+
+    def _candles_index(self, index: int) -> int:
+        return (self._block_offset(index) + BLOCK_HEADER_SIZE) // 8
+
+    def _values_index(self, index: int) -> int:
+        return self._candles_index(index) + self.capacity * len(CANDLE_FIELDS)
+
+    def _stream_index(self, stream: str) -> int:
+        index = self.streams.get(stream)
+        if index is None:
+            raise KeyError(f"Stream {stream} is not published in {self.name}")
+        return index
+
+    # ---------------- Writing ----------------
+
+    def publish(self, stream: str, rows: Sequence[Sequence], values: Optional[Dict[str, float]] = None):
+        """
+        Append closed klines to a stream and replace its indicator values.
+
+        Args:
+            stream: Stream name
+            rows: Binance kline rows (or CANDLE_FIELDS-ordered sequences), oldest first;
+                rows not newer than the last published candle are ignored
+            values: Latest values keyed by VALUE_FIELDS entries
+        """
+        index = self._stream_index(stream)
+        offset = self._block_offset(index)
+        seq, count, head, _ = _BLOCK_HEADER.unpack_from(self._shm.buf, offset)
+        last_open_time = self._last_open_time(index, count, head)
+        width = len(CANDLE_FIELDS)
+        candles_base = self._candles_index(index)
+
+        _U64.pack_into(self._shm.buf, offset, seq + 1)
+        try:
+            for row in rows:
+                if last_open_time is not None and float(row[0]) <= last_open_time:
+                    continue
+                slot = candles_base + head * width
+                self._doubles[slot:slot + width] = array("d", [float(row[i]) for i in range(width)])
+                last_open_time = float(row[0])
+                head = (head + 1) % self.capacity
+                count = min(count + 1, self.capacity)
+            if values is not None:
+                base = self._values_index(index)
+                self._doubles[base:base + self.n_values] = array(
+                    "d", [float(values.get(field, math.nan)) for field in VALUE_FIELDS]
+                )
+        finally:
+            _BLOCK_HEADER.pack_into(self._shm.buf, offset, seq + 2, count, head, time.time())
+
+    def _last_open_time(self, index: int, count: int, head: int) -> Optional[float]:
+        if count == 0:
+            return None
+        slot = self._candles_index(index) + ((head - 1) % self.capacity) * len(CANDLE_FIELDS)
+        return self._doubles[slot]
+
+    # ---------------- Reading ----------------
+
+    def _read_consistent(self, index: int, read_fn):
+        offset = self._block_offset(index)
+        for _ in range(MAX_READ_RETRIES):
+            seq, count, head, updated_at = _BLOCK_HEADER.unpack_from(self._shm.buf, offset)
+            if seq % 2:
+                time.sleep(0)
+                continue
+            result = read_fn(count, head, updated_at)
+            if _U64.unpack_from(self._shm.buf, offset)[0] == seq:
+                return result
+        raise Exception(f"Could not read a consistent snapshot of stream {index} in {self.name}")
+
+    def read_klines(self, stream: str, limit: Optional[int] = None) -> List[list]:
+        """
+        Read the most recent candles of a stream.
+
+        Args:
+            stream: Stream name
+            limit: Maximum number of candles (default: all retained)
+
+        Returns:
+            Rows of [open_time, open, high, low, close, volume, close_time], oldest first,
+            with integer millisecond times like Binance kline rows
+        """
+        index = self._stream_index(stream)
+        width = len(CANDLE_FIELDS)
+        base = self._candles_index(index)
+
+        def read(count, head, _):
+            n = count if limit is None else min(limit, count)
+            start = (head - n) % self.capacity
+            if start + n <= self.capacity:
+                flat = self._doubles[base + start * width:base + (start + n) * width].tolist()
+            else:
+                first = self._doubles[base + start * width:base + self.capacity * width].tolist()
+                flat = first + self._doubles[base:base + head * width].tolist()
+            return flat
+
+        flat = self._read_consistent(index, read)
+        rows = []
+        for i in range(0, len(flat), width):
+            row = flat[i:i + width]
+            row[0] = int(row[0])
+            row[6] = int(row[6])
+            rows.append(row)
+        return rows
+
+    def read_values(self, stream: str) -> Dict[str, float]:
+        """
+        Read the latest indicator values of a stream.
+
+        Args:
+            stream: Stream name
+
+        Returns:
+            Dictionary keyed by VALUE_FIELDS entries plus "updated_at" (Unix seconds)
+        """
+        index = self._stream_index(stream)
+        base = self._values_index(index)
+
+        def read(count, head, updated_at):
+            values = dict(zip(VALUE_FIELDS, self._doubles[base:base + self.n_values].tolist()))
+            values["updated_at"] = updated_at
+            return values
+
+        return self._read_consistent(index, read)
+
+    def get_closed_klines(self, symbol: str, interval: str, limit: int) -> Optional[List[list]]:
+        """
+        Serve closed klines for a symbol if the collector has fresh data for it.
+
+        Args:
+            symbol: Trading pair symbol (e.g. "ETHUSDT")
+            interval: Kline interval (e.g. "5m")
+            limit: Number of closed klines required
+
+        Returns:
+            Rows like read_klines, or None when the stream is not published, holds
+            fewer than limit candles, or is missing the most recently closed candle
+        """
+        stream = stream_name(symbol, interval)
+        if stream not in self.streams or interval not in INTERVAL_SECONDS:
+            increment("market_feed_reads_total", status="missing")
+            return None
+
+        rows = self.read_klines(stream, limit)
+        if len(rows) < limit:
+            increment("market_feed_reads_total", status="missing")
+            return None
+
+        # A newer candle has closed if "now" is a full interval past the last close
+        now_ms = time.time() * 1000
+        if now_ms > rows[-1][6] + 1 + INTERVAL_SECONDS[interval] * 1000:
+            increment("market_feed_reads_total", status="stale")
+            return None
+
+        increment("market_feed_reads_total", status="hit")
+        return rows
+
+    # ---------------- Lifecycle ----------------
+
+    def close(self):
+        """Unmap the segment from this process."""
+        self._doubles.release()
+        self._shm.close()
+
+    def unlink(self):
+        """Remove the segment (collector only, after close)."""
+        if self.owner:
+            _created.pop(self.name, None)
+            self._shm.unlink()
+
+
+_feed: Optional[SharedMarketFeed] = None
+# Feeds created by this process, served directly when a collector runs in-process
+_created: Dict[str, SharedMarketFeed] = {}
+
+
+def get_market_feed() -> Optional[SharedMarketFeed]:
+    """
+    Get the shared market feed named by MARKET_DATA_SHM (singleton).
+
+    Returns:
+        Attached SharedMarketFeed, or None when MARKET_DATA_SHM is unset or no
+        collector has created the segment yet (checked again on the next call)
+    """
+    global _feed
+    # Name of the segment agents attach to; unset means "no collector, use REST"
+    name = os.getenv("MARKET_DATA_SHM")
+    if _feed is not None or not name:
+        return _feed
+    if name in _created:
+        _feed = _created[name]
+        return _feed
+    try:
+        _feed = SharedMarketFeed.attach(name)
+        atexit.register(reset_market_feed)
+    except FileNotFoundError:
+        increment("market_feed_reads_total", status="no_collector")
+    return _feed
+
+
+def reset_market_feed():
+    """Detach from the shared market feed (useful for testing or reconnecting)."""
+    global _feed
+    if _feed is not None and not _feed.owner:
+        _feed.close()
+    _feed = None
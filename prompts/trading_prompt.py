@@ -6,13 +6,13 @@ ALL OF THE PRICE OR SIGNAL DATA BELOW IS ORDERED: OLDEST → NEWEST
 Timeframes note: Unless stated otherwise in a section title, intraday series are provided at 5‑minute intervals. If a coin uses a different interval, it is explicitly stated in that coin's section.
 CURRENT MARKET STATE FOR ALL COINS
 
-ALL ETH DATA
+ALL $coin DATA
 
 current_price = $current_price, current_ema20 = $current_ema20, current_macd = $current_macd, current_rsi (7 period) = $current_rsi_seven_period
 
-In addition, here is the latest ETH open interest and funding rate for perps:
-    Open Interest: Latest: $open_interest_rate_latest Average: $open_interest_rate_average
-    Funding Rate: $funding_rate
+In addition, here is the latest $coin open interest and funding rate for perps:
+    Open Interest: Latest: $open_interest_rate_latest Average (24h): $open_interest_rate_average Change: 1h $open_interest_change_1h, 24h $open_interest_change_24h
+    Funding Rate: Last: $funding_rate Predicted next: $funding_rate_predicted (settles in $funding_hours_to_next) Average (24h): $funding_rate_average Annualized (7d): $funding_rate_annualized
     
     Intraday series (5‑minute intervals, oldest → latest):
         Mid prices: [$intraday_midprices]
@@ -34,6 +34,7 @@ Current Total Return (percent): $total_return_percentage
 Available Cash: $available_cash
 Current Account Value: $current_account_value
 Current live positions & performance: $current_account_position
+Funding cost of open positions: $funding_position_cost
 Sharpe Ratio: $sharpe_ratio
 """)
 
@@ -47,6 +48,7 @@ REASONING PHASE:
    - Analyze price trends, EMA crossovers, MACD signals, and RSI levels
    - Consider intraday (5m) vs longer-term (4h) timeframes
    - Assess funding rate, open interest, and volume patterns
+   - Weigh the funding an open or planned position pays against its expected move
    - Review your current positions, available capital, and performance metrics
 
 2. THINK: Reason through the following questions:
@@ -66,6 +68,7 @@ ACTION PHASE:
 After completing your reasoning, use the appropriate tool:
 - createPosition(symbol, side, quantity): Open a LONG or SHORT position when you identify a strong trading opportunity
 - closeAllPosition(): Close all positions when risk management or market conditions warrant it
+- closePosition(symbol): Close the position in one market only, leaving the others open
 
 IMPORTANT: Always reason through your decision before taking action. If market conditions are unclear or signals are conflicting, it's acceptable to remain neutral and wait for better opportunities.
 """)
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Decision cascade (agent/decision.py) and early tool dispatch (agent/dispatch.py) with stub streaming models."""
+
+import asyncio
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+from pydantic import PrivateAttr
+
+from agent import tools
+from agent.decision import RULES_SOURCE, run_decision
+from agent.dispatch import ToolCallDispatcher
+
+
+class StreamingStubModel(BaseChatModel):
+    """
+    Chat model streaming one scripted answer.
+
+    With a tool call, its JSON arguments are streamed in ``chunk_chars``
+    pieces as tool_call_chunks; the answer after the tool result is plain
+    text. ``delay_seconds`` is waited before the first chunk,
+    ``hang_seconds`` after the tool call chunks, and ``fail`` raises
+    instead of answering.
+    """
+
+    streaming: bool = True
+    tool_name: Optional[str] = None
+    tool_args: Dict[str, Any] = {}
+    chunk_chars: int = 7
+    delay_seconds: float = 0.0
+    hang_seconds: float = 0.0
+    fail: bool = False
+    # Number of model calls, shared with the copies build_agent makes
+    _calls: List[int] = PrivateAttr(default_factory=list)
+
+    def __init__(self, **kwargs: Any):
+        # Streams only when streaming is set explicitly, like the production model
+        super().__init__(**{"streaming": True, **kwargs})
+
+    @property
+    def _llm_type(self) -> str:
+        return "streaming-stub"
+
+    @property
+    def calls(self) -> int:
+        return len(self._calls)
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StreamingStubModel":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Holding."))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any):
+        self._calls.append(1)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        if messages and isinstance(messages[-1], ToolMessage):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Done."))
+            return
+        if self.tool_name is None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="Holding, no clear edge."))
+            return
+
+        yield ChatGenerationChunk(message=AIMessageChunk(content="Opening. "))
+        call_id = f"call_{uuid.uuid4().hex[:8]}"
+        args = json.dumps(self.tool_args)
+        for i in range(0, len(args), self.chunk_chars):
+            first = i == 0
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": self.tool_name if first else None, "args": args[i:i + self.chunk_chars],
+                "id": call_id if first else None, "index": 0,
+            }]))
+        if self.hang_seconds:
+            await asyncio.sleep(self.hang_seconds)
+
+
+class RecordingTools:
+    """Tool implementations that record their calls instead of trading."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    def implementation(self, name: str):
+        async def run(tool_call_id: str, **args: Any) -> Dict[str, Any]:
+            self.calls.append({"name": name, "args": args, "id": tool_call_id})
+            return {"status": "ok", "tool": name, "tool_call_id": tool_call_id}
+        return run
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    recording = RecordingTools()
+    for name in list(tools._IMPLEMENTATIONS):
+        monkeypatch.setitem(tools._IMPLEMENTATIONS, name, recording.implementation(name))
+    yield recording
+    tools._tool_tasks.clear()
+
+
+OPEN_LONG = {"symbol": "ETH/USDT", "side": "LONG", "quantity": 0.5}
+
+
+def decide(models, **kwargs) -> Dict[str, Any]:
+    return asyncio.run(run_decision("You trade ETH.", "Decide.", models, **kwargs))
+
+
+def test_model_decides_within_budget(recorded):
+    primary = StreamingStubModel(tool_name="createPosition", tool_args=OPEN_LONG)
+    decision = decide([("primary", primary), ("fallback", StreamingStubModel())],
+                      deadline=5, primary_timeout=2)
+
+    assert (decision["source"], decision["status"]) == ("primary", "ok")
+    assert decision["tool_calls"] == ["createPosition"]
+    # Dispatched from the stream, then awaited (not placed again) by the tool node
+    assert [call["args"] for call in recorded.calls] == [OPEN_LONG]
+    assert primary.calls == 2
+    assert tools._tool_tasks == {}
+
+
+def test_primary_timeout_without_tool_call_runs_fallback(recorded):
+    primary = StreamingStubModel(delay_seconds=5)
+    fallback = StreamingStubModel()
+    decision = decide([("primary", primary), ("fallback", fallback)], deadline=5, primary_timeout=0.2)
+
+    assert (decision["source"], decision["status"]) == ("fallback", "ok")
+    assert decision["response"].endswith("Holding, no clear edge.")
+    assert fallback.calls == 1
+    assert recorded.calls == []
+
+
+def test_primary_timeout_after_dispatched_call_skips_fallback(recorded):
+    # The call is complete in the stream, but the model never finishes its answer
+    primary = StreamingStubModel(tool_name="createPosition", tool_args=OPEN_LONG, hang_seconds=5)
+    fallback = StreamingStubModel(tool_name="createPosition", tool_args=OPEN_LONG)
+    decision = decide([("primary", primary), ("fallback", fallback)], deadline=5, primary_timeout=0.3)
+
+    assert (decision["source"], decision["status"]) == ("primary", "timeout")
+    assert fallback.calls == 0
+    assert len(recorded.calls) == 1
+    assert recorded.calls[0]["args"] == OPEN_LONG
+    assert decision["tool_results"] == [{"status": "ok", "tool": "createPosition",
+                                         "tool_call_id": recorded.calls[0]["id"]}]
+    assert tools._tool_tasks == {}
+
+
+def test_every_model_failing_falls_back_to_rules(recorded):
+    models = [("primary", StreamingStubModel(fail=True)), ("fallback", StreamingStubModel(fail=True))]
+
+    def rules():
+        return [("closePosition", {"symbol": "ETH/USDT"}), ("closeAllPosition", {})], "Rules: trend turned"
+
+    decision = decide(models, rules=rules, deadline=5, primary_timeout=2, decision_id="c1-trend-ETHUSDT")
+
+    assert (decision["source"], decision["status"]) == (RULES_SOURCE, "ok")
+    assert decision["response"] == "Rules: trend turned"
+    assert [call["id"] for call in recorded.calls] == ["c1-trend-ETHUSDT-rules-0", "c1-trend-ETHUSDT-rules-1"]
+    assert [call["id"] for call in decision["messages"][0]["tool_calls"]] == [
+        "c1-trend-ETHUSDT-rules-0", "c1-trend-ETHUSDT-rules-1"]
+    assert [result["tool"] for result in decision["tool_results"]] == ["closePosition", "closeAllPosition"]
+    assert all(model.calls == 1 for _, model in models)
+    assert tools._tool_tasks == {}
+
+
+def test_every_model_failing_without_rules_holds(recorded):
+    decision = decide([("primary", StreamingStubModel(fail=True))], deadline=5)
+
+    assert decision["source"] == RULES_SOURCE
+    assert decision["tool_calls"] == []
+    assert recorded.calls == []
+
+
+def test_dispatch_from_partial_tool_call_chunks(recorded):
+    args = json.dumps(OPEN_LONG)
+    pieces = [args[:10], args[10:25], args[25:]]
+
+    async def stream():
+        dispatcher = ToolCallDispatcher()
+        run_id = uuid.uuid4()
+        for i, piece in enumerate(pieces):
+            dispatcher.on_llm_new_token("", chunk=ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[{"name": "createPosition" if i == 0 else None, "args": piece,
+                                                "id": "call_1" if i == 0 else None, "index": 0}])), run_id=run_id)
+            # Not dispatched until the arguments parse
+            assert dispatcher.tool_call_ids == ([] if i < len(pieces) - 1 else ["call_1"])
+        await asyncio.sleep(0)
+
+        # The complete message at the end of the model call does not dispatch it again
+        message = AIMessage(content="", tool_calls=[{"name": "createPosition", "args": OPEN_LONG, "id": "call_1"}])
+        dispatcher.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+        # A call of an unknown tool is left to the tool node
+        dispatcher.on_llm_new_token("", chunk=ChatGenerationChunk(message=AIMessageChunk(
+            content="", tool_call_chunks=[{"name": "cancelOrders", "args": "{}", "id": "call_2", "index": 1}])),
+            run_id=run_id)
+        return dispatcher, await tools._tool_tasks["call_1"]
+
+    dispatcher, result = asyncio.run(stream())
+
+    assert dispatcher.tool_call_ids == ["call_1"]
+    assert recorded.calls == [{"name": "createPosition", "args": OPEN_LONG, "id": "call_1"}]
+    assert result["tool_call_id"] == "call_1"
@@ -0,0 +1,140 @@
+"""Local mark-to-market (account_actions/mark_to_market.py) with fixed positions and mark prices."""
+
+import pytest
+
+from account_actions.mark_to_market import DEFAULT_LEVERAGE, MarkPriceCache, MarkToMarketEngine
+
+
+class StaticClient:
+    """Exchange answering with fixed account, positions and premium index rows."""
+
+    def __init__(self, marks):
+        self.marks = dict(marks)
+        self.calls = []
+        # V2 account: leverage and margin type of every symbol
+        self.account = {
+            "totalWalletBalance": "1000",
+            "positions": [
+                {"symbol": "ETHUSDT", "positionAmt": "2", "leverage": "5", "isolated": False},
+                {"symbol": "BTCUSDT", "positionAmt": "-0.1", "leverage": "20", "isolated": True},
+                {"symbol": "SOLUSDT", "positionAmt": "0", "leverage": "3", "isolated": True},
+            ],
+        }
+        # positionRisk V3: neither leverage nor margin type
+        self.positions = [
+            {"symbol": "ETHUSDT", "positionAmt": "2", "entryPrice": "2000", "markPrice": "2100",
+             "isolatedWallet": "0"},
+            {"symbol": "BTCUSDT", "positionAmt": "-0.1", "entryPrice": "30000", "markPrice": "31000",
+             "isolatedWallet": "150"},
+        ]
+
+    def futures_account(self, **kwargs):
+        self.calls.append("futures_account")
+        return self.account
+
+    def futures_position_information(self, **kwargs):
+        self.calls.append("futures_position_information")
+        return self.positions
+
+    def _row(self, symbol):
+        return {"symbol": symbol, "markPrice": str(self.marks[symbol]), "indexPrice": str(self.marks[symbol]),
+                "lastFundingRate": "0.0001", "nextFundingTime": 1_700_000_000_000, "time": 1_699_999_000_000}
+
+    def futures_mark_price(self, symbol=None, **kwargs):
+        self.calls.append("futures_mark_price" if symbol is None else f"futures_mark_price:{symbol}")
+        if symbol is not None:
+            return self._row(symbol)
+        return [self._row(s) for s in self.marks]
+
+
+@pytest.fixture
+def client():
+    return StaticClient({"ETHUSDT": 2100, "BTCUSDT": 31000, "SOLUSDT": 150})
+
+
+@pytest.fixture
+def engine(client):
+    return MarkToMarketEngine(client, prices=MarkPriceCache(client, ttl_seconds=2),
+                              maintenance_margin_rate=0.005, taker_fee_rate=0.0005)
+
+
+def test_unrealized_pnl_and_equity(engine):
+    view = engine.account_view(now=100.0)
+    positions = {p["symbol"]: p for p in view["positions"]}
+
+    assert positions["ETHUSDT"]["unRealizedProfit"] == pytest.approx(2 * (2100 - 2000))
+    assert positions["BTCUSDT"]["unRealizedProfit"] == pytest.approx(-0.1 * (31000 - 30000))
+    assert view["unrealized_pnl"] == pytest.approx(100.0)
+    assert view["wallet_balance"] == pytest.approx(1000.0)
+    assert view["equity"] == pytest.approx(1100.0)
+    # 4200 / 5 + 3100 / 20
+    assert view["initial_margin"] == pytest.approx(995.0)
+    assert view["available"] == pytest.approx(105.0)
+    assert view["maintenance_margin"] == pytest.approx((4200 + 3100) * 0.005)
+    assert view["margin_ratio"] == pytest.approx(36.5 / 1100)
+    assert view["reconciled_seconds_ago"] == 0
+
+
+def test_reconcile_takes_leverage_and_margin_type_from_account(engine, client):
+    engine.reconcile(now=100.0)
+    positions = {p["symbol"]: p for p in engine.account_view(now=100.0)["positions"]}
+
+    assert (positions["ETHUSDT"]["leverage"], positions["ETHUSDT"]["marginType"]) == (5, "cross")
+    assert (positions["BTCUSDT"]["leverage"], positions["BTCUSDT"]["marginType"]) == (20, "isolated")
+    assert engine.leverage("SOLUSDT") == 3
+    assert engine.leverage("XRPUSDT") == DEFAULT_LEVERAGE
+
+    # A symbol missing from a later account keeps the settings it had
+    client.account = {**client.account, "positions": client.account["positions"][1:]}
+    engine.reconcile(now=200.0)
+    assert engine.leverage("ETHUSDT") == 5
+
+    # A local fill opens a position with the reconciled settings
+    engine.apply_fill("SOLUSDT", "BUY", 10, 150)
+    positions = {p["symbol"]: p for p in engine.account_view(now=200.0, refresh=False)["positions"]}
+    assert (positions["SOLUSDT"]["leverage"], positions["SOLUSDT"]["marginType"]) == (3, "isolated")
+    assert positions["SOLUSDT"]["initialMargin"] == pytest.approx(10 * 150 / 3)
+
+
+def test_mark_prices_refresh_after_ttl(engine, client):
+    engine.account_view(now=100.0)
+    # Reconciliation pushed the position marks: no mark price request yet
+    assert client.calls == ["futures_account", "futures_position_information"]
+
+    client.marks["ETHUSDT"] = 2200
+    assert engine.account_view(now=101.9)["unrealized_pnl"] == pytest.approx(100.0)
+    assert "futures_mark_price" not in client.calls
+
+    view = engine.account_view(now=102.0)
+    # Both held symbols are stale: one request for the whole premium index
+    assert client.calls[2:] == ["futures_mark_price"]
+    assert view["unrealized_pnl"] == pytest.approx(2 * 200 - 100)
+    assert view["equity"] == pytest.approx(1300.0)
+
+
+def test_mark_price_cache_ttl(client):
+    prices = MarkPriceCache(client, ttl_seconds=2)
+
+    assert prices.get_prices(["ETHUSDT"], now=0.0) == {"ETHUSDT": 2100}
+    assert prices.get_prices(["ETHUSDT"], now=1.0) == {"ETHUSDT": 2100}
+    assert client.calls == ["futures_mark_price:ETHUSDT"]
+
+    client.marks["ETHUSDT"] = 2050
+    assert prices.get_prices(["ETHUSDT", "BTCUSDT"], now=2.0) == {"ETHUSDT": 2050, "BTCUSDT": 31000}
+    assert client.calls[1:] == ["futures_mark_price"]
+    assert prices.peek(["ETHUSDT", "XRPUSDT"]) == {"ETHUSDT": 2050}
+
+
+def test_premium_index_shared_with_mark_prices(client):
+    prices = MarkPriceCache(client, ttl_seconds=2)
+
+    premium = prices.get_premium_index("ETHUSDT", max_age_seconds=60, now=0.0)
+    assert premium["predicted_rate"] == pytest.approx(0.0001)
+    assert premium["next_funding_time"] == 1_700_000_000_000
+    # The same request served every symbol and their marks
+    assert prices.get_premium_index("BTCUSDT", max_age_seconds=60, now=30.0)["mark_price"] == 31000
+    assert prices.get_prices(["SOLUSDT"], now=1.0) == {"SOLUSDT": 150}
+    assert client.calls == ["futures_mark_price"]
+
+    prices.get_premium_index("ETHUSDT", max_age_seconds=60, now=60.0)
+    assert client.calls == ["futures_mark_price"] * 2
@@ -0,0 +1,151 @@
+"""Idempotent order submission (account_actions/orders.py) against a fake exchange."""
+
+import asyncio
+
+import pytest
+import requests
+
+from account_actions import orders
+from account_actions.account import TradingAccount, use_account
+from agent.tools import open_position
+from benchmarks.fake_exchange import FakeBinanceClient, FakeBinanceError, synthesize_responses
+from utils.checkpoint import Checkpointer
+
+
+class LossyClient(FakeBinanceClient):
+    """Fake exchange whose order responses can be lost, and whose order lookups can lag."""
+
+    def __init__(self, place_order: bool = True):
+        """
+        Args:
+            place_order: Whether an order whose response is lost reached the
+                matching engine
+        """
+        super().__init__(synthesize_responses(["ETHUSDT"], intervals=["1m"], candles=10))
+        self.place_order = place_order
+        self.lose_responses = True
+        self.visible = True
+        self.create_calls = 0
+        self.lookups = 0
+
+    def futures_create_order(self, **kwargs):
+        self.create_calls += 1
+        if not self.lose_responses:
+            return super().futures_create_order(**kwargs)
+        if self.place_order:
+            super().futures_create_order(**kwargs)
+            raise requests.exceptions.ReadTimeout("Read timed out")
+        raise requests.exceptions.ConnectionError("Connection reset by peer")
+
+    def futures_get_order(self, **kwargs):
+        self.lookups += 1
+        if not self.visible:
+            raise FakeBinanceError(orders.ORDER_DOES_NOT_EXIST, "Order does not exist.")
+        return super().futures_get_order(**kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fast_lookups(monkeypatch):
+    monkeypatch.setattr(orders, "ORDER_LOOKUP_ATTEMPTS", 3)
+    monkeypatch.setattr(orders, "ORDER_LOOKUP_DELAY_SECONDS", 0)
+    yield
+    orders._in_flight.clear()
+
+
+def account(client) -> TradingAccount:
+    # No mark-to-market or risk engine: orders only touch the fake exchange
+    return TradingAccount("test", client)
+
+
+def test_ambiguous_error_is_looked_up_not_resent():
+    client = LossyClient(place_order=True)
+    with use_account(account(client)):
+        order = orders.submit_market_order("ETHUSDT", "BUY", 0.1, client_order_id="trader-a")
+
+    assert order["clientOrderId"] == "trader-a"
+    assert order["status"] == "FILLED"
+    assert client.create_calls == 1
+    assert len(client.orders) == 1
+    assert orders.get_in_flight_orders() == {}
+
+
+def test_ambiguous_error_without_order_stays_in_flight():
+    client = LossyClient(place_order=False)
+    with use_account(account(client)):
+        with pytest.raises(Exception, match="Outcome of order trader-b unknown"):
+            orders.submit_market_order("ETHUSDT", "SELL", 0.2, client_order_id="trader-b")
+
+    assert client.create_calls == 1
+    assert client.lookups == orders.ORDER_LOOKUP_ATTEMPTS
+    assert client.orders == []
+    in_flight = orders.get_in_flight_orders()
+    assert list(in_flight) == ["trader-b"]
+    assert in_flight["trader-b"]["account"] == "test"
+
+
+def test_rejected_order_is_not_looked_up():
+    class RejectingClient(LossyClient):
+        def futures_create_order(self, **kwargs):
+            raise FakeBinanceError(-2019, "Margin is insufficient.")
+
+    client = RejectingClient()
+    with use_account(account(client)):
+        with pytest.raises(Exception, match="Margin is insufficient"):
+            orders.submit_market_order("ETHUSDT", "BUY", 0.1)
+
+    assert client.lookups == 0
+    assert orders.get_in_flight_orders() == {}
+
+
+def test_same_tool_call_id_places_one_order():
+    assert orders.new_client_order_id(key="call_1") == orders.new_client_order_id(key="call_1")
+    assert orders.new_client_order_id(key="call_1") != orders.new_client_order_id(key="call_2")
+    assert orders.new_client_order_id() != orders.new_client_order_id()
+
+    client = LossyClient()
+    client.lose_responses = False
+    with use_account(account(client)):
+        first = asyncio.run(open_position("ETH/USDT", "LONG", 0.1, tool_call_id="call_1"))
+        # A repeated execution of the same call hits the duplicate id and finds the first order
+        second = asyncio.run(open_position("ETH/USDT", "LONG", 0.1, tool_call_id="call_1"))
+
+    assert first["status"] == second["status"] == "ok"
+    assert first["client_order_id"] == second["client_order_id"] == orders.new_client_order_id(key="call_1")
+    assert first["order_id"] == second["order_id"]
+    assert client.create_calls == 2
+    assert len(client.orders) == 1
+    assert client.positions["ETHUSDT"] == pytest.approx(0.1)
+
+
+def test_in_flight_orders_are_recovered_after_restart(tmp_path):
+    client = LossyClient(place_order=True)
+    # The order fills, but is not visible to lookups before they give up
+    client.visible = False
+    with use_account(account(client)):
+        with pytest.raises(Exception, match="unknown"):
+            orders.submit_market_order("ETHUSDT", "BUY", 0.1, client_order_id="trader-filled")
+    orders._in_flight["trader-lost"] = {"symbol": "ETHUSDT", "side": "SELL", "quantity": 0.1,
+                                        "reduce_only": False, "account": "test", "submitted_at": 0}
+
+    path = str(tmp_path / "checkpoint.json.gz")
+    before = Checkpointer(path)
+    before.register("orders", orders.get_in_flight_orders, lambda state: None)
+    assert before.save()
+
+    # Restart: in-flight tracking starts empty and the checkpoint is restored
+    orders._in_flight.clear()
+    client.visible = True
+    recovered = {}
+
+    def restore(state):
+        with use_account(account(client)):
+            recovered.update(orders.recover_orders(state))
+
+    after = Checkpointer(path)
+    after.register("orders", orders.get_in_flight_orders, restore)
+    assert after.restore() == ["orders"]
+
+    assert recovered["trader-filled"]["status"] == "FILLED"
+    assert recovered["trader-lost"] is None
+    assert client.create_calls == 1
+    assert len(client.orders) == 1
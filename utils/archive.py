@@ -0,0 +1,309 @@
+"""Compressed, rotating archive of full prompts and agent responses indexed by decision and cycle.
+
+Each record is written as an independent gzip member appended to the
+current segment file, and its (segment, offset, length) is stored in a
+SQLite index, so any past decision can be read back with a single seek.
+The index also holds the cycle, symbol and strategy of each decision, so
+the several decisions of one cycle (one per symbol and strategy) can be
+found together.
+Segments rotate at a size limit and the oldest are deleted beyond a count
+limit. Writes happen on a background thread, off the trading hot path.
+
+Usage:
+    python -m utils.archive --list          # most recent archived decisions
+    python -m utils.archive <id>            # print a decision, or every decision of a cycle
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .logger import get_logger
+
+
+ARCHIVE_DIR = os.getenv(
+    "ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive")
+)
+ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+ARCHIVE_MAX_SEGMENTS = int(os.getenv("ARCHIVE_MAX_SEGMENTS", "32"))
+
+logger = get_logger("archive")
+
+_SEGMENT_PREFIX = "decisions-"
+_SEGMENT_SUFFIX = ".gz"
+
+
+class DecisionArchive:
+    """Rotating gzip archive of cycle records with a SQLite index."""
+
+    def __init__(self, directory: str = ARCHIVE_DIR, segment_bytes: int = ARCHIVE_SEGMENT_BYTES,
+                 max_segments: int = ARCHIVE_MAX_SEGMENTS):
+        """
+        Args:
+            directory: Directory holding segment files and index.db
+            segment_bytes: Size at which the current segment is rotated
+            max_segments: Number of segments kept; older ones are deleted
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
+        self.index_path = os.path.join(directory, "index.db")
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_index (
+                decision_id TEXT PRIMARY KEY,
+                cycle_id TEXT,
+                symbol TEXT,
+                strategy_id TEXT,
+                created_at TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            )
+        """)
+        self._migrate(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_created ON archive_index(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_cycle ON archive_index(cycle_id)")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Upgrade an index keyed by cycle id only: the key becomes the decision id."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(archive_index)")}
+        if "decision_id" in columns:
+            return
+        conn.execute("ALTER TABLE archive_index RENAME COLUMN cycle_id TO decision_id")
+        for column in ("cycle_id", "symbol", "strategy_id"):
+            conn.execute(f"ALTER TABLE archive_index ADD COLUMN {column} TEXT")
+        # Older records were keyed by cycle id in single-symbol mode; multi-symbol
+        # keys (<cycle>-<symbol>) cannot be split reliably and keep the whole key
+        conn.execute("UPDATE archive_index SET cycle_id = decision_id")
+        conn.commit()
+        logger.info("Archive index migrated to decision ids")
+
+    # ---------------- Writing ----------------
+
+    def put(self, decision_id: str, record: Dict[str, Any], cycle_id: Optional[str] = None,
+            symbol: Optional[str] = None, strategy_id: Optional[str] = None):
+        """
+        Queue a record for archiving without blocking.
+
+        Args:
+            decision_id: Decision identifier used to look the record up later
+            record: JSON-serializable record (prompt, response, tool calls, ...)
+            cycle_id: Cycle the decision belongs to (default: the decision id)
+            symbol: Symbol decided on
+            strategy_id: Strategy that decided
+        """
+        self._ensure_worker()
+        self._queue.put((decision_id, cycle_id or decision_id, symbol, strategy_id,
+                         datetime.utcnow().isoformat(), record))
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        if self._worker is not None:
+            self._queue.join()
+
+    def close(self):
+        """Flush queued records and stop the writer thread."""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="decision-archive", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        conn = sqlite3.connect(self.index_path)
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    self._write(conn, *item)
+                except Exception as e:
+                    logger.warning("Failed to archive cycle record", extra={"error": str(e)})
+                finally:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, decision_id: str, cycle_id: str, symbol: Optional[str],
+               strategy_id: Optional[str], created_at: str, record: Dict[str, Any]):
+        data = gzip.compress(json.dumps(record, default=str).encode("utf-8"))
+        segment = self._current_segment(len(data))
+        path = os.path.join(self.directory, segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+
+        conn.execute("""
+            INSERT OR REPLACE INTO archive_index
+                (decision_id, cycle_id, symbol, strategy_id, created_at, segment, offset, length)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (decision_id, cycle_id, symbol, strategy_id, created_at, segment, offset, len(data)))
+        conn.commit()
+        self._prune(conn)
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+
+    def _current_segment(self, incoming_bytes: int) -> str:
+        segments = self._segments()
+        if segments:
+            latest = segments[-1]
+            size = os.path.getsize(os.path.join(self.directory, latest))
+            if size + incoming_bytes <= self.segment_bytes or size == 0:
+                return latest
+            number = int(latest[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) + 1
+        else:
+            number = 1
+        return f"{_SEGMENT_PREFIX}{number:06d}{_SEGMENT_SUFFIX}"
+
+    def _prune(self, conn: sqlite3.Connection):
+        segments = self._segments()
+        for segment in segments[:-self.max_segments]:
+            conn.execute("DELETE FROM archive_index WHERE segment = ?", (segment,))
+            conn.commit()
+            os.remove(os.path.join(self.directory, segment))
+
+    # ---------------- Reading ----------------
+
+    def get(self, decision_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read an archived record.
+
+        Args:
+            decision_id: Decision identifier
+
+        Returns:
+            The archived record, or None if it is unknown or was rotated out
+        """
+        conn = sqlite3.connect(self.index_path)
+        row = conn.execute(
+            "SELECT segment, offset, length FROM archive_index WHERE decision_id = ?", (decision_id,)
+        ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return self._read(*row)
+
+    def find(self, cycle_id: str, symbol: Optional[str] = None,
+             strategy_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read every archived decision of a cycle.
+
+        Args:
+            cycle_id: Cycle identifier
+            symbol: Only the decisions on this symbol
+            strategy_id: Only the decisions of this strategy
+
+        Returns:
+            Archived records in the order they were written; rotated-out ones are skipped
+        """
+        query = "SELECT segment, offset, length FROM archive_index WHERE cycle_id = ?"
+        params: List[Any] = [cycle_id]
+        if symbol is not None:
+            query += " AND symbol = ?"
+            params.append(symbol)
+        if strategy_id is not None:
+            query += " AND strategy_id = ?"
+            params.append(strategy_id)
+        conn = sqlite3.connect(self.index_path)
+        rows = conn.execute(query + " ORDER BY created_at", params).fetchall()
+        conn.close()
+        records = (self._read(*row) for row in rows)
+        return [record for record in records if record is not None]
+
+    def _read(self, segment: str, offset: int, length: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+        except FileNotFoundError:
+            return None
+        return json.loads(gzip.decompress(data))
+
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        List the most recently archived decisions.
+
+        Args:
+            limit: Maximum number of entries
+
+        Returns:
+            List of dictionaries with decision_id, cycle_id, symbol,
+            strategy_id, created_at and compressed size, newest first
+        """
+        conn = sqlite3.connect(self.index_path)
+        rows = conn.execute("""
+            SELECT decision_id, cycle_id, symbol, strategy_id, created_at, length
+            FROM archive_index
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+        conn.close()
+        return [{"decision_id": r[0], "cycle_id": r[1], "symbol": r[2], "strategy_id": r[3],
+                 "created_at": r[4], "compressed_bytes": r[5]} for r in rows]
+
+
+_archive = None
+
+
+def get_archive() -> DecisionArchive:
+    """Get or create the process-wide decision archive (singleton)."""
+    global _archive
+    if _archive is None:
+        _archive = DecisionArchive()
+    return _archive
+
+
+def close_archive():
+    """Flush and close the process-wide archive if it was ever opened."""
+    if _archive is not None:
+        _archive.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect archived prompts and agent responses")
+    parser.add_argument("id", nargs="?", help="Decision id, or cycle id to print every decision of the cycle")
+    parser.add_argument("--list", action="store_true", help="List recent decisions")
+    parser.add_argument("--limit", type=int, default=20, help="Entries to list (default: 20)")
+    args = parser.parse_args()
+
+    archive = get_archive()
+    if args.list or not args.id:
+        for entry in archive.list(args.limit):
+            print(f"{entry['created_at']}  {entry['decision_id']:<40} {entry['compressed_bytes']:>8} bytes")
+    else:
+        record = archive.get(args.id)
+        records = [record] if record is not None else archive.find(args.id)
+        if not records:
+            print(f"No archived record for {args.id}")
+            sys.exit(1)
+        for record in records:
+            print(json.dumps(record, indent=2))
@@ -1,4 +1,10 @@
-from typing import List, Dict
+from typing import List, Dict, Union
+
+from .candles import CandleSeries
+
+# Either candle representation is accepted by the candle-based indicators
+Candles = Union[CandleSeries, List[Dict[str, float]]]
+
 
 # ---------------- EMA Calculation ----------------
 def get_ema(prices: List[float], period: int) -> List[float]:
@@ -27,12 +33,14 @@ def get_ema(prices: List[float], period: int) -> List[float]:
 
 
 # ---------------- Mid Prices ----------------
-def get_mid_prices(candlesticks: List[Dict[str, float]]) -> List[float]:
+def get_mid_prices(candlesticks: Candles) -> List[float]:
     """
     Calculate mid prices for candlesticks.
     Each candlestick should have 'open' and 'close' fields.
     """
-    return [round((c['open'] + c['close']) / 2, 3) for c in candlesticks]
+    if isinstance(candlesticks, CandleSeries):
+        return [(o + c) / 2 for o, c in zip(candlesticks.open, candlesticks.close)]
+    return [(c['open'] + c['close']) / 2 for c in candlesticks]
 
 
 # ---------------- MACD ----------------
@@ -103,7 +111,7 @@ def get_rsi(prices: List[float], period: int = 14) -> List[float]:
     return rsi_values
 
 # ---------------- ATR ----------------
-def get_atr(candlesticks: List[Dict[str, float]], period: int = 14) -> List[float]:
+def get_atr(candlesticks: Candles, period: int = 14) -> List[float]:
     """
     Calculate Average True Range (ATR).
     
@@ -118,7 +126,7 @@ def get_atr(candlesticks: List[Dict[str, float]], period: int = 14) -> List[floa
     - Position sizing based on volatility
     - Identifying volatile vs quiet markets
     
-    :param candlesticks: List of candlesticks with 'high', 'low', 'open', 'close' fields
+    :param candlesticks: CandleSeries or list of candlesticks with 'high', 'low', 'open', 'close' fields
     :param period: The number of periods for ATR calculation. Default is 14.
     :return: List of ATR values.
     """
@@ -127,50 +135,49 @@ def get_atr(candlesticks: List[Dict[str, float]], period: int = 14) -> List[floa
     
     # Calculate True Range for each candlestick
     true_ranges = []
-    for i in range(1, len(candlesticks)):
-        current = candlesticks[i]
-        previous = candlesticks[i-1]
-        
-        # Calculate three possible ranges
-        tr1 = current['high'] - current['low']
-        tr2 = abs(current['high'] - previous['close'])
-        tr3 = abs(current['low'] - previous['close'])
-        
-        # True Range is the maximum of the three
-        true_range = max(tr1, tr2, tr3)
-        true_ranges.append(true_range)
+    if isinstance(candlesticks, CandleSeries):
+        closes = candlesticks.close
+        for high, low, previous_close in zip(candlesticks.high[1:], candlesticks.low[1:], closes[:-1]):
+            true_ranges.append(max(high - low, abs(high - previous_close), abs(low - previous_close)))
+    else:
+        for i in range(1, len(candlesticks)):
+            current = candlesticks[i]
+            previous = candlesticks[i-1]
+            
+            # Calculate three possible ranges
+            tr1 = current['high'] - current['low']
+            tr2 = abs(current['high'] - previous['close'])
+            tr3 = abs(current['low'] - previous['close'])
+            
+            # True Range is the maximum of the three
+            true_range = max(tr1, tr2, tr3)
+            true_ranges.append(true_range)
     
     # Calculate ATR using EMA of True Ranges
-    atr_values = get_ema(true_ranges, period)
-    
-    return [round(x, 3) for x in atr_values]
+    return get_ema(true_ranges, period)
 
 
 # ---------------- Volume Calculations ----------------
-def get_volume_statistics(candlesticks: List[Dict[str, float]], period: int = 20) -> Dict[str, float]:
+def get_volume_statistics(candlesticks: Candles, period: int = 20) -> Dict[str, float]:
     """
     Calculate volume statistics: current volume and average volume over a period.
     
-    :param candlesticks: List of candlesticks with 'volume' field
+    :param candlesticks: CandleSeries or list of candlesticks with 'volume' field
     :param period: Number of periods to calculate average volume. Default is 20.
     :return: Dictionary with 'current_volume' and 'average_volume'
     """
     if len(candlesticks) < 1:
         raise ValueError("Need at least 1 candlestick for volume statistics")
     
-    # Get volumes
-    volumes = [c['volume'] for c in candlesticks]
+    # Only the last 'period' volumes are needed (all of them if there are fewer)
+    recent = candlesticks[-period:]
+    volumes = recent.volume if isinstance(recent, CandleSeries) else [c['volume'] for c in recent]
     
     # Current volume is the last volume
     current_volume = volumes[-1]
     
     # Average volume over the specified period
-    if len(candlesticks) < period:
-        # If not enough data, use all available
-        average_volume = sum(volumes) / len(volumes)
-    else:
-        # Use last 'period' volumes
-        average_volume = sum(volumes[-period:]) / period
+    average_volume = sum(volumes) / len(volumes)
     
     return {
         "current_volume": round(current_volume, 3),
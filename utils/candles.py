@@ -0,0 +1,181 @@
+"""Compact, array-backed candle series.
+
+A CandleSeries stores each candle field in its own ``array('d')`` column
+(56 bytes per candle, including open and close times) instead of one dict
+of floats per candle (~360 bytes), so long histories for many symbols fit
+comfortably in memory.
+
+Slices are views: ``series[-50:]`` shares the parent's columns and copies
+nothing. Column accessors (``series.close``) return memoryviews over the
+view's range; the parent cannot grow while such a memoryview is alive, so
+hold them only for the duration of a calculation.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+FIELDS = ("open_time", "open", "high", "low", "close", "volume", "close_time")
+
+
+class CandleSeries:
+    """Columnar OHLCV candles, oldest first, indexable by position or open time."""
+
+    __slots__ = ("_columns", "_start", "_stop")
+
+    def __init__(self, columns: Optional[Dict[str, array]] = None, start: int = 0, stop: Optional[int] = None):
+        """
+        :param columns: One array('d') per FIELDS entry, all the same length (default: empty)
+        :param start: First candle of the view
+        :param stop: End of the view (default: end of the columns)
+        """
+        self._columns = columns if columns is not None else {field: array("d") for field in FIELDS}
+        self._start = start
+        self._stop = len(self._columns["open_time"]) if stop is None else stop
+
+    # ---------------- Construction ----------------
+
+    @classmethod
+    def from_klines(cls, rows: Iterable[Sequence]) -> "CandleSeries":
+        """
+        Parse Binance kline rows in one pass.
+
+        :param rows: Rows of [open time, open, high, low, close, volume, close time, ...],
+                     with numbers or numeric strings
+        :return: New CandleSeries
+        """
+        series = cls()
+        series.extend_klines(rows)
+        return series
+
+    @classmethod
+    def from_candlesticks(cls, candlesticks: Iterable[Dict[str, float]]) -> "CandleSeries":
+        """
+        Build a series from dict candlesticks (missing fields default to 0).
+
+        :param candlesticks: Dicts with 'open', 'high', 'low', 'close', 'volume'
+                             and optionally 'open_time' / 'close_time'
+        :return: New CandleSeries
+        """
+        series = cls()
+        appends = [series._columns[field].append for field in FIELDS]
+        for candle in candlesticks:
+            for field, append in zip(FIELDS, appends):
+                append(float(candle.get(field, 0.0)))
+        series._stop = len(series._columns["open_time"])
+        return series
+
+    def extend_klines(self, rows: Iterable[Sequence]):
+        """
+        Append Binance kline rows to the series.
+
+        :param rows: Kline rows, oldest first
+        """
+        if self._start != 0 or self._stop != len(self._columns["open_time"]):
+            raise ValueError("Cannot append to a CandleSeries view")
+        open_time, open_, high, low, close, volume, close_time = (
+            self._columns[field].append for field in FIELDS
+        )
+        for row in rows:
+            open_time(float(row[0]))
+            open_(float(row[1]))
+            high(float(row[2]))
+            low(float(row[3]))
+            close(float(row[4]))
+            volume(float(row[5]))
+            close_time(float(row[6]))
+        self._stop = len(self._columns["open_time"])
+
+    # ---------------- Access ----------------
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("CandleSeries slices do not support a step")
+            return CandleSeries(self._columns, self._start + start, self._start + max(start, stop))
+
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError("CandleSeries index out of range")
+        position = self._start + index
+        return {field: self._columns[field][position] for field in FIELDS}
+
+    def column(self, field: str) -> memoryview:
+        """
+        Get one field for the candles in this view without copying.
+
+        :param field: One of FIELDS
+        :return: memoryview of float64 values
+        """
+        return memoryview(self._columns[field])[self._start:self._stop]
+
+    @property
+    def open(self) -> memoryview:
+        return self.column("open")
+
+    @property
+    def high(self) -> memoryview:
+        return self.column("high")
+
+    @property
+    def low(self) -> memoryview:
+        return self.column("low")
+
+    @property
+    def close(self) -> memoryview:
+        return self.column("close")
+
+    @property
+    def volume(self) -> memoryview:
+        return self.column("volume")
+
+    @property
+    def open_times(self) -> memoryview:
+        return self.column("open_time")
+
+    def index_of(self, open_time: float) -> int:
+        """
+        Find the position of the candle that opened at open_time.
+
+        :param open_time: Open time in milliseconds
+        :return: Position within this view
+        """
+        times = self._columns["open_time"]
+        position = bisect_left(times, open_time, self._start, self._stop)
+        if position == self._stop or times[position] != open_time:
+            raise KeyError(f"No candle opened at {open_time}")
+        return position - self._start
+
+    def between(self, start_time: float, end_time: float) -> "CandleSeries":
+        """
+        View of the candles with start_time <= open time < end_time.
+
+        :param start_time: Inclusive lower bound in milliseconds
+        :param end_time: Exclusive upper bound in milliseconds
+        :return: CandleSeries view
+        """
+        times = self._columns["open_time"]
+        lo = bisect_left(times, start_time, self._start, self._stop)
+        hi = bisect_left(times, end_time, lo, self._stop)
+        return CandleSeries(self._columns, lo, hi)
+
+    # ---------------- Conversion ----------------
+
+    def to_candlesticks(self) -> List[Dict[str, float]]:
+        """Convert to the list-of-dicts format used before CandleSeries."""
+        return [self[i] for i in range(len(self))]
+
+    def to_klines(self) -> List[list]:
+        """Convert to rows of [open_time, open, high, low, close, volume, close_time]."""
+        columns = [self.column(field).tolist() for field in FIELDS]
+        return [[int(row[0]), *row[1:6], int(row[6])] for row in zip(*columns)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of column storage covered by this view."""
+        return len(self) * len(FIELDS) * 8
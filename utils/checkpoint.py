@@ -0,0 +1,217 @@
+"""Checkpoint of in-memory runtime state for warm restarts.
+
+Stateful components (cycle counters, kline history, open interest and
+funding caches, signal gate and event trigger baselines, risk counters,
+orders in flight) register a pair of functions: one returning their state
+as JSON-serializable data, one restoring it. After every cycle and on
+shutdown the states are written to one gzip-compressed JSON file,
+atomically (temporary file + rename). On startup they are restored from
+it, so incremental syncs only fetch what changed since the checkpoint
+instead of backfilling everything, and counters and baselines carry over.
+
+A checkpoint older than CHECKPOINT_MAX_AGE_SECONDS is ignored. The account
+itself (balances, positions) is always re-read from the exchange.
+
+Usage:
+    python -m utils.checkpoint              # summary of the checkpoint file
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .logger import get_logger
+from .metrics import increment, observe, set_gauge
+
+
+CHECKPOINT_PATH = os.getenv(
+    "CHECKPOINT_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "runtime_checkpoint.json.gz")
+)
+CHECKPOINT_MAX_AGE_SECONDS = float(os.getenv("CHECKPOINT_MAX_AGE_SECONDS", "86400"))
+CHECKPOINT_VERSION = 1
+
+logger = get_logger("checkpoint")
+
+
+def monotonic_to_wall(monotonic: float) -> float:
+    """Convert a time.monotonic() timestamp of this process to Unix time."""
+    return time.time() - (time.monotonic() - monotonic)
+
+
+def wall_to_monotonic(wall: float) -> float:
+    """Convert a Unix time to this process's time.monotonic() clock."""
+    return time.monotonic() - (time.time() - wall)
+
+
+class Checkpointer:
+    """Save and restore the state of registered components in one file."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, max_age_seconds: float = CHECKPOINT_MAX_AGE_SECONDS):
+        """
+        Args:
+            path: Checkpoint file
+            max_age_seconds: Age beyond which a checkpoint is not restored
+        """
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._components: Dict[str, Tuple[Callable[[], Any], Callable[[Any], Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, get_state: Callable[[], Any], restore_state: Callable[[Any], Any]):
+        """
+        Register a component.
+
+        Args:
+            name: Unique component name (key in the checkpoint)
+            get_state: Returns the component state, JSON-serializable
+            restore_state: Restores a state returned by get_state
+        """
+        self._components[name] = (get_state, restore_state)
+
+    def save(self) -> bool:
+        """
+        Write the state of every registered component. Blocking.
+
+        A component whose state cannot be read is left out of the checkpoint.
+
+        Returns:
+            True if the checkpoint was written (never without registered
+            components, which would overwrite a checkpoint with nothing)
+        """
+        if not self._components:
+            return False
+        start = time.perf_counter()
+        states = {}
+        for name, (get_state, _) in list(self._components.items()):
+            try:
+                states[name] = get_state()
+            except Exception as e:
+                logger.warning("Failed to checkpoint component", extra={"component": name, "error": str(e)})
+        document = {"version": CHECKPOINT_VERSION, "saved_at": time.time(), "components": states}
+        try:
+            data = gzip.compress(json.dumps(document, separators=(",", ":")).encode(), compresslevel=6)
+            with self._lock:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                temporary = f"{self.path}.tmp"
+                with open(temporary, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporary, self.path)
+        except Exception as e:
+            increment("checkpoint_saves_total", status="error")
+            logger.warning("Failed to write checkpoint", extra={"path": self.path, "error": str(e)})
+            return False
+        elapsed = time.perf_counter() - start
+        increment("checkpoint_saves_total", status="ok")
+        observe("checkpoint_save_seconds", elapsed)
+        set_gauge("checkpoint_bytes", len(data))
+        logger.debug("Checkpoint written", extra={
+            "path": self.path, "bytes": len(data), "components": list(states), "seconds": round(elapsed, 4),
+        })
+        return True
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Read the checkpoint file.
+
+        Returns:
+            Checkpoint document (version, saved_at, components), or None if
+            there is none, it is unreadable, of another version or too old
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with gzip.open(self.path, "rb") as f:
+                document = json.loads(f.read())
+        except Exception as e:
+            logger.warning("Unreadable checkpoint, starting cold", extra={"path": self.path, "error": str(e)})
+            return None
+        if document.get("version") != CHECKPOINT_VERSION:
+            logger.warning("Checkpoint version mismatch, starting cold", extra={"version": document.get("version")})
+            return None
+        age = time.time() - document["saved_at"]
+        if age > self.max_age_seconds:
+            logger.info("Checkpoint too old, starting cold", extra={"age_seconds": round(age)})
+            return None
+        return document
+
+    def restore(self) -> List[str]:
+        """
+        Restore every registered component found in the checkpoint. Blocking.
+
+        A component that fails to restore keeps its cold state.
+
+        Returns:
+            Names of the restored components
+        """
+        document = self.load()
+        if document is None:
+            increment("checkpoint_restores_total", status="cold")
+            return []
+        restored = []
+        for name, (_, restore_state) in self._components.items():
+            if name not in document["components"]:
+                continue
+            try:
+                restore_state(document["components"][name])
+                restored.append(name)
+            except Exception as e:
+                logger.warning("Failed to restore component", extra={"component": name, "error": str(e)})
+        increment("checkpoint_restores_total", status="warm")
+        logger.info("Runtime state restored from checkpoint", extra={
+            "path": self.path,
+            "age_seconds": round(time.time() - document["saved_at"], 1),
+            "components": restored,
+        })
+        return restored
+
+
+_checkpointer: Checkpointer | None = None
+
+
+def get_checkpointer() -> Optional[Checkpointer]:
+    """
+    Get the process-wide checkpointer (singleton).
+
+    Returns:
+        Checkpointer writing CHECKPOINT_PATH, or None when CHECKPOINT_PATH
+        is set to an empty string
+    """
+    global _checkpointer
+    if _checkpointer is None and CHECKPOINT_PATH:
+        _checkpointer = Checkpointer()
+    return _checkpointer
+
+
+def reset_checkpointer():
+    """Forget the registered components."""
+    global _checkpointer
+    _checkpointer = None
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the runtime checkpoint")
+    parser.add_argument("path", nargs="?", default=CHECKPOINT_PATH, help="Checkpoint file")
+    args = parser.parse_args(argv)
+
+    checkpointer = Checkpointer(args.path, max_age_seconds=float("inf"))
+    document = checkpointer.load()
+    if document is None:
+        print(f"No readable checkpoint at {args.path}")
+        return 1
+    print(f"{args.path}: {os.path.getsize(args.path)} bytes, "
+          f"saved {time.time() - document['saved_at']:.0f}s ago")
+    for name, state in document["components"].items():
+        print(f"  {name:<20} {len(json.dumps(state)):>10} bytes (uncompressed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""Explicit environment loading for entry points.
+
+Modules no longer call load_dotenv() at import time; entry points (main.py,
+api_server.py, CLI tools) call load_env() once at startup, and the few
+functions that need credentials call it again, which is a no-op after the
+first call.
+"""
+
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_env():
+    """
+    Load variables from a local .env file into os.environ (first call only).
+
+    Existing environment variables are not overridden.
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _loaded = True
@@ -0,0 +1,120 @@
+"""Queue-backed, non-blocking structured logging.
+
+Log calls only enqueue the record; a background listener thread formats
+and writes it, so slow stdout (systemd/docker log capture) never stalls
+the event loop. Records are emitted as JSON lines by default, with any
+`extra={...}` fields included as top-level keys.
+
+Configuration via environment variables:
+    LOG_LEVEL: DEBUG, INFO, WARNING, ERROR (default: INFO)
+    LOG_FORMAT: json or text (default: json)
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+ROOT_LOGGER_NAME = "trader"
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RESERVED_ATTRS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+def _get_extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _RESERVED_ATTRS and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(_get_extra_fields(record))
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format with extra fields appended as key=value pairs."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = _get_extra_fields(record)
+        if extra:
+            line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        return line
+
+
+def setup_logging(level: str | None = None, fmt: str | None = None):
+    """
+    Configure the "trader" logger hierarchy with a queue-backed handler.
+
+    Safe to call more than once; only the first call takes effect.
+
+    Args:
+        level: Log level name (default: LOG_LEVEL env var or INFO)
+        fmt: "json" or "text" (default: LOG_FORMAT env var or json)
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(level)
+        root.handlers = [QueueHandler(log_queue)]
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger in the "trader" hierarchy.
+
+    Entry points call setup_logging() once; until then records propagate to
+    the standard library's default handling (warnings and above to stderr).
+
+    Args:
+        name: Logger name, usually the module name (e.g. "main", "scheduler")
+
+    Returns:
+        logging.Logger instance
+    """
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
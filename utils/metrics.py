@@ -0,0 +1,319 @@
+"""Lightweight in-process metrics: timing spans, counters, gauges and histograms.
+
+Spans are recorded into fixed-bucket histograms and, while a cycle trace is
+active, appended to that trace so each trading cycle can be inspected stage
+by stage. The registry renders itself in the Prometheus text exposition
+format and can be snapshotted to JSON so another process (the API server)
+can serve it.
+"""
+
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Histogram buckets in seconds, from a single REST call up to a slow LLM reasoning call
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Active cycle trace (list of span records) for the current task, if any
+_current_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_trace", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Fixed-bucket cumulative histogram."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """Increase a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to the given value."""
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value into a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def record_span(self, name: str, start: float, duration: float, **labels):
+        """
+        Record a completed span.
+
+        The duration is recorded in the `<name>_seconds` histogram and, if a
+        cycle trace is active, appended to it.
+
+        Args:
+            name: Span name (e.g. "stage", "binance_request", "llm_call")
+            start: time.perf_counter() value when the span started
+            duration: Span duration in seconds
+            **labels: Label values identifying the span (e.g. stage="klines")
+        """
+        self.observe(f"{name}_seconds", duration, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["spans"].append({
+                "name": name,
+                "labels": labels,
+                "offset": round(start - trace["perf_start"], 6),
+                "duration": round(duration, 6),
+            })
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        Time a block of code and record it as a span (see record_span).
+
+        Args:
+            name: Span name
+            **labels: Label values identifying the span
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, start, time.perf_counter() - start, **labels)
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text (content type text/plain; version=0.0.4)
+        """
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, key), value in counters:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for (name, key), value in gauges:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} gauge")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for (name, key), histogram in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+                cumulative += histogram.counts[-1]
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        Export the registry as JSON-serializable data.
+
+        Returns:
+            Dictionary with counters, gauges and histograms lists
+        """
+        with self._lock:
+            return {
+                "counters": [[name, dict(key), value] for (name, key), value in self.counters.items()],
+                "gauges": [[name, dict(key), value] for (name, key), value in self.gauges.items()],
+                "histograms": [
+                    [name, dict(key), list(h.buckets), list(h.counts), h.sum, h.count]
+                    for (name, key), h in self.histograms.items()
+                ],
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Optional[Dict[str, list]]) -> "MetricsRegistry":
+        """
+        Rebuild a registry from a snapshot produced by snapshot().
+
+        Args:
+            snapshot: Snapshot dictionary, or None for an empty registry
+
+        Returns:
+            MetricsRegistry instance
+        """
+        registry = cls()
+        if not snapshot:
+            return registry
+        for name, labels, value in snapshot.get("counters", []):
+            registry.counters[(name, _label_key(labels))] = value
+        for name, labels, value in snapshot.get("gauges", []):
+            registry.gauges[(name, _label_key(labels))] = value
+        for name, labels, buckets, counts, total, count in snapshot.get("histograms", []):
+            histogram = Histogram(tuple(buckets))
+            histogram.counts = list(counts)
+            histogram.sum = total
+            histogram.count = count
+            registry.histograms[(name, _label_key(labels))] = histogram
+        return registry
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry (singleton)."""
+    return _registry
+
+
+def span(name: str, **labels):
+    """Time a block of code with the process-wide registry (see MetricsRegistry.span)."""
+    return _registry.span(name, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """Record a histogram value in the process-wide registry."""
+    _registry.observe(name, value, **labels)
+
+
+def increment(name: str, amount: float = 1, **labels):
+    """Increase a counter in the process-wide registry."""
+    _registry.increment(name, amount, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    """Set a gauge in the process-wide registry."""
+    _registry.set_gauge(name, value, **labels)
+
+
+def start_trace(cycle_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Start collecting spans for a trading cycle in the current context.
+
+    Args:
+        cycle_id: Optional cycle identifier (a random id is generated if omitted)
+
+    Returns:
+        The trace dictionary spans are appended to
+    """
+    trace = {
+        "cycle_id": cycle_id or uuid.uuid4().hex[:12],
+        "started_at": time.time(),
+        "perf_start": time.perf_counter(),
+        "spans": [],
+    }
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace() -> Optional[Dict[str, Any]]:
+    """
+    Stop collecting spans for the current cycle.
+
+    Returns:
+        Trace dictionary with cycle_id, started_at, duration and spans,
+        or None if no trace was active
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    _current_trace.set(None)
+    return {
+        "cycle_id": trace["cycle_id"],
+        "started_at": trace["started_at"],
+        "duration": round(time.perf_counter() - trace["perf_start"], 6),
+        "spans": trace["spans"],
+    }
+
+
+def get_current_cycle_id() -> Optional[str]:
+    """Get the id of the cycle trace active in the current context, if any."""
+    trace = _current_trace.get()
+    return trace["cycle_id"] if trace is not None else None
+
+
+# ---------------- Overhead check ----------------
+if __name__ == "__main__":
+    iterations = 100_000
+    registry = MetricsRegistry()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with registry.span("overhead", stage="check"):
+            pass
+    spans = time.perf_counter() - start
+
+    start_trace("overhead")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with registry.span("overhead", stage="traced"):
+            pass
+    traced = time.perf_counter() - start
+    end_trace()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        registry.increment("overhead_total", stage="check")
+    counters = time.perf_counter() - start
+
+    print(f"span overhead:         {(spans - baseline) / iterations * 1e6:.2f} us")
+    print(f"traced span overhead:  {(traced - baseline) / iterations * 1e6:.2f} us")
+    print(f"counter overhead:      {(counters - baseline) / iterations * 1e6:.2f} us")
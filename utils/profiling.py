@@ -0,0 +1,517 @@
+"""Opt-in profiling of live trading cycles.
+
+Off by default. When enabled, a cycle is captured if it is every Nth cycle
+(PROFILE_EVERY_N_CYCLES) or if it runs longer than a latency threshold
+(PROFILE_SLOW_CYCLE_SECONDS). A capture holds:
+
+- a CPU profile: by default a sampling profiler that walks the stacks of
+  every thread (the event loop and the to_thread workers running
+  indicators, exchange calls and serialization) every
+  PROFILE_SAMPLE_INTERVAL_MS, skipping threads idle in select or queue
+  waits; PROFILE_MODE=cprofile runs cProfile on the event loop thread
+  instead (exact call counts, much higher overhead, loop thread only)
+- a tracemalloc snapshot of the allocations made during the cycle and still
+  alive at its end, plus the peak traced memory (every Nth cycle only;
+  tracing every cycle just in case it turns out slow would cost too much)
+- asyncio task dumps: every task with its await chain, and the stack of
+  every thread, PROFILE_TASK_DUMP_SECONDS into the cycle if it is still
+  running (default: the slow threshold, else 5s)
+
+To catch slow cycles the sampler runs during every cycle; a capture is only
+kept if the cycle turned out slow. Captures are written as gzip-compressed
+JSON files to PROFILE_DIR, keeping the newest PROFILE_MAX_FILES. One cycle
+is captured at a time: a cycle overlapping a capture (e.g. an
+event-triggered decision) is not profiled.
+
+Usage:
+    python -m utils.profiling --list                  # captures, newest first
+    python -m utils.profiling <capture>               # summary of one capture
+    python -m utils.profiling <capture> <capture>     # diff: second minus first
+    python -m utils.profiling <capture> --folded      # folded stacks, for flamegraph.pl
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from .logger import get_logger
+from .metrics import increment, observe
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+PROFILE_EVERY_N_CYCLES = int(os.getenv("PROFILE_EVERY_N_CYCLES", "0"))
+PROFILE_SLOW_CYCLE_SECONDS = float(os.getenv("PROFILE_SLOW_CYCLE_SECONDS", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "true").lower() == "true"
+PROFILE_TASK_DUMP_SECONDS = float(os.getenv("PROFILE_TASK_DUMP_SECONDS", "0")) or PROFILE_SLOW_CYCLE_SECONDS or 5.0
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "profiles")
+)
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# Functions and allocation sites kept per capture
+MAX_FUNCTIONS = 500
+MAX_STACKS = 1000
+MAX_ALLOCATION_SITES = 100
+
+logger = get_logger("profiling")
+
+_CAPTURE_PREFIX = "profile-"
+_CAPTURE_SUFFIX = ".json.gz"
+# Leaf frames of threads waiting for work; their samples are not CPU or I/O time
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FunctionKey = Tuple[str, int, str]
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the repository or to site-packages, for display."""
+    if filename.startswith(_ROOT + os.sep):
+        return os.path.relpath(filename, _ROOT)
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    stdlib = _stdlib_path()
+    if filename.startswith(stdlib + os.sep):
+        return os.path.relpath(filename, stdlib)
+    return filename
+
+
+@lru_cache(maxsize=1)
+def _stdlib_path() -> str:
+    import sysconfig
+
+    return sysconfig.get_paths()["stdlib"]
+
+
+def _function_name(key: FunctionKey) -> str:
+    filename, line, name = key
+    return f"{_short_path(filename)}:{line}({name})"
+
+
+class _Sampler(threading.Thread):
+    """Background thread sampling the stack of every other thread."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in _IDLE_LEAVES:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                # Root first, like folded stacks
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def result(self) -> Dict[str, Any]:
+        """CPU section of a capture: per-function self/total time and the heaviest stacks."""
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for key in set(stack):
+                total_samples[key] += count
+        functions = {
+            _function_name(key): {"self": self_samples[key] * self.interval,
+                                  "total": count * self.interval, "calls": None}
+            for key, count in total_samples.most_common(MAX_FUNCTIONS)
+        }
+        folded = {";".join(f"{_short_path(f)}:{name}" for f, _, name in stack): count
+                  for stack, count in self.stacks.most_common(MAX_STACKS)}
+        return {"mode": "sampling", "interval": self.interval, "samples": self.samples,
+                "idle_samples": self.idle_samples, "functions": functions, "stacks": folded}
+
+
+def _cprofile_result(profile: "cProfile.Profile") -> Dict[str, Any]:
+    import pstats
+
+    stats = pstats.Stats(profile).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:MAX_FUNCTIONS]
+    functions = {_function_name(key): {"self": tottime, "total": cumtime, "calls": calls}
+                 for key, (_, calls, tottime, cumtime, _) in ranked}
+    return {"mode": "cprofile", "functions": functions}
+
+
+def _await_chain(coro) -> List[str]:
+    """Frames of a coroutine and of everything it awaits, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            frames.append(f"{_short_path(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+def dump_tasks() -> Dict[str, Any]:
+    """
+    Dump the asyncio tasks of the running loop and the stacks of every thread.
+
+    Must be called from the event loop thread.
+
+    Returns:
+        Dictionary with tasks (name, coroutine, await chain) and threads (name, stack)
+    """
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "await_chain": _await_chain(coro),
+        })
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    threads = []
+    for thread_id, frame in sys._current_frames().items():
+        stack = []
+        while frame is not None:
+            stack.append(f"{_short_path(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}")
+            frame = frame.f_back
+        threads.append({"name": names.get(thread_id, str(thread_id)), "stack": list(reversed(stack))})
+    return {"taken_at": time.time(), "tasks": tasks, "threads": threads}
+
+
+def _allocations(snapshot: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    return [{"site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+             "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:MAX_ALLOCATION_SITES]]
+
+
+class CycleProfiler:
+    """Decide which cycles to capture, capture them and write rotating capture files."""
+
+    def __init__(self, directory: str = PROFILE_DIR, every_n: int = PROFILE_EVERY_N_CYCLES,
+                 slow_seconds: float = PROFILE_SLOW_CYCLE_SECONDS, mode: str = PROFILE_MODE,
+                 sample_interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS, trace_allocations: bool = PROFILE_TRACEMALLOC,
+                 task_dump_seconds: float = PROFILE_TASK_DUMP_SECONDS, max_files: int = PROFILE_MAX_FILES):
+        """
+        Args:
+            directory: Directory of the capture files
+            every_n: Capture every Nth cycle (0: never)
+            slow_seconds: Keep the capture of a cycle slower than this (0: never)
+            mode: CPU profiler, "sampling" or "cprofile"
+            sample_interval_ms: Interval of the sampling profiler
+            trace_allocations: Take a tracemalloc snapshot of every Nth cycle
+            task_dump_seconds: Dump the asyncio tasks this far into a captured cycle
+            max_files: Capture files kept; older ones are deleted
+        """
+        if mode not in ("sampling", "cprofile"):
+            raise ValueError(f"Unknown profiling mode {mode}, expected sampling or cprofile")
+        self.directory = directory
+        self.every_n = every_n
+        self.slow_seconds = slow_seconds
+        self.mode = mode
+        self.sample_interval = sample_interval_ms / 1000
+        self.trace_allocations = trace_allocations
+        self.task_dump_seconds = task_dump_seconds
+        self.max_files = max(1, max_files)
+        self.cycles = 0
+        self._active = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.every_n > 0 or self.slow_seconds > 0
+
+    @contextmanager
+    def capture(self, cycle_id: str) -> Iterator[None]:
+        """
+        Profile the cycle run inside the block, if it is to be captured.
+
+        Args:
+            cycle_id: Cycle id (names the capture file)
+        """
+        with self._lock:
+            self.cycles += 1
+            scheduled = self.every_n > 0 and self.cycles % self.every_n == 0
+            if (not scheduled and self.slow_seconds <= 0) or self._active:
+                skip = True
+            else:
+                skip = False
+                self._active = True
+        if skip:
+            yield
+            return
+
+        record: Dict[str, Any] = {"cycle_id": cycle_id, "started_at": time.time(), "tasks": None}
+        sampler = profile = timer = None
+        tracing = False
+        try:
+            if self.mode == "cprofile":
+                import cProfile
+
+                profile = cProfile.Profile()
+            else:
+                sampler = _Sampler(self.sample_interval)
+            if scheduled and self.trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                tracing = True
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                timer = loop.call_later(self.task_dump_seconds, lambda: record.update(tasks=dump_tasks()))
+            if sampler is not None:
+                sampler.start()
+            if profile is not None:
+                profile.enable()
+        except Exception as e:
+            # Profiling must never stop the cycle
+            logger.warning("Failed to start cycle profile", extra={"cycle_id": cycle_id, "error": str(e)})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                if profile is not None:
+                    profile.disable()
+                if sampler is not None and sampler.is_alive():
+                    sampler.stop()
+                if timer is not None:
+                    timer.cancel()
+                allocations = None
+                if tracing:
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    allocations = {"peak_bytes": peak, "sites": _allocations(snapshot)}
+                slow = self.slow_seconds > 0 and duration >= self.slow_seconds
+                if scheduled or slow:
+                    record.update({
+                        "reason": "every_n" if scheduled else "slow",
+                        "duration": duration,
+                        "allocations": allocations,
+                    })
+                    threading.Thread(target=self._write, args=(record, sampler, profile),
+                                     name="profile-writer", daemon=True).start()
+            except Exception as e:
+                logger.warning("Failed to finish cycle profile", extra={"cycle_id": cycle_id, "error": str(e)})
+            finally:
+                with self._lock:
+                    self._active = False
+
+    def _write(self, record: Dict[str, Any], sampler: Optional[_Sampler], profile: Optional["cProfile.Profile"]):
+        """Aggregate a capture and write it (capture writer thread)."""
+        try:
+            record["cpu"] = sampler.result() if sampler is not None else _cprofile_result(profile)
+            import gzip
+
+            data = gzip.compress(json.dumps(record, separators=(",", ":")).encode(), compresslevel=6)
+            os.makedirs(self.directory, exist_ok=True)
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", record["cycle_id"])
+            path = os.path.join(self.directory, f"{_CAPTURE_PREFIX}{int(record['started_at'])}-{name}"
+                                                f"{_CAPTURE_SUFFIX}")
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(data)
+            os.replace(f"{path}.tmp", path)
+            self._prune()
+        except Exception as e:
+            increment("profile_captures_total", reason=record["reason"], status="error")
+            logger.warning("Failed to write cycle profile", extra={"cycle_id": record["cycle_id"], "error": str(e)})
+            return
+        increment("profile_captures_total", reason=record["reason"], status="ok")
+        observe("profile_capture_bytes", len(data))
+        logger.info("Cycle profile written", extra={
+            "cycle_id": record["cycle_id"], "reason": record["reason"], "duration": round(record["duration"], 3),
+            "path": path,
+        })
+
+    def _prune(self):
+        with self._lock:
+            for name in list_captures(self.directory)[self.max_files:]:
+                os.remove(os.path.join(self.directory, name))
+
+
+def list_captures(directory: str = PROFILE_DIR) -> List[str]:
+    """Capture file names in a directory, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted((name for name in os.listdir(directory)
+                   if name.startswith(_CAPTURE_PREFIX) and name.endswith(_CAPTURE_SUFFIX)), reverse=True)
+
+
+def load_capture(path: str) -> Dict[str, Any]:
+    """
+    Read a capture file.
+
+    Args:
+        path: Capture file, or its name in PROFILE_DIR
+
+    Returns:
+        Capture record (cycle_id, reason, duration, cpu, allocations, tasks)
+    """
+    if not os.path.exists(path):
+        path = os.path.join(PROFILE_DIR, path)
+    import gzip
+
+    with gzip.open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+_profiler: CycleProfiler | None = None
+
+
+def get_cycle_profiler() -> CycleProfiler:
+    """Get the process-wide cycle profiler (singleton)."""
+    global _profiler
+    if _profiler is None:
+        _profiler = CycleProfiler()
+    return _profiler
+
+
+def reset_cycle_profiler():
+    """Rebuild the profiler from the current settings on the next get_cycle_profiler."""
+    global _profiler
+    _profiler = None
+
+
+@contextmanager
+def profile_cycle(cycle_id: Optional[str]) -> Iterator[None]:
+    """
+    Profile a trading cycle if profiling is enabled and selects it (no-op otherwise).
+
+    Args:
+        cycle_id: Id of the cycle trace
+    """
+    profiler = get_cycle_profiler()
+    if not profiler.enabled:
+        yield
+        return
+    with profiler.capture(cycle_id or "cycle"):
+        yield
+
+
+# ---------------- CLI ----------------
+
+def _print_functions(functions: Dict[str, Dict[str, Any]], sort: str, top: int):
+    print(f"  {'self s':>9} {'total s':>9} {'calls':>8}  function (by {sort})")
+    ranked = sorted(functions.items(), key=lambda item: item[1][sort], reverse=True)[:top]
+    for name, stats in ranked:
+        calls = stats["calls"] if stats["calls"] is not None else "-"
+        print(f"  {stats['self']:>9.4f} {stats['total']:>9.4f} {calls:>8}  {name}")
+
+
+def summarize(capture: Dict[str, Any], top: int = 25):
+    """Print the hot functions, allocation sites and task dump of a capture."""
+    cpu = capture["cpu"]
+    print(f"cycle {capture['cycle_id']} ({capture['reason']}): {capture['duration']:.3f}s, {cpu['mode']} profile")
+    if cpu["mode"] == "sampling":
+        print(f"  {cpu['samples']} samples every {cpu['interval'] * 1000:g}ms "
+              f"({cpu['idle_samples']} idle samples skipped), all threads")
+    print()
+    _print_functions(cpu["functions"], "self", top)
+    print()
+    _print_functions(cpu["functions"], "total", top)
+    allocations = capture.get("allocations")
+    if allocations:
+        print(f"\nallocations alive at cycle end (peak {allocations['peak_bytes'] / 1024:.0f} KiB)")
+        for site in allocations["sites"][:top]:
+            print(f"  {site['size'] / 1024:>10.1f} KiB {site['count']:>8}  {site['site']}")
+    tasks = capture.get("tasks")
+    if tasks:
+        print(f"\nasyncio tasks {tasks['taken_at'] - capture['started_at']:.1f}s into the cycle")
+        for task in tasks["tasks"]:
+            waiting = task["await_chain"][-1] if task["await_chain"] else "-"
+            print(f"  {task['name']:<24} {task['coro']:<40} {waiting}")
+
+
+def diff(first: Dict[str, Any], second: Dict[str, Any], top: int = 25):
+    """Print what changed from the first capture to the second."""
+    print(f"{first['cycle_id']} ({first['duration']:.3f}s) -> {second['cycle_id']} ({second['duration']:.3f}s): "
+          f"{second['duration'] - first['duration']:+.3f}s")
+    if first["cpu"]["mode"] != second["cpu"]["mode"]:
+        print(f"  warning: comparing a {first['cpu']['mode']} profile with a {second['cpu']['mode']} profile")
+    a, b = first["cpu"]["functions"], second["cpu"]["functions"]
+    zero = {"self": 0.0, "total": 0.0}
+    changes = sorted(((name, b.get(name, zero)["self"] - a.get(name, zero)["self"],
+                       b.get(name, zero)["total"] - a.get(name, zero)["total"]) for name in set(a) | set(b)),
+                     key=lambda change: abs(change[1]), reverse=True)[:top]
+    print(f"\n  {'self Δ s':>9} {'total Δ s':>9}  function (by self time change)")
+    for name, self_delta, total_delta in changes:
+        print(f"  {self_delta:>+9.4f} {total_delta:>+9.4f}  {name}")
+
+    if first.get("allocations") and second.get("allocations"):
+        before = {site["site"]: site["size"] for site in first["allocations"]["sites"]}
+        after = {site["site"]: site["size"] for site in second["allocations"]["sites"]}
+        peak = second["allocations"]["peak_bytes"] - first["allocations"]["peak_bytes"]
+        print(f"\n  allocations alive at cycle end (peak {peak / 1024:+.0f} KiB)")
+        sites = sorted(((site, after.get(site, 0) - before.get(site, 0)) for site in set(before) | set(after)),
+                       key=lambda change: abs(change[1]), reverse=True)[:top]
+        for site, delta in sites:
+            print(f"  {delta / 1024:>+10.1f} KiB  {site}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize and compare cycle profiles")
+    parser.add_argument("captures", nargs="*", help="One capture to summarize, or two to diff")
+    parser.add_argument("--list", action="store_true", help="List captures in PROFILE_DIR")
+    parser.add_argument("--top", type=int, default=25, help="Rows per table (default: 25)")
+    parser.add_argument("--folded", action="store_true", help="Print the folded stacks of a sampling capture")
+    args = parser.parse_args(argv)
+
+    if args.list or not args.captures:
+        for name in list_captures():
+            size = os.path.getsize(os.path.join(PROFILE_DIR, name))
+            print(f"{name:<64} {size:>8} bytes")
+        return 0
+    if len(args.captures) > 2:
+        parser.error("expected one capture to summarize or two to diff")
+    captures = [load_capture(path) for path in args.captures]
+    if args.folded:
+        for stack, count in captures[0]["cpu"].get("stacks", {}).items():
+            print(f"{stack} {count}")
+    elif len(captures) == 1:
+        summarize(captures[0], args.top)
+    else:
+        diff(captures[0], captures[1], args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
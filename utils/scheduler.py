@@ -0,0 +1,202 @@
+"""Candle-close-aligned scheduler for the trading loop."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
+
+from .logger import get_logger
+from .metrics import increment, observe
+
+
+logger = get_logger("scheduler")
+
+OverrunPolicy = Literal["skip", "overlap"]
+
+
+class CandleScheduler:
+    """
+    Run an async cycle a fixed offset after every candle close.
+
+    Slots are aligned to exchange candle boundaries (multiples of the interval
+    since the Unix epoch, which is how Binance buckets klines), so a 300s
+    interval with a 2s offset wakes at hh:00:02, hh:05:02, hh:10:02, ...
+
+    Overrun policies (what happens when a cycle is still running at the next slot):
+    - "skip": cycles never overlap; slots that pass while a cycle is running
+      are skipped and the next cycle starts at the first slot after it finishes.
+    - "overlap": every slot starts a cycle on time, up to max_concurrent cycles
+      in flight; a slot is skipped only when that limit is reached.
+
+    Every cycle records its scheduled start, actual start lag, duration and
+    whether it finished after its deadline (the next slot).
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 300,
+        offset_seconds: float = 2.0,
+        overrun_policy: OverrunPolicy = "skip",
+        max_concurrent: int = 2,
+        history_size: int = 288,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            interval_seconds: Candle interval in seconds (default: 300 for 5m)
+            offset_seconds: Delay after each candle close before starting a cycle
+            overrun_policy: "skip" or "overlap" (see class docstring)
+            max_concurrent: Maximum cycles in flight for the "overlap" policy
+            history_size: Number of cycle records to keep (default: one day of 5m cycles)
+            clock: Wall-clock function returning Unix seconds
+        """
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+        if not 0 <= offset_seconds < interval_seconds:
+            raise ValueError("offset_seconds must be within [0, interval_seconds)")
+        if overrun_policy not in ("skip", "overlap"):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+
+        self.interval_seconds = interval_seconds
+        self.offset_seconds = offset_seconds
+        self.overrun_policy = overrun_policy
+        self.max_concurrent = max(1, max_concurrent)
+        self._clock = clock
+
+        self.history: deque = deque(maxlen=history_size)
+        self.cycles_run = 0
+        self.skipped_cycles = 0
+        self.missed_deadlines = 0
+        self.failed_cycles = 0
+        self._last_scheduled: Optional[float] = None
+
+    def next_run_time(self, after: float) -> float:
+        """
+        Get the first slot strictly after the given time.
+
+        Args:
+            after: Unix timestamp in seconds
+
+        Returns:
+            Unix timestamp of the next slot (candle close + offset)
+        """
+        k = math.floor((after - self.offset_seconds) / self.interval_seconds) + 1
+        return k * self.interval_seconds + self.offset_seconds
+
+    def candle_close_for(self, scheduled: float) -> float:
+        """Get the candle close time a slot belongs to."""
+        return scheduled - self.offset_seconds
+
+    async def run(
+        self,
+        cycle_fn: Callable[[float], Awaitable[Any]],
+        max_cycles: Optional[int] = None,
+    ):
+        """
+        Run cycle_fn at every slot until cancelled.
+
+        Args:
+            cycle_fn: Async function called with the candle close time (Unix seconds)
+                the cycle belongs to
+            max_cycles: Optional number of slots to process before returning
+        """
+        running: set = set()
+        slots = 0
+
+        try:
+            while max_cycles is None or slots < max_cycles:
+                reference = self._clock()
+                if self._last_scheduled is not None:
+                    reference = max(reference, self._last_scheduled)
+                scheduled = self.next_run_time(reference)
+
+                if self._last_scheduled is not None:
+                    missed = int(round((scheduled - self._last_scheduled) / self.interval_seconds)) - 1
+                    if missed > 0:
+                        self.skipped_cycles += missed
+                        increment("cycles_skipped_total", missed)
+                        logger.warning("Skipped slots because the previous cycle overran", extra={"skipped": missed})
+                self._last_scheduled = scheduled
+
+                logger.info("Next cycle scheduled", extra={
+                    "scheduled": datetime.fromtimestamp(scheduled).strftime('%Y-%m-%d %H:%M:%S'),
+                })
+                await asyncio.sleep(max(0.0, scheduled - self._clock()))
+                slots += 1
+
+                if self.overrun_policy == "skip":
+                    await self._run_cycle(cycle_fn, scheduled)
+                    continue
+
+                running = {task for task in running if not task.done()}
+                if len(running) >= self.max_concurrent:
+                    self.skipped_cycles += 1
+                    increment("cycles_skipped_total")
+                    logger.warning("Skipped slot, cycles still running", extra={"running": len(running)})
+                    continue
+                running.add(asyncio.create_task(self._run_cycle(cycle_fn, scheduled)))
+
+            if running:
+                await asyncio.gather(*running)
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _run_cycle(self, cycle_fn: Callable[[float], Awaitable[Any]], scheduled: float):
+        started = self._clock()
+        deadline = scheduled + self.interval_seconds
+        error = None
+        try:
+            await cycle_fn(self.candle_close_for(scheduled))
+        except Exception as e:
+            error = str(e)
+            self.failed_cycles += 1
+            logger.exception("Cycle failed", extra={"error": error})
+        finished = self._clock()
+
+        record = {
+            "scheduled": scheduled,
+            "started": started,
+            "start_lag": round(started - scheduled, 4),
+            "duration": round(finished - started, 4),
+            "deadline": deadline,
+            "missed_deadline": finished > deadline,
+            "error": error,
+        }
+        self.history.append(record)
+        self.cycles_run += 1
+        observe("cycle_start_lag_seconds", max(record["start_lag"], 0.0))
+        increment("cycles_total", status="error" if error else "ok")
+
+        if record["missed_deadline"]:
+            self.missed_deadlines += 1
+            increment("cycles_missed_deadline_total")
+            logger.warning("Cycle missed its deadline", extra={
+                "overrun": round(finished - deadline, 3),
+                "start_lag": record["start_lag"],
+                "duration": record["duration"],
+            })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get scheduling statistics over the retained history.
+
+        Returns:
+            Dictionary with cycle counts, skipped/missed/failed counts, and
+            average/max start lag and cycle duration in seconds
+        """
+        records: List[Dict[str, Any]] = list(self.history)
+        lags = [r["start_lag"] for r in records]
+        durations = [r["duration"] for r in records]
+        return {
+            "cycles_run": self.cycles_run,
+            "skipped_cycles": self.skipped_cycles,
+            "missed_deadlines": self.missed_deadlines,
+            "failed_cycles": self.failed_cycles,
+            "avg_start_lag": round(sum(lags) / len(lags), 4) if lags else 0.0,
+            "max_start_lag": max(lags) if lags else 0.0,
+            "avg_duration": round(sum(durations) / len(durations), 4) if durations else 0.0,
+            "max_duration": max(durations) if durations else 0.0,
+        }
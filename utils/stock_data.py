@@ -1,10 +1,127 @@
 from typing import Literal
+import math
 import time
 from client.binance_client import get_binance_client
-from binance import KLINE_INTERVAL_12HOUR, Client
+from market_data.shared_feed import get_market_feed, stream_name
+from market_data.resampler import get_resampler
+from .candles import CandleSeries
+from .metrics import span, increment
 from .calculations import get_ema, get_macd, get_mid_prices, get_atr, get_rsi, get_volume_statistics
 
 
+# (symbol, interval) -> closed klines of the last REST fetch, reused until the
+# next candle closes so that scanning and the agent share one fetch
+_closed_klines_cache: dict[tuple[str, str], list[list]] = {}
+
+
+def _round_significant(value: float, digits: int = 7) -> float:
+    """
+    Round a value to a number of significant digits.
+    
+    Unlike round(value, 3), this keeps the precision of indicators of
+    low-priced symbols (e.g. an ATR of 0.00004 does not become 0.0).
+    
+    :param value: Value to round
+    :param digits: Significant digits to keep
+    :return: Rounded value
+    """
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - math.floor(math.log10(abs(value))))
+
+
+def _next_close_ms(klines_data: list[list]) -> int:
+    """Close time (ms) of the candle following the last one in klines_data."""
+    open_time, close_time = int(klines_data[-1][0]), int(klines_data[-1][6])
+    return close_time + (close_time - open_time + 1)
+
+
+def get_closed_klines(symbol: str, interval: str, limit: int = 50) -> list[list]:
+    """
+    Fetch the most recent fully closed klines for a symbol.
+    
+    Binance always returns the in-progress candle as the last kline. It is
+    dropped here so that decisions are made on the freshly closed candle
+    rather than on a candle that is only a few seconds old.
+    
+    When a market-data collector publishes the stream (MARKET_DATA_SHM), the
+    klines are read from shared memory and Binance is only queried if the
+    collector has not published the latest closed candle yet.
+    
+    Intervals that are multiples of RESAMPLE_BASE_INTERVAL (5m by default)
+    are served from the local resampler, which only fetches new base candles
+    and aggregates larger intervals in memory (market_data/resampler.py).
+    
+    Otherwise klines fetched from Binance are kept until the next candle of
+    the interval closes, so repeated requests within a cycle (the symbol
+    scan, both indicator passes) are served without another REST call.
+    
+    :param symbol: Crypto trading pair symbol (e.g., "ETHUSDT")
+    :param interval: Binance kline interval (e.g., "5m")
+    :param limit: Number of closed klines to return
+    :return: List of raw Binance kline rows, oldest first
+    """
+    feed = get_market_feed()
+    if feed is not None:
+        shared_klines = feed.get_closed_klines(symbol, interval, limit)
+        if shared_klines is not None:
+            return shared_klines
+    
+    resampler = get_resampler()
+    if resampler is not None and resampler.supports(interval):
+        resampler.sync(symbol)
+        resampled = resampler.get_klines(symbol, interval, limit)
+        if resampled is not None:
+            increment("klines_resampled_total", interval=interval, status="hit")
+            return resampled
+        # Not enough base history for this many bars: fetch them directly
+        increment("klines_resampled_total", interval=interval, status="short")
+    
+    now_ms = int(time.time() * 1000)
+    cached = _closed_klines_cache.get((symbol, interval))
+    if cached and len(cached) >= limit and _next_close_ms(cached) > now_ms:
+        increment("klines_cache_total", status="hit")
+        return cached[-limit:]
+    increment("klines_cache_total", status="miss")
+    
+    client = get_binance_client()
+    klines_data = client.get_klines(
+        symbol=symbol,
+        interval=interval,
+        limit=limit + 1
+    )
+    
+    # Binance format: [Open time, Open, High, Low, Close, Volume, Close time, ...]
+    if klines_data and int(klines_data[-1][6]) >= now_ms:
+        klines_data = klines_data[:-1]
+    
+    klines_data = klines_data[-limit:]
+    if klines_data:
+        _closed_klines_cache[(symbol, interval)] = klines_data
+    return klines_data
+
+
+def get_klines_cache_state() -> dict[str, list[list]]:
+    """
+    Get the closed klines cached from REST fetches, for a checkpoint.
+    
+    :return: Mapping of stream name ("ETHUSDT:1m") to kline rows
+    """
+    return {stream_name(symbol, interval): rows for (symbol, interval), rows in list(_closed_klines_cache.items())}
+
+
+def restore_klines_cache_state(state: dict[str, list[list]]):
+    """
+    Restore cached klines from a checkpoint; rows whose next candle has
+    closed since are refetched on first use as usual.
+    
+    :param state: Output of get_klines_cache_state
+    """
+    for stream, rows in state.items():
+        symbol, interval = stream.split(":", 1)
+        _closed_klines_cache[(symbol, interval)] = rows
+
+
 def get_indicators(
     duration: Literal["5m", "4h"],
     symbol: str = "ETHUSDT"
@@ -18,29 +135,26 @@ def get_indicators(
              current_volume and average_volume (single values)
     """
     # Map duration to Binance interval format
-    interval = Client.KLINE_INTERVAL_5MINUTE if duration == "5m" else Client.KLINE_INTERVAL_4HOUR
+    interval = "5m" if duration == "5m" else "4h"
     candle_limit = 50  
     
-    # Fetch klines from Binance using python-binance client
-    client = get_binance_client()
-    klines_data = client.get_klines(
-        symbol=symbol,
-        interval=interval,
-        limit=candle_limit
-    )
+    # Fetch closed klines from Binance using python-binance client
+    with span("stage", stage="klines"):
+        klines_data = get_closed_klines(symbol, interval, candle_limit)
+    
+    with span("stage", stage="indicators"):
+        return _compute_indicators(klines_data)
+
+
+def _compute_indicators(klines_data: list[list]) -> dict[str, list[float]]:
+    """
+    Compute the indicator set returned by get_indicators from raw klines.
     
-    # Convert Binance klines format to our format
+    :param klines_data: Raw Binance kline rows, oldest first
+    :return: Same dictionary as get_indicators
+    """
     # Binance format: [Open time, Open, High, Low, Close, Volume, ...]
-    candlesticks = [
-        {
-            "open": float(candle[1]),
-            "high": float(candle[2]),
-            "low": float(candle[3]),
-            "close": float(candle[4]),
-            "volume": float(candle[5])
-        }
-        for candle in klines_data
-    ]
+    candlesticks = CandleSeries.from_klines(klines_data)
     
     # Calculate mid prices
     mid_prices = get_mid_prices(candlesticks)
@@ -72,12 +186,13 @@ def get_indicators(
     # Calculate volume statistics
     volume_stats = get_volume_statistics(candlesticks, period=20)
     
-    # Return last 10 values, rounded to 3 decimals
+    # Return last 10 values, rounded to 7 significant digits (prices can be
+    # far below 1, so a fixed number of decimals could round them to 0)
     return {
-        "midPrices": [round(x, 3) for x in mid_prices[-10:]],
-        "macd": [round(x, 3) for x in macd[-10:]],
-        "ema20s": [round(x, 3) for x in ema20s[-10:]],
-        "atr": [round(x, 3) for x in atr_values[-10:]],
+        "midPrices": [_round_significant(x) for x in mid_prices[-10:]],
+        "macd": [_round_significant(x) for x in macd[-10:]],
+        "ema20s": [_round_significant(x) for x in ema20s[-10:]],
+        "atr": [_round_significant(x) for x in atr_values[-10:]],
         "rsi": [round(x, 2) for x in rsi_values[-10:]],
         "current_volume": volume_stats["current_volume"],
         "average_volume": volume_stats["average_volume"]